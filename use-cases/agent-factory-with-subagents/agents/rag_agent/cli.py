@@ -15,6 +15,9 @@ from pydantic_ai import Agent
 from agent import search_agent
 from dependencies import AgentDependencies
 from settings import load_settings
+from utils.db_utils import db_pool as shared_pool
+from utils.local_index import close_shared_indexes
+from utils.search_timing import phase_summary
 
 console = Console()
 
@@ -221,12 +224,38 @@ async def main():
                 
                 elif user_input.lower() == 'info':
                     settings = load_settings()
+                    if deps.db_pool:
+                        pool = deps.db_pool.stats()
+                        wait = pool["acquire_wait"]
+                        replicas = "".join(
+                            f"\n[cyan]Replica {replica['name']}:[/cyan] "
+                            f"{'in rotation' if replica['usable'] else 'skipped'}, lag {replica['lag_seconds']}s, "
+                            f"{replica['acquires']:.0f} reads"
+                            for replica in pool["replicas"]
+                        )
+                        storage = (
+                            f"[cyan]DB Pool:[/cyan] {pool['in_use']} in use (peak {pool['in_use_max']:.0f}) "
+                            f"of {pool['size']}/{pool['max_size']}, acquire wait p95 "
+                            f"{wait.get('p95', 0) * 1000:.1f}ms"
+                            f"{replicas}"
+                        )
+                    else:
+                        storage = f"[cyan]Vector Store:[/cyan] {settings.vector_store} at {settings.vector_store_path}"
+                    timing = ""
+                    for tool in ("semantic_search", "hybrid_search"):
+                        phases = phase_summary(tool)
+                        if phases:
+                            timing += f"\n[cyan]{tool} p95:[/cyan] " + ", ".join(
+                                f"{phase} {summary['p95'] * 1000:.1f}ms" for phase, summary in phases.items()
+                            )
                     console.print(Panel(
                         f"[cyan]LLM Provider:[/cyan] {settings.llm_provider}\n"
                         f"[cyan]LLM Model:[/cyan] {settings.llm_model}\n"
                         f"[cyan]Embedding Model:[/cyan] {settings.embedding_model}\n"
                         f"[cyan]Default Match Count:[/cyan] {settings.default_match_count}\n"
-                        f"[cyan]Default Text Weight:[/cyan] {settings.default_text_weight}",
+                        f"[cyan]Default Text Weight:[/cyan] {settings.default_text_weight}\n"
+                        f"{storage}"
+                        f"{timing}",
                         title="System Configuration",
                         border_style="magenta"
                     ))
@@ -274,14 +303,22 @@ async def main():
                     console.print(f"[bold blue]Assistant:[/bold blue] {final_response}")
                     console.print()
                     conversation_history.append(f"Assistant: {final_response}")
+                
+                # Time of each search the agent ran this turn, by phase
+                for tool, timings in deps.search_timings:
+                    phases = ", ".join(f"{phase} {ms:.1f}ms" for phase, ms in timings.phases.items())
+                    console.print(f"[dim]{tool}: {timings.total_ms:.1f}ms ({phases})[/dim]")
+                deps.search_timings.clear()
                     
             except KeyboardInterrupt:
                 console.print("\n[yellow]Use 'exit' to quit[/yellow]")
                 continue
                 
     finally:
-        # Clean up
+        # Clean up the session, then the process-wide index and pool it used
         await deps.cleanup()
+        close_shared_indexes()
+        await shared_pool.close()
         console.print("[dim]Session ended[/dim]")
 
 
@@ -1,10 +1,15 @@
 """Dependencies for Semantic Search Agent."""
 
+import os
 from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
-import asyncpg
 import openai
 from settings import load_settings
+from utils.db_utils import DatabasePool, SEARCH_QUERIES, parse_urls, db_pool as shared_pool
+from utils.local_index import shared_index
+from utils.vector_store import VectorStore, PostgresVectorStore
+from utils.ivf_store import IVFVectorStore
+from utils.result_cache import SearchResultCache, result_cache as shared_result_cache
 
 
 @dataclass
@@ -12,27 +17,67 @@ class AgentDependencies:
     """Dependencies injected into the agent context."""
     
     # Core dependencies
-    db_pool: Optional[asyncpg.Pool] = None
+    db_pool: Optional[DatabasePool] = None
     openai_client: Optional[openai.AsyncOpenAI] = None
     settings: Optional[Any] = None
+    vector_store: Optional[VectorStore] = None
+    result_cache: Optional[SearchResultCache] = None
     
     # Session context
     session_id: Optional[str] = None
+    collection_id: Optional[str] = None
     user_preferences: Dict[str, Any] = field(default_factory=dict)
     query_history: list = field(default_factory=list)
+    # (tool, SearchTimings) of the session's recent searches, oldest first
+    search_timings: list = field(default_factory=list)
     
     async def initialize(self):
         """Initialize external connections."""
         if not self.settings:
             self.settings = load_settings()
         
-        # Initialize database pool
-        if not self.db_pool:
-            self.db_pool = await asyncpg.create_pool(
-                self.settings.database_url,
+        # The local engine needs no database
+        if not self.vector_store and self.settings.vector_store == "ivf":
+            self.vector_store = IVFVectorStore.from_settings(self.settings)
+        
+        # Use the process-wide pool, warmed with the search statements
+        if not self.vector_store and not self.db_pool:
+            shared_pool.configure(
+                database_url=self.settings.database_url,
                 min_size=self.settings.db_pool_min_size,
-                max_size=self.settings.db_pool_max_size
+                max_size=self.settings.db_pool_max_size,
+                statement_cache_size=self.settings.db_statement_cache_size,
+                warmup_queries=SEARCH_QUERIES,
+                replica_urls=parse_urls(self.settings.database_replica_urls),
+                replica_routing=self.settings.replica_routing,
+                max_replica_lag=self.settings.replica_max_lag
+            )
+            await shared_pool.initialize()
+            self.db_pool = shared_pool
+        
+        if not self.vector_store:
+            # Mirror the session's collection for in-process vector search,
+            # shared by the process; searches use Postgres until it has synced
+            local_index = None
+            if self.settings.local_index_path:
+                collection = self.collection_id or self.settings.default_collection
+                local_index = shared_index(
+                    os.path.join(self.settings.local_index_path, collection),
+                    collection,
+                    self.settings.embedding_dimension,
+                    self.settings.vector_metric
+                )
+                if local_index.generation is None:
+                    local_index.sync_in_background(self.db_pool)
+            self.vector_store = PostgresVectorStore(self.db_pool, self.settings, local_index=local_index)
+        
+        # Results are shared by all sessions of the process
+        if not self.result_cache and self.settings.result_cache_size > 0:
+            shared_result_cache.configure(
+                max_entries=self.settings.result_cache_size,
+                path=self.settings.result_cache_path
             )
+            self.result_cache = shared_result_cache
         
         # Initialize OpenAI client (or compatible provider)
         if not self.openai_client:
@@ -42,10 +87,15 @@ class AgentDependencies:
             )
     
     async def cleanup(self):
-        """Clean up external connections."""
-        if self.db_pool:
-            await self.db_pool.close()
-            self.db_pool = None
+        """
+        Release the session's resources.
+        
+        The database pool and the local index are shared by every session of
+        the process, so they are only dropped here; the application closes
+        them when it shuts down.
+        """
+        self.db_pool = None
+        self.vector_store = None
     
     async def get_embedding(self, text: str) -> list[float]:
         """Generate embedding for text using OpenAI."""
@@ -59,6 +109,19 @@ class AgentDependencies:
         # Return as list of floats - asyncpg will handle conversion
         return response.data[0].embedding
     
+    async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for several texts in one OpenAI call."""
+        if not texts:
+            return []
+        if not self.openai_client:
+            await self.initialize()
+        
+        response = await self.openai_client.embeddings.create(
+            model=self.settings.embedding_model,
+            input=texts
+        )
+        return [data.embedding for data in sorted(response.data, key=lambda data: data.index)]
+    
     def set_user_preference(self, key: str, value: Any):
         """Set a user preference for the session."""
         self.user_preferences[key] = value
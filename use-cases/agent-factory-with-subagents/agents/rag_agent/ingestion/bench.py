@@ -0,0 +1,183 @@
+"""
+Ingestion benchmark: replicate a corpus and measure per-stage throughput.
+"""
+
+import os
+import re
+import shutil
+import logging
+from typing import List, Dict, Any, Tuple
+from dataclasses import dataclass, field, asdict
+
+from .discovery import walk_documents
+from .sources import DEFAULT_EXTENSIONS
+
+try:
+    from ..utils.metrics import MetricsRegistry, peak_rss_bytes
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.metrics import MetricsRegistry, peak_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)(i?)b?\s*$", re.IGNORECASE)
+_EXPONENTS = {"": 0, "k": 1, "m": 2, "g": 3}
+
+MB = 1000 ** 2
+
+
+def parse_size(text: str) -> int:
+    """
+    Parse a human-readable size such as '50MB', '1.5GiB' or '800k'.
+
+    Args:
+        text: Size with optional unit (decimal, or binary with 'i')
+
+    Returns:
+        Size in bytes
+    """
+    match = _SIZE.match(text)
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+
+    number, prefix, binary = match.groups()
+    base = 1024 if binary else 1000
+    return int(float(number) * base ** _EXPONENTS[prefix.lower()])
+
+
+def replicate_corpus(
+    source_folder: str,
+    target_bytes: int,
+    output_folder: str,
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS
+) -> Tuple[int, int]:
+    """
+    Copy a corpus repeatedly until it reaches a target size.
+
+    Each copy goes into its own subfolder (copy-0000, copy-0001, ...), so
+    every replicated document keeps a unique source identifier.
+
+    Args:
+        source_folder: Folder with the seed documents
+        target_bytes: Minimum total size of the replicated corpus
+        output_folder: Folder to write copies into
+        extensions: Document extensions to replicate
+
+    Returns:
+        Tuple of (files written, bytes written)
+    """
+    seed = list(walk_documents(source_folder, extensions))
+    if not seed:
+        raise ValueError(f"No documents to replicate in {source_folder}")
+
+    files = 0
+    written = 0
+    copy = 0
+
+    while written < target_bytes:
+        copy_folder = os.path.join(output_folder, f"copy-{copy:04d}")
+        for found in seed:
+            target = os.path.join(copy_folder, os.path.relpath(found.path, source_folder))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(found.path, target)
+            files += 1
+            written += found.size
+            if written >= target_bytes:
+                break
+        copy += 1
+
+    logger.info(f"Replicated {len(seed)} seed documents into {files} files ({written / MB:.1f} MB)")
+    return files, written
+
+
+@dataclass
+class StageThroughput:
+    """Throughput of one pipeline stage, relative to the time spent in it."""
+    stage: str
+    seconds: float
+    documents_per_second: float
+    chunks_per_second: float
+    mb_per_second: float
+    peak_rss_mb: float
+
+
+@dataclass
+class BenchmarkReport:
+    """Outcome of a benchmark run."""
+    documents: int
+    chunks: int
+    bytes: int
+    wall_seconds: float
+    peak_rss_mb: float
+    stages: List[StageThroughput] = field(default_factory=list)
+
+    @classmethod
+    def from_metrics(cls, metrics: MetricsRegistry, wall_seconds: float) -> "BenchmarkReport":
+        """
+        Build a report from a finished run's metrics.
+
+        Args:
+            metrics: Registry the pipeline recorded into
+            wall_seconds: Wall-clock time of the run
+
+        Returns:
+            Benchmark report
+        """
+        documents = int(metrics.counter_value("ingest_documents_total", status="ok"))
+        chunks = int(metrics.counter_value("ingest_chunks_total"))
+        size = int(metrics.counter_value("ingest_bytes_total"))
+
+        def rate(amount: float, seconds: float) -> float:
+            return round(amount / seconds, 2) if seconds > 0 else 0.0
+
+        stages = []
+        for stage in ("read", "chunk", "llm_split", "embed", "db"):
+            histogram = metrics.histogram("ingest_stage_seconds", stage=stage)
+            if not histogram or not histogram.count:
+                continue
+            stages.append(StageThroughput(
+                stage=stage,
+                seconds=round(histogram.sum, 4),
+                documents_per_second=rate(histogram.count, histogram.sum),
+                chunks_per_second=rate(chunks, histogram.sum),
+                mb_per_second=rate(size / MB, histogram.sum),
+                peak_rss_mb=round(metrics.gauge_value("ingest_stage_peak_rss_bytes", stage=stage) / MB, 1)
+            ))
+
+        stages.append(StageThroughput(
+            stage="total",
+            seconds=round(wall_seconds, 4),
+            documents_per_second=rate(documents, wall_seconds),
+            chunks_per_second=rate(chunks, wall_seconds),
+            mb_per_second=rate(size / MB, wall_seconds),
+            peak_rss_mb=round(peak_rss_bytes() / MB, 1)
+        ))
+
+        return cls(
+            documents=documents,
+            chunks=chunks,
+            bytes=size,
+            wall_seconds=round(wall_seconds, 4),
+            peak_rss_mb=round(peak_rss_bytes() / MB, 1),
+            stages=stages
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the report as plain data."""
+        return asdict(self)
+
+    def format(self) -> str:
+        """Render the report as a table."""
+        lines = [
+            f"Documents: {self.documents}  Chunks: {self.chunks}  "
+            f"Size: {self.bytes / MB:.1f} MB  Wall: {self.wall_seconds:.2f}s  Peak RSS: {self.peak_rss_mb:.1f} MB",
+            f"{'stage':<10} {'seconds':>9} {'docs/s':>10} {'chunks/s':>10} {'MB/s':>8} {'peak RSS MB':>12}"
+        ]
+        for stage in self.stages:
+            lines.append(
+                f"{stage.stage:<10} {stage.seconds:>9.2f} {stage.documents_per_second:>10.1f} "
+                f"{stage.chunks_per_second:>10.1f} {stage.mb_per_second:>8.2f} {stage.peak_rss_mb:>12.1f}"
+            )
+        return "\n".join(lines)
@@ -4,6 +4,7 @@ Semantic chunking implementation for intelligent document splitting.
 
 import os
 import re
+import time
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
@@ -26,9 +27,23 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from utils.providers import get_embedding_client, get_ingestion_model
 
-# Initialize clients with flexible providers
-embedding_client = get_embedding_client()
-ingestion_model = get_ingestion_model()
+# Clients are created on first use, so rule-based and stubbed runs need no API key
+_embedding_client = None
+_ingestion_model = None
+
+
+def _get_embedding_client():
+    global _embedding_client
+    if _embedding_client is None:
+        _embedding_client = get_embedding_client()
+    return _embedding_client
+
+
+def _get_ingestion_model():
+    global _ingestion_model
+    if _ingestion_model is None:
+        _ingestion_model = get_ingestion_model()
+    return _ingestion_model
 
 
 @dataclass
@@ -77,8 +92,20 @@ class SemanticChunker:
             config: Chunking configuration
         """
         self.config = config
-        self.client = embedding_client
-        self.model = ingestion_model
+        
+        # Cumulative time spent in LLM splitting, for per-stage telemetry
+        self.llm_split_seconds = 0.0
+        self.llm_split_calls = 0
+    
+    @property
+    def client(self):
+        """Embedding client, created on first use."""
+        return _get_embedding_client()
+    
+    @property
+    def model(self):
+        """LLM used for semantic splitting, created on first use."""
+        return _get_ingestion_model()
     
     async def chunk_document(
         self,
@@ -156,7 +183,10 @@ class SemanticChunker:
                 # Handle oversized sections
                 if len(section) > self.config.max_chunk_size:
                     # Split the section semantically
+                    split_start = time.perf_counter()
                     sub_chunks = await self._split_long_section(section)
+                    self.llm_split_seconds += time.perf_counter() - split_start
+                    self.llm_split_calls += 1
                     chunks.extend(sub_chunks)
                 else:
                     current_chunk = section
@@ -350,7 +380,7 @@ class SimpleChunker:
         """Initialize simple chunker."""
         self.config = config
     
-    def chunk_document(
+    async def chunk_document(
         self,
         content: str,
         title: str,
@@ -0,0 +1,60 @@
+"""
+Collections: per-tenant partitions of the chunks table.
+"""
+
+import re
+import logging
+
+import asyncpg
+
+from .indexes import ANNIndexSpec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+
+# Must match create_collection() in sql/schema.sql; ids become part of table names
+_COLLECTION_ID = re.compile(r"^[a-z0-9_]{1,48}$")
+
+
+def validate_collection_id(collection: str) -> str:
+    """
+    Check a collection id is usable as part of a partition name.
+
+    Args:
+        collection: Collection id
+
+    Returns:
+        The collection id
+    """
+    if not _COLLECTION_ID.match(collection or ""):
+        raise ValueError(
+            f"Invalid collection id: {collection!r} (use 1-48 lowercase letters, digits or underscores)"
+        )
+    return collection
+
+
+def partition_name(collection: str) -> str:
+    """Name of the chunks partition holding a collection."""
+    return f"chunks_c_{validate_collection_id(collection)}"
+
+
+def ann_index_spec(collection: str) -> ANNIndexSpec:
+    """Default vector index of a collection's partition."""
+    partition = partition_name(collection)
+    return ANNIndexSpec(name=f"idx_{partition}_embedding", table=partition)
+
+
+async def ensure_collection(conn: asyncpg.Connection, collection: str) -> str:
+    """
+    Create a collection's chunks partition if it does not exist yet.
+
+    Args:
+        conn: Database connection
+        collection: Collection id
+
+    Returns:
+        Name of the collection's partition
+    """
+    validate_collection_id(collection)
+    return await conn.fetchval("SELECT create_collection($1)", collection)
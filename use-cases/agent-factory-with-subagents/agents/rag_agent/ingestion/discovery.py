@@ -0,0 +1,272 @@
+"""
+Lazy single-pass document discovery with ignore rules.
+"""
+
+import os
+import re
+import queue
+import logging
+import threading
+from typing import List, Iterator, NamedTuple, Optional, Pattern, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+IGNORE_FILE = ".ingestignore"
+
+# Directories never worth descending into
+DEFAULT_IGNORED_DIRS = (
+    ".git", ".hg", ".svn", "node_modules", "__pycache__",
+    ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache", ".ingestion_runs"
+)
+
+
+class DiscoveredFile(NamedTuple):
+    """A file found during discovery."""
+    path: str
+    size: int
+    mtime: float
+
+
+class IgnoreRules:
+    """
+    Gitignore-style ignore rules.
+
+    Supports the common subset: glob patterns, `#` comments, `!` negation,
+    trailing `/` for directory-only patterns and leading `/` to anchor a
+    pattern at the root. Patterns without a slash match at any depth.
+    `*`, `?` and `[...]` match within one path segment; `**` matches any
+    number of segments.
+    """
+
+    def __init__(self, patterns: Optional[List[str]] = None):
+        """
+        Initialize rules.
+
+        Args:
+            patterns: Ignore patterns, in file order
+        """
+        self.rules: List[Tuple[Pattern[str], bool, bool, bool]] = []
+        for pattern in patterns or []:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+
+            negated = pattern.startswith("!")
+            if negated:
+                pattern = pattern[1:]
+
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+
+            anchored = "/" in pattern
+            pattern = pattern.lstrip("/")
+
+            self.rules.append((_compile_pattern(pattern), negated, dir_only, anchored))
+
+    @classmethod
+    def from_file(cls, path: str) -> "IgnoreRules":
+        """Load rules from an ignore file, if it exists."""
+        if not os.path.isfile(path):
+            return cls()
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read().splitlines())
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        Check whether a path is ignored; the last matching rule wins.
+
+        Args:
+            relative_path: Path relative to the walk root, using '/' separators
+            is_dir: Whether the path is a directory
+        """
+        ignored = False
+        name = relative_path.rsplit("/", 1)[-1]
+
+        for pattern, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = relative_path if anchored else name
+            if pattern.match(target):
+                ignored = not negated
+
+        return ignored
+
+
+def _compile_pattern(pattern: str) -> Pattern[str]:
+    """
+    Translate a glob to a regex that keeps wildcards inside path segments.
+
+    Args:
+        pattern: Glob pattern without negation or leading/trailing slashes
+
+    Returns:
+        Compiled regex matching the whole path
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    return re.compile("".join(parts) + r"\Z", re.DOTALL)
+
+
+class _Walker:
+    """Single os.scandir walk matching all extensions in one pass."""
+
+    def __init__(
+        self,
+        root: str,
+        extensions: Tuple[str, ...],
+        rules: IgnoreRules,
+        ignored_dirs: Tuple[str, ...]
+    ):
+        self.root = root
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.rules = rules
+        self.ignored_dirs = set(ignored_dirs)
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def scan(self, directory: str) -> Tuple[List[DiscoveredFile], List[str]]:
+        """Scan one directory into its matching files and walkable subdirectories."""
+        files, subdirectories = [], []
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            logger.warning(f"Cannot read directory {directory}: {e}")
+            return files, subdirectories
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in self.ignored_dirs:
+                        continue
+                    if self.rules.is_ignored(self._relative(entry.path), is_dir=True):
+                        continue
+                    subdirectories.append(entry.path)
+                elif entry.is_file() and entry.name.lower().endswith(self.extensions):
+                    if self.rules.is_ignored(self._relative(entry.path), is_dir=False):
+                        continue
+                    stat = entry.stat()
+                    files.append(DiscoveredFile(entry.path, stat.st_size, stat.st_mtime))
+            except OSError as e:
+                logger.warning(f"Cannot stat {entry.path}: {e}")
+
+        return files, subdirectories
+
+    def walk(self, start: str) -> Iterator[DiscoveredFile]:
+        """Depth-first walk below a directory, yielding matches as they are found."""
+        stack = [start]
+
+        while stack:
+            files, subdirectories = self.scan(stack.pop())
+            yield from files
+            # Reversed so subdirectories are visited in sorted order
+            stack.extend(reversed(subdirectories))
+
+
+def walk_documents(
+    root: str,
+    extensions: Tuple[str, ...],
+    ignore_file: Optional[str] = IGNORE_FILE,
+    ignored_dirs: Tuple[str, ...] = DEFAULT_IGNORED_DIRS,
+    threads: int = 0,
+    queue_size: int = 1024
+) -> Iterator[DiscoveredFile]:
+    """
+    Lazily discover document files below a folder.
+
+    Files are yielded as soon as they are found, so processing can start
+    before the walk finishes. With threads > 1 the top-level subdirectories
+    are walked concurrently, which helps on very wide trees and network
+    filesystems; results then arrive in completion order instead of sorted.
+
+    Args:
+        root: Folder to walk
+        extensions: File extensions to include (case-insensitive)
+        ignore_file: Name of a gitignore-style file at the root, or None
+        ignored_dirs: Directory names that are always skipped
+        threads: Number of walker threads; 0 or 1 walks in the calling thread
+        queue_size: Maximum discovered files buffered ahead of the consumer
+
+    Yields:
+        DiscoveredFile tuples of (path, size, mtime)
+    """
+    if not os.path.isdir(root):
+        logger.error(f"Documents folder not found: {root}")
+        return
+
+    rules = IgnoreRules.from_file(os.path.join(root, ignore_file)) if ignore_file else IgnoreRules()
+    walker = _Walker(root, extensions, rules, ignored_dirs)
+
+    if threads <= 1:
+        yield from walker.walk(root)
+        return
+
+    files, subdirectories = walker.scan(root)
+    yield from files
+
+    results: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def offer(item) -> bool:
+        # Block while the consumer is behind, but give up once it has stopped
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def walk_subtree(directory: str):
+        try:
+            for found in walker.walk(directory):
+                if not offer(found):
+                    return
+        except Exception as e:
+            logger.error(f"Directory walk failed below {directory}: {e}")
+        offer(done)
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ingest-walk")
+    try:
+        for directory in subdirectories:
+            executor.submit(walk_subtree, directory)
+
+        remaining = len(subdirectories)
+        while remaining:
+            item = results.get()
+            if item is done:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        # Consumer stopped early or walk finished: release blocked walkers
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
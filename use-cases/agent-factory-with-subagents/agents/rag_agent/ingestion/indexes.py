@@ -0,0 +1,267 @@
+"""
+ANN index management for bulk loads.
+"""
+
+import re
+import math
+import time
+import logging
+from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+ANN_METHODS = ("ivfflat", "hnsw")
+
+# Operator class per search metric; must match the metric the search functions use
+METRIC_OPCLASSES = {
+    "cosine": "vector_cosine_ops",
+    "inner_product": "vector_ip_ops",
+    "l2": "vector_l2_ops"
+}
+
+# Storage parameters each method accepts
+METHOD_PARAMETERS = {
+    "ivfflat": ("lists",),
+    "hnsw": ("m", "ef_construction")
+}
+
+_ANN_DEF = re.compile(
+    r"USING (?P<method>ivfflat|hnsw) \((?P<column>\w+)(?: (?P<opclass>\w+))?\)",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class ANNIndexSpec:
+    """Definition of a vector index, independent of its tuning parameters."""
+    name: str = "idx_chunks_embedding"
+    table: str = "chunks"
+    column: str = "embedding"
+    method: str = "ivfflat"
+    opclass: str = "vector_cosine_ops"
+
+    @classmethod
+    def from_definition(cls, name: str, table: str, definition: str) -> Optional["ANNIndexSpec"]:
+        """Parse a pg_get_indexdef() definition, or None if it is not an ANN index."""
+        match = _ANN_DEF.search(definition)
+        if not match:
+            return None
+
+        return cls(
+            name=name,
+            table=table,
+            column=match.group("column"),
+            method=match.group("method").lower(),
+            opclass=match.group("opclass") or "vector_l2_ops"
+        )
+
+
+@dataclass
+class IndexBuildReport:
+    """Outcome of an index build."""
+    name: str
+    table: str
+    method: str
+    rows: int
+    seconds: float
+    parameters: Dict[str, int] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        params = ", ".join(f"{k}={v}" for k, v in self.parameters.items())
+        return f"{self.name} ({self.method}, {params}) on {self.rows} rows in {self.seconds:.1f}s"
+
+
+def derive_parameters(method: str, rows: int) -> Dict[str, int]:
+    """
+    Derive build parameters from the number of indexed rows.
+
+    IVFFlat follows the pgvector guidance of rows / 1000 lists up to one
+    million rows and sqrt(rows) beyond. HNSW scales graph degree and build
+    candidate list with collection size.
+
+    Args:
+        method: Index method (ivfflat or hnsw)
+        rows: Number of rows with a vector
+
+    Returns:
+        Index storage parameters
+    """
+    if method == "ivfflat":
+        if rows <= 1_000_000:
+            lists = rows // 1000
+        else:
+            lists = int(math.sqrt(rows))
+        return {"lists": max(1, lists)}
+
+    if method == "hnsw":
+        if rows < 100_000:
+            return {"m": 16, "ef_construction": 64}
+        if rows < 1_000_000:
+            return {"m": 16, "ef_construction": 128}
+        return {"m": 24, "ef_construction": 200}
+
+    raise ValueError(f"Unsupported ANN index method: {method}")
+
+
+class ANNIndexManager:
+    """
+    Drops vector indexes before bulk loads and rebuilds them right-sized.
+
+    Loading into an indexed table pays index maintenance on every insert, and
+    an IVFFlat index trained on an empty table (lists = 1) degenerates to a
+    flat scan. Building once after the load, with parameters derived from the
+    final row count and generous maintenance memory, is both faster and gives
+    a usable index.
+    """
+
+    def __init__(
+        self,
+        method: Optional[str] = None,
+        maintenance_work_mem: str = "1GB",
+        parallel_workers: Optional[int] = None,
+        metric: Optional[str] = None,
+        parameters: Optional[Dict[str, int]] = None
+    ):
+        """
+        Initialize index manager.
+
+        Args:
+            method: Force ivfflat or hnsw when rebuilding; None keeps each index's method
+            maintenance_work_mem: Memory for the build (kept in memory = much faster)
+            parallel_workers: max_parallel_maintenance_workers for the build;
+                None leaves the server setting
+            metric: Force the operator class (cosine, inner_product, l2);
+                None keeps each index's operator class
+            parameters: Storage parameters (lists, m, ef_construction) that
+                override the derived ones; keys the method does not take are ignored
+        """
+        if method is not None and method not in ANN_METHODS:
+            raise ValueError(f"Unsupported ANN index method: {method}")
+        if metric is not None and metric not in METRIC_OPCLASSES:
+            raise ValueError(f"Unsupported vector metric: {metric}")
+
+        self.method = method
+        self.maintenance_work_mem = maintenance_work_mem
+        self.parallel_workers = parallel_workers
+        self.metric = metric
+        self.parameters = {k: v for k, v in (parameters or {}).items() if v is not None}
+
+    def parameters_for(self, method: str, rows: int) -> Dict[str, int]:
+        """
+        Get the build parameters: derived from the row count, then overridden.
+
+        Args:
+            method: Index method (ivfflat or hnsw)
+            rows: Number of rows with a vector
+
+        Returns:
+            Index storage parameters
+        """
+        parameters = derive_parameters(method, rows)
+        for key in METHOD_PARAMETERS[method]:
+            if key in self.parameters:
+                parameters[key] = int(self.parameters[key])
+        return parameters
+
+    async def find(self, conn: asyncpg.Connection, table: str = "chunks") -> List[ANNIndexSpec]:
+        """
+        Find the vector indexes on a table.
+
+        Args:
+            conn: Database connection
+            table: Table to inspect
+
+        Returns:
+            Specs of the table's ANN indexes
+        """
+        rows = await conn.fetch(
+            """
+            SELECT i.relname AS name, pg_get_indexdef(x.indexrelid) AS definition
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            WHERE x.indrelid = $1::regclass
+              AND am.amname = ANY($2::text[])
+            ORDER BY i.relname
+            """,
+            table,
+            list(ANN_METHODS)
+        )
+
+        specs = []
+        for row in rows:
+            spec = ANNIndexSpec.from_definition(row["name"], table, row["definition"])
+            if spec:
+                specs.append(spec)
+        return specs
+
+    async def drop(self, conn: asyncpg.Connection, table: str = "chunks") -> List[ANNIndexSpec]:
+        """
+        Drop the vector indexes on a table ahead of a bulk load.
+
+        Args:
+            conn: Database connection
+            table: Table to load
+
+        Returns:
+            Specs of the dropped indexes, to rebuild after loading
+        """
+        specs = await self.find(conn, table)
+        for spec in specs:
+            await conn.execute(f"DROP INDEX IF EXISTS {spec.name}")
+            logger.info(f"Dropped {spec.name} for bulk load")
+        return specs
+
+    async def build(
+        self,
+        conn: asyncpg.Connection,
+        spec: ANNIndexSpec,
+        table: Optional[str] = None,
+        name: Optional[str] = None
+    ) -> IndexBuildReport:
+        """
+        Build a vector index sized for the rows currently in the table.
+
+        Args:
+            conn: Database connection
+            spec: Index to build
+            table: Build on this table instead of spec.table
+            name: Build under this name instead of spec.name
+
+        Returns:
+            Build report with parameters and duration
+        """
+        table = table or spec.table
+        name = name or spec.name
+        method = self.method or spec.method
+        opclass = METRIC_OPCLASSES[self.metric] if self.metric else spec.opclass
+
+        rows = await conn.fetchval(f"SELECT COUNT(*) FROM {table} WHERE {spec.column} IS NOT NULL")
+        parameters = self.parameters_for(method, rows)
+        with_clause = ", ".join(f"{k} = {v}" for k, v in parameters.items())
+
+        start = time.perf_counter()
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL maintenance_work_mem = '{self.maintenance_work_mem}'")
+            if self.parallel_workers is not None:
+                await conn.execute(f"SET LOCAL max_parallel_maintenance_workers = {int(self.parallel_workers)}")
+
+            await conn.execute(f"DROP INDEX IF EXISTS {name}")
+            await conn.execute(
+                f"CREATE INDEX {name} ON {table} USING {method} ({spec.column} {opclass}) WITH ({with_clause})"
+            )
+        seconds = time.perf_counter() - start
+
+        report = IndexBuildReport(
+            name=name,
+            table=table,
+            method=method,
+            rows=rows,
+            seconds=seconds,
+            parameters=parameters
+        )
+        logger.info(f"Built {report}")
+        return report
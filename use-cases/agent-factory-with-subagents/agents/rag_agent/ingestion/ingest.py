@@ -3,12 +3,16 @@ Main ingestion script for processing markdown documents into vector DB and knowl
 """
 
 import os
+import time
+import queue
+import shutil
+import tempfile
 import asyncio
 import logging
+import threading
 import json
-import glob
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Callable, Awaitable
 from datetime import datetime
 import argparse
 
@@ -16,12 +20,24 @@ import asyncpg
 from dotenv import load_dotenv
 
 from .chunker import ChunkingConfig, create_chunker, DocumentChunk
-from .embedder import create_embedder
+from .embedder import create_embedder, EmbeddingGenerator, StubEmbeddingGenerator
+from .journal import IngestionJournal, DEFAULT_JOURNAL_DIR
+from .sources import SourceDocument, open_source
+from .reindex import ShadowReindex
+from .collections import DEFAULT_COLLECTION, validate_collection_id, partition_name, ann_index_spec, ensure_collection
+from .indexes import ANNIndexManager, ANNIndexSpec, IndexBuildReport
+from .work_queue import IngestionJobQueue, IngestionJob, LeaseLostError, default_worker_id
+from .sinks import InMemorySink, NullSink
+from .bench import BenchmarkReport, parse_size, replicate_corpus
 
 # Import utilities
 try:
     from ..utils.db_utils import initialize_database, close_database, db_pool
     from ..utils.models import IngestionConfig, IngestionResult
+    from ..utils.metrics import MetricsRegistry, current_rss_bytes
+    from ..utils.vector_store import PostgresVectorStore
+    from ..utils.ivf_store import IVFVectorStore
+    from ..utils.result_cache import warm_configured
 except ImportError:
     # For direct execution or testing
     import sys
@@ -29,12 +45,22 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from utils.db_utils import initialize_database, close_database, db_pool
     from utils.models import IngestionConfig, IngestionResult
+    from utils.metrics import MetricsRegistry, current_rss_bytes
+    from utils.vector_store import PostgresVectorStore
+    from utils.ivf_store import IVFVectorStore
+    from utils.result_cache import warm_configured
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+STAGES = ("read", "chunk", "llm_split", "embed", "db")
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+# Documents, or seconds, between corpus generation bumps while loading
+GENERATION_BATCH_DOCUMENTS = 100
+GENERATION_BATCH_SECONDS = 30.0
+
 
 class DocumentIngestionPipeline:
     """Pipeline for ingesting documents into vector DB and knowledge graph."""
@@ -43,19 +69,79 @@ class DocumentIngestionPipeline:
         self,
         config: IngestionConfig,
         documents_folder: str = "documents",
-        clean_before_ingest: bool = False
+        clean_before_ingest: bool = False,
+        resume_run_id: Optional[str] = None,
+        journal_dir: str = DEFAULT_JOURNAL_DIR,
+        jsonl_text_field: str = "content",
+        jsonl_id_field: str = "id",
+        walk_threads: int = 0,
+        reindex: bool = False,
+        defer_index: bool = False,
+        ann_manager: Optional[ANNIndexManager] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        prefetch_size: int = 8,
+        sink=None,
+        embedder: Optional[EmbeddingGenerator] = None,
+        collection: str = DEFAULT_COLLECTION
     ):
         """
         Initialize ingestion pipeline.
         
         Args:
             config: Ingestion configuration
-            documents_folder: Folder containing markdown documents
+            documents_folder: Folder of documents, archive (.tar.gz/.zip) or JSONL dump
             clean_before_ingest: Whether to clean existing data before ingestion
+            resume_run_id: Run journal to resume instead of starting a new run
+            journal_dir: Directory holding run journals
+            jsonl_text_field: Record field holding the text in JSONL dumps
+            jsonl_id_field: Record field holding the identifier in JSONL dumps
+            walk_threads: Threads used to walk very wide document folders
+            reindex: Rebuild into shadow tables and swap them in atomically,
+                keeping search available throughout (blue/green)
+            defer_index: Drop vector indexes during the load and rebuild them
+                right-sized afterwards (implied by reindex)
+            ann_manager: Vector index build settings
+            metrics: Registry receiving per-stage timings and counters
+            prefetch_size: Documents read ahead of processing
+            sink: Vector store to write to instead of PostgreSQL (e.g.
+                IVFVectorStore, or InMemorySink/NullSink for dry runs and
+                benchmarks)
+            embedder: Embedding generator (e.g. StubEmbeddingGenerator to run
+                without the embedding API)
+            collection: Collection (tenant) the documents belong to; cleaning,
+                reindexing and index builds only touch this collection
         """
+        if sink is not None and (reindex or defer_index):
+            raise ValueError("reindex and defer_index require PostgreSQL, not a sink")
+        
         self.config = config
         self.documents_folder = documents_folder
         self.clean_before_ingest = clean_before_ingest
+        self.jsonl_text_field = jsonl_text_field
+        self.jsonl_id_field = jsonl_id_field
+        self.walk_threads = walk_threads
+        self.resume_run_id = resume_run_id
+        self.journal_dir = journal_dir
+        self.journal: Optional[IngestionJournal] = None
+        self.metrics = metrics or MetricsRegistry()
+        self.prefetch_size = max(1, prefetch_size)
+        
+        # Target tables; a blue/green reindex loads into a shadow partition
+        self.collection = validate_collection_id(collection)
+        self.partition = partition_name(collection)
+        self.reindex = reindex
+        self.defer_index = defer_index
+        self.ann_manager = ann_manager or ANNIndexManager()
+        self.index_reports: List[IndexBuildReport] = []
+        self.reindexer = ShadowReindex(collection, ann_manager=self.ann_manager) if reindex else None
+        
+        # Documents are written through the vector store interface only
+        self.sink = sink
+        self.store = sink if sink is not None else PostgresVectorStore(
+            db_pool,
+            documents_table=self.reindexer.documents_table if reindex else "documents",
+            chunks_table=self.reindexer.chunks_table if reindex else "chunks"
+        )
         
         # Initialize components
         self.chunker_config = ChunkingConfig(
@@ -66,7 +152,11 @@ class DocumentIngestionPipeline:
         )
         
         self.chunker = create_chunker(self.chunker_config)
-        self.embedder = create_embedder()
+        self.embedder = embedder or create_embedder()
+        
+        # Documents written since the collection's generation was last bumped
+        self._unpublished_documents = 0
+        self._published_at = time.monotonic()
         
         self._initialized = False
     
@@ -78,7 +168,12 @@ class DocumentIngestionPipeline:
         logger.info("Initializing ingestion pipeline...")
         
         # Initialize database connections
-        await initialize_database()
+        if self.sink is None:
+            # Pool wait and query latency go into this run's metrics
+            db_pool.configure(metrics=self.metrics)
+            await initialize_database()
+            async with db_pool.acquire() as conn:
+                await ensure_collection(conn, self.collection)
         
         self._initialized = True
         logger.info("Ingestion pipeline initialized")
@@ -86,7 +181,8 @@ class DocumentIngestionPipeline:
     async def close(self):
         """Close database connections."""
         if self._initialized:
-            await close_database()
+            if self.sink is None:
+                await close_database()
             self._initialized = False
     
     async def ingest_documents(
@@ -94,10 +190,14 @@ class DocumentIngestionPipeline:
         progress_callback: Optional[callable] = None
     ) -> List[IngestionResult]:
         """
-        Ingest all documents from the documents folder.
+        Ingest all documents from the documents source.
+        
+        Documents are streamed from the source one at a time, so folders,
+        archives and JSONL dumps of any size are processed with bounded memory.
         
         Args:
-            progress_callback: Optional callback for progress updates
+            progress_callback: Optional callback for progress updates,
+                called with (processed, total); total is None when unknown
         
         Returns:
             List of ingestion results
@@ -105,42 +205,91 @@ class DocumentIngestionPipeline:
         if not self._initialized:
             await self.initialize()
         
-        # Clean existing data if requested
-        if self.clean_before_ingest:
-            await self._clean_databases()
+        if not os.path.exists(self.documents_folder):
+            logger.error(f"Documents source not found: {self.documents_folder}")
+            return []
         
-        # Find all markdown files
-        markdown_files = self._find_markdown_files()
+        self.journal = self._open_journal()
+        logger.info(f"Ingestion run ID: {self.journal.run_id}")
         
-        if not markdown_files:
-            logger.warning(f"No markdown files found in {self.documents_folder}")
-            return []
+        # Clean existing data if requested (only once per run, even across resumes)
+        if self.clean_before_ingest and not self.journal.cleaned:
+            await self._clean_databases()
+            self.journal.record_cleaned()
+        
+        if self.reindex:
+            if self.journal.has_marker("swapped"):
+                # Crashed after the swap: the rebuilt tables are already live
+                self.store.documents_table, self.store.chunks_table = "documents", "chunks"
+            elif not self.journal.has_marker("shadow_prepared"):
+                async with db_pool.acquire() as conn:
+                    await self.reindexer.prepare(conn, self.journal.run_id)
+                self.journal.record_marker("shadow_prepared")
+        elif self.defer_index and not self.journal.has_marker("ann_dropped"):
+            async with db_pool.acquire() as conn:
+                dropped = await self.ann_manager.drop(conn, self.partition)
+            self.journal.record_marker("ann_dropped", {"indexes": [vars(spec) for spec in dropped]})
         
-        logger.info(f"Found {len(markdown_files)} markdown files to process")
+        source = open_source(
+            self.documents_folder,
+            jsonl_text_field=self.jsonl_text_field,
+            jsonl_id_field=self.jsonl_id_field,
+            walk_threads=self.walk_threads
+        )
         
         results = []
+        processed = 0
+        run_start = time.perf_counter()
         
-        for i, file_path in enumerate(markdown_files):
-            try:
-                logger.info(f"Processing file {i+1}/{len(markdown_files)}: {file_path}")
-                
-                result = await self._ingest_single_document(file_path)
-                results.append(result)
+        try:
+            async for document, read_seconds in self._prefetch(source):
+                processed += 1
                 
-                if progress_callback:
-                    progress_callback(i + 1, len(markdown_files))
+                if self.journal.is_completed(document.source_id):
+                    logger.debug(f"Skipping {document.source_id}: already ingested in run {self.journal.run_id}")
+                    self.metrics.inc("ingest_documents_total", status="skipped")
+                    if progress_callback:
+                        progress_callback(processed, None)
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Failed to process {file_path}: {e}")
-                results.append(IngestionResult(
-                    document_id="",
-                    title=os.path.basename(file_path),
-                    chunks_created=0,
-                    entities_extracted=0,
-                    relationships_created=0,
-                    processing_time_ms=0,
-                    errors=[str(e)]
-                ))
+                try:
+                    logger.info(f"Processing document {processed}: {document.source_id}")
+                    
+                    result = await self._ingest_single_document(document)
+                    result.stage_timings_ms = {"read": round(read_seconds * 1000, 3), **result.stage_timings_ms}
+                    results.append(result)
+                    self._record_result(result)
+                    
+                    if result.document_id:
+                        self.journal.record_file_completed(document.source_id, result.document_id, result.chunks_created)
+                        await self._publish_writes()
+                    else:
+                        self.journal.record_file_failed(document.source_id, "; ".join(result.errors))
+                    
+                    if progress_callback:
+                        progress_callback(processed, None)
+                    
+                except Exception as e:
+                    logger.error(f"Failed to process {document.source_id}: {e}")
+                    self.journal.record_file_failed(document.source_id, str(e))
+                    result = IngestionResult(
+                        document_id="",
+                        title=document.name,
+                        chunks_created=0,
+                        entities_extracted=0,
+                        relationships_created=0,
+                        processing_time_ms=0,
+                        bytes_read=document.size,
+                        errors=[str(e)]
+                    )
+                    results.append(result)
+                    self._record_result(result)
+        finally:
+            # Publish what was committed even when a source fails or the run is interrupted
+            await self._publish_writes(force=True)
+        
+        if processed == 0:
+            logger.warning(f"No documents found in {self.documents_folder}")
         
         # Log summary
         total_chunks = sum(r.chunks_created for r in results)
@@ -148,37 +297,460 @@ class DocumentIngestionPipeline:
         
         logger.info(f"Ingestion complete: {len(results)} documents, {total_chunks} chunks, {total_errors} errors")
         
+        if self.reindex:
+            if not self.journal.has_marker("swapped"):
+                await self._promote_shadow_tables()
+            if self.journal.has_marker("swapped") and not self.journal.has_marker("retired"):
+                await self._retire_previous_generation()
+        elif self.defer_index:
+            if not self.journal.has_marker("ann_rebuilt"):
+                await self._rebuild_ann_indexes()
+        elif self.sink is None:
+            await self._ensure_ann_index()
+        
+        for report in self.index_reports:
+            self.metrics.observe("ingest_stage_seconds", report.seconds, stage="index")
+        
+        self.metrics.set_gauge(
+            "ingest_run_duration_seconds",
+            time.perf_counter() - run_start,
+            help="Wall time of the last ingestion run"
+        )
+        self.metrics.set_gauge(
+            "ingest_last_run_timestamp_seconds",
+            time.time(),
+            help="Unix time the last ingestion run finished"
+        )
+        
+        self.journal.record_run_completed(len(results), total_chunks, total_errors)
+        
+        return results
+    
+    async def enqueue_jobs(self, job_queue: IngestionJobQueue, inline: bool = False) -> int:
+        """
+        Enqueue every document of the source as a job for ingestion workers.
+        
+        Args:
+            job_queue: Queue of the batch to fill
+            inline: Store loose file contents in the jobs, for workers
+                without access to the documents folder
+        
+        Returns:
+            Number of documents offered to the queue
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        if not os.path.exists(self.documents_folder):
+            logger.error(f"Documents source not found: {self.documents_folder}")
+            return 0
+        
+        if self.clean_before_ingest:
+            await self._clean_databases()
+        
+        source = open_source(
+            self.documents_folder,
+            jsonl_text_field=self.jsonl_text_field,
+            jsonl_id_field=self.jsonl_id_field,
+            walk_threads=self.walk_threads
+        )
+        
+        async with db_pool.acquire() as conn:
+            return await job_queue.enqueue(conn, source, inline=inline, collection=self.collection)
+    
+    async def run_worker(
+        self,
+        job_queue: IngestionJobQueue,
+        worker_id: Optional[str] = None,
+        poll_interval: float = 5.0,
+        wait_for_jobs: bool = False,
+        progress_callback: Optional[callable] = None
+    ) -> List[IngestionResult]:
+        """
+        Claim and ingest jobs from the queue until the batch is drained.
+        
+        Any number of workers can run this against the same batch, on the
+        same or different hosts. While other workers still hold leases, an
+        idle worker keeps polling so it can pick up jobs whose lease expires.
+        
+        Args:
+            job_queue: Queue of the batch to work on
+            worker_id: Identity recorded on claimed jobs (default host:pid)
+            poll_interval: Seconds between claims when no job is pending
+            wait_for_jobs: Keep polling for new jobs after the batch drains
+            progress_callback: Optional callback, called with (processed, None)
+        
+        Returns:
+            Results of the jobs this worker processed
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        worker_id = worker_id or default_worker_id()
+        # Local cache of chunks and embedding batches for the job in progress
+        self.journal = self._open_journal()
+        logger.info(f"Worker {worker_id} joining batch {job_queue.batch_id}")
+        
+        results = []
+        
+        try:
+            while True:
+                async with db_pool.acquire() as conn:
+                    await job_queue.reclaim_stale(conn)
+                    jobs = await job_queue.claim(conn, worker_id)
+                
+                if not jobs:
+                    await self._publish_writes(force=True)
+                    async with db_pool.acquire() as conn:
+                        counts = await job_queue.status(conn)
+                    if not counts["running"] and not wait_for_jobs:
+                        break
+                    await asyncio.sleep(poll_interval)
+                    continue
+                
+                for job in jobs:
+                    result = await self._run_job(job_queue, job, worker_id)
+                    results.append(result)
+                    self._record_result(result)
+                    if result.document_id:
+                        await self._publish_writes()
+                    
+                    if progress_callback:
+                        progress_callback(len(results), None)
+        finally:
+            # Publish the jobs stored before a failure or cancellation
+            await self._publish_writes(force=True)
+        
+        logger.info(f"Worker {worker_id} finished: {len(results)} jobs processed")
+        self.journal.remove()
+        
         return results
     
-    async def _ingest_single_document(self, file_path: str) -> IngestionResult:
+    async def _run_job(self, job_queue: IngestionJobQueue, job: IngestionJob, worker_id: str) -> IngestionResult:
+        """Ingest one claimed job, keeping its lease alive until it is recorded."""
+        heartbeat = asyncio.create_task(self._heartbeat(job_queue, job, worker_id))
+        
+        async def complete_job(conn: asyncpg.Connection, document_id: str, chunks_created: int):
+            await job_queue.complete(conn, job, worker_id, document_id, chunks_created)
+        
+        try:
+            document = job.to_document()
+            document.metadata["ingestion_batch_id"] = job.batch_id
+            logger.info(f"Processing job {job.id} (attempt {job.attempts}): {job.source_id}")
+            
+            result = await self._ingest_single_document(
+                document,
+                finalize=complete_job,
+                collection=job.collection_id
+            )
+            
+            if result.document_id:
+                self.journal.record_file_completed(job.source_id, result.document_id, result.chunks_created)
+            else:
+                self.journal.record_file_failed(job.source_id, "; ".join(result.errors))
+                async with db_pool.acquire() as conn:
+                    await job_queue.fail(conn, job, worker_id, "; ".join(result.errors))
+            
+            return result
+        
+        except Exception as e:
+            if isinstance(e, LeaseLostError):
+                logger.warning(str(e))
+            else:
+                logger.error(f"Job {job.id} failed: {e}")
+                async with db_pool.acquire() as conn:
+                    await job_queue.fail(conn, job, worker_id, str(e))
+            self.journal.record_file_failed(job.source_id, str(e))
+            
+            return IngestionResult(
+                document_id="",
+                title=job.title or job.name,
+                chunks_created=0,
+                processing_time_ms=0,
+                errors=[str(e)]
+            )
+        
+        finally:
+            heartbeat.cancel()
+    
+    async def _heartbeat(self, job_queue: IngestionJobQueue, job: IngestionJob, worker_id: str):
+        """Extend a job's lease until cancelled."""
+        interval = max(1.0, job_queue.lease_seconds / 3)
+        
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with db_pool.acquire() as conn:
+                    if not await job_queue.heartbeat(conn, job, worker_id):
+                        logger.warning(f"Lost lease on job {job.id}")
+                        return
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job.id} failed: {e}")
+    
+    async def _prefetch(self, source) -> AsyncIterator[Tuple[SourceDocument, float]]:
+        """
+        Read documents from the source in a background thread.
+        
+        Reading (disk I/O, decompression, JSON parsing) overlaps with chunking,
+        embedding and database writes, and the bounded queue keeps at most
+        prefetch_size documents in memory. A queue that stays full means
+        processing is the bottleneck; one that stays empty means reading is.
+        
+        Args:
+            source: Iterable of SourceDocument
+        
+        Yields:
+            Tuples of (document, seconds spent reading it)
+        """
+        buffer: "queue.Queue" = queue.Queue(maxsize=self.prefetch_size)
+        stop = threading.Event()
+        done = object()
+        
+        def offer(item) -> bool:
+            # Block while processing is behind, but give up once the consumer stopped
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            documents = iter(source)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    document = next(documents, done)
+                    if document is done:
+                        break
+                    read_seconds = time.perf_counter() - start
+                    self.metrics.observe("ingest_stage_seconds", read_seconds, stage="read")
+                    self._sample_rss("read")
+                    if not offer((document, read_seconds)):
+                        return
+            except Exception as e:
+                offer(e)
+                return
+            offer(done)
+        
+        def take():
+            while not stop.is_set():
+                try:
+                    return buffer.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return done
+        
+        reader = threading.Thread(target=produce, name="ingest-read", daemon=True)
+        reader.start()
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while True:
+                depth = buffer.qsize()
+                self.metrics.set_gauge(
+                    "ingest_read_queue_depth",
+                    depth,
+                    help="Documents read ahead and waiting for processing"
+                )
+                self.metrics.observe(
+                    "ingest_read_queue_depth_samples",
+                    depth,
+                    help="Read-ahead queue depth sampled before each document",
+                    buckets=QUEUE_DEPTH_BUCKETS
+                )
+                
+                item = await loop.run_in_executor(None, take)
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+    
+    def _record_stage(self, timings: Dict[str, float], stage: str, seconds: float):
+        """Record a stage duration on the document result and in the run metrics."""
+        timings[stage] = round(seconds * 1000, 3)
+        self.metrics.observe(
+            "ingest_stage_seconds",
+            seconds,
+            help="Time spent per document in each ingestion stage",
+            stage=stage
+        )
+        self._sample_rss(stage)
+    
+    def _sample_rss(self, stage: str):
+        """Track the highest resident memory seen at the end of a stage."""
+        self.metrics.max_gauge(
+            "ingest_stage_peak_rss_bytes",
+            current_rss_bytes(),
+            help="Highest resident memory observed after each stage",
+            stage=stage
+        )
+    
+    def _record_result(self, result: IngestionResult):
+        """Add a document result to the run counters."""
+        status = "ok" if result.document_id and not result.errors else "failed"
+        self.metrics.inc("ingest_documents_total", help="Documents by outcome", status=status)
+        self.metrics.inc("ingest_bytes_total", result.bytes_read, help="Source bytes read")
+        self.metrics.inc("ingest_chunks_total", result.chunks_created, help="Chunks written")
+        self.metrics.inc("ingest_tokens_total", result.tokens, help="Estimated tokens embedded")
+        self.metrics.observe(
+            "ingest_document_seconds",
+            result.processing_time_ms / 1000,
+            help="End-to-end processing time per document"
+        )
+    
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """Get total and per-document percentiles of each stage that ran."""
+        summary = {}
+        for stage in STAGES + ("index",):
+            histogram = self.metrics.histogram("ingest_stage_seconds", stage=stage)
+            if histogram and histogram.count:
+                summary[stage] = histogram.to_dict()
+        return summary
+    
+    async def _publish_writes(self, force: bool = False):
+        """
+        Bump the generations of the collections written to, once per batch.
+        
+        Called after every stored document; bumps after GENERATION_BATCH_DOCUMENTS
+        documents or GENERATION_BATCH_SECONDS, or when forced at the end of
+        a load, so cached searches are invalidated once per batch rather than
+        once per document.
+        """
+        if self.sink is not None:
+            # Sinks keep their own generations
+            return
+        if not force:
+            self._unpublished_documents += 1
+            if (
+                self._unpublished_documents < GENERATION_BATCH_DOCUMENTS
+                and time.monotonic() - self._published_at < GENERATION_BATCH_SECONDS
+            ):
+                return
+        await self.store.bump_generations()
+        self._unpublished_documents = 0
+        self._published_at = time.monotonic()
+    
+    async def _promote_shadow_tables(self):
+        """Index the rebuilt shadow partition and swap it in for the live one."""
+        async with db_pool.acquire() as conn:
+            loaded = await self.reindexer.loaded_documents(conn, self.journal.run_id)
+            if not loaded:
+                logger.error(f"Reindex produced no documents; keeping the live {self.partition}")
+                await self.reindexer.abort(conn, self.journal.run_id)
+                return
+            
+            self.index_reports = await self.reindexer.build_indexes(conn)
+            await self.reindexer.swap(conn)
+        
+        self.journal.record_marker("swapped")
+        self.store.documents_table, self.store.chunks_table = "documents", "chunks"
+    
+    async def _retire_previous_generation(self):
+        """Delete the documents the swapped-out partition referenced."""
+        async with db_pool.acquire() as conn:
+            await self.reindexer.retire_documents(conn, self.journal.run_id)
+        self.journal.record_marker("retired")
+    
+    async def _rebuild_ann_indexes(self):
+        """Rebuild the vector indexes dropped for the bulk load, sized for the loaded rows."""
+        dropped = self.journal.marker_data("ann_dropped").get("indexes") or []
+        specs = [ANNIndexSpec(**spec) for spec in dropped] or [ann_index_spec(self.collection)]
+        
+        async with db_pool.acquire() as conn:
+            for spec in specs:
+                self.index_reports.append(await self.ann_manager.build(conn, spec))
+        
+        self.journal.record_marker("ann_rebuilt")
+    
+    async def _ensure_ann_index(self):
+        """Build the collection's vector index sized for its rows, if it has none yet."""
+        async with db_pool.acquire() as conn:
+            if await self.ann_manager.find(conn, self.partition):
+                return
+            self.index_reports.append(await self.ann_manager.build(conn, ann_index_spec(self.collection)))
+    
+    def _open_journal(self) -> IngestionJournal:
+        """Open the journal of the run being resumed, or start a new one."""
+        if self.resume_run_id:
+            return IngestionJournal.open(self.resume_run_id, self.journal_dir)
+        
+        return IngestionJournal.create(
+            {
+                "documents_folder": self.documents_folder,
+                "clean_before_ingest": self.clean_before_ingest,
+                "reindex": self.reindex,
+                "defer_index": self.defer_index,
+                "collection": self.collection,
+                "jsonl_text_field": self.jsonl_text_field,
+                "jsonl_id_field": self.jsonl_id_field,
+                "chunk_size": self.config.chunk_size,
+                "chunk_overlap": self.config.chunk_overlap,
+                "max_chunk_size": self.config.max_chunk_size,
+                "use_semantic_chunking": self.config.use_semantic_chunking
+            },
+            self.journal_dir
+        )
+    
+    async def _ingest_single_document(
+        self,
+        document: SourceDocument,
+        finalize: Optional[Callable[[asyncpg.Connection, str, int], Awaitable[None]]] = None,
+        collection: Optional[str] = None
+    ) -> IngestionResult:
         """
         Ingest a single document.
         
         Args:
-            file_path: Path to the document file
+            document: Document read from the source
+            finalize: Called inside the save transaction with the new
+                document ID and chunk count; raising rolls the save back
+            collection: Collection to save into (default: the pipeline's)
         
         Returns:
             Ingestion result
         """
         start_time = datetime.now()
+        timings: Dict[str, float] = {}
         
-        # Read document
-        document_content = self._read_document(file_path)
-        document_title = self._extract_title(document_content, file_path)
-        document_source = os.path.relpath(file_path, self.documents_folder)
+        document_content = document.content
+        document_title = document.title or self._extract_title(document_content, document.name)
+        document_source = document.source_id
         
         # Extract metadata from content
-        document_metadata = self._extract_document_metadata(document_content, file_path)
+        document_metadata = self._extract_document_metadata(document)
         
         logger.info(f"Processing document: {document_title}")
         
-        # Chunk the document
-        chunks = await self.chunker.chunk_document(
-            content=document_content,
-            title=document_title,
-            source=document_source,
-            metadata=document_metadata
-        )
+        # Reuse chunks and embedding batches from an interrupted attempt
+        chunks, cached_batches = self.journal.load_pending(document_source)
+        resumed = self.journal.was_started(document_source)
+        self.journal.record_file_started(document_source)
+        
+        if chunks is not None:
+            logger.info(f"Resuming {document_title} with {len(cached_batches)} embedding batches already paid for")
+        else:
+            # Chunk the document, separating LLM split time from local chunking
+            llm_before = getattr(self.chunker, "llm_split_seconds", 0.0)
+            stage_start = time.perf_counter()
+            chunks = await self.chunker.chunk_document(
+                content=document_content,
+                title=document_title,
+                source=document_source,
+                metadata=document_metadata
+            )
+            elapsed = time.perf_counter() - stage_start
+            llm_seconds = getattr(self.chunker, "llm_split_seconds", 0.0) - llm_before
+            self._record_stage(timings, "chunk", elapsed - llm_seconds)
+            if llm_seconds:
+                self._record_stage(timings, "llm_split", llm_seconds)
+            
+            if chunks:
+                self.journal.record_chunks(document_source, chunks)
         
         if not chunks:
             logger.warning(f"No chunks created for {document_title}")
@@ -189,6 +761,8 @@ class DocumentIngestionPipeline:
                 entities_extracted=0,
                 relationships_created=0,
                 processing_time_ms=(datetime.now() - start_time).total_seconds() * 1000,
+                bytes_read=document.size,
+                stage_timings_ms=timings,
                 errors=["No chunks created"]
             )
         
@@ -197,20 +771,33 @@ class DocumentIngestionPipeline:
         # Entity extraction removed (graph-related functionality)
         entities_extracted = 0
         
-        # Generate embeddings
-        embedded_chunks = await self.embedder.embed_chunks(chunks)
+        # Generate embeddings, journaling each batch as soon as it is paid for
+        stage_start = time.perf_counter()
+        embedded_chunks = await self.embedder.embed_chunks(
+            chunks,
+            cached_batches=cached_batches,
+            batch_callback=lambda batch_index, embeddings: self.journal.record_embedding_batch(
+                document_source, batch_index, embeddings
+            )
+        )
+        self._record_stage(timings, "embed", time.perf_counter() - stage_start)
         logger.info(f"Generated embeddings for {len(embedded_chunks)} chunks")
         
-        # Save to PostgreSQL
-        document_id = await self._save_to_postgres(
+        # Save to the vector store
+        stage_start = time.perf_counter()
+        document_id = await self.store.upsert(
+            collection or self.collection,
             document_title,
             document_source,
             document_content,
             embedded_chunks,
-            document_metadata
+            {**document_metadata, "ingestion_run_id": self.journal.run_id},
+            replace_partial=resumed,
+            finalize=finalize
         )
+        self._record_stage(timings, "db", time.perf_counter() - stage_start)
         
-        logger.info(f"Saved document to PostgreSQL with ID: {document_id}")
+        logger.info(f"Saved document with ID: {document_id}")
         
         # Knowledge graph functionality removed
         relationships_created = 0
@@ -226,33 +813,12 @@ class DocumentIngestionPipeline:
             entities_extracted=entities_extracted,
             relationships_created=relationships_created,
             processing_time_ms=processing_time,
+            bytes_read=document.size,
+            tokens=sum(chunk.token_count or 0 for chunk in chunks),
+            stage_timings_ms=timings,
             errors=graph_errors
         )
     
-    def _find_markdown_files(self) -> List[str]:
-        """Find all markdown files in the documents folder."""
-        if not os.path.exists(self.documents_folder):
-            logger.error(f"Documents folder not found: {self.documents_folder}")
-            return []
-        
-        patterns = ["*.md", "*.markdown", "*.txt"]
-        files = []
-        
-        for pattern in patterns:
-            files.extend(glob.glob(os.path.join(self.documents_folder, "**", pattern), recursive=True))
-        
-        return sorted(files)
-    
-    def _read_document(self, file_path: str) -> str:
-        """Read document content from file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # Try with different encoding
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
-    
     def _extract_title(self, content: str, file_path: str) -> str:
         """Extract title from document content or filename."""
         # Try to find markdown title
@@ -265,11 +831,13 @@ class DocumentIngestionPipeline:
         # Fallback to filename
         return os.path.splitext(os.path.basename(file_path))[0]
     
-    def _extract_document_metadata(self, content: str, file_path: str) -> Dict[str, Any]:
+    def _extract_document_metadata(self, document: SourceDocument) -> Dict[str, Any]:
         """Extract metadata from document content."""
+        content = document.content
         metadata = {
-            "file_path": file_path,
+            **document.metadata,
             "file_size": len(content),
+            "content_hash": document.content_hash,
             "ingestion_date": datetime.now().isoformat()
         }
         
@@ -295,112 +863,257 @@ class DocumentIngestionPipeline:
         
         return metadata
     
-    async def _save_to_postgres(
-        self,
-        title: str,
-        source: str,
-        content: str,
-        chunks: List[DocumentChunk],
-        metadata: Dict[str, Any]
-    ) -> str:
-        """Save document and chunks to PostgreSQL."""
-        async with db_pool.acquire() as conn:
-            async with conn.transaction():
-                # Insert document
-                document_result = await conn.fetchrow(
-                    """
-                    INSERT INTO documents (title, source, content, metadata)
-                    VALUES ($1, $2, $3, $4)
-                    RETURNING id::text
-                    """,
-                    title,
-                    source,
-                    content,
-                    json.dumps(metadata)
-                )
-                
-                document_id = document_result["id"]
-                
-                # Insert chunks
-                for chunk in chunks:
-                    # Convert embedding to PostgreSQL vector string format
-                    embedding_data = None
-                    if hasattr(chunk, 'embedding') and chunk.embedding:
-                        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-                        embedding_data = '[' + ','.join(map(str, chunk.embedding)) + ']'
-                    
-                    await conn.execute(
-                        """
-                        INSERT INTO chunks (document_id, content, embedding, chunk_index, metadata, token_count)
-                        VALUES ($1::uuid, $2, $3::vector, $4, $5, $6)
-                        """,
-                        document_id,
-                        chunk.content,
-                        embedding_data,
-                        chunk.index,
-                        json.dumps(chunk.metadata),
-                        chunk.token_count
-                    )
-                
-                return document_id
-    
     async def _clean_databases(self):
         """Clean existing data from databases."""
-        logger.warning("Cleaning existing data from databases...")
+        logger.warning(f"Cleaning existing data of collection {self.collection}...")
         
-        # Clean PostgreSQL
-        async with db_pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute("DELETE FROM chunks")
-                await conn.execute("DELETE FROM documents")
+        # Other collections are untouched
+        await self.store.delete(self.collection)
         
-        logger.info("Cleaned PostgreSQL database")
+        logger.info(f"Cleaned collection {self.collection}")
 
 async def main():
     """Main function for running ingestion."""
     parser = argparse.ArgumentParser(description="Ingest documents into vector DB")
-    parser.add_argument("--documents", "-d", default="documents", help="Documents folder path")
-    parser.add_argument("--clean", "-c", action="store_true", help="Clean existing data before ingestion")
+    parser.add_argument("--documents", "-d", default="documents", help="Documents folder, archive (.tar.gz/.zip) or JSONL dump")
+    parser.add_argument("--jsonl-text-field", default="content", help="Record field holding the document text in JSONL dumps")
+    parser.add_argument("--jsonl-id-field", default="id", help="Record field holding a stable document ID in JSONL dumps")
+    parser.add_argument(
+        "--collection",
+        default=DEFAULT_COLLECTION,
+        help="Collection (tenant) to ingest into; --clean, --reindex and index builds only touch this collection"
+    )
+    rebuild = parser.add_mutually_exclusive_group()
+    rebuild.add_argument("--clean", "-c", action="store_true", help="Clean existing data before ingestion")
+    rebuild.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Rebuild into shadow tables and atomically swap them in; search stays available"
+    )
+    parser.add_argument(
+        "--vector-store",
+        choices=["postgres", "ivf"],
+        default=os.getenv("VECTOR_STORE", "postgres"),
+        help="Where to store chunks: postgres (pgvector) or ivf (local NumPy engine at --store-path, no database)"
+    )
+    parser.add_argument(
+        "--store-path",
+        default=os.getenv("VECTOR_STORE_PATH", "./.vector_store"),
+        help="Directory of the ivf vector store"
+    )
     parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size for splitting documents")
     parser.add_argument("--chunk-overlap", type=int, default=200, help="Chunk overlap size")
     parser.add_argument("--no-semantic", action="store_true", help="Disable semantic chunking")
+    parser.add_argument(
+        "--defer-index",
+        action="store_true",
+        help="Drop vector indexes during the load and rebuild them sized for the loaded rows"
+    )
+    parser.add_argument("--index-method", choices=["ivfflat", "hnsw"], help="Vector index method to rebuild with")
+    parser.add_argument("--maintenance-work-mem", default="1GB", help="maintenance_work_mem for index builds")
+    parser.add_argument("--index-workers", type=int, help="max_parallel_maintenance_workers for index builds")
+    parser.add_argument(
+        "--index-metric",
+        choices=["cosine", "inner_product"],
+        help="Operator class to rebuild vector indexes with (set VECTOR_METRIC to match)"
+    )
+    parser.add_argument("--ivfflat-lists", type=int, help="Override the derived IVFFlat lists")
+    parser.add_argument("--hnsw-m", type=int, help="Override the derived HNSW m")
+    parser.add_argument("--hnsw-ef-construction", type=int, help="Override the derived HNSW ef_construction")
+    parser.add_argument("--walk-threads", type=int, default=0, help="Threads used to walk very wide document folders")
+    parser.add_argument("--prefetch", type=int, default=8, help="Documents read ahead of processing")
+    parser.add_argument("--metrics-json", metavar="PATH", help="Write run metrics as JSON")
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        help="Write run metrics as a Prometheus textfile (e.g. for the node exporter textfile collector)"
+    )
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume an interrupted ingestion run")
+    parser.add_argument("--journal-dir", default=DEFAULT_JOURNAL_DIR, help="Directory for ingestion run journals")
+    work_queue = parser.add_argument_group("work queue (multi-worker ingestion)")
+    queue_mode = work_queue.add_mutually_exclusive_group()
+    queue_mode.add_argument("--enqueue", metavar="BATCH_ID", help="Enqueue the documents as jobs for workers")
+    queue_mode.add_argument("--worker", metavar="BATCH_ID", help="Claim and ingest jobs of a batch until it is drained")
+    queue_mode.add_argument("--queue-status", metavar="BATCH_ID", help="Show job counts of a batch")
+    work_queue.add_argument("--inline", action="store_true", help="Store file contents in jobs (workers without shared storage)")
+    work_queue.add_argument("--worker-id", help="Worker identity recorded on claimed jobs (default host:pid)")
+    work_queue.add_argument("--lease-seconds", type=int, default=300, help="Job lease duration, extended by heartbeats")
+    work_queue.add_argument("--max-attempts", type=int, default=3, help="Claims per job before it is marked failed")
+    work_queue.add_argument("--wait", action="store_true", help="Keep polling for new jobs after the batch drains")
+    offline = parser.add_argument_group("dry run and benchmark (no database)")
+    offline_mode = offline.add_mutually_exclusive_group()
+    offline_mode.add_argument("--dry-run", action="store_true", help="Run the pipeline into an in-memory sink instead of PostgreSQL")
+    offline_mode.add_argument(
+        "--bench",
+        action="store_true",
+        help="Replicate the documents folder to --bench-size and report per-stage throughput"
+    )
+    offline.add_argument("--bench-size", default="10MB", help="Corpus size to benchmark (e.g. 50MB, 1GiB)")
+    offline.add_argument("--bench-json", metavar="PATH", help="Write the benchmark report as JSON")
+    offline.add_argument(
+        "--live-embeddings",
+        action="store_true",
+        help="Call the embedding API in dry runs and benchmarks instead of the local stub"
+    )
+    offline.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated latency per stub embedding batch")
     # Graph-related arguments removed
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     
     args = parser.parse_args()
     
-    # Configure logging
-    log_level = logging.DEBUG if args.verbose else logging.INFO
+    batch_id = args.enqueue or args.worker or args.queue_status
+    if batch_id and (args.resume or args.reindex or args.defer_index):
+        parser.error("--enqueue/--worker/--queue-status cannot be combined with --resume, --reindex or --defer-index")
+    
+    try:
+        validate_collection_id(args.collection)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    offline_run = args.dry_run or args.bench
+    if offline_run and (batch_id or args.resume or args.reindex or args.defer_index):
+        parser.error("--dry-run/--bench cannot be combined with database modes (--resume, --reindex, --defer-index, work queue)")
+    if args.vector_store == "ivf" and (offline_run or batch_id or args.reindex or args.defer_index):
+        parser.error("--vector-store ivf cannot be combined with --dry-run, --bench, --reindex, --defer-index or the work queue")
+    
+    # Configure logging; benchmarks only log warnings so logging does not skew timings
+    log_level = logging.DEBUG if args.verbose else (logging.WARNING if args.bench else logging.INFO)
     logging.basicConfig(
         level=log_level,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     
     # Create ingestion configuration
-    config = IngestionConfig(
-        chunk_size=args.chunk_size,
-        chunk_overlap=args.chunk_overlap,
-        use_semantic_chunking=not args.no_semantic
-    )
+    if args.resume:
+        # Resumed runs continue with the configuration they were started with
+        run_config = IngestionJournal.read_config(args.resume, args.journal_dir)
+        config = IngestionConfig(
+            chunk_size=run_config["chunk_size"],
+            chunk_overlap=run_config["chunk_overlap"],
+            max_chunk_size=run_config["max_chunk_size"],
+            use_semantic_chunking=run_config["use_semantic_chunking"]
+        )
+        documents_folder = run_config["documents_folder"]
+        clean_before_ingest = run_config["clean_before_ingest"]
+        reindex = run_config.get("reindex", False)
+        defer_index = run_config.get("defer_index", False)
+        collection = run_config.get("collection", DEFAULT_COLLECTION)
+        jsonl_text_field = run_config.get("jsonl_text_field", "content")
+        jsonl_id_field = run_config.get("jsonl_id_field", "id")
+    else:
+        config = IngestionConfig(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            use_semantic_chunking=not args.no_semantic
+        )
+        documents_folder = args.documents
+        clean_before_ingest = args.clean
+        reindex = args.reindex
+        defer_index = args.defer_index
+        collection = args.collection
+        jsonl_text_field = args.jsonl_text_field
+        jsonl_id_field = args.jsonl_id_field
+    
+    journal_dir = args.journal_dir
+    bench_dirs = []
+    if args.bench:
+        # Benchmark on a throwaway replica of the corpus, with a throwaway journal
+        bench_folder = tempfile.mkdtemp(prefix="rag-bench-")
+        journal_dir = tempfile.mkdtemp(prefix="rag-bench-journal-")
+        bench_dirs = [bench_folder, journal_dir]
+        files, size = replicate_corpus(documents_folder, parse_size(args.bench_size), bench_folder)
+        print(f"Benchmark corpus: {files} files, {size / 1e6:.1f} MB replicated from {documents_folder}")
+        documents_folder = bench_folder
+    
+    sink = None
+    embedder = None
+    if offline_run:
+        sink = NullSink() if args.bench else InMemorySink()
+        if not args.live_embeddings:
+            embedder = StubEmbeddingGenerator(latency_ms=args.stub_latency_ms)
+    elif args.vector_store == "ivf":
+        sink = IVFVectorStore(
+            args.store_path,
+            int(os.getenv("EMBEDDING_DIMENSION", "1536")),
+            os.getenv("VECTOR_METRIC", "cosine")
+        )
     
     # Create and run pipeline
     pipeline = DocumentIngestionPipeline(
         config=config,
-        documents_folder=args.documents,
-        clean_before_ingest=args.clean
+        documents_folder=documents_folder,
+        clean_before_ingest=clean_before_ingest,
+        resume_run_id=args.resume,
+        journal_dir=journal_dir,
+        jsonl_text_field=jsonl_text_field,
+        jsonl_id_field=jsonl_id_field,
+        walk_threads=args.walk_threads,
+        reindex=reindex,
+        defer_index=defer_index,
+        ann_manager=ANNIndexManager(
+            method=args.index_method,
+            maintenance_work_mem=args.maintenance_work_mem,
+            parallel_workers=args.index_workers,
+            metric=args.index_metric,
+            parameters={
+                "lists": args.ivfflat_lists,
+                "m": args.hnsw_m,
+                "ef_construction": args.hnsw_ef_construction
+            }
+        ),
+        prefetch_size=args.prefetch,
+        sink=sink,
+        embedder=embedder,
+        collection=collection
     )
     
-    def progress_callback(current: int, total: int):
-        print(f"Progress: {current}/{total} documents processed")
+    def progress_callback(current: int, total: Optional[int]):
+        if total:
+            print(f"Progress: {current}/{total} documents processed")
+        else:
+            print(f"Progress: {current} documents processed")
+    
+    job_queue = None
+    if batch_id:
+        job_queue = IngestionJobQueue(batch_id, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
     
     try:
+        if args.queue_status or args.enqueue:
+            await pipeline.initialize()
+            if args.enqueue:
+                enqueued = await pipeline.enqueue_jobs(job_queue, inline=args.inline)
+                print(f"Enqueued {enqueued} documents into batch {batch_id}")
+            async with db_pool.acquire() as conn:
+                counts = await job_queue.status(conn)
+            print(f"Batch {batch_id}: " + ", ".join(f"{status}={count}" for status, count in counts.items()))
+            return
+        
         start_time = datetime.now()
         
-        results = await pipeline.ingest_documents(progress_callback)
+        if args.worker:
+            results = await pipeline.run_worker(
+                job_queue,
+                worker_id=args.worker_id,
+                wait_for_jobs=args.wait,
+                progress_callback=progress_callback
+            )
+        else:
+            results = await pipeline.ingest_documents(None if args.bench else progress_callback)
         
         end_time = datetime.now()
         total_time = (end_time - start_time).total_seconds()
         
+        if args.bench:
+            report = BenchmarkReport.from_metrics(pipeline.metrics, total_time)
+            print("\n" + "="*50)
+            print("INGESTION BENCHMARK")
+            print("="*50)
+            print(report.format())
+            if args.bench_json:
+                with open(args.bench_json, "w", encoding="utf-8") as f:
+                    json.dump(report.to_dict(), f, indent=2)
+            return
+        
         # Print summary
         print("\n" + "="*50)
         print("INGESTION SUMMARY")
@@ -410,6 +1123,31 @@ async def main():
         # Graph-related stats removed
         print(f"Total errors: {sum(len(r.errors) for r in results)}")
         print(f"Total processing time: {total_time:.2f} seconds")
+        for report in pipeline.index_reports:
+            print(f"Index build: {report}")
+        if sink is None:
+            pool = db_pool.stats()
+            print(
+                f"Database pool: peak {pool['in_use_max']:.0f}/{pool['max_size']} connections in use, "
+                f"acquire wait p95 {pool['acquire_wait'].get('p95', 0) * 1000:.1f}ms"
+            )
+        stages = pipeline.stage_summary()
+        if stages:
+            print("Stage timings (total / p50 / p95 per document):")
+            for stage, stats in stages.items():
+                print(f"  {stage:<10} {stats['sum']:8.2f}s / {stats['p50']:.3f}s / {stats['p95']:.3f}s")
+        if args.dry_run:
+            print(f"Dry run: {len(sink.documents)} documents and {sink.chunk_count} chunks kept in memory, nothing written")
+        elif pipeline.journal and not args.worker:
+            print(f"Run ID: {pipeline.journal.run_id}")
+        if not args.dry_run:
+            # Replay the most frequent searches against the new corpus generation
+            try:
+                warmed = await warm_configured(sink)
+                if warmed:
+                    print(f"Search cache: warmed {warmed} frequent searches")
+            except Exception as e:
+                logger.warning(f"Could not warm the search result cache: {e}")
         print()
         
         # Print individual results
@@ -423,11 +1161,19 @@ async def main():
         
     except KeyboardInterrupt:
         print("\nIngestion interrupted by user")
+        if pipeline.journal and not args.worker:
+            print(f"Resume with: --resume {pipeline.journal.run_id}")
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
         raise
     finally:
+        if args.metrics_json:
+            pipeline.metrics.write_json(args.metrics_json)
+        if args.metrics_textfile:
+            pipeline.metrics.write_prometheus_textfile(args.metrics_textfile)
         await pipeline.close()
+        for folder in bench_dirs:
+            shutil.rmtree(folder, ignore_errors=True)
 
 
 if __name__ == "__main__":
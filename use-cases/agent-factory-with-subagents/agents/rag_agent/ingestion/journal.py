@@ -0,0 +1,305 @@
+"""
+Durable run journal for crash-safe, resumable ingestion.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Set, Tuple
+from datetime import datetime
+
+from .chunker import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_DIR = ".ingestion_runs"
+
+
+class IngestionJournal:
+    """
+    Append-only journal recording the progress of one ingestion run.
+
+    Layout on disk:
+        <journal_dir>/<run_id>/journal.jsonl       - status events, one per line
+        <journal_dir>/<run_id>/pending/<key>.jsonl - chunks and paid-for embedding
+                                                     batches of in-flight files
+
+    Every write is flushed and fsynced, so after a crash the journal reflects
+    everything that happened up to the last completed write. Pending files are
+    removed once a document is committed, keeping disk usage bounded.
+    """
+
+    def __init__(self, run_id: str, journal_dir: str = DEFAULT_JOURNAL_DIR):
+        """
+        Initialize journal handle.
+
+        Args:
+            run_id: Identifier of the ingestion run
+            journal_dir: Directory holding all run journals
+        """
+        self.run_id = run_id
+        self.run_dir = os.path.join(journal_dir, run_id)
+        self.journal_path = os.path.join(self.run_dir, "journal.jsonl")
+        self.pending_dir = os.path.join(self.run_dir, "pending")
+
+        self.config: Dict[str, Any] = {}
+        self.cleaned = False
+        self.finished = False
+        self.markers: Dict[str, Dict[str, Any]] = {}
+        self._completed: Dict[str, str] = {}
+        self._started: Set[str] = set()
+        self._failed: Dict[str, str] = {}
+
+    @classmethod
+    def create(
+        cls,
+        config: Dict[str, Any],
+        journal_dir: str = DEFAULT_JOURNAL_DIR
+    ) -> "IngestionJournal":
+        """
+        Start a new run journal.
+
+        Args:
+            config: Run configuration to record for resumption
+            journal_dir: Directory holding all run journals
+
+        Returns:
+            New journal
+        """
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        journal = cls(run_id, journal_dir)
+        os.makedirs(journal.pending_dir, exist_ok=True)
+        journal.config = dict(config)
+        journal._append({"event": "run_started", "config": journal.config})
+        return journal
+
+    @classmethod
+    def open(cls, run_id: str, journal_dir: str = DEFAULT_JOURNAL_DIR) -> "IngestionJournal":
+        """
+        Open an existing run journal and replay its events.
+
+        Args:
+            run_id: Identifier of the run to resume
+            journal_dir: Directory holding all run journals
+
+        Returns:
+            Journal with state restored
+        """
+        journal = cls(run_id, journal_dir)
+        if not os.path.exists(journal.journal_path):
+            raise ValueError(f"No ingestion run journal found for run '{run_id}' in {journal_dir}")
+
+        os.makedirs(journal.pending_dir, exist_ok=True)
+
+        for record in _read_jsonl(journal.journal_path):
+            journal._apply(record)
+
+        journal._append({"event": "run_resumed"})
+        logger.info(
+            f"Resuming run {run_id}: {len(journal._completed)} files already completed"
+        )
+        return journal
+
+    @staticmethod
+    def read_config(run_id: str, journal_dir: str = DEFAULT_JOURNAL_DIR) -> Dict[str, Any]:
+        """
+        Read the configuration a run was started with, without resuming it.
+
+        Args:
+            run_id: Identifier of the run
+            journal_dir: Directory holding all run journals
+
+        Returns:
+            Recorded run configuration
+        """
+        journal_path = os.path.join(journal_dir, run_id, "journal.jsonl")
+        if not os.path.exists(journal_path):
+            raise ValueError(f"No ingestion run journal found for run '{run_id}' in {journal_dir}")
+
+        for record in _read_jsonl(journal_path):
+            if record.get("event") == "run_started":
+                return record.get("config", {})
+
+        raise ValueError(f"Ingestion run journal for '{run_id}' has no start record")
+
+    def _apply(self, record: Dict[str, Any]):
+        """Apply a replayed event to in-memory state."""
+        event = record.get("event")
+        source = record.get("source")
+
+        if event == "run_started":
+            self.config = record.get("config", {})
+        elif event == "cleaned":
+            self.cleaned = True
+        elif event == "marker":
+            self.markers[record.get("name")] = record.get("data", {})
+        elif event == "file_started":
+            self._started.add(source)
+        elif event == "file_completed":
+            self._completed[source] = record.get("document_id", "")
+            self._failed.pop(source, None)
+        elif event == "file_failed":
+            self._failed[source] = record.get("error", "")
+        elif event == "run_completed":
+            self.finished = True
+
+    def _append(self, record: Dict[str, Any]):
+        """Durably append an event to the journal."""
+        record = {**record, "ts": datetime.now().isoformat()}
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(record)
+
+    def _pending_path(self, source: str) -> str:
+        """Get the pending data file for a source."""
+        key = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        return os.path.join(self.pending_dir, f"{key}.jsonl")
+
+    def _append_pending(self, source: str, record: Dict[str, Any]):
+        """Durably append a data record for an in-flight source."""
+        with open(self._pending_path(source), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Status recording
+    def record_cleaned(self):
+        """Record that the databases were cleaned for this run."""
+        self._append({"event": "cleaned"})
+
+    def record_marker(self, name: str, data: Optional[Dict[str, Any]] = None):
+        """Record that a run-level step (e.g. a table swap) completed."""
+        self._append({"event": "marker", "name": name, "data": data or {}})
+
+    def has_marker(self, name: str) -> bool:
+        """Check whether a run-level step already completed in this run."""
+        return name in self.markers
+
+    def marker_data(self, name: str) -> Dict[str, Any]:
+        """Get the data recorded with a run-level step."""
+        return self.markers.get(name, {})
+
+    def record_file_started(self, source: str):
+        """Record that processing of a source started."""
+        self._append({"event": "file_started", "source": source})
+
+    def record_chunks(self, source: str, chunks: List[DocumentChunk]):
+        """
+        Persist the chunks produced for a source.
+
+        Chunking may involve LLM calls and is not deterministic, so the exact
+        chunks are kept to line up with the embedding batches recorded later.
+        """
+        self._append_pending(source, {
+            "kind": "chunks",
+            "chunks": [
+                {
+                    "content": chunk.content,
+                    "index": chunk.index,
+                    "start_char": chunk.start_char,
+                    "end_char": chunk.end_char,
+                    "metadata": chunk.metadata,
+                    "token_count": chunk.token_count
+                }
+                for chunk in chunks
+            ]
+        })
+
+    def record_embedding_batch(self, source: str, batch_index: int, embeddings: List[List[float]]):
+        """Persist an embedding batch that has been paid for."""
+        self._append_pending(source, {
+            "kind": "embeddings",
+            "batch": batch_index,
+            "embeddings": embeddings
+        })
+
+    def record_file_completed(self, source: str, document_id: str, chunks_created: int):
+        """Record that a source was committed to the database."""
+        self._append({
+            "event": "file_completed",
+            "source": source,
+            "document_id": document_id,
+            "chunks_created": chunks_created
+        })
+        pending_path = self._pending_path(source)
+        if os.path.exists(pending_path):
+            os.remove(pending_path)
+
+    def record_file_failed(self, source: str, error: str):
+        """Record that processing of a source failed."""
+        self._append({"event": "file_failed", "source": source, "error": error})
+
+    def record_run_completed(self, documents: int, chunks: int, errors: int):
+        """Record that the run finished."""
+        self._append({
+            "event": "run_completed",
+            "documents": documents,
+            "chunks": chunks,
+            "errors": errors
+        })
+
+    # Status queries
+    def is_completed(self, source: str) -> bool:
+        """Check whether a source was already committed in this run."""
+        return source in self._completed
+
+    def was_started(self, source: str) -> bool:
+        """Check whether a source was started in this run."""
+        return source in self._started
+
+    @property
+    def completed_count(self) -> int:
+        """Number of sources committed in this run."""
+        return len(self._completed)
+
+    def load_pending(
+        self,
+        source: str
+    ) -> Tuple[Optional[List[DocumentChunk]], Dict[int, List[List[float]]]]:
+        """
+        Load the chunks and embedding batches recorded for an in-flight source.
+
+        Args:
+            source: Source identifier
+
+        Returns:
+            Tuple of (chunks or None, dict of batch index to embeddings)
+        """
+        chunks: Optional[List[DocumentChunk]] = None
+        batches: Dict[int, List[List[float]]] = {}
+
+        pending_path = self._pending_path(source)
+        if not os.path.exists(pending_path):
+            return chunks, batches
+
+        for record in _read_jsonl(pending_path):
+            if record.get("kind") == "chunks":
+                chunks = [DocumentChunk(**chunk) for chunk in record["chunks"]]
+                # Batches always refer to the latest recorded chunking
+                batches = {}
+            elif record.get("kind") == "embeddings" and chunks is not None:
+                batches[record["batch"]] = record["embeddings"]
+
+        return chunks, batches
+
+    def remove(self):
+        """Delete the journal from disk."""
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+
+def _read_jsonl(path: str):
+    """Read JSON lines, skipping a torn trailing write left by a crash."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping incomplete journal record in {path}")
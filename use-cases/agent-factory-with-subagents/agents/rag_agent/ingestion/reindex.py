@@ -0,0 +1,356 @@
+"""
+Blue/green reindexing of a collection through a shadow partition and an atomic swap.
+"""
+
+import re
+import time
+import asyncio
+import logging
+from typing import List, Tuple, Optional
+
+import asyncpg
+
+from .indexes import ANNIndexManager, ANNIndexSpec, IndexBuildReport
+from .collections import DEFAULT_COLLECTION, partition_name, ann_index_spec, ensure_collection
+
+try:
+    from ..utils.db_utils import BUMP_GENERATION_QUERY
+except ImportError:
+    # For direct execution or testing
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.db_utils import BUMP_GENERATION_QUERY
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = "_next"
+
+_INDEX_DEF = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (ONLY )?(\S+) (.*)$", re.DOTALL)
+
+
+def shadow_name(table: str) -> str:
+    """Name of the shadow table for a live table."""
+    return f"{table}{SHADOW_SUFFIX}"
+
+
+class ShadowReindex:
+    """
+    Rebuilds one collection without taking its search offline.
+
+    Chunks are partitioned by collection. A rebuild loads the collection's
+    chunks into a standalone shadow table (chunks_c_<id>_next) that has no
+    secondary indexes, so bulk inserts pay no index maintenance; the new
+    documents go into the documents table next to the old ones. A
+    collection_reindexes row records the run, and document listings hide its
+    staged documents until the swap and the previous generation's from the
+    swap until retire_documents deletes them. The live partition's indexes are then
+    recreated on the shadow table, and a single short transaction detaches
+    the live partition, attaches the shadow table in its place and drops the
+    previous generation. Searches keep hitting the complete old generation
+    until the swap commits, and see the complete new one right after. Other
+    collections' partitions are not touched, so they are only blocked for the
+    milliseconds the swap holds its catalog locks.
+    """
+
+    def __init__(
+        self,
+        collection: str = DEFAULT_COLLECTION,
+        lock_timeout: str = "5s",
+        swap_attempts: int = 5,
+        ann_manager: Optional[ANNIndexManager] = None
+    ):
+        """
+        Initialize reindexer.
+
+        Args:
+            collection: Collection to rebuild
+            lock_timeout: Maximum wait for the swap's table locks per attempt, so
+                a long-running query cannot stall all searches behind the swap
+            swap_attempts: Number of swap attempts before giving up
+            ann_manager: Builds vector indexes sized for the loaded rows
+        """
+        self.collection = collection
+        self.partition = partition_name(collection)
+        self.lock_timeout = lock_timeout
+        self.swap_attempts = swap_attempts
+        self.ann_manager = ann_manager or ANNIndexManager()
+
+    @property
+    def documents_table(self) -> str:
+        """Table ingestion writes documents to during the rebuild."""
+        return "documents"
+
+    @property
+    def chunks_table(self) -> str:
+        """Table ingestion writes chunks to during the rebuild."""
+        return shadow_name(self.partition)
+
+    async def _clear_unfinished(self, conn: asyncpg.Connection, run_id: str):
+        """Finish what an earlier, crashed rebuild of the collection left behind."""
+        previous = await conn.fetchrow(
+            "SELECT run_id, swapped FROM collection_reindexes WHERE collection_id = $1",
+            self.collection
+        )
+        if previous is None or previous["run_id"] == run_id:
+            return
+
+        if previous["swapped"]:
+            # Its generation is live; the one before it was never deleted
+            await conn.execute(
+                """
+                DELETE FROM documents
+                WHERE collection_id = $1 AND metadata->>'ingestion_run_id' IS DISTINCT FROM $2
+                """,
+                self.collection,
+                previous["run_id"]
+            )
+        else:
+            # Its staged documents never went live
+            await conn.execute(
+                """
+                DELETE FROM documents
+                WHERE collection_id = $1 AND metadata->>'ingestion_run_id' = $2
+                """,
+                self.collection,
+                previous["run_id"]
+            )
+        logger.info(f"Cleared the unfinished rebuild {previous['run_id']} of {self.collection}")
+
+    async def prepare(self, conn: asyncpg.Connection, run_id: str):
+        """
+        Create an empty shadow partition, dropping leftovers from an aborted rebuild.
+
+        Args:
+            conn: Database connection
+            run_id: Ingestion run that loads the new generation; its
+                documents stay hidden from listings until the swap
+        """
+        shadow = self.chunks_table
+
+        async with conn.transaction():
+            await ensure_collection(conn, self.collection)
+            await self._clear_unfinished(conn, run_id)
+            await conn.execute(
+                """
+                INSERT INTO collection_reindexes (collection_id, run_id) VALUES ($1, $2)
+                ON CONFLICT (collection_id) DO UPDATE
+                SET run_id = excluded.run_id, swapped = FALSE, started_at = CURRENT_TIMESTAMP
+                """,
+                self.collection,
+                run_id
+            )
+            await conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+
+            # Columns (generated ones included), defaults and checks only; secondary
+            # indexes are built after loading
+            await conn.execute(f"CREATE TABLE {shadow} (LIKE chunks INCLUDING ALL EXCLUDING INDEXES)")
+            await conn.execute(f"ALTER TABLE {shadow} ADD PRIMARY KEY (collection_id, id)")
+            await conn.execute(
+                f"""
+                ALTER TABLE {shadow}
+                ADD FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE
+                """
+            )
+            # Lets ATTACH PARTITION skip scanning the table for the partition bound
+            await conn.execute(
+                f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow}_collection_check "
+                f"CHECK (collection_id = '{self.collection}')"
+            )
+
+        logger.info(f"Prepared shadow partition {shadow} for collection {self.collection}")
+
+    async def _secondary_indexes(self, conn: asyncpg.Connection, table: str) -> List[Tuple[str, str]]:
+        """Get (name, definition) of a table's non-constraint indexes."""
+        rows = await conn.fetch(
+            """
+            SELECT i.relname AS name, pg_get_indexdef(x.indexrelid) AS definition
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = $1::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            ORDER BY i.relname
+            """,
+            table
+        )
+        return [(row["name"], row["definition"]) for row in rows]
+
+    async def loaded_documents(self, conn: asyncpg.Connection, run_id: str) -> int:
+        """Count the documents the rebuild has loaded so far."""
+        return await conn.fetchval(
+            """
+            SELECT COUNT(*) FROM documents
+            WHERE collection_id = $1 AND metadata->>'ingestion_run_id' = $2
+            """,
+            self.collection,
+            run_id
+        )
+
+    async def build_indexes(self, conn: asyncpg.Connection) -> List[IndexBuildReport]:
+        """
+        Recreate the live partition's secondary indexes on the loaded shadow table.
+
+        Index definitions are copied from the live partition, so schema.sql
+        stays the single source of truth; the vector index is rebuilt with
+        parameters sized for the loaded rows (and created if the collection
+        had none yet). Shadow indexes get a temporary suffix and take over the
+        canonical names during the swap.
+
+        Args:
+            conn: Database connection
+
+        Returns:
+            Build reports of the vector indexes
+        """
+        reports = []
+        shadow = self.chunks_table
+        await conn.execute(f"ANALYZE {shadow}")
+
+        for name, definition in await self._secondary_indexes(conn, self.partition):
+            match = _INDEX_DEF.match(definition)
+            if not match:
+                logger.warning(f"Skipping index {name}: unrecognized definition")
+                continue
+
+            unique, _, _, _, rest = match.groups()
+            shadow_index = f"{name}{SHADOW_SUFFIX}"
+
+            ann_spec = ANNIndexSpec.from_definition(name, self.partition, definition)
+            if ann_spec:
+                reports.append(
+                    await self.ann_manager.build(conn, ann_spec, table=shadow, name=shadow_index)
+                )
+                continue
+
+            await conn.execute(f"DROP INDEX IF EXISTS {shadow_index}")
+
+            start = time.perf_counter()
+            await conn.execute(
+                f"CREATE {unique or ''}INDEX {shadow_index} ON {shadow} {rest}"
+            )
+            elapsed = time.perf_counter() - start
+            logger.info(f"Built {shadow_index} on {shadow} in {elapsed:.1f}s")
+
+        if not reports:
+            spec = ann_index_spec(self.collection)
+            reports.append(
+                await self.ann_manager.build(conn, spec, table=shadow, name=f"{spec.name}{SHADOW_SUFFIX}")
+            )
+
+        return reports
+
+    async def _rename_indexes(self, conn: asyncpg.Connection, table: str, from_suffix: str, to_suffix: str):
+        """Rename a table's suffixed secondary indexes."""
+        for name, _ in await self._secondary_indexes(conn, table):
+            if from_suffix and not name.endswith(from_suffix):
+                continue
+            base = name[:-len(from_suffix)] if from_suffix else name
+            await conn.execute(f"ALTER INDEX {name} RENAME TO {base}{to_suffix}")
+
+    async def _swap_once(self, conn: asyncpg.Connection):
+        """Swap the shadow partition into place in one transaction."""
+        partition = self.partition
+        shadow = self.chunks_table
+
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{self.lock_timeout}'")
+
+            # Retire the live partition, freeing the canonical names
+            await conn.execute(f"ALTER TABLE chunks DETACH PARTITION {partition}")
+            await conn.execute(f"DROP TABLE {partition}")
+
+            # Promote the shadow table under the canonical names
+            await conn.execute(f"ALTER TABLE {shadow} RENAME TO {partition}")
+            await self._rename_indexes(conn, partition, SHADOW_SUFFIX, "")
+            for constraint in ("pkey", "document_id_fkey", "collection_check"):
+                await conn.execute(
+                    f"ALTER TABLE {partition} RENAME CONSTRAINT {shadow}_{constraint} TO {partition}_{constraint}"
+                )
+
+            # Matching indexes and the foreign key are adopted by the parent's
+            await conn.execute(
+                f"ALTER TABLE chunks ATTACH PARTITION {partition} FOR VALUES IN ('{self.collection}')"
+            )
+
+            # Searches and listings see the new generation from this commit on
+            await conn.execute(
+                "UPDATE collection_reindexes SET swapped = TRUE WHERE collection_id = $1",
+                self.collection
+            )
+            await conn.fetchval(BUMP_GENERATION_QUERY, self.collection)
+
+    async def swap(self, conn: asyncpg.Connection):
+        """
+        Atomically replace the live partition with the shadow table.
+
+        The swap only touches the catalog, so it holds its locks for
+        milliseconds. If a long query holds a conflicting lock, the attempt
+        times out (instead of queueing every new search behind it) and is
+        retried.
+
+        Args:
+            conn: Database connection
+        """
+        for attempt in range(1, self.swap_attempts + 1):
+            try:
+                await self._swap_once(conn)
+                logger.info(f"Swapped the rebuilt {self.partition} into place and dropped the previous generation")
+                return
+            except asyncpg.LockNotAvailableError:
+                if attempt == self.swap_attempts:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Swap could not acquire table locks, retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def retire_documents(self, conn: asyncpg.Connection, run_id: str) -> int:
+        """
+        Delete the previous generation's documents after the swap.
+
+        Nothing references them once the old partition is gone; they are
+        deleted outside the swap so its locks stay short, and are hidden from
+        listings in the meantime. Deleting them ends the rebuild.
+
+        Args:
+            conn: Database connection
+            run_id: Ingestion run that loaded the new generation
+
+        Returns:
+            Number of documents deleted
+        """
+        async with conn.transaction():
+            result = await conn.execute(
+                """
+                DELETE FROM documents
+                WHERE collection_id = $1
+                  AND metadata->>'ingestion_run_id' IS DISTINCT FROM $2
+                """,
+                self.collection,
+                run_id
+            )
+            await conn.execute(
+                "DELETE FROM collection_reindexes WHERE collection_id = $1 AND run_id = $2",
+                self.collection,
+                run_id
+            )
+        deleted = int(result.split()[-1]) if result else 0
+        logger.info(f"Deleted {deleted} documents of the previous generation of {self.collection}")
+        return deleted
+
+    async def abort(self, conn: asyncpg.Connection, run_id: str):
+        """Drop the shadow partition and the documents loaded for it, leaving the live generation untouched."""
+        async with conn.transaction():
+            await conn.execute(f"DROP TABLE IF EXISTS {self.chunks_table}")
+            await conn.execute(
+                """
+                DELETE FROM documents
+                WHERE collection_id = $1 AND metadata->>'ingestion_run_id' = $2
+                """,
+                self.collection,
+                run_id
+            )
+            await conn.execute(
+                "DELETE FROM collection_reindexes WHERE collection_id = $1 AND run_id = $2",
+                self.collection,
+                run_id
+            )
@@ -0,0 +1,110 @@
+"""
+Storage sinks that stand in for PostgreSQL in dry runs and benchmarks.
+
+They implement the writing half of the VectorStore interface (upsert and
+delete), which is all the ingestion pipeline uses.
+"""
+
+import uuid
+import logging
+from typing import List, Dict, Any, Optional
+
+from .chunker import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+
+class InMemorySink:
+    """Keeps saved documents and chunks in memory, for dry runs and tests."""
+
+    def __init__(self):
+        """Initialize an empty sink."""
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def chunk_count(self) -> int:
+        """Number of chunks saved."""
+        return sum(len(document["chunks"]) for document in self.documents.values())
+
+    async def upsert(
+        self,
+        collection: str,
+        title: str,
+        source: str,
+        content: str,
+        chunks: List[DocumentChunk],
+        metadata: Dict[str, Any],
+        **options: Any
+    ) -> str:
+        """
+        Save a document and its chunks.
+
+        Returns:
+            Generated document ID
+        """
+        document_id = str(uuid.uuid4())
+        self.documents[document_id] = {
+            "collection": collection,
+            "title": title,
+            "source": source,
+            "content": content,
+            "metadata": metadata,
+            "chunks": chunks
+        }
+        return document_id
+
+    async def delete(self, collection: str, source: Optional[str] = None) -> int:
+        """
+        Remove saved documents of a collection, optionally only those with a source.
+
+        Returns:
+            Number of documents removed
+        """
+        removed = [
+            document_id for document_id, document in self.documents.items()
+            if document["collection"] == collection and (source is None or document["source"] == source)
+        ]
+        for document_id in removed:
+            del self.documents[document_id]
+        return len(removed)
+
+
+class NullSink:
+    """Discards documents, only counting what would have been written."""
+
+    def __init__(self):
+        """Initialize counters."""
+        self.documents = 0
+        self.chunk_count = 0
+
+    async def upsert(
+        self,
+        collection: str,
+        title: str,
+        source: str,
+        content: str,
+        chunks: List[DocumentChunk],
+        metadata: Dict[str, Any],
+        **options: Any
+    ) -> str:
+        """
+        Count a document and its chunks.
+
+        Returns:
+            Generated document ID
+        """
+        self.documents += 1
+        self.chunk_count += len(chunks)
+        return str(uuid.uuid4())
+
+    async def delete(self, collection: str, source: Optional[str] = None) -> int:
+        """
+        Reset counters.
+
+        Returns:
+            Number of documents counted before the reset
+        """
+        removed = self.documents
+        self.documents = 0
+        self.chunk_count = 0
+        return removed
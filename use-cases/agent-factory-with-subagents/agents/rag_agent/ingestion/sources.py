@@ -0,0 +1,310 @@
+"""
+Source adapters that stream documents into the ingestion pipeline.
+"""
+
+import os
+import io
+import gzip
+import json
+import zipfile
+import tarfile
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Iterator, Tuple
+from dataclasses import dataclass, field
+
+from .discovery import DiscoveredFile, walk_documents, IGNORE_FILE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = (".md", ".markdown", ".txt")
+DEFAULT_MAX_MEMBER_BYTES = 50 * 1024 * 1024
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ZIP_SUFFIXES = (".zip",)
+JSONL_SUFFIXES = (".jsonl", ".jsonl.gz", ".ndjson", ".ndjson.gz")
+
+
+@dataclass
+class SourceDocument:
+    """A single document produced by a source adapter."""
+    source_id: str
+    content: str
+    name: str
+    size: int
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    title: Optional[str] = None
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the document content, for change detection on re-ingest."""
+        return hashlib.sha256(self.content.encode("utf-8")).hexdigest()
+
+
+def decode_bytes(data: bytes) -> str:
+    """Decode document bytes, falling back to latin-1 like the file reader."""
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _has_extension(name: str, extensions: Tuple[str, ...]) -> bool:
+    """Check whether a file or member name has one of the extensions."""
+    return name.lower().endswith(extensions)
+
+
+class DirectorySource:
+    """Loose document files under a folder, discovered lazily in a single walk."""
+
+    def __init__(
+        self,
+        folder: str,
+        extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+        ignore_file: Optional[str] = IGNORE_FILE,
+        walk_threads: int = 0
+    ):
+        """
+        Initialize directory source.
+
+        Args:
+            folder: Folder to scan recursively
+            extensions: File extensions to include
+            ignore_file: Gitignore-style file at the folder root, or None
+            walk_threads: Threads used to walk wide trees (0 walks inline)
+        """
+        self.folder = folder
+        self.extensions = extensions
+        self.ignore_file = ignore_file
+        self.walk_threads = walk_threads
+
+    def find_files(self) -> Iterator[DiscoveredFile]:
+        """Lazily find all matching files in the folder."""
+        return walk_documents(
+            self.folder,
+            self.extensions,
+            ignore_file=self.ignore_file,
+            threads=self.walk_threads
+        )
+
+    def __iter__(self) -> Iterator[SourceDocument]:
+        for found in self.find_files():
+            with open(found.path, "rb") as f:
+                data = f.read()
+
+            yield SourceDocument(
+                source_id=os.path.relpath(found.path, self.folder),
+                content=decode_bytes(data),
+                name=os.path.basename(found.path),
+                size=len(data),
+                metadata={"file_path": found.path, "file_mtime": found.mtime}
+            )
+
+
+class TarArchiveSource:
+    """
+    Documents inside a tar archive (optionally compressed).
+
+    The archive is read in streaming mode, so members are decompressed one at
+    a time straight into the pipeline without extracting to disk or seeking.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+        max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES
+    ):
+        """
+        Initialize tar source.
+
+        Args:
+            path: Path to the archive
+            extensions: Member extensions to include
+            max_member_bytes: Members larger than this are skipped
+        """
+        self.path = path
+        self.extensions = extensions
+        self.max_member_bytes = max_member_bytes
+
+    def __iter__(self) -> Iterator[SourceDocument]:
+        archive_name = os.path.basename(self.path)
+
+        with tarfile.open(self.path, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile() or not _has_extension(member.name, self.extensions):
+                    continue
+
+                if member.size > self.max_member_bytes:
+                    logger.warning(f"Skipping {archive_name}!{member.name}: {member.size} bytes exceeds limit")
+                    continue
+
+                member_file = tar.extractfile(member)
+                if member_file is None:
+                    continue
+                data = member_file.read()
+
+                yield SourceDocument(
+                    source_id=f"{archive_name}!{member.name}",
+                    content=decode_bytes(data),
+                    name=os.path.basename(member.name),
+                    size=len(data),
+                    metadata={"archive": archive_name, "archive_member": member.name}
+                )
+
+
+class ZipArchiveSource:
+    """Documents inside a zip archive, read member by member."""
+
+    def __init__(
+        self,
+        path: str,
+        extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+        max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES
+    ):
+        """
+        Initialize zip source.
+
+        Args:
+            path: Path to the archive
+            extensions: Member extensions to include
+            max_member_bytes: Members larger than this are skipped
+        """
+        self.path = path
+        self.extensions = extensions
+        self.max_member_bytes = max_member_bytes
+
+    def __iter__(self) -> Iterator[SourceDocument]:
+        archive_name = os.path.basename(self.path)
+
+        with zipfile.ZipFile(self.path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _has_extension(info.filename, self.extensions):
+                    continue
+
+                if info.file_size > self.max_member_bytes:
+                    logger.warning(f"Skipping {archive_name}!{info.filename}: {info.file_size} bytes exceeds limit")
+                    continue
+
+                with archive.open(info) as member_file:
+                    data = member_file.read()
+
+                yield SourceDocument(
+                    source_id=f"{archive_name}!{info.filename}",
+                    content=decode_bytes(data),
+                    name=os.path.basename(info.filename),
+                    size=len(data),
+                    metadata={"archive": archive_name, "archive_member": info.filename}
+                )
+
+
+class JsonlSource:
+    """
+    One document per line in a JSON Lines dump (optionally gzipped).
+
+    Each record must carry the document text in `text_field`. The source
+    identifier uses `id_field` when present, falling back to the line number.
+    Remaining scalar fields are kept as document metadata.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        text_field: str = "content",
+        id_field: str = "id",
+        title_field: str = "title"
+    ):
+        """
+        Initialize JSONL source.
+
+        Args:
+            path: Path to the dump
+            text_field: Record field holding the document text
+            id_field: Record field holding a stable document identifier
+            title_field: Record field holding the document title
+        """
+        self.path = path
+        self.text_field = text_field
+        self.id_field = id_field
+        self.title_field = title_field
+
+    def _open(self) -> io.BufferedIOBase:
+        """Open the dump for line-by-line reading, as bytes so sizes are byte counts."""
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, "rb")
+        return open(self.path, "rb")
+
+    def __iter__(self) -> Iterator[SourceDocument]:
+        dump_name = os.path.basename(self.path)
+
+        with self._open() as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    # Invalid JSON, or bytes that are not UTF-8
+                    logger.warning(f"Skipping {dump_name} line {line_number}: {e}")
+                    continue
+
+                content = record.get(self.text_field) if isinstance(record, dict) else None
+                if not isinstance(content, str):
+                    logger.warning(f"Skipping {dump_name} line {line_number}: no '{self.text_field}' text")
+                    continue
+
+                record_id = record.get(self.id_field)
+                key = str(record_id) if record_id is not None else f"L{line_number}"
+                title = record.get(self.title_field)
+
+                metadata = {
+                    k: v for k, v in record.items()
+                    if k != self.text_field and isinstance(v, (str, int, float, bool))
+                }
+                metadata["dump"] = dump_name
+
+                yield SourceDocument(
+                    source_id=f"{dump_name}#{key}",
+                    content=content,
+                    name=key,
+                    size=len(line),
+                    metadata=metadata,
+                    title=title if isinstance(title, str) else None
+                )
+
+
+def open_source(
+    path: str,
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+    jsonl_text_field: str = "content",
+    jsonl_id_field: str = "id",
+    ignore_file: Optional[str] = IGNORE_FILE,
+    walk_threads: int = 0
+):
+    """
+    Create the source adapter matching a path.
+
+    Args:
+        path: Folder, archive or JSONL dump
+        extensions: File extensions to include from folders and archives
+        jsonl_text_field: Record field holding the text in JSONL dumps
+        jsonl_id_field: Record field holding the identifier in JSONL dumps
+        ignore_file: Gitignore-style file honored when walking folders
+        walk_threads: Threads used to walk folders
+
+    Returns:
+        Iterable of SourceDocument
+    """
+    lowered = path.lower()
+
+    if os.path.isfile(path):
+        if lowered.endswith(JSONL_SUFFIXES):
+            return JsonlSource(path, text_field=jsonl_text_field, id_field=jsonl_id_field)
+        if lowered.endswith(ZIP_SUFFIXES):
+            return ZipArchiveSource(path, extensions)
+        if lowered.endswith(TAR_SUFFIXES):
+            return TarArchiveSource(path, extensions)
+        raise ValueError(f"Unsupported source file: {path}")
+
+    return DirectorySource(path, extensions, ignore_file=ignore_file, walk_threads=walk_threads)
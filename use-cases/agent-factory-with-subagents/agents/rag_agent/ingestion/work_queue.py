@@ -0,0 +1,314 @@
+"""
+Postgres-backed job queue for multi-worker ingestion.
+"""
+
+import os
+import socket
+import logging
+from typing import List, Dict, Any, Optional, Iterable
+from dataclasses import dataclass, field
+
+import asyncpg
+
+from .sources import SourceDocument, decode_bytes
+from .collections import DEFAULT_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("pending", "running", "done", "failed")
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker no longer holds the lease of the job it is finishing."""
+
+
+def default_worker_id() -> str:
+    """Identify this worker by host and process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class IngestionJob:
+    """A claimed ingestion job."""
+    id: int
+    batch_id: str
+    source_id: str
+    name: str
+    location: Optional[str] = None
+    content: Optional[str] = None
+    title: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    collection_id: str = DEFAULT_COLLECTION
+
+    def to_document(self) -> SourceDocument:
+        """
+        Materialize the job's document.
+
+        Inline content is used as-is; loose files are read from their
+        location, which must be visible to the worker (shared storage).
+        """
+        if self.content is not None:
+            content = self.content
+            size = len(content.encode("utf-8"))
+        else:
+            with open(self.location, "rb") as f:
+                data = f.read()
+            content = decode_bytes(data)
+            size = len(data)
+
+        return SourceDocument(
+            source_id=self.source_id,
+            content=content,
+            name=self.name,
+            size=size,
+            metadata=dict(self.metadata),
+            title=self.title
+        )
+
+
+class IngestionJobQueue:
+    """
+    Work queue in the ingestion_jobs table.
+
+    A coordinator enqueues one job per document; any number of workers, on
+    any host, claim jobs with FOR UPDATE SKIP LOCKED so concurrent claims
+    never block on or return the same row. A claim is a lease: workers
+    heartbeat to extend it, and jobs whose lease expired (crashed or stuck
+    worker) go back to pending until max_attempts is reached. Completion is
+    recorded in the same transaction that saves the document and only while
+    the lease is still held, so a document is never committed twice.
+    """
+
+    def __init__(self, batch_id: str, lease_seconds: int = 300, max_attempts: int = 3):
+        """
+        Initialize job queue.
+
+        Args:
+            batch_id: Batch of jobs this queue works on
+            lease_seconds: How long a claim is valid without a heartbeat
+            max_attempts: Claims per job before it is marked failed
+        """
+        self.batch_id = batch_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    async def enqueue(
+        self,
+        conn: asyncpg.Connection,
+        documents: Iterable[SourceDocument],
+        inline: bool = False,
+        batch_size: int = 500,
+        collection: str = DEFAULT_COLLECTION
+    ) -> int:
+        """
+        Add one job per document, skipping documents already in the batch.
+
+        Loose files are enqueued by path unless inline is set; documents
+        without a file of their own (archive members, JSONL records) always
+        carry their content.
+
+        Args:
+            conn: Database connection
+            documents: Documents from a source adapter
+            inline: Store file content in the job instead of the path
+            batch_size: Jobs inserted per round trip
+            collection: Collection the documents are ingested into
+
+        Returns:
+            Number of documents offered to the queue
+        """
+        insert = """
+            INSERT INTO ingestion_jobs (batch_id, source_id, name, location, content, title, metadata, collection_id)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (batch_id, source_id) DO NOTHING
+        """
+        offered = 0
+        rows = []
+
+        for document in documents:
+            location = document.metadata.get("file_path")
+            content = None if location and not inline else document.content
+            rows.append((
+                self.batch_id,
+                document.source_id,
+                document.name,
+                location,
+                content,
+                document.title,
+                document.metadata,
+                collection
+            ))
+            offered += 1
+
+            if len(rows) >= batch_size:
+                await conn.executemany(insert, rows)
+                rows = []
+
+        if rows:
+            await conn.executemany(insert, rows)
+
+        logger.info(f"Enqueued {offered} documents into batch {self.batch_id}")
+        return offered
+
+    async def claim(self, conn: asyncpg.Connection, worker_id: str, limit: int = 1) -> List[IngestionJob]:
+        """
+        Lease up to `limit` pending jobs.
+
+        Args:
+            conn: Database connection
+            worker_id: Identity of the claiming worker
+            limit: Maximum jobs to claim
+
+        Returns:
+            Claimed jobs, empty if none are pending
+        """
+        rows = await conn.fetch(
+            """
+            UPDATE ingestion_jobs j
+            SET status = 'running',
+                worker_id = $2,
+                attempts = j.attempts + 1,
+                lease_expires_at = now() + make_interval(secs => $3),
+                updated_at = now()
+            WHERE j.id IN (
+                SELECT id FROM ingestion_jobs
+                WHERE batch_id = $1 AND status = 'pending'
+                ORDER BY id
+                LIMIT $4
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING j.id, j.batch_id, j.source_id, j.name, j.location, j.content,
+                      j.title, j.metadata, j.attempts, j.collection_id
+            """,
+            self.batch_id,
+            worker_id,
+            float(self.lease_seconds),
+            limit
+        )
+
+        return [
+            IngestionJob(
+                id=row["id"],
+                batch_id=row["batch_id"],
+                source_id=row["source_id"],
+                name=row["name"],
+                location=row["location"],
+                content=row["content"],
+                title=row["title"],
+                metadata=row["metadata"] or {},
+                attempts=row["attempts"],
+                collection_id=row["collection_id"]
+            )
+            for row in rows
+        ]
+
+    async def heartbeat(self, conn: asyncpg.Connection, job: IngestionJob, worker_id: str) -> bool:
+        """
+        Extend a job's lease.
+
+        Leases are matched on worker and attempt, so a worker never extends or
+        finishes a later claim of the same job, even its own.
+
+        Returns:
+            False if the lease was lost (expired and reclaimed)
+        """
+        updated = await conn.fetchval(
+            """
+            UPDATE ingestion_jobs
+            SET lease_expires_at = now() + make_interval(secs => $4), updated_at = now()
+            WHERE id = $1 AND worker_id = $2 AND attempts = $3 AND status = 'running'
+            RETURNING id
+            """,
+            job.id,
+            worker_id,
+            job.attempts,
+            float(self.lease_seconds)
+        )
+        return updated is not None
+
+    async def complete(
+        self,
+        conn: asyncpg.Connection,
+        job: IngestionJob,
+        worker_id: str,
+        document_id: str,
+        chunks_created: int
+    ):
+        """
+        Mark a job done; call inside the transaction that saved its document.
+
+        Raises:
+            LeaseLostError: If the lease expired and the job was reclaimed,
+                which rolls back the document save
+        """
+        updated = await conn.fetchval(
+            """
+            UPDATE ingestion_jobs
+            SET status = 'done', document_id = $4::uuid, chunks_created = $5,
+                error = NULL, lease_expires_at = NULL, updated_at = now()
+            WHERE id = $1 AND worker_id = $2 AND attempts = $3 AND status = 'running'
+            RETURNING id
+            """,
+            job.id,
+            worker_id,
+            job.attempts,
+            document_id,
+            chunks_created
+        )
+        if updated is None:
+            raise LeaseLostError(f"Lease on job {job.id} was lost; discarding result")
+
+    async def fail(self, conn: asyncpg.Connection, job: IngestionJob, worker_id: str, error: str):
+        """Release a failed job for retry, or mark it failed after max_attempts."""
+        await conn.execute(
+            """
+            UPDATE ingestion_jobs
+            SET status = CASE WHEN attempts >= $5 THEN 'failed' ELSE 'pending' END,
+                worker_id = NULL, lease_expires_at = NULL, error = $4, updated_at = now()
+            WHERE id = $1 AND worker_id = $2 AND attempts = $3 AND status = 'running'
+            """,
+            job.id,
+            worker_id,
+            job.attempts,
+            error[:2000],
+            self.max_attempts
+        )
+
+    async def reclaim_stale(self, conn: asyncpg.Connection) -> int:
+        """
+        Return jobs with expired leases to the queue.
+
+        Returns:
+            Number of jobs reclaimed or given up on
+        """
+        result = await conn.execute(
+            """
+            UPDATE ingestion_jobs
+            SET status = CASE WHEN attempts >= $2 THEN 'failed' ELSE 'pending' END,
+                error = COALESCE(error, 'lease expired'),
+                worker_id = NULL, lease_expires_at = NULL, updated_at = now()
+            WHERE batch_id = $1 AND status = 'running' AND lease_expires_at < now()
+            """,
+            self.batch_id,
+            self.max_attempts
+        )
+        reclaimed = int(result.split()[-1]) if result else 0
+        if reclaimed:
+            logger.warning(f"Reclaimed {reclaimed} jobs with expired leases in batch {self.batch_id}")
+        return reclaimed
+
+    async def status(self, conn: asyncpg.Connection) -> Dict[str, int]:
+        """Count the batch's jobs by status."""
+        rows = await conn.fetch(
+            """
+            SELECT status, COUNT(*) AS jobs
+            FROM ingestion_jobs
+            WHERE batch_id = $1
+            GROUP BY status
+            """,
+            self.batch_id
+        )
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["jobs"] for row in rows})
+        return counts
@@ -25,6 +25,21 @@ class Settings(BaseSettings):
         description="PostgreSQL connection URL with PGVector extension"
     )
     
+    database_replica_urls: Optional[str] = Field(
+        default=None,
+        description="Comma-separated read replica URLs; search reads are routed to them"
+    )
+    
+    replica_routing: str = Field(
+        default="round_robin",
+        description="How reads pick a replica (round_robin, least_latency)"
+    )
+    
+    replica_max_lag: float = Field(
+        default=5.0,
+        description="Replication lag in seconds above which a replica gets no reads"
+    )
+    
     # LLM Configuration (OpenAI-compatible)
     llm_provider: str = Field(
         default="openai",
@@ -62,6 +77,126 @@ class Settings(BaseSettings):
         description="Default text weight for hybrid search (0-1)"
     )
     
+    vector_metric: str = Field(
+        default="cosine",
+        description="Vector distance used by search (cosine, inner_product); match the index opclass"
+    )
+    
+    hnsw_ef_search: Optional[int] = Field(
+        default=None,
+        description="HNSW candidate list size per query (server default 40 when unset)"
+    )
+    
+    ivfflat_probes: Optional[int] = Field(
+        default=None,
+        description="IVFFlat lists probed per query (server default 1 when unset)"
+    )
+    
+    exact_scan_limit: int = Field(
+        default=20000,
+        description="Filtered searches matching at most this many chunks scan them exactly instead of using the ANN index"
+    )
+    
+    default_collection: str = Field(
+        default="default",
+        description="Collection searched when the session does not select one"
+    )
+    
+    search_projection: str = Field(
+        default="full",
+        description="Search result content: full (chunk text and metadata) or snippet (highlighted window, whitelisted metadata)"
+    )
+    
+    snippet_metadata_keys: str = Field(
+        default="file_path,title,tags",
+        description="Comma-separated metadata keys kept in snippet results"
+    )
+    
+    snippet_max_words: int = Field(
+        default=35,
+        description="Words per highlighted fragment in snippet results"
+    )
+    
+    vector_store: str = Field(
+        default="postgres",
+        description="Chunk storage and search: postgres (pgvector) or ivf (local NumPy engine, no database)"
+    )
+    
+    vector_store_path: str = Field(
+        default="./.vector_store",
+        description="Directory of the ivf vector store"
+    )
+    
+    local_index_path: Optional[str] = Field(
+        default=None,
+        description="Directory of memory-mapped embedding copies; unfiltered semantic searches run in-process when set"
+    )
+    
+    local_index_sync_interval: float = Field(
+        default=30.0,
+        description="Seconds between syncs of the local index with the chunks table"
+    )
+    
+    search_diversify: bool = Field(
+        default=False,
+        description="Re-rank search results by maximal marginal relevance to drop near-duplicate chunks"
+    )
+    
+    mmr_lambda: float = Field(
+        default=0.7,
+        description="Relevance weight of MMR re-ranking: 1 keeps the plain ranking, lower values favor diversity"
+    )
+    
+    context_token_budget: int = Field(
+        default=3000,
+        description="Tokens search_context may return, packed from the most relevant passages"
+    )
+    
+    context_neighbors: int = Field(
+        default=0,
+        description="Chunks search_context adds on each side of a hit"
+    )
+    
+    context_merge_gap: int = Field(
+        default=1,
+        description="Hits of a document at most this many chunks apart are merged into one passage"
+    )
+    
+    batch_search_size: int = Field(
+        default=100,
+        description="Queries batch_search embeds in one API call and resolves in one statement"
+    )
+    
+    search_explain_threshold_ms: Optional[float] = Field(
+        default=None,
+        description="Statement time above which searches are sampled for EXPLAIN (ANALYZE, BUFFERS); unset disables"
+    )
+    
+    search_explain_sample_rate: float = Field(
+        default=0.1,
+        description="Fraction of slow search statements explained"
+    )
+    
+    search_explain_path: str = Field(
+        default="./search_explain.jsonl",
+        description="JSON lines file the sampled plans are appended to"
+    )
+    
+    result_cache_size: int = Field(
+        default=512,
+        description="Search results cached in process, per query and corpus generation (0 disables the cache)"
+    )
+    
+    result_cache_path: Optional[str] = Field(
+        default=None,
+        description="SQLite file sharing cached results and the query log across processes"
+    )
+    
+    result_cache_warm_queries: int = Field(
+        default=50,
+        description="Most frequent logged searches replayed into the shared cache after each ingest"
+    )
+    
     # Connection Pool Configuration
     db_pool_min_size: int = Field(
         default=10,
@@ -73,6 +208,11 @@ class Settings(BaseSettings):
         description="Maximum database connection pool size"
     )
     
+    db_statement_cache_size: int = Field(
+        default=100,
+        description="Prepared statements cached per connection (0 behind pgbouncer in transaction mode)"
+    )
+    
     # Embedding Configuration
     embedding_model: str = Field(
         default="text-embedding-3-small",
@@ -0,0 +1,38 @@
+-- Optional: replace the IVFFlat vector indexes with HNSW.
+--
+-- HNSW needs no training data, so unlike IVFFlat it can be built on an empty table
+-- and stays accurate as rows are added; it builds slower and uses more memory.
+--   m                more graph links per node: better recall, bigger index (default 16)
+--   ef_construction  build-time candidate list: better graph, slower build (default 64)
+-- Query-time recall is controlled by hnsw.ef_search (HNSW_EF_SEARCH in .env).
+--
+-- Vector indexes are per collection partition; this rebuilds every partition's.
+-- Run after schema.sql. The ingestion CLI can also (re)build one collection's
+-- index sized for its data:
+--   python -m ingestion.ingest --collection <id> --defer-index --index-method hnsw ...
+
+SET maintenance_work_mem = '1GB';
+
+DO $$
+DECLARE
+    partition_table TEXT;
+BEGIN
+    FOR partition_table IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'chunks'::regclass
+    LOOP
+        EXECUTE format('DROP INDEX IF EXISTS %I', 'idx_' || partition_table || '_embedding');
+        EXECUTE format(
+            'CREATE INDEX %I ON %I USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)',
+            'idx_' || partition_table || '_embedding',
+            partition_table
+        );
+    END LOOP;
+END;
+$$;
+
+-- Inner-product variant for unit-length embeddings (OpenAI embeddings are normalized).
+-- Use vector_ip_ops instead of vector_cosine_ops above and set VECTOR_METRIC=inner_product
+-- so the search functions order by <#> and can use the index.
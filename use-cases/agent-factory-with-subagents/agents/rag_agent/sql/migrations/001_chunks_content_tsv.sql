@@ -0,0 +1,21 @@
+-- Add the stored tsvector column and its GIN index to an existing database.
+--
+-- schema.sql creates both for new databases. On an existing one, run this
+-- file, then re-run the hybrid_search definition from schema.sql so keyword
+-- search uses the column:
+--   psql "$DATABASE_URL" -f sql/migrations/001_chunks_content_tsv.sql
+--
+-- Adding a stored generated column rewrites the chunks table under an
+-- ACCESS EXCLUSIVE lock, so run it in a maintenance window on large tables.
+-- The index is built CONCURRENTLY and does not block searches or ingestion;
+-- don't wrap this file in a transaction (no psql --single-transaction).
+
+ALTER TABLE chunks
+    ADD COLUMN IF NOT EXISTS content_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
+
+ANALYZE chunks;
@@ -0,0 +1,4 @@
+-- Index document sources for prefix filters (filtered_documents.source_prefix).
+-- Re-run the function definitions from schema.sql afterwards.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_source ON documents (source text_pattern_ops);
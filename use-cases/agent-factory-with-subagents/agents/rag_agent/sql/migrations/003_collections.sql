@@ -0,0 +1,62 @@
+-- Partition an existing chunks table by collection.
+--
+-- schema.sql creates the partitioned layout for new databases. On an existing
+-- one, this file turns the current chunks table into the partition of the
+-- 'default' collection (chunks_c_default) under a new partitioned parent, so
+-- no chunk is copied. Afterwards re-run the function definitions from
+-- schema.sql (create_collection through hybrid_search) so search takes the
+-- collection argument:
+--   psql "$DATABASE_URL" --single-transaction -f sql/migrations/003_collections.sql
+--
+-- Replacing the primary key rebuilds its index under an ACCESS EXCLUSIVE lock
+-- on chunks, so run it in a maintenance window on large tables. The existing
+-- vector index is kept and becomes the default collection's.
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS collection_id TEXT NOT NULL DEFAULT 'default';
+CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents (collection_id);
+
+ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS collection_id TEXT NOT NULL DEFAULT 'default';
+
+-- Leftovers of the former whole-table rebuild
+DROP TABLE IF EXISTS chunks_next, documents_next, chunks_old, documents_old CASCADE;
+
+ALTER TABLE chunks RENAME TO chunks_c_default;
+ALTER TABLE chunks_c_default ADD COLUMN collection_id TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE chunks_c_default
+    ADD CONSTRAINT chunks_c_default_collection_check CHECK (collection_id = 'default');
+
+ALTER TABLE chunks_c_default DROP CONSTRAINT chunks_pkey;
+ALTER TABLE chunks_c_default ADD CONSTRAINT chunks_c_default_pkey PRIMARY KEY (collection_id, id);
+ALTER TABLE chunks_c_default RENAME CONSTRAINT chunks_document_id_fkey TO chunks_c_default_document_id_fkey;
+
+-- Free the canonical names for the parent's indexes
+ALTER INDEX IF EXISTS idx_chunks_embedding RENAME TO idx_chunks_c_default_embedding;
+ALTER INDEX IF EXISTS idx_chunks_document_id RENAME TO chunks_c_default_document_id_idx;
+ALTER INDEX IF EXISTS idx_chunks_chunk_index RENAME TO chunks_c_default_document_id_chunk_index_idx;
+ALTER INDEX IF EXISTS idx_chunks_content_trgm RENAME TO chunks_c_default_content_idx;
+ALTER INDEX IF EXISTS idx_chunks_content_tsv RENAME TO chunks_c_default_content_tsv_idx;
+
+CREATE TABLE chunks (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    collection_id TEXT NOT NULL DEFAULT 'default',
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    embedding vector(1536),
+    chunk_index INTEGER NOT NULL,
+    metadata JSONB DEFAULT '{}',
+    token_count INTEGER,
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (collection_id, id)
+) PARTITION BY LIST (collection_id);
+
+-- The check constraint lets the attach skip validating every row
+ALTER TABLE chunks ATTACH PARTITION chunks_c_default FOR VALUES IN ('default');
+
+-- Adopt the partition's matching indexes instead of building new ones
+CREATE INDEX idx_chunks_document_id ON chunks (document_id);
+CREATE INDEX idx_chunks_chunk_index ON chunks (document_id, chunk_index);
+CREATE INDEX idx_chunks_content_trgm ON chunks USING GIN (content gin_trgm_ops);
+CREATE INDEX idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
+
+ANALYZE chunks;
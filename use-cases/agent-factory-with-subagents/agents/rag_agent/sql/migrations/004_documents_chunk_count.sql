@@ -0,0 +1,33 @@
+-- Add the maintained chunk count and the keyset pagination index to an
+-- existing database.
+--
+-- schema.sql creates both for new databases. Ingestion writes chunk_count
+-- with each document from then on; this file backfills it for documents
+-- already loaded. Indexes are built CONCURRENTLY, so don't wrap this file in
+-- a transaction (no psql --single-transaction):
+--   psql "$DATABASE_URL" -f sql/migrations/004_documents_chunk_count.sql
+--
+-- The backfill counts every document's chunks once; on large tables run it
+-- outside peak hours.
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE documents d
+SET chunk_count = c.chunk_count
+FROM (
+    SELECT document_id, COUNT(*) AS chunk_count
+    FROM chunks
+    GROUP BY document_id
+) c
+WHERE c.document_id = d.id;
+
+-- Row comparisons in the keyset cursor need a non-NULL created_at
+UPDATE documents SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE documents ALTER COLUMN created_at SET NOT NULL;
+
+-- Replace the created_at index with one covering the (created_at, id) sort key
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_created_at_id ON documents (created_at DESC, id DESC);
+DROP INDEX CONCURRENTLY IF EXISTS idx_documents_created_at;
+ALTER INDEX idx_documents_created_at_id RENAME TO idx_documents_created_at;
+
+ANALYZE documents;
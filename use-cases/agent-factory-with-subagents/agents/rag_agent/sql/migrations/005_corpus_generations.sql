@@ -0,0 +1,14 @@
+-- Add the corpus generation counter to an existing database.
+--
+-- schema.sql creates it for new databases. From then on, ingestion bumps a
+-- collection's generation after each batch of committed documents (every 100
+-- documents or 30 seconds, and when a load ends or fails), deletes after they
+-- commit, and reindexing at the swap. The search result cache only serves
+-- results computed at the current generation:
+--   psql "$DATABASE_URL" -f sql/migrations/005_corpus_generations.sql
+
+CREATE TABLE IF NOT EXISTS corpus_generations (
+    collection_id TEXT PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,13 @@
+-- Track blue/green reindexes in an existing database.
+--
+-- schema.sql creates it for new databases. Document listings hide the
+-- documents a reindex has staged but not swapped in yet, and those of the
+-- previous generation between the swap and their deletion:
+--   psql "$DATABASE_URL" -f sql/migrations/006_collection_reindexes.sql
+
+CREATE TABLE IF NOT EXISTS collection_reindexes (
+    collection_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    swapped BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
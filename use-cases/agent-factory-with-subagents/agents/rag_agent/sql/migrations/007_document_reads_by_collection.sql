@@ -0,0 +1,14 @@
+-- Scope document reads to a collection in an existing database.
+--
+-- schema.sql creates both for new databases. Document listings filter on
+-- collection_id and page by (created_at, id) within it, and
+-- get_document_chunks takes the collection, so it reads one partition. The
+-- old one-argument function is dropped; re-run the function definitions
+-- from schema.sql afterwards. The index is built CONCURRENTLY, so don't wrap
+-- this file in a transaction (no psql --single-transaction):
+--   psql "$DATABASE_URL" -f sql/migrations/007_document_reads_by_collection.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_collection_created_at
+    ON documents (collection_id, created_at DESC, id DESC);
+
+DROP FUNCTION IF EXISTS get_document_chunks(UUID);
@@ -2,45 +2,232 @@ CREATE EXTENSION IF NOT EXISTS vector;
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
+DROP TABLE IF EXISTS ingestion_jobs CASCADE;
+DROP TABLE IF EXISTS corpus_generations CASCADE;
+DROP TABLE IF EXISTS collection_reindexes CASCADE;
 DROP TABLE IF EXISTS chunks CASCADE;
 DROP TABLE IF EXISTS documents CASCADE;
-DROP INDEX IF EXISTS idx_chunks_embedding;
-DROP INDEX IF EXISTS idx_chunks_document_id;
-DROP INDEX IF EXISTS idx_documents_metadata;
-DROP INDEX IF EXISTS idx_chunks_content_trgm;
+
+-- Drop every version of the search functions, whatever their signature
+DO $$
+DECLARE
+    fn regprocedure;
+BEGIN
+    FOR fn IN
+        SELECT p.oid::regprocedure
+        FROM pg_proc p
+        WHERE p.pronamespace = 'public'::regnamespace
+          AND p.proname IN (
+              'match_chunks', 'hybrid_search', 'vector_candidates', 'filtered_documents',
+              'create_collection', 'chunk_snippet', 'jsonb_pick', 'get_document_chunks'
+          )
+    LOOP
+        EXECUTE 'DROP FUNCTION ' || fn;
+    END LOOP;
+END;
+$$;
 
 CREATE TABLE documents (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    collection_id TEXT NOT NULL DEFAULT 'default',
     title TEXT NOT NULL,
     source TEXT NOT NULL,
     content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Written with the document's chunks by ingestion, so listings never count chunks
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_documents_collection ON documents (collection_id);
 CREATE INDEX idx_documents_metadata ON documents USING GIN (metadata);
-CREATE INDEX idx_documents_created_at ON documents (created_at DESC);
+-- Newest-first keyset pagination on (created_at, id); also serves date range filters
+CREATE INDEX idx_documents_created_at ON documents (created_at DESC, id DESC);
+-- The same within a collection, for document listings
+CREATE INDEX idx_documents_collection_created_at ON documents (collection_id, created_at DESC, id DESC);
+CREATE INDEX idx_documents_source ON documents (source text_pattern_ops);
 
+-- One partition per collection (tenant), created by create_collection(). Queries
+-- for a collection are pruned to its partition, and each partition has its own
+-- vector index, so collections are searched, sized and rebuilt independently.
 CREATE TABLE chunks (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    collection_id TEXT NOT NULL DEFAULT 'default',
     document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
     content TEXT NOT NULL,
     embedding vector(1536),
     chunk_index INTEGER NOT NULL,
     metadata JSONB DEFAULT '{}',
     token_count INTEGER,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    -- Parsed once on insert so keyword search never re-parses chunk text
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (collection_id, id)
+) PARTITION BY LIST (collection_id);
 
-CREATE INDEX idx_chunks_embedding ON chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 1);
+-- Created on every partition
 CREATE INDEX idx_chunks_document_id ON chunks (document_id);
 CREATE INDEX idx_chunks_chunk_index ON chunks (document_id, chunk_index);
 CREATE INDEX idx_chunks_content_trgm ON chunks USING GIN (content gin_trgm_ops);
+CREATE INDEX idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
+
+-- Create the chunks partition of a collection (chunks_c_<collection>).
+--
+-- The vector index is per partition and not created here: an IVFFlat index
+-- built on an empty table is no better than a flat scan. Ingestion builds it
+-- sized for the loaded rows (idx_chunks_c_<collection>_embedding); see
+-- sql/hnsw.sql to use HNSW instead.
+CREATE OR REPLACE FUNCTION create_collection(collection TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    partition_table TEXT := 'chunks_c_' || collection;
+BEGIN
+    IF collection !~ '^[a-z0-9_]{1,48}$' THEN
+        RAISE EXCEPTION 'Invalid collection id: % (use 1-48 lowercase letters, digits or underscores)', collection;
+    END IF;
+
+    IF to_regclass(partition_table) IS NULL THEN
+        EXECUTE format('CREATE TABLE %I PARTITION OF chunks FOR VALUES IN (%L)', partition_table, collection);
+    END IF;
+
+    RETURN partition_table;
+END;
+$$;
+
+SELECT create_collection('default');
+
+-- Documents matching the search filters; NULL filters match everything.
+-- Inlined into the callers, so metadata containment uses idx_documents_metadata,
+-- the source prefix idx_documents_source and the date range idx_documents_created_at.
+CREATE OR REPLACE FUNCTION filtered_documents(
+    filter_metadata JSONB DEFAULT NULL,
+    source_prefix TEXT DEFAULT NULL,
+    created_after TIMESTAMPTZ DEFAULT NULL,
+    created_before TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (id UUID)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT d.id
+    FROM documents d
+    WHERE (filter_metadata IS NULL OR d.metadata @> filter_metadata)
+      AND (source_prefix IS NULL OR d.source LIKE
+           replace(replace(replace(source_prefix, '\', '\\'), '%', '\%'), '_', '\_') || '%')
+      AND (created_after IS NULL OR d.created_at >= created_after)
+      AND (created_before IS NULL OR d.created_at < created_before);
+$$;
+
+-- Top-k chunk IDs by vector distance: the vector leg of both search functions.
+--
+-- metric 'cosine' uses <=> (vector_cosine_ops indexes); 'inner_product' uses <#>
+-- (vector_ip_ops indexes), which ranks like cosine for unit-length embeddings such
+-- as OpenAI's and is cheaper to compute.
+--
+-- Only the collection's partition is scanned. Unfiltered searches take an
+-- index-backed ORDER BY ... LIMIT over chunks alone.
+-- With filters, the matching chunks are counted first (stopping past
+-- exact_scan_limit): a selective filter is answered by an exact scan of just
+-- those chunks, which is both faster and complete; a broad filter goes through
+-- the ANN index and filters its candidates, where a larger hnsw.ef_search or
+-- ivfflat.probes keeps enough of them.
+CREATE OR REPLACE FUNCTION vector_candidates(
+    query_embedding vector(1536),
+    candidate_count INT,
+    metric TEXT DEFAULT 'cosine',
+    filter_metadata JSONB DEFAULT NULL,
+    source_prefix TEXT DEFAULT NULL,
+    created_after TIMESTAMPTZ DEFAULT NULL,
+    created_before TIMESTAMPTZ DEFAULT NULL,
+    exact_scan_limit INT DEFAULT 20000,
+    collection TEXT DEFAULT 'default'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    has_filter BOOLEAN := filter_metadata IS NOT NULL OR source_prefix IS NOT NULL
+        OR created_after IS NOT NULL OR created_before IS NOT NULL;
+    filtered_chunks BIGINT;
+BEGIN
+    IF has_filter THEN
+        SELECT COUNT(*) INTO filtered_chunks
+        FROM (
+            SELECT 1
+            FROM chunks c
+            WHERE c.collection_id = collection
+              AND c.document_id IN (
+                  SELECT f.id FROM filtered_documents(filter_metadata, source_prefix, created_after, created_before) f
+              )
+            LIMIT exact_scan_limit + 1
+        ) probe;
+    END IF;
+
+    IF has_filter AND filtered_chunks <= exact_scan_limit THEN
+        RETURN QUERY
+        WITH candidates AS MATERIALIZED (
+            SELECT c.id, c.embedding
+            FROM chunks c
+            WHERE c.collection_id = collection
+              AND c.embedding IS NOT NULL
+              AND c.document_id IN (
+                  SELECT f.id FROM filtered_documents(filter_metadata, source_prefix, created_after, created_before) f
+              )
+        )
+        SELECT x.id AS chunk_id, x.sim AS similarity
+        FROM (
+            SELECT 
+                cand.id,
+                (CASE WHEN metric = 'inner_product'
+                    THEN -(cand.embedding <#> query_embedding)
+                    ELSE 1 - (cand.embedding <=> query_embedding)
+                END)::float8 AS sim
+            FROM candidates cand
+        ) x
+        ORDER BY x.sim DESC
+        LIMIT candidate_count;
+    ELSIF metric = 'inner_product' THEN
+        RETURN QUERY
+        SELECT c.id AS chunk_id, (-(c.embedding <#> query_embedding))::float8 AS similarity
+        FROM chunks c
+        WHERE c.collection_id = collection
+          AND c.embedding IS NOT NULL
+          AND (NOT has_filter OR c.document_id IN (
+              SELECT f.id FROM filtered_documents(filter_metadata, source_prefix, created_after, created_before) f
+          ))
+        ORDER BY c.embedding <#> query_embedding
+        LIMIT candidate_count;
+    ELSE
+        RETURN QUERY
+        SELECT c.id AS chunk_id, (1 - (c.embedding <=> query_embedding))::float8 AS similarity
+        FROM chunks c
+        WHERE c.collection_id = collection
+          AND c.embedding IS NOT NULL
+          AND (NOT has_filter OR c.document_id IN (
+              SELECT f.id FROM filtered_documents(filter_metadata, source_prefix, created_after, created_before) f
+          ))
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT candidate_count;
+    END IF;
+END;
+$$;
 
 CREATE OR REPLACE FUNCTION match_chunks(
     query_embedding vector(1536),
-    match_count INT DEFAULT 10
+    match_count INT DEFAULT 10,
+    metric TEXT DEFAULT 'cosine',
+    filter_metadata JSONB DEFAULT NULL,
+    source_prefix TEXT DEFAULT NULL,
+    created_after TIMESTAMPTZ DEFAULT NULL,
+    created_before TIMESTAMPTZ DEFAULT NULL,
+    exact_scan_limit INT DEFAULT 20000,
+    collection TEXT DEFAULT 'default'
 )
 RETURNS TABLE (
     chunk_id UUID,
@@ -59,23 +246,41 @@ BEGIN
         c.id AS chunk_id,
         c.document_id,
         c.content,
-        1 - (c.embedding <=> query_embedding) AS similarity,
+        v.similarity,
         c.metadata,
         d.title AS document_title,
         d.source AS document_source
-    FROM chunks c
+    FROM vector_candidates(
+        query_embedding, match_count, metric,
+        filter_metadata, source_prefix, created_after, created_before, exact_scan_limit, collection
+    ) v
+    JOIN chunks c ON c.collection_id = collection AND c.id = v.chunk_id
     JOIN documents d ON c.document_id = d.id
-    WHERE c.embedding IS NOT NULL
-    ORDER BY c.embedding <=> query_embedding
-    LIMIT match_count;
+    ORDER BY v.similarity DESC;
 END;
 $$;
 
+-- Hybrid search by Reciprocal Rank Fusion: each leg contributes its top
+-- candidate_count chunks (vector leg through the ANN index, keyword leg through
+-- the content_tsv GIN index) and a chunk scores
+--   (1 - text_weight) / (rrf_k + vector rank) + text_weight / (rrf_k + text rank)
+-- Ranks rather than raw scores are fused, because cosine similarity and
+-- ts_rank_cd are on incomparable scales. Cost depends on candidate_count and
+-- the number of keyword matches, not on the corpus size. Filters apply to both legs.
 CREATE OR REPLACE FUNCTION hybrid_search(
     query_embedding vector(1536),
     query_text TEXT,
     match_count INT DEFAULT 10,
-    text_weight FLOAT DEFAULT 0.3
+    text_weight FLOAT DEFAULT 0.3,
+    metric TEXT DEFAULT 'cosine',
+    candidate_count INT DEFAULT NULL,
+    rrf_k INT DEFAULT 60,
+    filter_metadata JSONB DEFAULT NULL,
+    source_prefix TEXT DEFAULT NULL,
+    created_after TIMESTAMPTZ DEFAULT NULL,
+    created_before TIMESTAMPTZ DEFAULT NULL,
+    exact_scan_limit INT DEFAULT 20000,
+    collection TEXT DEFAULT 'default'
 )
 RETURNS TABLE (
     chunk_id UUID,
@@ -90,52 +295,109 @@ RETURNS TABLE (
 )
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    ts_query tsquery := plainto_tsquery('english', query_text);
+    candidates INT := COALESCE(candidate_count, GREATEST(match_count * 4, 40));
+    has_filter BOOLEAN := filter_metadata IS NOT NULL OR source_prefix IS NOT NULL
+        OR created_after IS NOT NULL OR created_before IS NOT NULL;
 BEGIN
     RETURN QUERY
     WITH vector_results AS (
         SELECT 
-            c.id AS chunk_id,
-            c.document_id,
-            c.content,
-            1 - (c.embedding <=> query_embedding) AS vector_sim,
-            c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source
-        FROM chunks c
-        JOIN documents d ON c.document_id = d.id
-        WHERE c.embedding IS NOT NULL
+            v.chunk_id,
+            v.similarity AS vector_sim,
+            row_number() OVER (ORDER BY v.similarity DESC) AS vector_rank
+        FROM vector_candidates(
+            query_embedding, candidates, metric,
+            filter_metadata, source_prefix, created_after, created_before, exact_scan_limit, collection
+        ) v
     ),
     text_results AS (
         SELECT 
-            c.id AS chunk_id,
-            c.document_id,
-            c.content,
-            ts_rank_cd(to_tsvector('english', c.content), plainto_tsquery('english', query_text)) AS text_sim,
-            c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source
-        FROM chunks c
-        JOIN documents d ON c.document_id = d.id
-        WHERE to_tsvector('english', c.content) @@ plainto_tsquery('english', query_text)
+            t.chunk_id,
+            t.text_sim,
+            row_number() OVER (ORDER BY t.text_sim DESC) AS text_rank
+        FROM (
+            SELECT c.id AS chunk_id, ts_rank_cd(c.content_tsv, ts_query) AS text_sim
+            FROM chunks c
+            WHERE c.collection_id = collection
+              AND c.content_tsv @@ ts_query
+              AND (NOT has_filter OR c.document_id IN (
+                  SELECT f.id FROM filtered_documents(filter_metadata, source_prefix, created_after, created_before) f
+              ))
+            ORDER BY text_sim DESC
+            LIMIT candidates
+        ) t
+    ),
+    fused AS (
+        SELECT 
+            COALESCE(v.chunk_id, t.chunk_id) AS fused_id,
+            COALESCE((1 - text_weight) / (rrf_k + v.vector_rank), 0)
+                + COALESCE(text_weight / (rrf_k + t.text_rank), 0) AS score,
+            v.vector_sim,
+            t.text_sim
+        FROM vector_results v
+        FULL OUTER JOIN text_results t ON v.chunk_id = t.chunk_id
+        ORDER BY score DESC
+        LIMIT match_count
     )
     SELECT 
-        COALESCE(v.chunk_id, t.chunk_id) AS chunk_id,
-        COALESCE(v.document_id, t.document_id) AS document_id,
-        COALESCE(v.content, t.content) AS content,
-        (COALESCE(v.vector_sim, 0) * (1 - text_weight) + COALESCE(t.text_sim, 0) * text_weight)::float8 AS combined_score,
-        COALESCE(v.vector_sim, 0)::float8 AS vector_similarity,
-        COALESCE(t.text_sim, 0)::float8 AS text_similarity,
-        COALESCE(v.metadata, t.metadata) AS metadata,
-        COALESCE(v.doc_title, t.doc_title) AS document_title,
-        COALESCE(v.doc_source, t.doc_source) AS document_source
-    FROM vector_results v
-    FULL OUTER JOIN text_results t ON v.chunk_id = t.chunk_id
-    ORDER BY combined_score DESC
-    LIMIT match_count;
+        f.fused_id AS chunk_id,
+        c.document_id,
+        c.content,
+        f.score::float8 AS combined_score,
+        COALESCE(
+            f.vector_sim,
+            CASE WHEN metric = 'inner_product'
+                THEN -(c.embedding <#> query_embedding)
+                ELSE 1 - (c.embedding <=> query_embedding)
+            END,
+            0
+        )::float8 AS vector_similarity,
+        COALESCE(f.text_sim, 0)::float8 AS text_similarity,
+        c.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM fused f
+    JOIN chunks c ON c.collection_id = collection AND c.id = f.fused_id
+    JOIN documents d ON c.document_id = d.id
+    ORDER BY f.score DESC;
 END;
 $$;
 
-CREATE OR REPLACE FUNCTION get_document_chunks(doc_id UUID)
+-- Query-highlighted fragments of a chunk, returned instead of its full text by
+-- the snippet projection of the search tools. Matched terms are wrapped in **;
+-- without matching terms (pure semantic hits) it is the chunk's opening words.
+CREATE OR REPLACE FUNCTION chunk_snippet(content TEXT, query_text TEXT, max_words INT DEFAULT 35)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT ts_headline(
+        'english',
+        content,
+        plainto_tsquery('english', query_text),
+        format(
+            'MaxWords=%s, MinWords=%s, MaxFragments=2, FragmentDelimiter=" ... ", StartSel="**", StopSel="**"',
+            greatest(max_words, 2),
+            greatest(max_words / 2, 1)
+        )
+    );
+$$;
+
+-- The listed keys of a JSONB object; all other keys are dropped.
+CREATE OR REPLACE FUNCTION jsonb_pick(doc JSONB, keys TEXT[])
+RETURNS JSONB
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT COALESCE(jsonb_object_agg(e.key, e.value), '{}'::jsonb)
+    FROM jsonb_each(doc) e
+    WHERE e.key = ANY(keys);
+$$;
+
+-- Chunks of a document in the collection; reads only the collection's partition
+CREATE OR REPLACE FUNCTION get_document_chunks(doc_id UUID, collection TEXT DEFAULT 'default')
 RETURNS TABLE (
     chunk_id UUID,
     content TEXT,
@@ -152,8 +414,8 @@ BEGIN
         chunks.chunk_index,
         chunks.metadata
     FROM chunks
-    WHERE document_id = doc_id
-    ORDER BY chunk_index;
+    WHERE chunks.collection_id = collection AND chunks.document_id = doc_id
+    ORDER BY chunks.chunk_index;
 END;
 $$;
 
@@ -167,4 +429,49 @@ $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER update_documents_updated_at BEFORE UPDATE ON documents
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Bumped after each committed batch of changes to a collection's chunks;
+-- cached search results are only served for the generation they were computed at
+CREATE TABLE corpus_generations (
+    collection_id TEXT PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Blue/green reindex in progress per collection. Until the swap, documents of
+-- run_id are staged and hidden from listings; after it (swapped), the previous
+-- generation's documents are hidden until they are deleted with this row.
+CREATE TABLE collection_reindexes (
+    collection_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    swapped BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Work queue for multi-worker ingestion (python -m ingestion.ingest --enqueue / --worker)
+CREATE TABLE ingestion_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    batch_id TEXT NOT NULL,
+    collection_id TEXT NOT NULL DEFAULT 'default',
+    source_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    location TEXT,
+    content TEXT,
+    title TEXT,
+    metadata JSONB DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
+    document_id UUID,
+    chunks_created INTEGER,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (batch_id, source_id),
+    CHECK (location IS NOT NULL OR content IS NOT NULL)
+);
+
+CREATE INDEX idx_ingestion_jobs_pending ON ingestion_jobs (batch_id, id) WHERE status = 'pending';
+CREATE INDEX idx_ingestion_jobs_leases ON ingestion_jobs (batch_id, lease_expires_at) WHERE status = 'running';
     
\ No newline at end of file
@@ -37,6 +37,7 @@ def mock_db_pool():
     """Create mock database pool."""
     pool = AsyncMock()
     connection = AsyncMock()
+    connection.transaction = MagicMock()
     pool.acquire.return_value.__aenter__.return_value = connection
     pool.acquire.return_value.__aexit__.return_value = None
     return pool, connection
@@ -0,0 +1,149 @@
+"""Test batched searches: one embedding call and one statement for many queries."""
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from ..tools import batch_search, semantic_search, hybrid_search
+from ..utils.db_utils import BATCH_MATCH_CHUNKS_QUERY, BATCH_HYBRID_SEARCH_QUERY, query_label
+from ..utils.ivf_store import IVFVectorStore
+from ..utils.models import SearchFilters
+from ..utils.result_cache import SearchResultCache
+from ..utils.vector_store import VectorQuery, PostgresVectorStore, batch_template
+
+DIMENSION = 8
+TEXTS = ["reset password", "billing cycle", "invite users", "export data"]
+
+
+def make_settings(**values):
+    """Create the settings the search tools read."""
+    settings = {
+        "default_match_count": 2, "max_match_count": 50, "default_text_weight": 0.3,
+        "search_projection": "full", "default_collection": "default", "search_diversify": False,
+        "mmr_lambda": 0.7, "batch_search_size": 100, "vector_metric": "cosine", "exact_scan_limit": 20000,
+        "hnsw_ef_search": None, "ivfflat_probes": None
+    }
+    settings.update(values)
+    return SimpleNamespace(**settings)
+
+
+class TestBatchTemplate:
+    """Test which batches can run as one statement."""
+
+    def test_shared_parameters(self):
+        queries = [VectorQuery(embedding=[1.0], match_count=3, text=t) for t in "ab"]
+        assert batch_template(queries).match_count == 3
+
+        with pytest.raises(ValueError):
+            batch_template(queries + [VectorQuery(embedding=[1.0], match_count=4, text="c")])
+        with pytest.raises(ValueError):
+            batch_template([VectorQuery(embedding=[1.0], match_count=3, text="a", snippet=True)])
+
+    def test_query_label(self):
+        assert query_label(BATCH_MATCH_CHUNKS_QUERY) == "match_chunks_batch"
+        assert query_label(BATCH_HYBRID_SEARCH_QUERY) == "hybrid_search_batch"
+
+
+class TestPostgresBatch:
+    """Test the batched statements on a mocked connection."""
+
+    def make_store(self, rows):
+        self.conn = MagicMock()
+        self.conn.fetch = AsyncMock(return_value=rows)
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield self.conn
+
+        return PostgresVectorStore(SimpleNamespace(acquire=acquire), settings=make_settings())
+
+    @pytest.mark.asyncio
+    async def test_search_batch(self):
+        rows = [
+            {"query_index": 0, "chunk_id": "a", "similarity": 0.9},
+            {"query_index": 0, "chunk_id": "b", "similarity": 0.8},
+            {"query_index": 2, "chunk_id": "c", "similarity": 0.7},
+        ]
+        store = self.make_store(rows)
+        filters = SearchFilters(source_prefix="guides/")
+        queries = [VectorQuery(embedding=[float(i), 0.5], match_count=2, filters=filters) for i in range(3)]
+
+        results = await store.search_batch(queries)
+
+        assert results == [
+            [{"chunk_id": "a", "similarity": 0.9}, {"chunk_id": "b", "similarity": 0.8}],
+            [],
+            [{"chunk_id": "c", "similarity": 0.7}],
+        ]
+        self.conn.fetch.assert_awaited_once()
+        args = self.conn.fetch.await_args.args
+        assert args[:4] == (BATCH_MATCH_CHUNKS_QUERY, ["[0.0,0.5]", "[1.0,0.5]", "[2.0,0.5]"], 2, "cosine")
+        assert args[5] == "guides/" and args[-1] == "default"
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_batch(self):
+        store = self.make_store([{"query_index": 1, "chunk_id": "a", "combined_score": 0.03}])
+        queries = [VectorQuery(embedding=[1.0], match_count=5, text=t, text_weight=0.5) for t in ("x", "y")]
+
+        assert await store.hybrid_search_batch(queries) == [[], [{"chunk_id": "a", "combined_score": 0.03}]]
+        args = self.conn.fetch.await_args.args
+        assert args[:5] == (BATCH_HYBRID_SEARCH_QUERY, ["[1.0]", "[1.0]"], ["x", "y"], 5, 0.5)
+
+
+class TestBatchTool:
+    """Test the tool on the IVF store."""
+
+    async def make_ctx(self, tmp_path, cache=None, **settings):
+        rng = np.random.default_rng(3)
+        self.vectors = rng.standard_normal((4, DIMENSION))
+        store = IVFVectorStore(str(tmp_path / "store"), DIMENSION)
+        chunks = [
+            SimpleNamespace(content=text, index=i, metadata={}, token_count=2, embedding=vector.tolist())
+            for i, (text, vector) in enumerate(zip(TEXTS, self.vectors))
+        ]
+        await store.upsert("default", "FAQ", "faq.md", "", chunks, {})
+        embeddings = {text: vector.tolist() for text, vector in zip(TEXTS, self.vectors)}
+        self.deps = SimpleNamespace(
+            settings=make_settings(**settings), vector_store=store, result_cache=cache, collection_id=None,
+            search_timings=[], user_preferences={},
+            get_embedding=AsyncMock(side_effect=lambda text: embeddings[text]),
+            get_embeddings=AsyncMock(side_effect=lambda texts: [embeddings[text] for text in texts])
+        )
+        return SimpleNamespace(deps=self.deps)
+
+    @pytest.mark.asyncio
+    async def test_matches_single_searches(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path)
+
+        semantic = await batch_search(ctx, TEXTS, search_type="semantic")
+        hybrid = await batch_search(ctx, TEXTS)
+
+        assert [entry["query"] for entry in hybrid] == TEXTS
+        for text, entry in zip(TEXTS, semantic):
+            assert entry["results"] == [r.model_dump(exclude={"snippet"}) for r in await semantic_search(ctx, text)]
+        for text, entry in zip(TEXTS, hybrid):
+            assert entry["results"] == [{k: v for k, v in r.items() if k != "snippet"} for r in await hybrid_search(ctx, text)]
+        assert self.deps.get_embeddings.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_split_into_batches(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path, batch_search_size=3)
+
+        results = await batch_search(ctx, TEXTS)
+
+        assert len(results) == 4
+        assert [len(call.args[0]) for call in self.deps.get_embeddings.await_args_list] == [3, 1]
+
+    @pytest.mark.asyncio
+    async def test_cache_hits_are_not_embedded(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path, cache=SearchResultCache())
+        await hybrid_search(ctx, "billing cycle")
+
+        results = await batch_search(ctx, TEXTS)
+
+        self.deps.get_embeddings.assert_awaited_once_with(["reset password", "invite users", "export data"])
+        assert results[1]["results"][0]["content"] == "billing cycle"
+        assert "Unknown search type" in await batch_search(ctx, TEXTS, search_type="keyword")
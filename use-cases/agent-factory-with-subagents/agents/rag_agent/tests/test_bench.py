@@ -0,0 +1,127 @@
+"""Test dry-run sinks, stub embeddings and the ingestion benchmark."""
+
+import math
+
+import pytest
+
+from ..ingestion.bench import BenchmarkReport, parse_size, replicate_corpus
+from ..ingestion.embedder import StubEmbeddingGenerator
+from ..ingestion.ingest import DocumentIngestionPipeline
+from ..ingestion.sinks import InMemorySink, NullSink
+from ..utils.models import IngestionConfig
+
+
+def write_corpus(folder):
+    """Create a small markdown corpus."""
+    (folder / "guide.md").write_text("# Guide\n\n" + "Setup steps for the service. " * 80)
+    (folder / "notes").mkdir()
+    (folder / "notes" / "faq.md").write_text("# FAQ\n\n" + "Answers to common questions. " * 40)
+
+
+class TestParseSize:
+    """Test human-readable sizes."""
+
+    def test_decimal_and_binary_units(self):
+        """Test decimal and binary prefixes."""
+        assert parse_size("50MB") == 50_000_000
+        assert parse_size("2k") == 2000
+        assert parse_size("1GiB") == 1024 ** 3
+        assert parse_size("512") == 512
+
+    def test_invalid_size(self):
+        """Test garbage is rejected."""
+        with pytest.raises(ValueError):
+            parse_size("lots")
+
+
+class TestReplicateCorpus:
+    """Test corpus replication."""
+
+    def test_reaches_target_size(self, tmp_path):
+        """Test copies are made until the target size is reached."""
+        seed = tmp_path / "seed"
+        seed.mkdir()
+        write_corpus(seed)
+        seed_bytes = sum(p.stat().st_size for p in seed.rglob("*.md"))
+
+        files, written = replicate_corpus(str(seed), seed_bytes * 3, str(tmp_path / "out"))
+
+        assert written >= seed_bytes * 3
+        assert files == 6
+        assert (tmp_path / "out" / "copy-0002" / "notes" / "faq.md").exists()
+
+
+class TestStubEmbeddings:
+    """Test deterministic local embeddings."""
+
+    @pytest.mark.asyncio
+    async def test_deterministic_unit_vectors(self):
+        """Test identical texts embed identically to unit vectors."""
+        embedder = StubEmbeddingGenerator()
+
+        first, second, other = await embedder.generate_embeddings_batch(["alpha", "alpha", "beta"])
+
+        assert first == second
+        assert first != other
+        assert len(first) == embedder.get_embedding_dimension()
+        assert math.isclose(math.fsum(v * v for v in first), 1.0, rel_tol=1e-9)
+
+
+class TestDryRun:
+    """Test running the pipeline without PostgreSQL or the embedding API."""
+
+    @pytest.mark.asyncio
+    async def test_ingest_into_memory_sink(self, tmp_path):
+        """Test documents land in the in-memory sink with embeddings."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        write_corpus(docs)
+        sink = InMemorySink()
+
+        pipeline = DocumentIngestionPipeline(
+            IngestionConfig(chunk_size=500, chunk_overlap=50, use_semantic_chunking=False),
+            documents_folder=str(docs),
+            journal_dir=str(tmp_path / "journal"),
+            sink=sink,
+            embedder=StubEmbeddingGenerator()
+        )
+        results = await pipeline.ingest_documents()
+        await pipeline.close()
+
+        assert len(results) == 2
+        assert all(r.document_id and not r.errors for r in results)
+        assert len(sink.documents) == 2
+        assert sink.chunk_count == sum(r.chunks_created for r in results)
+        chunk = next(iter(sink.documents.values()))["chunks"][0]
+        assert len(chunk.embedding) == 1536
+
+    @pytest.mark.asyncio
+    async def test_benchmark_report(self, tmp_path):
+        """Test the benchmark report covers each stage and the total."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        write_corpus(docs)
+
+        pipeline = DocumentIngestionPipeline(
+            IngestionConfig(chunk_size=500, chunk_overlap=50, use_semantic_chunking=False),
+            documents_folder=str(docs),
+            journal_dir=str(tmp_path / "journal"),
+            sink=NullSink(),
+            embedder=StubEmbeddingGenerator()
+        )
+        await pipeline.ingest_documents()
+        report = BenchmarkReport.from_metrics(pipeline.metrics, wall_seconds=1.0)
+
+        assert report.documents == 2
+        assert [s.stage for s in report.stages] == ["read", "chunk", "embed", "db", "total"]
+        assert report.stages[-1].documents_per_second == 2.0
+
+    def test_sink_rejects_database_modes(self, tmp_path):
+        """Test reindexing needs PostgreSQL."""
+        with pytest.raises(ValueError):
+            DocumentIngestionPipeline(
+                IngestionConfig(use_semantic_chunking=False),
+                journal_dir=str(tmp_path),
+                reindex=True,
+                sink=NullSink()
+            )
@@ -0,0 +1,165 @@
+"""Test collection partitions and per-collection reindexing."""
+
+import os
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from ..ingestion.collections import validate_collection_id, partition_name, ann_index_spec
+from ..ingestion.reindex import ShadowReindex
+from ..utils import db_utils
+from ..utils.db_utils import VISIBLE_DOCUMENT, get_document, list_documents, list_documents_page
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "schema.sql")
+
+
+class TestCollectionIds:
+    """Test collection ids map safely onto partition names."""
+
+    def test_partition_name(self):
+        """Test each collection gets its own partition and vector index name."""
+        assert partition_name("acme_42") == "chunks_c_acme_42"
+        assert ann_index_spec("acme_42").name == "idx_chunks_c_acme_42_embedding"
+        assert ann_index_spec("acme_42").table == "chunks_c_acme_42"
+
+    @pytest.mark.parametrize("collection", ["", "Acme", "acme-corp", "a; DROP TABLE chunks", "x" * 49])
+    def test_invalid_ids_rejected(self, collection):
+        """Test ids that are not safe as identifiers are rejected."""
+        with pytest.raises(ValueError):
+            validate_collection_id(collection)
+
+
+@pytest.fixture
+def conn():
+    """Mock database connection with transactions."""
+    connection = MagicMock()
+    connection.fetch = AsyncMock(return_value=[])
+    connection.fetchval = AsyncMock(return_value=0)
+    connection.fetchrow = AsyncMock(return_value=None)
+    connection.execute = AsyncMock(return_value="DELETE 0")
+    connection.transaction.return_value.__aenter__ = AsyncMock()
+    connection.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    return connection
+
+
+class TestShadowReindex:
+    """Test a collection is rebuilt beside its live partition."""
+
+    def test_targets(self):
+        """Test documents go to the live table and chunks to the shadow partition."""
+        reindex = ShadowReindex("acme")
+
+        assert reindex.documents_table == "documents"
+        assert reindex.chunks_table == "chunks_c_acme_next"
+
+    @pytest.mark.asyncio
+    async def test_prepare_shadow_partition(self, conn):
+        """Test the shadow table is shaped to attach as the collection's partition."""
+        await ShadowReindex("acme").prepare(conn, "run-1")
+
+        conn.fetchval.assert_awaited_once_with("SELECT create_collection($1)", "acme")
+        statements = [call.args[0] for call in conn.execute.call_args_list]
+        (record,) = [call.args for call in conn.execute.call_args_list if "collection_reindexes" in call.args[0]]
+        assert "INSERT INTO collection_reindexes" in record[0] and record[1:] == ("acme", "run-1")
+        assert "CREATE TABLE chunks_c_acme_next (LIKE chunks INCLUDING ALL EXCLUDING INDEXES)" in statements
+        assert "ALTER TABLE chunks_c_acme_next ADD PRIMARY KEY (collection_id, id)" in statements
+        assert any("CHECK (collection_id = 'acme')" in statement for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_swap_only_touches_collection(self, conn):
+        """Test the swap detaches and attaches only the collection's partition."""
+        await ShadowReindex("acme").swap(conn)
+
+        statements = [call.args[0] for call in conn.execute.call_args_list]
+        assert "ALTER TABLE chunks DETACH PARTITION chunks_c_acme" in statements
+        assert "ALTER TABLE chunks_c_acme_next RENAME TO chunks_c_acme" in statements
+        attach = "ALTER TABLE chunks ATTACH PARTITION chunks_c_acme FOR VALUES IN ('acme')"
+        assert statements.index("DROP TABLE chunks_c_acme") < statements.index(attach)
+        # Listings switch generations in the same transaction
+        assert "UPDATE collection_reindexes SET swapped = TRUE" in statements[-1]
+
+    @pytest.mark.asyncio
+    async def test_retire_previous_generation(self, conn):
+        """Test only the collection's documents from other runs are deleted."""
+        conn.execute.return_value = "DELETE 12"
+
+        assert await ShadowReindex("acme").retire_documents(conn, "run-1") == 12
+        (documents, collection, run_id), (marker, *marker_args) = [call.args for call in conn.execute.call_args_list]
+        assert "IS DISTINCT FROM" in documents
+        assert (collection, run_id) == ("acme", "run-1")
+        # The rebuild ends with its marker, in the same transaction
+        assert "DELETE FROM collection_reindexes" in marker and marker_args == ["acme", "run-1"]
+        conn.transaction.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_abort(self, conn):
+        """Test an abort drops the shadow table, the staged documents and the marker."""
+        await ShadowReindex("acme").abort(conn, "run-1")
+
+        drop, documents, marker = [call.args for call in conn.execute.call_args_list]
+        assert drop == ("DROP TABLE IF EXISTS chunks_c_acme_next",)
+        assert "ingestion_run_id' = $2" in documents[0] and documents[1:] == ("acme", "run-1")
+        assert "DELETE FROM collection_reindexes" in marker[0] and marker[1:] == ("acme", "run-1")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("swapped, condition", [(False, "ingestion_run_id' = $2"), (True, "IS DISTINCT FROM $2")])
+    async def test_prepare_clears_crashed_rebuild(self, conn, swapped, condition):
+        """Test a new rebuild deletes what a crashed one left: staged documents, or the retired generation."""
+        conn.fetchrow.return_value = {"run_id": "run-0", "swapped": swapped}
+
+        await ShadowReindex("acme").prepare(conn, "run-1")
+
+        (cleanup,) = [call.args for call in conn.execute.call_args_list if "DELETE FROM documents" in call.args[0]]
+        assert condition in cleanup[0] and cleanup[1:] == ("acme", "run-0")
+
+
+class TestListingsDuringReindex:
+    """Test document reads hide what an unfinished rebuild holds back."""
+
+    def patch_pool(self):
+        self.conn = MagicMock()
+        self.conn.fetch = AsyncMock(return_value=[])
+        self.conn.fetchrow = AsyncMock(return_value=None)
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield self.conn
+
+        return patch.object(db_utils.db_pool, "acquire", acquire)
+
+    def test_visibility_condition(self):
+        """Test staged documents are hidden before the swap and retired ones after it."""
+        assert "collection_reindexes" in VISIBLE_DOCUMENT
+        assert "IS NOT DISTINCT FROM r.run_id) <> r.swapped" in VISIBLE_DOCUMENT
+
+    @pytest.mark.asyncio
+    async def test_reads_filter(self):
+        """Test every document read applies the condition."""
+        with self.patch_pool():
+            await list_documents_page(limit=10)
+            await list_documents(limit=10, metadata_filter={"tag": "a"})
+            assert await get_document("00000000-0000-0000-0000-000000000000") is None
+
+        queries = [call.args[0] for call in self.conn.fetch.call_args_list + self.conn.fetchrow.call_args_list]
+        assert len(queries) == 3
+        assert all(VISIBLE_DOCUMENT in query for query in queries)
+
+    @pytest.mark.asyncio
+    async def test_reads_scoped_to_collection(self):
+        """Test document reads only return documents of the requested collection."""
+        with self.patch_pool():
+            await list_documents_page(limit=10, collection="acme")
+            await list_documents(limit=10, collection="acme")
+            await get_document("00000000-0000-0000-0000-000000000000", collection="acme")
+
+        for call in self.conn.fetch.call_args_list + self.conn.fetchrow.call_args_list:
+            query, *params = call.args
+            assert "d.collection_id = $" in query and "acme" in params
+
+    def test_document_chunks_function_scoped(self):
+        """Test get_document_chunks reads the collection's partition only."""
+        schema = open(SCHEMA_PATH).read()
+        function = schema[schema.index("FUNCTION get_document_chunks"):]
+        function = function[:function.index("$$;")]
+        assert "collection TEXT DEFAULT 'default'" in function
+        assert "chunks.collection_id = collection" in function
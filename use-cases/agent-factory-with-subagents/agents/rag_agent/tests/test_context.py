@@ -0,0 +1,146 @@
+"""Test assembling search hits into merged, token-budgeted passages."""
+
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from ..tools import search_context
+from ..utils.context import (
+    strip_overlap, join_chunks, build_passages, pack_passages, window_radius, Passage
+)
+from ..utils.ivf_store import IVFVectorStore
+from ..utils.vector_store import PostgresVectorStore
+from ..utils.db_utils import NEIGHBOR_CHUNKS_QUERY
+
+DIMENSION = 4
+
+TEXT = " ".join(f"Sentence {i} explains step {i} of the setup." for i in range(40))
+
+
+def split(text, size=300, overlap=60):
+    """Split text into overlapping windows like the simple chunker."""
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(text[start:start + size])
+        start += size - overlap
+    return chunks
+
+
+def chunk(index, content, document_id="doc"):
+    """Create a chunk row as get_neighbor_chunks returns it."""
+    return {"chunk_id": f"{document_id}-{index}", "document_id": document_id, "chunk_index": index, "content": content}
+
+
+def hit(index, score, document_id="doc"):
+    """Create a hybrid search row for a chunk."""
+    return {
+        "chunk_id": f"{document_id}-{index}", "document_id": document_id,
+        "document_title": document_id.title(), "document_source": f"{document_id}.md", "combined_score": score
+    }
+
+
+class TestJoin:
+    """Test overlap removal between adjacent chunks."""
+
+    def test_strip_overlap(self):
+        windows = split(TEXT)
+        assert strip_overlap(windows[0], windows[1]) == windows[1][60:]
+        assert strip_overlap("no shared text at all here", "something entirely different") is None
+
+    def test_join_restores_text(self):
+        windows = split(TEXT)
+        assert join_chunks([chunk(i, c) for i, c in enumerate(windows)]) == TEXT
+
+    def test_gap_keeps_both(self):
+        windows = split(TEXT)
+        joined = join_chunks([chunk(0, windows[0]), chunk(2, windows[2])])
+        assert joined == windows[0] + "\n\n" + windows[2]
+
+
+class TestPassages:
+    """Test merging hits and packing them into the budget."""
+
+    def setup_method(self):
+        self.windows = split(TEXT)
+        self.chunks = [chunk(i, c) for i, c in enumerate(self.windows)] + [chunk(0, "Other document.", "other")]
+
+    def test_close_hits_merge(self):
+        hits = [hit(1, 0.02), hit(3, 0.03), hit(6, 0.01), hit(0, 0.015, "other")]
+        passages = build_passages(hits, self.chunks, "combined_score", merge_gap=1)
+
+        merged = next(p for p in passages if p.first_chunk_index == 1 and p.document_id == "doc")
+        assert merged.last_chunk_index == 3
+        assert merged.score == 0.03
+        assert merged.hit_chunk_ids == ["doc-1", "doc-3"]
+        assert merged.content == join_chunks([chunk(i, self.windows[i]) for i in (1, 2, 3)])
+        assert len(passages) == 3
+
+    def test_neighbors(self):
+        passages = build_passages([hit(4, 0.02)], self.chunks, "combined_score", neighbors=1)
+        assert (passages[0].first_chunk_index, passages[0].last_chunk_index) == (3, 5)
+        assert window_radius(1, 1) == 1 and window_radius(0, 3) == 2
+
+    def test_pack_by_score_and_truncate(self):
+        passages = [
+            Passage("a", "A", "a.md", 0, 0, "x " * 200, 0.9, 100),
+            Passage("b", "B", "b.md", 0, 0, "y. " * 400, 0.5, 300),
+            Passage("c", "C", "c.md", 0, 0, "z " * 40, 0.1, 20),
+        ]
+        packed, omitted = pack_passages(passages, 200)
+
+        assert [p.document_id for p in packed] == ["a", "b"]
+        assert packed[1].truncated and packed[1].tokens <= 100
+        assert omitted == 1
+        assert not passages[1].truncated and passages[1].tokens == 300
+
+
+class TestSearchContext:
+    """Test the tool on the IVF store and the Postgres neighbor query."""
+
+    @pytest.mark.asyncio
+    async def test_tool(self, tmp_path):
+        store = IVFVectorStore(str(tmp_path / "store"), DIMENSION)
+        windows = split(TEXT)
+        vectors = [[0.0, 0.0, 1.0, 0.0]] * len(windows)
+        vectors[2] = vectors[3] = [1.0, 0.0, 0.0, 0.0]
+        chunks = [
+            SimpleNamespace(content=c, index=i, metadata={}, token_count=len(c) // 4, embedding=v)
+            for i, (c, v) in enumerate(zip(windows, vectors))
+        ]
+        await store.upsert("default", "Setup", "setup.md", TEXT, chunks, {})
+        settings = SimpleNamespace(
+            default_match_count=2, max_match_count=50, default_text_weight=0.3, default_collection="default",
+            search_diversify=False, mmr_lambda=0.7,
+            context_token_budget=3000, context_neighbors=1, context_merge_gap=1
+        )
+        ctx = SimpleNamespace(deps=SimpleNamespace(
+            settings=settings, vector_store=store, result_cache=None, collection_id=None,
+            search_timings=[], user_preferences={}, get_embedding=AsyncMock(return_value=[1.0, 0.0, 0.0, 0.0])
+        ))
+
+        result = await search_context(ctx, "setup steps")
+
+        (passage,) = result["passages"]
+        assert (passage["first_chunk_index"], passage["last_chunk_index"]) == (1, 4)
+        assert passage["content"] == join_chunks([chunk(i, windows[i]) for i in range(1, 5)])
+        assert result["tokens"] == passage["tokens"]
+
+        small = await search_context(ctx, "setup steps", token_budget=60)
+        assert small["passages"][0]["truncated"] and small["tokens"] <= 60
+
+    @pytest.mark.asyncio
+    async def test_postgres_neighbor_query(self):
+        chunk_id = uuid.uuid4()
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=[chunk(0, "text")])
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield conn
+
+        store = PostgresVectorStore(SimpleNamespace(acquire=acquire))
+        assert await store.get_neighbor_chunks("docs", [chunk_id], 2) == [chunk(0, "text")]
+        conn.fetch.assert_awaited_once_with(NEIGHBOR_CHUNKS_QUERY, "docs", [chunk_id], 2)
@@ -0,0 +1,320 @@
+"""Test the shared, instrumented database pool."""
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import asyncpg
+import pytest
+
+from ..utils.db_utils import (
+    DatabasePool, query_label, register_json_codecs, record_to_dict, _encode_jsonb, _decode_jsonb,
+    MATCH_CHUNKS_QUERY, HYBRID_SEARCH_QUERY
+)
+from ..utils.metrics import MetricsRegistry
+from ..utils.row_bench import synthetic_rows, legacy_convert, codec_convert, run_synthetic, format_results
+
+
+def fake_pool(lag=0.0):
+    """Mock asyncpg pool handing out one connection."""
+    pool = MagicMock()
+    connection = MagicMock()
+    connection.fetchval = AsyncMock(return_value=lag)
+    pool.acquire = AsyncMock(return_value=connection)
+    pool.release = AsyncMock()
+    pool.close = AsyncMock()
+    pool.get_size.return_value = 5
+    pool.get_idle_size.return_value = 4
+    return pool, connection
+
+
+class TestQueryLabel:
+    """Test queries are labelled with low cardinality."""
+
+    def test_search_functions(self):
+        """Test search calls are labelled by the function they call."""
+        assert query_label(MATCH_CHUNKS_QUERY) == "match_chunks"
+        assert query_label(HYBRID_SEARCH_QUERY) == "hybrid_search"
+
+    def test_plain_statements(self):
+        """Test other statements are labelled by their leading keyword."""
+        assert query_label("  INSERT INTO chunks (id) VALUES ($1)") == "insert"
+        assert query_label("SELECT COUNT(*) FROM chunks") == "select"
+
+
+class TestDatabasePool:
+    """Test pool creation, warmup and instrumentation."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_initialize_creates_one_pool(self):
+        """Test concurrent first acquires share a single pool."""
+        pool, _ = fake_pool()
+
+        async def create_pool(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return pool
+
+        db = DatabasePool("postgresql://x@localhost/x", min_size=2, max_size=4)
+        with patch("asyncpg.create_pool", side_effect=create_pool) as mock_create_pool:
+            await asyncio.gather(*(db.initialize() for _ in range(10)))
+
+        mock_create_pool.assert_called_once()
+        kwargs = mock_create_pool.call_args.kwargs
+        assert (kwargs["min_size"], kwargs["max_size"]) == (2, 4)
+        assert db.pool is pool
+
+    @pytest.mark.asyncio
+    async def test_configure_after_initialize_keeps_pool(self):
+        """Test connection options cannot change under a running pool."""
+        pool, _ = fake_pool()
+        db = DatabasePool("postgresql://x@localhost/x", max_size=4)
+        with patch("asyncpg.create_pool", new_callable=AsyncMock, return_value=pool):
+            await db.initialize()
+
+        db.configure(max_size=50)
+
+        assert db.max_size == 4
+
+    @pytest.mark.asyncio
+    async def test_acquire_records_wait_and_in_use(self):
+        """Test acquire wait and in-use connections are tracked."""
+        pool, connection = fake_pool()
+        metrics = MetricsRegistry()
+        db = DatabasePool("postgresql://x@localhost/x", max_size=4, metrics=metrics)
+        with patch("asyncpg.create_pool", new_callable=AsyncMock, return_value=pool):
+            async with db.acquire() as conn:
+                assert conn is connection
+                assert db.stats()["in_use"] == 1
+
+        stats = db.stats()
+        assert stats["in_use"] == 0
+        assert stats["in_use_max"] == 1
+        assert stats["acquire_wait"]["count"] == 1
+        assert (stats["size"], stats["idle"], stats["max_size"]) == (5, 4, 4)
+
+    @pytest.mark.asyncio
+    async def test_warmup_prepares_statements(self):
+        """Test new connections prepare the warmup statements and log query latency."""
+        db = DatabasePool("postgresql://x@localhost/x", warmup_queries=[MATCH_CHUNKS_QUERY, HYBRID_SEARCH_QUERY])
+        conn = MagicMock()
+        conn.set_type_codec = AsyncMock()
+        conn.prepare = AsyncMock(side_effect=[None, asyncpg.UndefinedFunctionError("missing")])
+
+        await db._setup_connection(conn)
+
+        assert conn.prepare.await_count == 2
+        conn.add_query_logger.assert_called_once()
+
+    def test_query_latency_recorded(self):
+        """Test finished queries land in per-statement latency histograms."""
+        db = DatabasePool("postgresql://x@localhost/x")
+
+        db._record_query(SimpleNamespace(query=MATCH_CHUNKS_QUERY, elapsed=0.02, exception=None))
+
+        histogram = db.metrics.histogram("db_query_seconds", query="match_chunks", status="ok")
+        assert histogram.count == 1
+        assert db.stats()["queries"]["query=match_chunks,status=ok"]["count"] == 1
+
+
+class TestReplicaRouting:
+    """Test read-only acquires are spread over healthy replicas."""
+
+    PRIMARY = "postgresql://u:p@primary:5432/rag"
+    REPLICAS = ["postgresql://u:p@replica-a:5432/rag", "postgresql://u:p@replica-b:5433/rag"]
+
+    async def start(self, pools, **options):
+        """Initialize a pool whose create_pool hands out the given pools by URL."""
+        async def create_pool(url, **kwargs):
+            pool = pools[url]
+            if isinstance(pool, Exception):
+                raise pool
+            return pool
+
+        db = DatabasePool(self.PRIMARY, replica_urls=self.REPLICAS, **options)
+        with patch("asyncpg.create_pool", side_effect=create_pool):
+            await db.initialize()
+        return db
+
+    @pytest.mark.asyncio
+    async def test_round_robin_reads_and_primary_writes(self):
+        """Test reads alternate between replicas while writes stay on the primary."""
+        primary, primary_conn = fake_pool()
+        replica_a, conn_a = fake_pool()
+        replica_b, conn_b = fake_pool()
+        db = await self.start({self.PRIMARY: primary, self.REPLICAS[0]: replica_a, self.REPLICAS[1]: replica_b})
+
+        used = []
+        for _ in range(4):
+            async with db.acquire(readonly=True) as conn:
+                used.append(conn)
+        async with db.acquire() as conn:
+            assert conn is primary_conn
+
+        assert used.count(conn_a) == 2 and used.count(conn_b) == 2
+        assert used[0] is not used[1]
+        primary.release.assert_awaited_once_with(primary_conn)
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_skipped(self):
+        """Test a replica over the lag threshold receives no reads."""
+        primary, _ = fake_pool()
+        replica_a, conn_a = fake_pool(lag=30.0)
+        replica_b, conn_b = fake_pool(lag=0.5)
+        db = await self.start(
+            {self.PRIMARY: primary, self.REPLICAS[0]: replica_a, self.REPLICAS[1]: replica_b},
+            max_replica_lag=5.0
+        )
+
+        for _ in range(3):
+            async with db.acquire(readonly=True) as conn:
+                assert conn is conn_b
+
+        replicas = {replica["name"]: replica for replica in db.stats()["replicas"]}
+        assert replicas["replica-a:5432"]["usable"] is False
+        assert replicas["replica-b:5433"]["acquires"] == 3
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_least_latency(self):
+        """Test least-latency routing prefers the fastest replica."""
+        primary, _ = fake_pool()
+        replica_a, _ = fake_pool()
+        replica_b, conn_b = fake_pool()
+        db = await self.start(
+            {self.PRIMARY: primary, self.REPLICAS[0]: replica_a, self.REPLICAS[1]: replica_b},
+            replica_routing="least_latency"
+        )
+        db.replicas[0].latency, db.replicas[1].latency = 0.020, 0.002
+
+        async with db.acquire(readonly=True) as conn:
+            assert conn is conn_b
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_replicas_fall_back_to_primary(self):
+        """Test reads use the primary when no replica can serve them."""
+        primary, primary_conn = fake_pool()
+        replica_b, _ = fake_pool()
+        replica_b.acquire.side_effect = OSError("connection refused")
+        db = await self.start({
+            self.PRIMARY: primary,
+            self.REPLICAS[0]: OSError("connection refused"),
+            self.REPLICAS[1]: replica_b
+        })
+
+        async with db.acquire(readonly=True) as conn:
+            assert conn is primary_conn
+        assert not any(replica["usable"] for replica in db.stats()["replicas"])
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_lag_probed_in_background(self):
+        """Test reads never wait on a probe, and the background probes move reads off a lagging replica."""
+        primary, _ = fake_pool()
+        replica_a, conn_a = fake_pool()
+        replica_b, conn_b = fake_pool()
+        db = await self.start(
+            {self.PRIMARY: primary, self.REPLICAS[0]: replica_a, self.REPLICAS[1]: replica_b},
+            replica_check_interval=0.01
+        )
+        conn_a.fetchval.reset_mock()
+        conn_a.fetchval.return_value = 30.0
+
+        async with db.acquire(readonly=True):
+            conn_a.fetchval.assert_not_awaited()
+        await asyncio.sleep(0.05)
+
+        conn_a.fetchval.assert_awaited()
+        for _ in range(3):
+            async with db.acquire(readonly=True) as conn:
+                assert conn is conn_b
+        await db.close()
+        assert db._probe_task is None
+
+    @pytest.mark.asyncio
+    async def test_hung_replica_marked_down(self):
+        """Test a probe that gets no answer in time marks its replica down without holding up the others."""
+        primary, _ = fake_pool()
+        replica_a, _ = fake_pool()
+        replica_b, conn_b = fake_pool()
+        db = await self.start(
+            {self.PRIMARY: primary, self.REPLICAS[0]: replica_a, self.REPLICAS[1]: replica_b},
+            replica_probe_timeout=0.01
+        )
+
+        async def hang():
+            await asyncio.Event().wait()
+
+        replica_a.acquire = AsyncMock(side_effect=hang)
+        conn_b.fetchval.return_value = 1.0
+
+        await asyncio.wait_for(asyncio.gather(*(db._probe(replica) for replica in db.replicas)), 1.0)
+
+        assert not db.replicas[0].up and not db.replicas[0].lock.locked()
+        assert db.replicas[1].lag == 1.0
+        async with db.acquire(readonly=True) as conn:
+            assert conn is conn_b
+        await db.close()
+
+
+class TestJsonCodec:
+    """Test JSON values are exchanged as Python objects."""
+
+    @pytest.mark.asyncio
+    async def test_codecs_registered(self):
+        """Test json and jsonb get binary codecs on every connection."""
+        conn = MagicMock()
+        conn.set_type_codec = AsyncMock()
+
+        await register_json_codecs(conn)
+
+        registered = {call.args[0]: call.kwargs for call in conn.set_type_codec.call_args_list}
+        assert set(registered) == {"json", "jsonb"}
+        assert all(options["format"] == "binary" for options in registered.values())
+
+    def test_jsonb_round_trip(self):
+        """Test the jsonb wire format carries its version byte."""
+        value = {"file_path": "/docs/a.md", "tags": ["x"], "n": 1}
+
+        encoded = _encode_jsonb(value)
+
+        assert encoded[:1] == b"\x01"
+        assert _decode_jsonb(encoded) == value
+
+
+class TestRecordToDict:
+    """Test rows are converted in one place."""
+
+    def test_isoformat_and_extra(self):
+        """Test timestamps are rendered and extra keys added."""
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        row = record_to_dict(
+            {"id": "a", "created_at": created, "metadata": {}}, isoformat=("created_at",), snippet=True
+        )
+
+        assert row == {"id": "a", "created_at": "2024-01-01T00:00:00+00:00", "metadata": {}, "snippet": True}
+
+
+class TestRowBench:
+    """Test the row handling benchmark."""
+
+    def test_paths_produce_same_rows(self):
+        """Test the codec path returns what the per-row decoding did."""
+        legacy = legacy_convert(synthetic_rows(3, 10))
+        codec = codec_convert(synthetic_rows(3, 10, text_ids=True))
+
+        assert [row["metadata"] for row in legacy] == [row["metadata"] for row in codec]
+        assert all(isinstance(row["id"], str) for row in codec)
+
+    def test_report(self):
+        """Test both workloads are measured for both paths."""
+        results = run_synthetic(seconds=0.01)
+
+        assert {(r.workload, r.path) for r in results} == {
+            ("search", "legacy"), ("search", "codec"), ("listing", "legacy"), ("listing", "codec")
+        }
+        assert all(r.rows_per_second > 0 for r in results)
+        assert "x)" in format_results(results)
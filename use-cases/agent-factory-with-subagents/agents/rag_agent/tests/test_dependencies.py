@@ -49,7 +49,7 @@ class TestAgentDependencies:
         
         with patch.object(deps, 'settings', None):
             with patch('..dependencies.load_settings', return_value=test_settings):
-                with patch('asyncpg.create_pool') as mock_create_pool:
+                with patch('asyncpg.create_pool', new_callable=AsyncMock) as mock_create_pool:
                     with patch('openai.AsyncOpenAI') as mock_openai:
                         mock_pool = AsyncMock()
                         mock_client = AsyncMock()
@@ -59,15 +59,16 @@ class TestAgentDependencies:
                         await deps.initialize()
                         
                         assert deps.settings is test_settings
-                        assert deps.db_pool is mock_pool
+                        assert deps.db_pool.pool is mock_pool
                         assert deps.openai_client is mock_client
                         
                         # Verify pool creation parameters
-                        mock_create_pool.assert_called_once_with(
-                            test_settings.database_url,
-                            min_size=test_settings.db_pool_min_size,
-                            max_size=test_settings.db_pool_max_size
-                        )
+                        args, kwargs = mock_create_pool.call_args
+                        assert args == (test_settings.database_url,)
+                        assert kwargs["min_size"] == test_settings.db_pool_min_size
+                        assert kwargs["max_size"] == test_settings.db_pool_max_size
+                        
+                        await deps.cleanup()
                         
                         # Verify OpenAI client creation
                         mock_openai.assert_called_once_with(
@@ -100,13 +101,13 @@ class TestAgentDependencies:
     
     @pytest.mark.asyncio
     async def test_dependencies_cleanup(self):
-        """Test dependency cleanup process."""
+        """Test cleanup drops the shared pool without closing it for other sessions."""
         mock_pool = AsyncMock()
         deps = AgentDependencies(db_pool=mock_pool)
         
         await deps.cleanup()
         
-        mock_pool.close.assert_called_once()
+        mock_pool.close.assert_not_called()
         assert deps.db_pool is None
     
     @pytest.mark.asyncio
@@ -335,7 +336,7 @@ class TestDatabaseIntegration:
     @pytest.mark.asyncio
     async def test_database_pool_creation(self, test_settings):
         """Test database pool is created with correct parameters."""
-        with patch('asyncpg.create_pool') as mock_create_pool:
+        with patch('asyncpg.create_pool', new_callable=AsyncMock) as mock_create_pool:
             mock_pool = AsyncMock()
             mock_create_pool.return_value = mock_pool
             
@@ -343,17 +344,20 @@ class TestDatabaseIntegration:
             deps.settings = test_settings
             await deps.initialize()
             
-            mock_create_pool.assert_called_once_with(
-                test_settings.database_url,
-                min_size=test_settings.db_pool_min_size,
-                max_size=test_settings.db_pool_max_size
-            )
-            assert deps.db_pool is mock_pool
+            mock_create_pool.assert_called_once()
+            args, kwargs = mock_create_pool.call_args
+            assert args == (test_settings.database_url,)
+            assert kwargs["min_size"] == test_settings.db_pool_min_size
+            assert kwargs["max_size"] == test_settings.db_pool_max_size
+            assert kwargs["statement_cache_size"] == test_settings.db_statement_cache_size
+            assert deps.db_pool.pool is mock_pool
+            
+            await deps.cleanup()
     
     @pytest.mark.asyncio
     async def test_database_connection_error(self, test_settings):
         """Test handling database connection errors."""
-        with patch('asyncpg.create_pool') as mock_create_pool:
+        with patch('asyncpg.create_pool', new_callable=AsyncMock) as mock_create_pool:
             mock_create_pool.side_effect = asyncpg.InvalidCatalogNameError(
                 "Database does not exist"
             )
@@ -366,13 +370,13 @@ class TestDatabaseIntegration:
     
     @pytest.mark.asyncio
     async def test_database_pool_cleanup(self):
-        """Test database pool cleanup."""
+        """Test database pool cleanup leaves the shared pool open."""
         mock_pool = AsyncMock()
         deps = AgentDependencies(db_pool=mock_pool)
         
         await deps.cleanup()
         
-        mock_pool.close.assert_called_once()
+        mock_pool.close.assert_not_called()
         assert deps.db_pool is None
     
     @pytest.mark.asyncio
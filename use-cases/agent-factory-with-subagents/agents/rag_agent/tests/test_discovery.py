@@ -0,0 +1,113 @@
+"""Test lazy document discovery."""
+
+import os
+
+from ..ingestion.discovery import IgnoreRules, walk_documents
+
+
+EXTENSIONS = (".md", ".markdown", ".txt")
+
+
+def make_tree(root):
+    """Create a small document tree."""
+    for relative in [
+        "a.md",
+        "b.TXT",
+        "image.png",
+        "guide/c.markdown",
+        "guide/drafts/d.md",
+        "node_modules/pkg/readme.md",
+        ".git/description.md",
+        "archive/old.md",
+    ]:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("content")
+
+
+def relative_paths(root, found):
+    """Convert discovered files to sorted relative paths."""
+    return sorted(os.path.relpath(f.path, root).replace(os.sep, "/") for f in found)
+
+
+class TestIgnoreRules:
+    """Test gitignore-style matching."""
+
+    def test_unanchored_pattern_matches_any_depth(self):
+        """Test patterns without a slash match names anywhere."""
+        rules = IgnoreRules(["*.tmp.md", "# comment", ""])
+
+        assert rules.is_ignored("notes/x.tmp.md", is_dir=False)
+        assert not rules.is_ignored("notes/x.md", is_dir=False)
+
+    def test_anchored_and_directory_patterns(self):
+        """Test anchored and directory-only patterns."""
+        rules = IgnoreRules(["/archive/", "guide/*.md"])
+
+        assert rules.is_ignored("archive", is_dir=True)
+        assert not rules.is_ignored("archive", is_dir=False)
+        assert not rules.is_ignored("sub/archive", is_dir=True)
+        assert rules.is_ignored("guide/x.md", is_dir=False)
+
+    def test_wildcards_stay_in_segment(self):
+        """Test `*` does not cross directories but `**` does."""
+        rules = IgnoreRules(["guide/*.md", "docs/**/draft?.md", "**/tmp"])
+
+        assert not rules.is_ignored("guide/sub/x.md", is_dir=False)
+        assert rules.is_ignored("docs/draft1.md", is_dir=False)
+        assert rules.is_ignored("docs/a/b/draft1.md", is_dir=False)
+        assert not rules.is_ignored("docs/a/draft/1.md", is_dir=False)
+        assert rules.is_ignored("tmp", is_dir=True)
+        assert rules.is_ignored("a/b/tmp", is_dir=True)
+
+    def test_negation(self):
+        """Test later negated rules re-include paths."""
+        rules = IgnoreRules(["*.md", "!keep.md"])
+
+        assert rules.is_ignored("drop.md", is_dir=False)
+        assert not rules.is_ignored("keep.md", is_dir=False)
+
+
+class TestWalkDocuments:
+    """Test the single-pass walk."""
+
+    def test_matches_extensions_and_skips_default_dirs(self, tmp_path):
+        """Test all extensions match in one pass and vendored dirs are skipped."""
+        make_tree(tmp_path)
+
+        found = list(walk_documents(str(tmp_path), EXTENSIONS))
+
+        assert relative_paths(tmp_path, found) == [
+            "a.md", "archive/old.md", "b.TXT", "guide/c.markdown", "guide/drafts/d.md"
+        ]
+        assert all(f.size == len("content") and f.mtime > 0 for f in found)
+
+    def test_honors_ignore_file(self, tmp_path):
+        """Test the root ignore file prunes directories and files."""
+        make_tree(tmp_path)
+        (tmp_path / ".ingestignore").write_text("drafts/\n/archive\n*.TXT\n")
+
+        found = list(walk_documents(str(tmp_path), EXTENSIONS))
+
+        assert relative_paths(tmp_path, found) == ["a.md", "guide/c.markdown"]
+
+    def test_is_lazy(self, tmp_path):
+        """Test results are yielded before the walk completes."""
+        make_tree(tmp_path)
+
+        walk = walk_documents(str(tmp_path), EXTENSIONS)
+
+        assert os.path.basename(next(walk).path) == "a.md"
+
+    def test_threaded_walk_finds_same_files(self, tmp_path):
+        """Test sharding the walk across threads finds the same files."""
+        make_tree(tmp_path)
+
+        sequential = list(walk_documents(str(tmp_path), EXTENSIONS))
+        threaded = list(walk_documents(str(tmp_path), EXTENSIONS, threads=4))
+
+        assert relative_paths(tmp_path, threaded) == relative_paths(tmp_path, sequential)
+
+    def test_missing_root(self, tmp_path):
+        """Test a missing folder yields nothing."""
+        assert list(walk_documents(str(tmp_path / "missing"), EXTENSIONS)) == []
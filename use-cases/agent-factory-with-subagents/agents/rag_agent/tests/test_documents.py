@@ -0,0 +1,110 @@
+"""Test keyset pagination of document listings."""
+
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from ..utils import db_utils
+from ..utils.db_utils import encode_cursor, decode_cursor, list_documents_page, list_documents
+
+
+def make_rows(count, start=datetime(2024, 6, 1, tzinfo=timezone.utc)):
+    """Create document rows sorted newest first, as the listing query returns them."""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Doc {i}",
+            "source": f"doc-{i}.md",
+            "metadata": {},
+            "chunk_count": i,
+            "created_at": start - timedelta(minutes=i),
+            "updated_at": start - timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+def patch_pool(rows):
+    """Patch the shared pool to return the given rows."""
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=rows)
+
+    @asynccontextmanager
+    async def acquire(readonly=False):
+        assert readonly
+        yield conn
+
+    return conn, patch.object(db_utils.db_pool, "acquire", acquire)
+
+
+class TestCursor:
+    """Test cursor encoding."""
+
+    def test_round_trip(self):
+        created_at = datetime(2024, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        document_id = str(uuid.uuid4())
+
+        cursor = encode_cursor(created_at, document_id)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (created_at, uuid.UUID(document_id))
+
+    @pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(datetime.now(timezone.utc), "nope")[:-2], "W10"])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor)
+
+
+class TestListDocumentsPage:
+    """Test keyset pages."""
+
+    @pytest.mark.asyncio
+    async def test_first_page(self):
+        rows = make_rows(3)
+        conn, patched = patch_pool(rows)
+
+        with patched:
+            page = await list_documents_page(limit=2)
+
+        query, *params = conn.fetch.call_args.args
+        assert "created_at, d.id) <" not in query
+        assert "COUNT(" not in query
+        assert "ORDER BY d.created_at DESC, d.id DESC" in query
+        assert "d.collection_id = $1" in query
+        assert params == ["default", 3]
+        assert [doc["title"] for doc in page["documents"]] == ["Doc 0", "Doc 1"]
+        assert page["documents"][1]["chunk_count"] == 1
+        assert decode_cursor(page["next_cursor"]) == (rows[1]["created_at"], uuid.UUID(rows[1]["id"]))
+
+    @pytest.mark.asyncio
+    async def test_next_page_with_filter(self):
+        rows = make_rows(2)
+        cursor = encode_cursor(rows[0]["created_at"], rows[0]["id"])
+        conn, patched = patch_pool(rows[1:])
+
+        with patched:
+            page = await list_documents_page(limit=2, cursor=cursor, metadata_filter={"tag": "a"}, collection="acme")
+
+        query, *params = conn.fetch.call_args.args
+        assert "d.metadata @> $2::jsonb" in query
+        assert "(d.created_at, d.id) < ($3::timestamptz, $4::uuid)" in query
+        assert params == ["acme", {"tag": "a"}, rows[0]["created_at"], uuid.UUID(rows[0]["id"]), 3]
+        assert len(page["documents"]) == 1
+        assert page["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_offset_shim(self):
+        conn, patched = patch_pool(make_rows(1))
+
+        with patched:
+            documents = await list_documents(limit=10, offset=20)
+
+        query, *params = conn.fetch.call_args.args
+        assert "JOIN" not in query
+        assert "d.collection_id = $1" in query
+        assert "LIMIT $2 OFFSET $3" in query
+        assert params == ["default", 10, 20]
+        assert documents[0]["created_at"] == "2024-06-01T00:00:00+00:00"
@@ -0,0 +1,156 @@
+"""Tests for the search tools' query parameters."""
+
+import os
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from ..utils.vector_store import (
+    resolve_index_params, index_params, resolve_metric, hybrid_candidate_count, filter_args
+)
+from ..utils.models import SearchFilters, SearchRequest
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+
+def make_settings(**overrides):
+    """Create the search settings the helpers read."""
+    values = {"hnsw_ef_search": None, "ivfflat_probes": None, "vector_metric": "cosine"}
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class TestResolveIndexParams:
+    """Test how index settings are chosen for a query."""
+
+    def test_nothing_configured(self):
+        """Test no settings are applied by default."""
+        assert resolve_index_params(make_settings(), 10) == {}
+
+    def test_configured_defaults(self):
+        """Test configured values are used when the call gives none."""
+        params = resolve_index_params(make_settings(hnsw_ef_search=80, ivfflat_probes=10), 10)
+        assert params == {"hnsw.ef_search": "80", "ivfflat.probes": "10"}
+
+    def test_call_overrides_settings(self):
+        """Test per-call values win over configured ones."""
+        params = resolve_index_params(make_settings(hnsw_ef_search=80), 10, ef_search=200, probes=4)
+        assert params == {"hnsw.ef_search": "200", "ivfflat.probes": "4"}
+
+    def test_ef_search_covers_match_count(self):
+        """Test ef_search is raised so HNSW can return match_count rows."""
+        assert resolve_index_params(make_settings(), 50, ef_search=20) == {"hnsw.ef_search": "50"}
+
+    def test_values_clamped(self):
+        """Test values are kept within what pgvector accepts."""
+        params = resolve_index_params(make_settings(), 10, ef_search=5000, probes=0)
+        assert params == {"hnsw.ef_search": "1000", "ivfflat.probes": "1"}
+
+
+class TestIndexParams:
+    """Test index settings are applied transaction-locally."""
+
+    @pytest.mark.asyncio
+    async def test_set_config_in_transaction(self):
+        """Test settings are applied with set_config(..., true) inside a transaction."""
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+
+        async with index_params(conn, {"hnsw.ef_search": "100", "ivfflat.probes": "8"}):
+            pass
+
+        conn.transaction.assert_called_once()
+        conn.execute.assert_awaited_once_with(
+            "SELECT set_config($1, $2, true), set_config($3, $4, true)",
+            "hnsw.ef_search", "100", "ivfflat.probes", "8"
+        )
+
+    @pytest.mark.asyncio
+    async def test_no_transaction_without_params(self):
+        """Test no transaction or round trip is added when nothing is set."""
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+
+        async with index_params(conn, {}):
+            pass
+
+        conn.transaction.assert_not_called()
+        conn.execute.assert_not_awaited()
+
+
+class TestResolveMetric:
+    """Test metric validation."""
+
+    def test_known_metric(self):
+        """Test supported metrics pass through."""
+        assert resolve_metric(make_settings(vector_metric="inner_product")) == "inner_product"
+
+    def test_unknown_metric(self):
+        """Test unsupported metrics are rejected."""
+        with pytest.raises(ValueError):
+            resolve_metric(make_settings(vector_metric="l1"))
+
+
+class TestHybridCandidateCount:
+    """Test the candidate pool hybrid search fuses."""
+
+    def test_floor_for_small_requests(self):
+        """Test small requests still fuse a useful number of candidates."""
+        assert hybrid_candidate_count(5) == 40
+
+    def test_scales_with_match_count(self):
+        """Test larger requests get proportionally more candidates."""
+        assert hybrid_candidate_count(50) == 200
+
+
+class TestFilterArgs:
+    """Test filters are turned into search function arguments."""
+
+    def test_no_filters(self):
+        """Test missing or empty filters pass NULLs."""
+        assert filter_args(None) == [None, None, None, None]
+        assert filter_args(SearchFilters()) == [None, None, None, None]
+
+    def test_all_filters(self):
+        """Test each filter is passed in the function's argument order."""
+        after = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        filters = SearchFilters(metadata={"tag": "billing"}, source_prefix="docs/api/", created_after=after)
+
+        assert filter_args(filters) == [{"tag": "billing"}, "docs/api/", after, None]
+
+    def test_legacy_filter_dict(self):
+        """Test plain metadata dicts, as SearchRequest.filters used to take, still filter."""
+        request = SearchRequest(query="refunds", filters={"category": "billing", "source_prefix": "docs/"})
+
+        assert request.filters.metadata == {"category": "billing"}
+        assert filter_args(request.filters) == [{"category": "billing"}, "docs/", None, None]
+        assert SearchFilters(tag="faq", metadata={"lang": "en"}).metadata == {"tag": "faq", "lang": "en"}
+
+
+def read_sql(*path):
+    """Read a file below the sql directory."""
+    with open(os.path.join(SQL_DIR, *path)) as f:
+        return " ".join(f.read().split())
+
+
+class TestKeywordIndex:
+    """Test keyword search reads the stored tsvector through its GIN index."""
+
+    @pytest.mark.parametrize("path", [("schema.sql",), ("migrations", "001_chunks_content_tsv.sql")])
+    def test_generated_column_indexed(self, path):
+        """Test the schema and the migration store content_tsv and index it with GIN."""
+        sql = read_sql(*path)
+
+        assert "content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED" in sql
+        assert "ON chunks USING GIN (content_tsv)" in sql
+
+    def test_hybrid_search_uses_column(self):
+        """Test hybrid_search matches and ranks on content_tsv instead of computing tsvectors per row."""
+        schema = read_sql("schema.sql")
+        function = schema[schema.index("FUNCTION hybrid_search("):]
+        function = function[:function.index("$$;")]
+
+        assert "c.content_tsv @@ ts_query" in function
+        assert "ts_rank_cd(c.content_tsv, ts_query)" in function
+        assert "to_tsvector(" not in function
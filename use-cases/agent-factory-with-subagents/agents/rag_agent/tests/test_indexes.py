@@ -0,0 +1,103 @@
+"""Test right-sized ANN index builds."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from ..ingestion.indexes import ANNIndexManager, ANNIndexSpec, derive_parameters
+
+
+class TestDeriveParameters:
+    """Test index parameters scale with row count."""
+
+    def test_ivfflat_lists_small_table(self):
+        """Test small tables get rows / 1000 lists, at least one."""
+        assert derive_parameters("ivfflat", 0) == {"lists": 1}
+        assert derive_parameters("ivfflat", 250_000) == {"lists": 250}
+
+    def test_ivfflat_lists_large_table(self):
+        """Test tables over a million rows get sqrt(rows) lists."""
+        assert derive_parameters("ivfflat", 4_000_000) == {"lists": 2000}
+
+    def test_hnsw_parameters(self):
+        """Test HNSW build effort grows with collection size."""
+        small = derive_parameters("hnsw", 10_000)
+        large = derive_parameters("hnsw", 5_000_000)
+
+        assert small["m"] <= large["m"]
+        assert small["ef_construction"] < large["ef_construction"]
+
+    def test_unknown_method(self):
+        """Test unsupported methods are rejected."""
+        with pytest.raises(ValueError):
+            derive_parameters("btree", 100)
+
+
+class TestANNIndexSpec:
+    """Test parsing index definitions."""
+
+    def test_from_ivfflat_definition(self):
+        """Test the schema's vector index is recognized."""
+        definition = (
+            "CREATE INDEX idx_chunks_embedding ON public.chunks "
+            "USING ivfflat (embedding vector_cosine_ops) WITH (lists='1')"
+        )
+
+        spec = ANNIndexSpec.from_definition("idx_chunks_embedding", "chunks", definition)
+
+        assert spec.method == "ivfflat"
+        assert spec.column == "embedding"
+        assert spec.opclass == "vector_cosine_ops"
+
+    def test_non_ann_definition(self):
+        """Test other indexes are left alone."""
+        definition = "CREATE INDEX idx_chunks_document_id ON public.chunks USING btree (document_id)"
+
+        assert ANNIndexSpec.from_definition("idx_chunks_document_id", "chunks", definition) is None
+
+
+class TestANNIndexManager:
+    """Test index builds."""
+
+    @pytest.mark.asyncio
+    async def test_build_sized_for_rows(self):
+        """Test the index is rebuilt with parameters from the row count."""
+        conn = MagicMock()
+        conn.fetchval = AsyncMock(return_value=50_000)
+        conn.execute = AsyncMock()
+        conn.transaction.return_value.__aenter__ = AsyncMock()
+        conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        manager = ANNIndexManager(maintenance_work_mem="2GB", parallel_workers=4)
+        report = await manager.build(conn, ANNIndexSpec())
+
+        statements = [call.args[0] for call in conn.execute.call_args_list]
+        assert "SET LOCAL maintenance_work_mem = '2GB'" in statements
+        assert "SET LOCAL max_parallel_maintenance_workers = 4" in statements
+        assert statements[-1].endswith("WITH (lists = 50)")
+        assert report.rows == 50_000
+        assert report.parameters == {"lists": 50}
+
+    @pytest.mark.asyncio
+    async def test_build_with_metric_and_overrides(self):
+        """Test the operator class and explicit parameters override the derived ones."""
+        conn = MagicMock()
+        conn.fetchval = AsyncMock(return_value=50_000)
+        conn.execute = AsyncMock()
+        conn.transaction.return_value.__aenter__ = AsyncMock()
+        conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        manager = ANNIndexManager(
+            method="hnsw",
+            metric="inner_product",
+            parameters={"m": 32, "ef_construction": None, "lists": 10}
+        )
+        report = await manager.build(conn, ANNIndexSpec())
+
+        statements = [call.args[0] for call in conn.execute.call_args_list]
+        assert statements[-1].endswith("USING hnsw (embedding vector_ip_ops) WITH (m = 32, ef_construction = 64)")
+        assert report.parameters == {"m": 32, "ef_construction": 64}
+
+    def test_unknown_metric(self):
+        """Test unsupported metrics are rejected."""
+        with pytest.raises(ValueError):
+            ANNIndexManager(metric="hamming")
@@ -0,0 +1,85 @@
+"""Test ingestion run journal for crash-safe resumption."""
+
+import pytest
+
+from ..ingestion.chunker import DocumentChunk
+from ..ingestion.journal import IngestionJournal
+
+
+def make_chunks(count: int = 3):
+    """Create simple document chunks."""
+    return [
+        DocumentChunk(
+            content=f"chunk {i}",
+            index=i,
+            start_char=i * 10,
+            end_char=i * 10 + 7,
+            metadata={"title": "Doc"}
+        )
+        for i in range(count)
+    ]
+
+
+class TestIngestionJournal:
+    """Test journal recording and replay."""
+
+    def test_create_records_config(self, tmp_path):
+        """Test a new journal records its run configuration."""
+        journal = IngestionJournal.create({"chunk_size": 500}, str(tmp_path))
+
+        assert journal.run_id
+        assert IngestionJournal.read_config(journal.run_id, str(tmp_path)) == {"chunk_size": 500}
+
+    def test_open_unknown_run(self, tmp_path):
+        """Test opening a missing run fails clearly."""
+        with pytest.raises(ValueError, match="No ingestion run journal"):
+            IngestionJournal.open("missing", str(tmp_path))
+
+    def test_completed_files_survive_reopen(self, tmp_path):
+        """Test completed files are skipped after resuming."""
+        journal = IngestionJournal.create({}, str(tmp_path))
+        journal.record_cleaned()
+        journal.record_file_started("a.md")
+        journal.record_file_completed("a.md", "doc-1", 3)
+        journal.record_file_started("b.md")
+
+        resumed = IngestionJournal.open(journal.run_id, str(tmp_path))
+
+        assert resumed.cleaned
+        assert resumed.is_completed("a.md")
+        assert not resumed.is_completed("b.md")
+        assert resumed.was_started("b.md")
+
+    def test_pending_chunks_and_batches(self, tmp_path):
+        """Test chunks and paid-for embedding batches are restored."""
+        journal = IngestionJournal.create({}, str(tmp_path))
+        journal.record_chunks("a.md", make_chunks())
+        journal.record_embedding_batch("a.md", 0, [[0.1, 0.2]] * 3)
+
+        resumed = IngestionJournal.open(journal.run_id, str(tmp_path))
+        chunks, batches = resumed.load_pending("a.md")
+
+        assert [c.content for c in chunks] == ["chunk 0", "chunk 1", "chunk 2"]
+        assert batches == {0: [[0.1, 0.2]] * 3}
+
+    def test_completion_removes_pending_data(self, tmp_path):
+        """Test pending data is dropped once a document is committed."""
+        journal = IngestionJournal.create({}, str(tmp_path))
+        journal.record_chunks("a.md", make_chunks())
+        journal.record_file_completed("a.md", "doc-1", 3)
+
+        chunks, batches = journal.load_pending("a.md")
+
+        assert chunks is None
+        assert batches == {}
+
+    def test_torn_trailing_record_ignored(self, tmp_path):
+        """Test a partially written final line does not break replay."""
+        journal = IngestionJournal.create({}, str(tmp_path))
+        journal.record_file_completed("a.md", "doc-1", 1)
+        with open(journal.journal_path, "a") as f:
+            f.write('{"event": "file_comp')
+
+        resumed = IngestionJournal.open(journal.run_id, str(tmp_path))
+
+        assert resumed.is_completed("a.md")
@@ -0,0 +1,291 @@
+"""Test the memory-mapped local vector index."""
+
+import uuid
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from ..tools import semantic_search
+from ..utils.models import SearchFilters
+from ..utils.vector_store import PostgresVectorStore
+from ..utils.local_index import (
+    LocalVectorIndex, INITIAL_CAPACITY, SYNC_ROWS_QUERY, SYNC_COUNT_QUERY, SYNC_GENERATION_QUERY,
+    shared_index, close_shared_indexes
+)
+from ..utils.result_cache import SearchResultCache
+
+DIMENSION = 8
+
+
+def make_chunks(count, seed=0):
+    """Create chunk rows as the sync query returns them."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    return [
+        {"id": uuid.uuid4(), "created_at": start + timedelta(seconds=i), "embedding": rng.standard_normal(DIMENSION).tolist()}
+        for i in range(count)
+    ]
+
+
+def make_index(tmp_path, metric="cosine"):
+    """Create and load an empty index."""
+    index = LocalVectorIndex(str(tmp_path / "default"), "default", DIMENSION, metric)
+    index.load()
+    return index
+
+
+def fill(index, chunks):
+    """Append chunk rows to an index."""
+    index.append([c["id"] for c in chunks], [c["embedding"] for c in chunks], (chunks[-1]["created_at"], chunks[-1]["id"]))
+
+
+class FakeChunks:
+    """Chunks table answering the sync queries."""
+
+    def __init__(self, chunks, generation=1):
+        self.chunks = chunks
+        self.generation = generation
+        self.conn = MagicMock()
+        self.conn.fetch = AsyncMock(side_effect=self.fetch)
+        self.conn.fetchval = AsyncMock(side_effect=self.fetchval)
+
+    async def fetch(self, query, collection, after, after_id, limit):
+        assert query == SYNC_ROWS_QUERY
+        rows = sorted(self.chunks, key=lambda c: (c["created_at"], c["id"].bytes))
+        if after is not None:
+            rows = [c for c in rows if (c["created_at"], c["id"].bytes) > (after, after_id.bytes)]
+        return rows[:limit]
+
+    async def fetchval(self, query, collection):
+        if query == SYNC_GENERATION_QUERY:
+            return self.generation
+        assert query == SYNC_COUNT_QUERY
+        return len(self.chunks)
+
+    @asynccontextmanager
+    async def acquire(self, readonly=False):
+        yield self.conn
+
+
+class TestLocalVectorIndex:
+    """Test storage and exact search."""
+
+    @pytest.mark.parametrize("metric", ["cosine", "inner_product"])
+    def test_matches_brute_force(self, tmp_path, metric):
+        chunks = make_chunks(300)
+        index = make_index(tmp_path, metric)
+        fill(index, chunks)
+        query = np.random.default_rng(1).standard_normal(DIMENSION)
+
+        matrix = np.array([c["embedding"] for c in chunks])
+        if metric == "cosine":
+            scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+        else:
+            scores = matrix @ query
+        expected = [str(chunks[i]["id"]) for i in np.argsort(-scores)[:5]]
+
+        results = index.search(query.tolist(), 5)
+
+        assert [chunk_id for chunk_id, _ in results] == expected
+        assert results[0][1] == pytest.approx(scores.max(), rel=1e-5)
+
+    def test_grows_and_persists(self, tmp_path):
+        chunks = make_chunks(INITIAL_CAPACITY + 10)
+        index = make_index(tmp_path)
+        fill(index, chunks[:100])
+        fill(index, chunks[100:])
+
+        reopened = make_index(tmp_path)
+
+        assert reopened.count == len(chunks)
+        assert reopened.capacity >= len(chunks)
+        assert reopened.watermark == (chunks[-1]["created_at"], chunks[-1]["id"])
+        assert reopened.search(chunks[-1]["embedding"], 1)[0][0] == str(chunks[-1]["id"])
+
+    def test_other_metric_starts_over(self, tmp_path):
+        fill(make_index(tmp_path), make_chunks(10))
+
+        assert make_index(tmp_path, "inner_product").count == 0
+
+    def test_small_index(self, tmp_path):
+        index = make_index(tmp_path)
+        assert index.search([1.0] * DIMENSION, 5) == []
+
+        fill(index, make_chunks(3))
+        assert len(index.search([1.0] * DIMENSION, 5)) == 3
+
+
+class TestSync:
+    """Test syncing with the chunks table."""
+
+    @pytest.mark.asyncio
+    async def test_incremental(self, tmp_path):
+        table = FakeChunks(make_chunks(25))
+        index = make_index(tmp_path)
+
+        assert await index.sync(table, batch_size=10) == 25
+        assert index.generation == 1
+
+        table.generation = 2
+        table.chunks += [dict(c, created_at=c["created_at"] + timedelta(days=1)) for c in make_chunks(5, seed=2)]
+        assert await index.sync(table, batch_size=10) == 5
+        assert index.count == 30
+        assert index.generation == 2
+
+    @pytest.mark.asyncio
+    async def test_deleted_chunks_rebuild(self, tmp_path):
+        table = FakeChunks(make_chunks(20))
+        index = make_index(tmp_path)
+        await index.sync(table)
+        deleted = table.chunks.pop(0)
+
+        await index.sync(table)
+
+        assert index.count == 19
+        assert str(deleted["id"]) not in [chunk_id for chunk_id, _ in index.search(deleted["embedding"], 19)]
+        assert not (tmp_path / "default.next").exists()
+
+    @pytest.mark.asyncio
+    async def test_shared_index_single_writer(self, tmp_path):
+        """Test sessions of a process share one index, so concurrent syncs of its files run once."""
+        table = FakeChunks(make_chunks(20))
+        index = shared_index(str(tmp_path / "default"), "default", DIMENSION)
+        try:
+            assert shared_index(str(tmp_path / "default"), "default", DIMENSION) is index
+
+            assert sorted(await asyncio.gather(index.sync(table), index.sync(table))) == [0, 20]
+            assert index.count == 20
+        finally:
+            close_shared_indexes()
+        assert shared_index(str(tmp_path / "default"), "default", DIMENSION) is not index
+        close_shared_indexes()
+
+
+class TestLocalSemanticSearch:
+    """Test semantic_search routing to the local index."""
+
+    def make_ctx(self, tmp_path, hydrated):
+        chunks = make_chunks(10)
+        index = make_index(tmp_path)
+        fill(index, chunks)
+        index.synced_at = float("inf")
+        index.generation = 1
+
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=hydrated(chunks))
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield conn
+
+        settings = SimpleNamespace(
+            default_match_count=3, max_match_count=50, vector_metric="cosine", hnsw_ef_search=None,
+            ivfflat_probes=None, search_projection="full", local_index_sync_interval=30.0,
+            default_collection="default", search_diversify=False, mmr_lambda=0.7
+        )
+        deps = SimpleNamespace(
+            settings=settings,
+            vector_store=PostgresVectorStore(SimpleNamespace(acquire=acquire), settings, local_index=index),
+            result_cache=None,
+            search_timings=[],
+            collection_id=None,
+            get_embedding=AsyncMock(return_value=chunks[4]["embedding"])
+        )
+        return SimpleNamespace(deps=deps), conn, chunks
+
+    @pytest.mark.asyncio
+    async def test_hydrates_top_k(self, tmp_path):
+        def hydrated(chunks):
+            return [
+                {"chunk_id": str(c["id"]), "document_id": "d", "content": "text", "chunk_index": 0,
+                 "metadata": {}, "document_title": "T", "document_source": "s"}
+                for c in chunks[4:5]
+            ]
+        ctx, conn, chunks = self.make_ctx(tmp_path, hydrated)
+
+        results = await semantic_search(ctx, "query", match_count=3)
+
+        _, collection, ids = conn.fetch.call_args.args
+        assert len(ids) == 3 and ids[0] == chunks[4]["id"]
+        assert results[0].chunk_id == str(chunks[4]["id"])
+        assert results[0].similarity == pytest.approx(1.0, rel=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_scores_off_event_loop(self, tmp_path):
+        """Test the exact scan runs on a worker thread, not the event loop's."""
+        ctx, conn, chunks = self.make_ctx(tmp_path, lambda chunks: [])
+        index = ctx.deps.vector_store.local_index
+        search = index.search
+        threads = []
+
+        def recording_search(embedding, match_count):
+            threads.append(threading.get_ident())
+            return search(embedding, match_count)
+
+        index.search = recording_search
+        await semantic_search(ctx, "query", match_count=3)
+
+        assert threads and threading.get_ident() not in threads
+
+    @pytest.mark.asyncio
+    async def test_due_sync_runs_in_background(self, tmp_path):
+        ctx, conn, chunks = self.make_ctx(tmp_path, lambda chunks: [
+            {"chunk_id": str(c["id"]), "document_id": "d", "content": "text", "chunk_index": 0,
+             "metadata": {}, "document_title": "T", "document_source": "s"}
+            for c in chunks
+        ])
+        index = ctx.deps.vector_store.local_index
+        index.synced_at = 0.0
+        release = asyncio.Event()
+
+        async def slow_sync(pool, batch_size=1000):
+            await release.wait()
+            return 0
+
+        index.sync = AsyncMock(side_effect=slow_sync)
+
+        # Answered from the current rows while the sync waits
+        results = await semantic_search(ctx, "query", match_count=3)
+        await semantic_search(ctx, "query", match_count=3)
+
+        await asyncio.sleep(0)
+        assert results[0].chunk_id == str(chunks[4]["id"])
+        assert index.sync.await_count == 1
+        release.set()
+        assert await index._sync_task == 0
+
+    @pytest.mark.asyncio
+    async def test_filters_use_postgres(self, tmp_path):
+        ctx, conn, _ = self.make_ctx(tmp_path, lambda chunks: [])
+        ctx.deps.settings.exact_scan_limit = 20000
+
+        await semantic_search(ctx, "query", filters=SearchFilters(source_prefix="docs/"))
+
+        assert "match_chunks" in conn.fetch.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_behind_generation_uses_postgres(self, tmp_path):
+        """Test results cached under a newer generation never come from an index synced before it."""
+        ctx, conn, _ = self.make_ctx(tmp_path, lambda chunks: [])
+        ctx.deps.settings.exact_scan_limit = 20000
+        ctx.deps.result_cache = SearchResultCache()
+        conn.fetchval = AsyncMock(return_value=2)
+        index = ctx.deps.vector_store.local_index
+        index.sync = AsyncMock(return_value=0)
+
+        await semantic_search(ctx, "query", match_count=3)
+
+        assert "match_chunks" in conn.fetch.call_args.args[0]
+        await asyncio.sleep(0)
+        index.sync.assert_awaited_once()
+
+        # Caught up: answered locally
+        index.generation = 2
+        await semantic_search(ctx, "query", match_count=4)
+        assert "match_chunks" not in conn.fetch.call_args.args[0]
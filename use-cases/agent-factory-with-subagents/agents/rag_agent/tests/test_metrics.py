@@ -0,0 +1,95 @@
+"""Test in-process metrics and their export formats."""
+
+import json
+
+import pytest
+
+from ..utils.metrics import Histogram, MetricsRegistry
+
+
+class TestHistogram:
+    """Test histogram bucketing and quantiles."""
+
+    def test_observations_bucketed(self):
+        """Test observations land in the right cumulative buckets."""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value)
+
+        assert list(histogram.cumulative()) == [(0.1, 1), (1.0, 3), (float("inf"), 4)]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(4.25)
+        assert histogram.max == 3.0
+
+    def test_quantiles_bounded_by_max(self):
+        """Test quantile estimates stay within the observed range."""
+        histogram = Histogram(buckets=(1.0, 10.0))
+        for _ in range(99):
+            histogram.observe(0.5)
+        histogram.observe(2.0)
+
+        assert histogram.quantile(0.5) <= 1.0
+        assert histogram.quantile(1.0) == 2.0
+
+    def test_empty_histogram(self):
+        """Test an empty histogram summarizes to zeros."""
+        assert Histogram().to_dict()["p95"] == 0.0
+
+
+class TestMetricsRegistry:
+    """Test registry bookkeeping and export."""
+
+    def test_counters_by_label(self):
+        """Test counters are tracked per label set."""
+        metrics = MetricsRegistry()
+        metrics.inc("docs_total", status="ok")
+        metrics.inc("docs_total", 2, status="ok")
+        metrics.inc("docs_total", status="failed")
+
+        assert metrics.counter_value("docs_total", status="ok") == 3
+        assert metrics.counter_value("docs_total", status="failed") == 1
+
+    def test_type_conflict_rejected(self):
+        """Test a name cannot be reused for another metric type."""
+        metrics = MetricsRegistry()
+        metrics.inc("things")
+
+        with pytest.raises(ValueError):
+            metrics.set_gauge("things", 1)
+
+    def test_prometheus_exposition(self):
+        """Test the textfile output follows the exposition format."""
+        metrics = MetricsRegistry()
+        metrics.observe("stage_seconds", 0.2, help="Stage time", buckets=(0.1, 1.0), stage="embed")
+        metrics.set_gauge("queue_depth", 3)
+
+        text = metrics.to_prometheus()
+
+        assert "# HELP stage_seconds Stage time" in text
+        assert "# TYPE stage_seconds histogram" in text
+        assert 'stage_seconds_bucket{stage="embed",le="0.1"} 0' in text
+        assert 'stage_seconds_bucket{stage="embed",le="+Inf"} 1' in text
+        assert 'stage_seconds_count{stage="embed"} 1' in text
+        assert "queue_depth 3" in text
+        assert text.endswith("\n")
+
+    def test_label_values_escaped(self):
+        """Test quotes and backslashes in label values are escaped."""
+        metrics = MetricsRegistry()
+        metrics.inc("files_total", source='a"b\\c')
+
+        assert 'files_total{source="a\\"b\\\\c"} 1' in metrics.to_prometheus()
+
+    def test_write_files(self, tmp_path):
+        """Test JSON and textfile exports are written."""
+        metrics = MetricsRegistry()
+        with metrics.timer("db_seconds"):
+            pass
+
+        metrics.write_json(str(tmp_path / "metrics.json"))
+        metrics.write_prometheus_textfile(str(tmp_path / "ingest.prom"))
+
+        snapshot = json.loads((tmp_path / "metrics.json").read_text())
+        assert snapshot["histograms"]["db_seconds"]["_"]["count"] == 1
+        assert "db_seconds_count 1" in (tmp_path / "ingest.prom").read_text()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["ingest.prom", "metrics.json"]
@@ -0,0 +1,124 @@
+"""Test maximal marginal relevance re-ranking of search results."""
+
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from ..tools import semantic_search, hybrid_search, resolve_mmr_lambda
+from ..utils.ivf_store import IVFVectorStore
+from ..utils.mmr import mmr_select, relevance_scores, mmr_candidate_count
+from ..utils.result_cache import cache_key
+from ..utils.vector_store import VectorQuery, PostgresVectorStore
+from ..utils.db_utils import EMBEDDINGS_BY_ID_QUERY
+
+DIMENSION = 4
+
+
+class TestMMRSelect:
+    """Test the greedy selection."""
+
+    def setup_method(self):
+        # Two near-duplicates of the best match, and a weaker distinct one
+        self.embeddings = np.array([
+            [1.0, 0.0, 0.0, 0.0],
+            [0.99, 0.01, 0.0, 0.0],
+            [0.98, 0.0, 0.02, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+        ])
+        self.relevance = np.array([0.9, 0.89, 0.88, 0.6])
+
+    def test_skips_near_duplicates(self):
+        assert mmr_select(self.embeddings, self.relevance, 2, 0.5) == [0, 3]
+
+    def test_lambda_one_keeps_ranking(self):
+        assert mmr_select(self.embeddings, self.relevance, 3, 1.0) == [0, 1, 2]
+
+    def test_k_larger_than_candidates(self):
+        assert sorted(mmr_select(self.embeddings, self.relevance, 10, 0.5)) == [0, 1, 2, 3]
+        assert mmr_select(self.embeddings[:0], self.relevance[:0], 3) == []
+
+    def test_relevance_scales(self):
+        rows = [{"similarity": 0.8, "combined_score": 0.03}, {"similarity": 0.5, "combined_score": 0.01}]
+        assert relevance_scores(rows, "similarity").tolist() == pytest.approx([0.8, 0.5])
+        assert relevance_scores(rows, "combined_score").tolist() == pytest.approx([1.0, 0.0])
+
+    def test_candidate_count(self):
+        assert mmr_candidate_count(3) == 20
+        assert mmr_candidate_count(10) == 40
+
+
+class TestDiversifiedSearch:
+    """Test the search tools with diversification on the IVF store."""
+
+    async def make_ctx(self, tmp_path, **settings):
+        store = IVFVectorStore(str(tmp_path / "store"), DIMENSION)
+        chunks = [
+            SimpleNamespace(content=text, index=i, metadata={}, token_count=2, embedding=vector)
+            for i, (text, vector) in enumerate([
+                ("reset your password", [1.0, 0.0, 0.0, 0.0]),
+                ("reset your password now", [0.99, 0.02, 0.0, 0.0]),
+                ("reset your password here", [0.98, 0.0, 0.03, 0.0]),
+                ("password rules", [0.6, 0.8, 0.0, 0.0]),
+                ("billing", [0.0, 0.0, 0.0, 1.0]),
+            ])
+        ]
+        await store.upsert("default", "Guide", "guide.md", "", chunks, {})
+        values = {
+            "default_match_count": 2, "max_match_count": 50, "default_text_weight": 0.3,
+            "search_projection": "full", "default_collection": "default",
+            "search_diversify": False, "mmr_lambda": 0.5
+        }
+        values.update(settings)
+        deps = SimpleNamespace(
+            settings=SimpleNamespace(**values), vector_store=store, result_cache=None, collection_id=None,
+            search_timings=[], user_preferences={}, get_embedding=AsyncMock(return_value=[1.0, 0.1, 0.0, 0.0])
+        )
+        return SimpleNamespace(deps=deps)
+
+    @pytest.mark.asyncio
+    async def test_semantic(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path)
+
+        plain = await semantic_search(ctx, "reset password")
+        diverse = await semantic_search(ctx, "reset password", diversify=True)
+
+        assert [r.content for r in plain] == ["reset your password now", "reset your password"]
+        assert [r.content for r in diverse] == ["reset your password now", "password rules"]
+
+    @pytest.mark.asyncio
+    async def test_hybrid_from_settings(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path, search_diversify=True)
+
+        results = await hybrid_search(ctx, "reset password")
+
+        assert len(results) == 2
+        assert "password rules" in [r["content"] for r in results]
+
+    def test_resolve_and_cache_key(self):
+        settings = SimpleNamespace(search_diversify=False, mmr_lambda=1.5)
+        assert resolve_mmr_lambda(settings) is None
+        assert resolve_mmr_lambda(settings, diversify=True) == 1.0
+
+        plain = VectorQuery(embedding=None, match_count=5, text="q")
+        diverse = VectorQuery(embedding=None, match_count=5, text="q", mmr_lambda=0.7)
+        assert cache_key("semantic_search", plain) != cache_key("semantic_search", diverse)
+
+    @pytest.mark.asyncio
+    async def test_postgres_embeddings_by_id(self):
+        chunk_id = uuid.uuid4()
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=[{"chunk_id": str(chunk_id), "embedding": [0.5, 0.5]}])
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield conn
+
+        store = PostgresVectorStore(SimpleNamespace(acquire=acquire))
+        embeddings = await store.get_embeddings("docs", [chunk_id, uuid.uuid4()])
+
+        assert embeddings == {str(chunk_id): [0.5, 0.5]}
+        assert conn.fetch.await_args.args[:2] == (EMBEDDINGS_BY_ID_QUERY, "docs")
@@ -0,0 +1,304 @@
+"""Test the search result cache, corpus generations and the warmer."""
+
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from ..ingestion.embedder import StubEmbeddingGenerator
+from ..ingestion.ingest import DocumentIngestionPipeline
+from ..tools import semantic_search, hybrid_search
+from ..utils.ivf_store import IVFVectorStore
+from ..utils.models import IngestionConfig, SearchFilters
+from ..utils.result_cache import SearchResultCache, cache_key, warm
+from ..utils.vector_store import VectorQuery, PostgresVectorStore
+from ..utils.db_utils import DatabasePool, BUMP_GENERATION_QUERY
+
+DIMENSION = 8
+
+
+def make_chunks(vectors, texts):
+    """Create embedded chunks like the ingestion pipeline produces."""
+    return [
+        SimpleNamespace(content=text, index=i, metadata={}, token_count=2, embedding=list(map(float, vector)))
+        for i, (vector, text) in enumerate(zip(vectors, texts))
+    ]
+
+
+def query(text="How do I reset my password?", **fields):
+    """Create a search without an embedding, as the tools look it up."""
+    return VectorQuery(embedding=None, match_count=5, text=text, **fields)
+
+
+class TestCacheKey:
+    """Test which parameters distinguish cached searches."""
+
+    def test_normalized_text(self):
+        assert cache_key("semantic_search", query("  How do I RESET my\npassword? ")) == cache_key(
+            "semantic_search", query()
+        )
+
+    def test_parameters_distinguish(self):
+        base = cache_key("hybrid_search", query())
+        assert cache_key("hybrid_search", query(text_weight=0.5)) != base
+        assert cache_key("hybrid_search", query(collection="docs")) != base
+        assert cache_key("hybrid_search", query(snippet=True)) != base
+        assert cache_key("hybrid_search", query(filters=SearchFilters(source_prefix="guides/"))) != base
+        assert cache_key("semantic_search", query()) != base
+
+    def test_irrelevant_parameters_ignored(self):
+        # text_weight only affects hybrid search; empty filters are no filters
+        assert cache_key("semantic_search", query(text_weight=0.9)) == cache_key("semantic_search", query())
+        assert cache_key("semantic_search", query(filters=SearchFilters())) == cache_key("semantic_search", query())
+
+
+class TestSearchResultCache:
+    """Test generations, eviction and sharing across processes."""
+
+    @pytest.mark.asyncio
+    async def test_generation_must_match(self):
+        cache = SearchResultCache()
+        cache.put("semantic_search", query(), 3, [{"chunk_id": "a"}])
+
+        assert await cache.get("semantic_search", query(), 3) == [{"chunk_id": "a"}]
+        assert await cache.get("semantic_search", query(), 4) is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        cache = SearchResultCache(max_entries=2)
+        for text in ("a", "b"):
+            cache.put("semantic_search", query(text), 1, [{"chunk_id": text}])
+        await cache.get("semantic_search", query("a"), 1)
+        cache.put("semantic_search", query("c"), 1, [{"chunk_id": "c"}])
+
+        assert await cache.get("semantic_search", query("b"), 1) is None
+        assert await cache.get("semantic_search", query("a"), 1) == [{"chunk_id": "a"}]
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        cache = SearchResultCache(max_entries=0)
+        cache.put("semantic_search", query(), 1, [{"chunk_id": "a"}])
+        assert await cache.get("semantic_search", query(), 1) is None
+
+    @pytest.mark.asyncio
+    async def test_callers_get_copies(self):
+        cache = SearchResultCache()
+        rows = [{"chunk_id": "a", "similarity": 0.9}]
+        cache.put("semantic_search", query(), 1, rows)
+        rows[0]["similarity"] = 0.0
+
+        served = await cache.get("semantic_search", query(), 1)
+        served[0]["content"] = "modified by a caller"
+        served.append({"chunk_id": "b"})
+
+        assert await cache.get("semantic_search", query(), 1) == [{"chunk_id": "a", "similarity": 0.9}]
+
+    @pytest.mark.asyncio
+    async def test_shared_file(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        writer, reader = SearchResultCache(path=path), SearchResultCache(path=path)
+        searched = query()
+        searched.embedding = [0.5] * DIMENSION
+        writer.put("hybrid_search", searched, 1, [{"chunk_id": "a", "combined_score": 0.03}])
+        await writer.flush()
+
+        assert await reader.get("hybrid_search", query(), 1) == [{"chunk_id": "a", "combined_score": 0.03}]
+
+        # Entries of older generations are dropped with the first newer one
+        writer.put("hybrid_search", query("other"), 2, [])
+        await writer.flush()
+        assert await SearchResultCache(path=path).get("hybrid_search", query(), 1) is None
+
+    @pytest.mark.asyncio
+    async def test_shared_file_off_event_loop(self, tmp_path):
+        cache = SearchResultCache(path=str(tmp_path / "cache.sqlite"))
+        cache.put("semantic_search", query(), 1, [{"chunk_id": "a"}])
+        threads = await cache._run(lambda: threading.current_thread().name)
+
+        assert threads.startswith("result-cache")
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_query_log(self, tmp_path):
+        cache = SearchResultCache(path=str(tmp_path / "cache.sqlite"))
+        for text, hits in (("rare", 0), ("common", 2)):
+            searched = query(text, filters=SearchFilters(metadata={"tag": "faq"}))
+            searched.embedding = [1.0] * DIMENSION
+            cache.put("semantic_search", searched, 1, [])
+            for _ in range(hits):
+                await cache.get("semantic_search", query(text, filters=SearchFilters(metadata={"tag": "faq"})), 1)
+
+        (tool, top), _ = await cache.top_queries(2)
+        assert tool == "semantic_search"
+        assert top.text == "common"
+        assert top.embedding == [1.0] * DIMENSION
+        assert top.filters == SearchFilters(metadata={"tag": "faq"})
+
+
+class TestGenerations:
+    """Test writes move a collection's generation."""
+
+    @pytest.mark.asyncio
+    async def test_ivf_generation_persists(self, tmp_path):
+        rng = np.random.default_rng(0)
+        store = IVFVectorStore(str(tmp_path / "store"), DIMENSION)
+        assert await store.generation("default") == 0
+
+        await store.upsert("default", "A", "a.md", "", make_chunks(rng.standard_normal((2, DIMENSION)), "xy"), {})
+        await store.upsert("default", "B", "b.md", "", make_chunks(rng.standard_normal((2, DIMENSION)), "xy"), {})
+        assert await store.generation("default") == 2
+        assert await store.generation("other") == 0
+
+        # Deleting most rows compacts the files; the count goes on from there
+        await store.delete("default", "a.md")
+        await store.delete("default", "b.md")
+        assert await store.generation("default") == 4
+        assert await IVFVectorStore(str(tmp_path / "store"), DIMENSION).generation("default") == 4
+
+    @pytest.mark.asyncio
+    async def test_postgres_bumps_once_per_batch(self):
+        conn = MagicMock()
+        conn.fetchrow = AsyncMock(return_value={"id": "doc"})
+        conn.fetchval = AsyncMock(return_value=1)
+        conn.execute = AsyncMock()
+
+        @asynccontextmanager
+        async def transaction():
+            yield
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield conn
+
+        conn.transaction = transaction
+        store = PostgresVectorStore(SimpleNamespace(acquire=acquire))
+        chunks = make_chunks([[0.1] * DIMENSION], ["x"])
+
+        # Not inside each document's transaction
+        await store.upsert("docs", "A", "a.md", "", chunks, {})
+        await store.upsert("docs", "B", "b.md", "", chunks, {})
+        conn.fetchval.assert_not_awaited()
+
+        assert await store.bump_generations() == {"docs": 1}
+        conn.fetchval.assert_awaited_once_with(BUMP_GENERATION_QUERY, "docs")
+        assert await store.bump_generations() == {}
+
+        # Shadow partitions are bumped by the swap instead
+        conn.fetchval.reset_mock()
+        store.chunks_table = "chunks_c_docs_next"
+        await store.upsert("docs", "A", "a.md", "", chunks, {})
+        assert await store.bump_generations() == {}
+        conn.fetchval.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_load_publishes(self, tmp_path):
+        """Test documents committed before a source fails are still published."""
+        (tmp_path / "docs").mkdir()
+        pipeline = DocumentIngestionPipeline(
+            IngestionConfig(chunk_size=300, chunk_overlap=0, use_semantic_chunking=False),
+            documents_folder=str(tmp_path / "docs"),
+            journal_dir=str(tmp_path / "journal"),
+            embedder=StubEmbeddingGenerator()
+        )
+        pipeline._initialized = True
+        pipeline.store = MagicMock(bump_generations=AsyncMock(return_value={"default": 3}))
+
+        async def corrupt_source(source):
+            raise OSError("corrupt archive")
+            yield
+
+        pipeline._prefetch = corrupt_source
+        with pytest.raises(OSError):
+            await pipeline.ingest_documents()
+
+        pipeline.store.bump_generations.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_postgres_generation_read_on_primary(self):
+        """Test replicas at different generations never supply the generation results are filed under."""
+        urls = ["postgresql://u:p@primary/rag", "postgresql://u:p@replica-a/rag", "postgresql://u:p@replica-b/rag"]
+        pools, conns = {}, []
+        for url in urls:
+            conn = MagicMock()
+            # Replication lag, for the probes
+            conn.fetchval = AsyncMock(return_value=0.0)
+            pools[url] = MagicMock(acquire=AsyncMock(return_value=conn), release=AsyncMock(), close=AsyncMock())
+            conns.append(conn)
+
+        async def create_pool(url, **kwargs):
+            return pools[url]
+
+        db = DatabasePool(urls[0], replica_urls=urls[1:])
+        with patch("asyncpg.create_pool", side_effect=create_pool):
+            await db.initialize()
+        for conn, generation in zip(conns, (7, 5, 6)):
+            conn.fetchval.return_value = generation
+
+        store = PostgresVectorStore(db)
+        assert [await store.generation("docs") for _ in range(4)] == [7] * 4
+        await db.close()
+
+
+class TestCachedTools:
+    """Test the search tools on the IVF store with a cache."""
+
+    async def setup(self, tmp_path):
+        rng = np.random.default_rng(2)
+        self.vectors = rng.standard_normal((4, DIMENSION))
+        self.store = IVFVectorStore(str(tmp_path / "store"), DIMENSION)
+        await self.store.upsert(
+            "default", "FAQ", "faq.md", "",
+            make_chunks(self.vectors, ["reset password", "billing cycle", "invite users", "export data"]), {}
+        )
+        self.cache = SearchResultCache(path=str(tmp_path / "cache.sqlite"))
+        settings = SimpleNamespace(
+            default_match_count=2, max_match_count=50, default_text_weight=0.3,
+            search_projection="full", default_collection="default", search_diversify=False, mmr_lambda=0.7
+        )
+        self.deps = SimpleNamespace(
+            settings=settings, vector_store=self.store, result_cache=self.cache, collection_id=None,
+            search_timings=[], user_preferences={}, get_embedding=AsyncMock(return_value=self.vectors[0].tolist())
+        )
+        return SimpleNamespace(deps=self.deps)
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_embedding(self, tmp_path):
+        ctx = await self.setup(tmp_path)
+
+        first = await semantic_search(ctx, "Reset password")
+        second = await semantic_search(ctx, "reset  password")
+        await hybrid_search(ctx, "reset password")
+
+        assert [r.chunk_id for r in second] == [r.chunk_id for r in first]
+        assert self.deps.get_embedding.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_ingest_invalidates(self, tmp_path):
+        ctx = await self.setup(tmp_path)
+        await semantic_search(ctx, "reset password")
+
+        await self.store.upsert(
+            "default", "New", "new.md", "", make_chunks([self.vectors[0] * 2], ["reset password again"]), {}
+        )
+        results = await semantic_search(ctx, "reset password")
+
+        assert self.deps.get_embedding.await_count == 2
+        assert {r.document_title for r in results} == {"FAQ", "New"}
+
+    @pytest.mark.asyncio
+    async def test_warm_after_ingest(self, tmp_path):
+        ctx = await self.setup(tmp_path)
+        await hybrid_search(ctx, "reset password")
+        await self.store.upsert(
+            "default", "New", "new.md", "", make_chunks([self.vectors[1]], ["billing"]), {}
+        )
+
+        assert await warm(self.cache, self.store, 10) == 1
+        assert await warm(self.cache, self.store, 10) == 0
+
+        await hybrid_search(ctx, "reset password")
+        assert self.deps.get_embedding.await_count == 1
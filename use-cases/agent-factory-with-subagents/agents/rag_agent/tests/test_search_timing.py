@@ -0,0 +1,215 @@
+"""Test per-phase search timings, their histograms and EXPLAIN sampling."""
+
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import asyncpg
+import numpy as np
+import pytest
+
+from ..tools import semantic_search, hybrid_search, batch_search
+from ..utils.db_utils import MATCH_CHUNKS_QUERY
+from ..utils.ivf_store import IVFVectorStore
+from ..utils.metrics import MetricsRegistry
+from ..utils.models import SearchResponse, SearchType
+from ..utils.result_cache import SearchResultCache
+from ..utils.search_timing import SearchTimings, TimedResults, ExplainSampler, phase_summary
+from ..utils.vector_store import VectorQuery, PostgresVectorStore
+
+DIMENSION = 8
+TEXTS = ["reset password", "billing cycle", "invite users"]
+
+
+def make_settings(**values):
+    """Create the settings the search tools and the PostgreSQL store read."""
+    settings = {
+        "default_match_count": 2, "max_match_count": 50, "default_text_weight": 0.3,
+        "search_projection": "full", "default_collection": "default", "search_diversify": False,
+        "mmr_lambda": 0.7, "batch_search_size": 100, "vector_metric": "cosine", "exact_scan_limit": 20000,
+        "hnsw_ef_search": None, "ivfflat_probes": None, "search_explain_threshold_ms": None,
+        "search_explain_sample_rate": 1.0, "search_explain_path": "explain.jsonl"
+    }
+    settings.update(values)
+    return SimpleNamespace(**settings)
+
+
+class TestSearchTimings:
+    """Test phase accounting and the histograms."""
+
+    def test_phases_accumulate(self):
+        timings = SearchTimings()
+        timings.add("execute", 0.002)
+        timings.add("execute", 0.001)
+        with timings.phase("embed"):
+            pass
+        timings.finish()
+
+        result = timings.to_dict()
+        assert result["execute_ms"] == pytest.approx(3.0)
+        assert set(result) == {"execute_ms", "embed_ms", "total_ms"}
+        assert result["total_ms"] >= 0
+
+    def test_record(self):
+        metrics = MetricsRegistry()
+        timings = SearchTimings()
+        timings.add("execute", 0.004)
+        timings.finish().record("semantic_search", metrics)
+
+        summary = phase_summary("semantic_search", metrics)
+        assert summary["execute"]["count"] == 1
+        assert summary["execute"]["max"] == pytest.approx(0.004)
+        assert summary["total"]["count"] == 1
+
+    def test_results_stay_lists(self):
+        results = TimedResults([{"chunk_id": "a"}], SearchTimings())
+        assert results == [{"chunk_id": "a"}]
+        assert json.dumps(results) == '[{"chunk_id": "a"}]'
+
+
+class TestTimedTools:
+    """Test the tools attach and record their timings on the IVF store."""
+
+    async def make_ctx(self, tmp_path, cache=None):
+        rng = np.random.default_rng(5)
+        vectors = rng.standard_normal((len(TEXTS), DIMENSION))
+        store = IVFVectorStore(str(tmp_path / "store"), DIMENSION)
+        chunks = [
+            SimpleNamespace(content=text, index=i, metadata={}, token_count=2, embedding=vector.tolist())
+            for i, (text, vector) in enumerate(zip(TEXTS, vectors))
+        ]
+        await store.upsert("default", "FAQ", "faq.md", "", chunks, {})
+        deps = SimpleNamespace(
+            settings=make_settings(), vector_store=store, result_cache=cache, collection_id=None,
+            search_timings=[], user_preferences={},
+            get_embedding=AsyncMock(return_value=vectors[0].tolist()),
+            get_embeddings=AsyncMock(side_effect=lambda texts: [vectors[0].tolist()] * len(texts))
+        )
+        return SimpleNamespace(deps=deps)
+
+    @pytest.mark.asyncio
+    async def test_phases_attached(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path)
+
+        results = await hybrid_search(ctx, "reset password")
+
+        assert set(results.timings.to_dict()) >= {"embed_ms", "execute_ms", "total_ms"}
+        assert ctx.deps.search_timings == [("hybrid_search", results.timings)]
+
+    @pytest.mark.asyncio
+    async def test_response_timed(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path)
+        results = await semantic_search(ctx, "reset password")
+
+        response = SearchResponse.from_results(results, SearchType.SEMANTIC)
+
+        assert response.total_results == 2
+        assert response.query_time_ms == results.timings.total_ms > 0
+        assert response.timings == results.timings.to_dict()
+
+    @pytest.mark.asyncio
+    async def test_cache_hit(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path, cache=SearchResultCache())
+        await semantic_search(ctx, "reset password")
+
+        results = await semantic_search(ctx, "reset password")
+
+        assert set(results.timings.to_dict()) == {"cache_ms", "total_ms"}
+
+    @pytest.mark.asyncio
+    async def test_batch(self, tmp_path):
+        ctx = await self.make_ctx(tmp_path)
+
+        results = await batch_search(ctx, TEXTS, search_type="semantic")
+
+        assert len(results) == len(TEXTS)
+        assert "embed_ms" in results.timings.to_dict()
+        assert ctx.deps.search_timings == [("semantic_search_batch", results.timings)]
+
+
+class TestPostgresPhases:
+    """Test pool wait, execution and EXPLAIN sampling of the PostgreSQL store."""
+
+    def make_store(self, tmp_path, auto_explain=False, **settings):
+        self.conn = MagicMock()
+        self.conn.fetch = AsyncMock(return_value=[{"chunk_id": "a", "similarity": 0.9}])
+        self.conn.fetchval = AsyncMock(return_value='[{"Plan": {"Node Type": "Function Scan"}}]')
+        self.conn.execute = AsyncMock(
+            side_effect=None if auto_explain else asyncpg.InsufficientPrivilegeError("access to library denied")
+        )
+        self.listeners = []
+        self.conn.add_log_listener = self.listeners.append
+        self.conn.remove_log_listener = self.listeners.remove
+
+        @asynccontextmanager
+        async def transaction():
+            yield
+
+        @asynccontextmanager
+        async def acquire(readonly=False):
+            yield self.conn
+
+        self.conn.transaction = transaction
+
+        settings.setdefault("search_explain_path", str(tmp_path / "explain.jsonl"))
+        return PostgresVectorStore(SimpleNamespace(acquire=acquire), settings=make_settings(**settings))
+
+    @pytest.mark.asyncio
+    async def test_phases(self, tmp_path):
+        store = self.make_store(tmp_path)
+        timings = SearchTimings()
+
+        await store.search(VectorQuery(embedding=[0.1, 0.2], match_count=3, timings=timings))
+
+        assert set(timings.phases) == {"acquire", "execute", "convert"}
+        assert store.explain is None
+
+    @pytest.mark.asyncio
+    async def test_explain_sampled(self, tmp_path):
+        store = self.make_store(tmp_path, search_explain_threshold_ms=0.0)
+
+        await store.search(VectorQuery(embedding=[0.1, 0.2], match_count=3))
+        await asyncio.gather(*store.explain._tasks)
+
+        sql = self.conn.fetchval.await_args.args[0]
+        assert sql == f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {MATCH_CHUNKS_QUERY}"
+        (line,) = open(tmp_path / "explain.jsonl").read().splitlines()
+        entry = json.loads(line)
+        assert entry["query"] == "match_chunks"
+        assert entry["method"] == "explain"
+        assert entry["plan"][0]["Plan"]["Node Type"] == "Function Scan"
+        # The query vector is not logged
+        assert "[0.1,0.2]" not in entry["args"]
+
+    @pytest.mark.asyncio
+    async def test_explain_nested_statements(self, tmp_path):
+        store = self.make_store(tmp_path, auto_explain=True, search_explain_threshold_ms=0.0)
+        inner = {"Query Text": "SELECT c.id ... ORDER BY c.embedding <=> query_embedding", "Plan": {"Node Type": "Limit"}}
+        outer = {"Query Text": MATCH_CHUNKS_QUERY, "Plan": {"Node Type": "Function Scan"}}
+
+        async def fetch(sql, *args):
+            # The re-run reports its plans as notices, inner statements first
+            for plan in (inner, outer):
+                for listener in list(self.listeners):
+                    listener(self.conn, SimpleNamespace(message=f"duration: 1.2 ms  plan:\n{json.dumps(plan)}"))
+            return [{"chunk_id": "a", "similarity": 0.9}]
+
+        self.conn.fetch = AsyncMock(side_effect=fetch)
+        await store.search(VectorQuery(embedding=[0.1, 0.2], match_count=3))
+        await asyncio.gather(*store.explain._tasks)
+
+        self.conn.execute.assert_any_await("LOAD 'auto_explain'")
+        self.conn.fetchval.assert_not_awaited()
+        assert not self.listeners
+        entry = json.loads(open(tmp_path / "explain.jsonl").read())
+        assert entry["method"] == "auto_explain"
+        assert [plan["Plan"]["Node Type"] for plan in entry["plan"]] == ["Limit", "Function Scan"]
+
+    def test_sampling_switch(self):
+        sampler = ExplainSampler("explain.jsonl", threshold_ms=100.0, sample_rate=0.0)
+        assert not sampler.wants(500.0)
+        sampler.sample_rate = 1.0
+        assert sampler.wants(500.0) and not sampler.wants(50.0)
+        assert ExplainSampler.from_settings(make_settings()) is None
@@ -0,0 +1,142 @@
+"""Test the snippet projection of search results and lazy full-text fetches."""
+
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from ..tools import semantic_search, hybrid_search, get_chunks, resolve_projection
+from ..utils.vector_store import PostgresVectorStore, snippet_metadata_keys
+from ..utils.db_utils import (
+    MATCH_CHUNKS_QUERY, MATCH_CHUNKS_SNIPPET_QUERY, HYBRID_SEARCH_SNIPPET_QUERY, CHUNKS_BY_ID_QUERY
+)
+
+
+def make_settings(**overrides):
+    """Create the settings the search tools read."""
+    values = {
+        "default_match_count": 10, "max_match_count": 50, "default_text_weight": 0.3,
+        "vector_metric": "cosine", "hnsw_ef_search": None, "ivfflat_probes": None,
+        "exact_scan_limit": 20000, "default_collection": "default",
+        "search_projection": "full", "snippet_metadata_keys": "file_path, title", "snippet_max_words": 35,
+        "search_diversify": False, "mmr_lambda": 0.7
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def make_ctx(rows, **settings):
+    """Create a run context whose pool returns the given rows."""
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=rows)
+
+    @asynccontextmanager
+    async def acquire(readonly=False):
+        yield conn
+
+    settings = make_settings(**settings)
+    deps = SimpleNamespace(
+        settings=settings,
+        vector_store=PostgresVectorStore(SimpleNamespace(acquire=acquire), settings),
+        get_embedding=AsyncMock(return_value=[0.1, 0.2]),
+        result_cache=None,
+        search_timings=[],
+        user_preferences={},
+        collection_id=None
+    )
+    return SimpleNamespace(deps=deps), conn
+
+
+ROW = {
+    "chunk_id": str(uuid.uuid4()), "document_id": str(uuid.uuid4()), "content": "... the **pool** size ...",
+    "similarity": 0.8, "combined_score": 0.03, "vector_similarity": 0.8, "text_similarity": 0.1,
+    "metadata": {"title": "Pools"}, "document_title": "Pools", "document_source": "pools.md"
+}
+
+
+class TestProjectionSettings:
+    """Test projection options are validated."""
+
+    def test_call_overrides_setting(self):
+        """Test a per-call projection wins over the configured one."""
+        assert resolve_projection(make_settings(), "snippet") == "snippet"
+        assert resolve_projection(make_settings(search_projection="snippet")) == "snippet"
+
+    def test_unknown_projection(self):
+        """Test unknown projections are rejected."""
+        with pytest.raises(ValueError):
+            resolve_projection(make_settings(), "summary")
+
+    def test_metadata_keys(self):
+        """Test the whitelist is parsed from the comma-separated setting."""
+        assert snippet_metadata_keys(make_settings()) == ["file_path", "title"]
+
+
+class TestSnippetSearch:
+    """Test searches return highlighted windows when asked to."""
+
+    @pytest.mark.asyncio
+    async def test_semantic_snippets(self):
+        """Test the snippet query gets the query text, metadata keys and window size."""
+        ctx, conn = make_ctx([ROW])
+
+        results = await semantic_search(ctx, "pool size", projection="snippet")
+
+        query, *args = conn.fetch.call_args.args
+        assert query == MATCH_CHUNKS_SNIPPET_QUERY
+        assert args[-3:] == ["pool size", ["file_path", "title"], 35]
+        assert results[0].snippet is True
+
+    @pytest.mark.asyncio
+    async def test_full_by_default(self):
+        """Test full chunks are returned unless a snippet projection is configured."""
+        ctx, conn = make_ctx([ROW])
+
+        results = await semantic_search(ctx, "pool size")
+
+        query, *args = conn.fetch.call_args.args
+        assert query == MATCH_CHUNKS_QUERY
+        assert len(args) == 9
+        assert results[0].snippet is False
+
+    @pytest.mark.asyncio
+    async def test_hybrid_snippets(self):
+        """Test hybrid search reuses its query argument for the highlight."""
+        ctx, conn = make_ctx([ROW], search_projection="snippet")
+
+        results = await hybrid_search(ctx, "pool size")
+
+        query, *args = conn.fetch.call_args.args
+        assert query == HYBRID_SEARCH_SNIPPET_QUERY
+        assert len(args) == 15
+        assert args[-2:] == [["file_path", "title"], 35]
+        assert results[0]["snippet"] is True
+
+
+class TestGetChunks:
+    """Test full text is fetched by chunk id."""
+
+    @pytest.mark.asyncio
+    async def test_fetch_by_id(self):
+        """Test valid ids are fetched from the session's collection."""
+        ctx, conn = make_ctx([dict(ROW, content="full text", chunk_index=3)])
+        chunk_id = ROW["chunk_id"]
+
+        results = await get_chunks(ctx, [chunk_id, "not-a-uuid"])
+
+        query, collection, ids = conn.fetch.call_args.args
+        assert query == CHUNKS_BY_ID_QUERY
+        assert collection == "default"
+        assert ids == [uuid.UUID(chunk_id)]
+        assert results[0]["content"] == "full text"
+        assert results[0]["metadata"] == {"title": "Pools"}
+
+    @pytest.mark.asyncio
+    async def test_no_valid_ids(self):
+        """Test no query is run without valid ids."""
+        ctx, conn = make_ctx([])
+
+        assert await get_chunks(ctx, ["nope"]) == []
+        conn.fetch.assert_not_called()
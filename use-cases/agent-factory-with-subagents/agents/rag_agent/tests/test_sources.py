@@ -0,0 +1,127 @@
+"""Test streaming source adapters for ingestion."""
+
+import io
+import json
+import gzip
+import zipfile
+import tarfile
+
+import pytest
+
+from ..ingestion.sources import (
+    DirectorySource,
+    TarArchiveSource,
+    ZipArchiveSource,
+    JsonlSource,
+    open_source
+)
+
+
+def add_tar_member(tar: tarfile.TarFile, name: str, content: str):
+    """Add an in-memory file to a tar archive."""
+    data = content.encode("utf-8")
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+class TestDirectorySource:
+    """Test loose file discovery."""
+
+    def test_reads_matching_files(self, tmp_path):
+        """Test only supported extensions are read with relative IDs."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.md").write_text("# A\n\nAlpha")
+        (tmp_path / "sub" / "b.txt").write_text("Beta")
+        (tmp_path / "c.pdf").write_text("ignored")
+
+        documents = list(DirectorySource(str(tmp_path)))
+
+        assert sorted(d.source_id for d in documents) == ["a.md", "sub/b.txt"]
+
+
+class TestArchiveSources:
+    """Test archive member streaming."""
+
+    def test_tar_gz_members(self, tmp_path):
+        """Test tar.gz members stream with archive-qualified IDs."""
+        path = tmp_path / "export.tar.gz"
+        with tarfile.open(path, "w:gz") as tar:
+            add_tar_member(tar, "docs/a.md", "# A\n\nAlpha")
+            add_tar_member(tar, "docs/image.png", "binary")
+
+        documents = list(open_source(str(path)))
+
+        assert isinstance(open_source(str(path)), TarArchiveSource)
+        assert [d.source_id for d in documents] == ["export.tar.gz!docs/a.md"]
+        assert documents[0].content == "# A\n\nAlpha"
+        assert documents[0].metadata["archive_member"] == "docs/a.md"
+
+    def test_zip_members(self, tmp_path):
+        """Test zip members stream with archive-qualified IDs."""
+        path = tmp_path / "export.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("a.md", "Alpha")
+            archive.writestr("b.markdown", "Beta")
+
+        documents = list(ZipArchiveSource(str(path)))
+
+        assert [d.source_id for d in documents] == ["export.zip!a.md", "export.zip!b.markdown"]
+
+    def test_oversized_members_skipped(self, tmp_path):
+        """Test members above the size limit are skipped."""
+        path = tmp_path / "export.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("big.md", "x" * 100)
+            archive.writestr("small.md", "x")
+
+        documents = list(ZipArchiveSource(str(path), max_member_bytes=10))
+
+        assert [d.name for d in documents] == ["small.md"]
+
+
+class TestJsonlSource:
+    """Test JSON Lines dumps."""
+
+    def test_records_become_documents(self, tmp_path):
+        """Test records use the ID field and keep scalar metadata."""
+        path = tmp_path / "dump.jsonl.gz"
+        with gzip.open(path, "wt") as f:
+            f.write(json.dumps({"id": 7, "title": "Seven", "content": "text", "tag": "x"}) + "\n")
+            f.write("\n")
+            f.write(json.dumps({"content": "no id"}) + "\n")
+
+        documents = list(JsonlSource(str(path)))
+
+        assert [d.source_id for d in documents] == ["dump.jsonl.gz#7", "dump.jsonl.gz#L3"]
+        assert documents[0].title == "Seven"
+        assert documents[0].metadata["tag"] == "x"
+        assert "content" not in documents[0].metadata
+
+    def test_invalid_lines_skipped(self, tmp_path):
+        """Test malformed and text-less records are skipped."""
+        path = tmp_path / "dump.jsonl"
+        path.write_text('{"id": 1, "body": "wrong field"}\nnot json\n{"id": 2, "content": "ok"}\n')
+
+        documents = list(open_source(str(path)))
+
+        assert [d.source_id for d in documents] == ["dump.jsonl#2"]
+
+    def test_size_in_bytes(self, tmp_path):
+        """Test document sizes count encoded bytes, not characters."""
+        path = tmp_path / "dump.jsonl"
+        line = json.dumps({"id": 1, "content": "Größe über €"}, ensure_ascii=False) + "\n"
+        path.write_bytes(line.encode("utf-8") + b'{"id": 2, "content": "\xff"}\n')
+
+        (document,) = JsonlSource(str(path))
+
+        assert document.content == "Größe über €"
+        assert document.size == len(line.encode("utf-8")) > len(line)
+
+    def test_unsupported_file(self, tmp_path):
+        """Test unknown single files are rejected."""
+        path = tmp_path / "data.csv"
+        path.write_text("a,b")
+
+        with pytest.raises(ValueError, match="Unsupported source file"):
+            open_source(str(path))
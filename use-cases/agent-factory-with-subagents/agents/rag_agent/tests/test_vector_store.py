@@ -0,0 +1,233 @@
+"""Test the vector store interface and the local IVF engine."""
+
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from ..ingestion.embedder import StubEmbeddingGenerator
+from ..ingestion.ingest import DocumentIngestionPipeline
+from ..tools import semantic_search, hybrid_search, get_chunks
+from ..utils import ivf_store
+from ..utils.ivf_store import IVFVectorStore, jsonb_contains, highlight
+from ..utils.models import IngestionConfig, SearchFilters
+from ..utils.vector_store import VectorStore, VectorQuery, PostgresVectorStore
+
+DIMENSION = 8
+
+
+def make_chunks(vectors, texts=None):
+    """Create embedded chunks like the ingestion pipeline produces."""
+    return [
+        SimpleNamespace(
+            content=texts[i] if texts else f"chunk {i}",
+            index=i,
+            metadata={"position": i},
+            token_count=2,
+            embedding=list(map(float, vector))
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def make_store(tmp_path, **options):
+    """Create an IVF store in a temporary directory."""
+    return IVFVectorStore(str(tmp_path / "store"), DIMENSION, **options)
+
+
+class TestInterface:
+    """Test both stores implement the interface."""
+
+    def test_protocol(self, tmp_path):
+        assert isinstance(make_store(tmp_path), VectorStore)
+        assert isinstance(PostgresVectorStore(pool=None), VectorStore)
+
+
+class TestIVFVectorStore:
+    """Test storage, persistence and exact search of small collections."""
+
+    @pytest.mark.asyncio
+    async def test_search_and_reopen(self, tmp_path):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((20, DIMENSION))
+        store = make_store(tmp_path)
+        document_id = await store.upsert("default", "Guide", "guide.md", "text", make_chunks(vectors), {"tag": "a"})
+
+        results = await store.search(VectorQuery(embedding=vectors[7].tolist(), match_count=3))
+
+        assert results[0]["content"] == "chunk 7"
+        assert results[0]["similarity"] == pytest.approx(1.0, rel=1e-5)
+        assert results[0]["document_id"] == document_id
+        assert results[0]["document_title"] == "Guide"
+
+        reopened = make_store(tmp_path)
+        again = await reopened.search(VectorQuery(embedding=vectors[7].tolist(), match_count=3))
+        assert [r["chunk_id"] for r in again] == [r["chunk_id"] for r in results]
+
+    @pytest.mark.asyncio
+    async def test_delete_by_source_and_all(self, tmp_path):
+        rng = np.random.default_rng(1)
+        store = make_store(tmp_path)
+        await store.upsert("default", "A", "a.md", "", make_chunks(rng.standard_normal((3, DIMENSION))), {})
+        await store.upsert("default", "B", "b.md", "", make_chunks(rng.standard_normal((3, DIMENSION))), {})
+        await store.upsert("other", "C", "c.md", "", make_chunks(rng.standard_normal((3, DIMENSION))), {})
+
+        assert await store.delete("default", "a.md") == 1
+        results = await make_store(tmp_path).search(VectorQuery(embedding=[1.0] * DIMENSION, match_count=10))
+        assert {r["document_source"] for r in results} == {"b.md"}
+
+        assert await store.delete("default") == 1
+        assert await make_store(tmp_path).search(VectorQuery(embedding=[1.0] * DIMENSION, match_count=10)) == []
+        other = await store.search(VectorQuery(embedding=[1.0] * DIMENSION, match_count=10, collection="other"))
+        assert len(other) == 3
+
+    @pytest.mark.asyncio
+    async def test_filters(self, tmp_path):
+        rng = np.random.default_rng(2)
+        store = make_store(tmp_path)
+        await store.upsert("default", "A", "docs/api/a.md", "", make_chunks(rng.standard_normal((2, DIMENSION))),
+                           {"tags": ["billing", "api"]})
+        await store.upsert("default", "B", "docs/guide/b.md", "", make_chunks(rng.standard_normal((2, DIMENSION))),
+                           {"tags": ["setup"]})
+
+        by_tag = await store.search(VectorQuery(
+            embedding=[1.0] * DIMENSION, match_count=10, filters=SearchFilters(metadata={"tags": ["billing"]})
+        ))
+        by_prefix = await store.search(VectorQuery(
+            embedding=[1.0] * DIMENSION, match_count=10, filters=SearchFilters(source_prefix="docs/guide/")
+        ))
+
+        assert {r["document_title"] for r in by_tag} == {"A"}
+        assert {r["document_title"] for r in by_prefix} == {"B"}
+
+    @pytest.mark.asyncio
+    async def test_hybrid_and_snippets(self, tmp_path):
+        rng = np.random.default_rng(3)
+        texts = ["billing invoices are sent monthly", "setup the service", "unrelated words here"]
+        store = make_store(tmp_path, snippet_metadata_keys=["position"], snippet_max_words=3)
+        await store.upsert("default", "A", "a.md", "", make_chunks(rng.standard_normal((3, DIMENSION)), texts), {})
+
+        results = await store.hybrid_search(VectorQuery(
+            embedding=rng.standard_normal(DIMENSION).tolist(), match_count=3, text="billing", text_weight=1.0,
+            snippet=True
+        ))
+
+        assert results[0]["content"] == "**billing** invoices are"
+        assert results[0]["text_similarity"] > 0
+        assert results[0]["combined_score"] > results[1]["combined_score"]
+        assert results[0]["metadata"] == {"position": 0}
+        assert {"vector_similarity", "combined_score"} <= set(results[-1])
+
+    @pytest.mark.asyncio
+    async def test_get_chunks_in_requested_order(self, tmp_path):
+        store = make_store(tmp_path)
+        await store.upsert("default", "A", "a.md", "", make_chunks(np.eye(DIMENSION)[:3]), {})
+        ids = [r["chunk_id"] for r in await store.search(VectorQuery(embedding=[1.0] * DIMENSION, match_count=3))]
+
+        chunks = await store.get_chunks("default", [uuid.UUID(ids[2]), uuid.uuid4(), uuid.UUID(ids[0])])
+
+        assert [c["chunk_id"] for c in chunks] == [ids[2], ids[0]]
+        assert "chunk_index" in chunks[0]
+
+    @pytest.mark.asyncio
+    async def test_torn_log_is_dropped(self, tmp_path):
+        store = make_store(tmp_path)
+        await store.upsert("default", "A", "a.md", "", make_chunks(np.eye(DIMENSION)[:2]), {})
+        collection_dir = tmp_path / "store" / "default"
+        with open(collection_dir / "log.jsonl", "a") as f:
+            f.write('{"op": "upsert", "document": {"id"')
+
+        reopened = make_store(tmp_path)
+        await reopened.upsert("default", "B", "b.md", "", make_chunks(np.eye(DIMENSION)[2:4]), {})
+
+        results = await make_store(tmp_path).search(VectorQuery(embedding=[1.0] * DIMENSION, match_count=10))
+        assert {r["document_title"] for r in results} == {"A", "B"}
+
+
+class TestIVFLists:
+    """Test list training and probing."""
+
+    @pytest.mark.asyncio
+    async def test_trained_lists_match_exact_search(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ivf_store, "TRAIN_MIN_ROWS", 200)
+        rng = np.random.default_rng(4)
+        vectors = rng.standard_normal((400, DIMENSION))
+        store = make_store(tmp_path)
+        for start in range(0, 400, 100):
+            await store.upsert("default", f"D{start}", f"{start}.md", "", make_chunks(vectors[start:start + 100]), {})
+
+        collection = store.collection("default")
+        assert collection.centroids is not None
+        n_lists = len(collection.centroids)
+
+        query = rng.standard_normal(DIMENSION).tolist()
+        all_lists = await store.search(VectorQuery(embedding=query, match_count=5, probes=n_lists))
+        one_list = await store.search(VectorQuery(embedding=query, match_count=5, probes=1))
+
+        assert [r["similarity"] for r in all_lists] == pytest.approx(
+            sorted(collection.vectors[:400] @ (np.array(query) / np.linalg.norm(query)), reverse=True)[:5], rel=1e-5
+        )
+        assert len(one_list) <= 5
+        assert (tmp_path / "store" / "default" / "centroids.npy").exists()
+        assert len(make_store(tmp_path).collection("default").centroids) == n_lists
+
+
+class TestHelpers:
+    """Test JSON containment and highlighting."""
+
+    def test_jsonb_contains(self):
+        assert jsonb_contains({"a": 1, "tags": ["x", "y"]}, {"tags": ["y"]})
+        assert jsonb_contains({"a": {"b": 2, "c": 3}}, {"a": {"b": 2}})
+        assert not jsonb_contains({"a": 1}, {"a": 2})
+        assert not jsonb_contains({"tags": ["x"]}, {"tags": ["x", "z"]})
+
+    def test_highlight_without_match(self):
+        assert highlight("one two three four", ["nothing"], 2) == "one two"
+
+
+class TestEndToEnd:
+    """Test ingestion and the search tools on the IVF store, without a database."""
+
+    @pytest.mark.asyncio
+    async def test_ingest_then_search(self, tmp_path):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "billing.md").write_text("# Billing\n\n" + "Invoices are sent monthly. " * 20)
+        (docs / "setup.md").write_text("# Setup\n\n" + "Install the service first. " * 20)
+        embedder = StubEmbeddingGenerator()
+        store = IVFVectorStore(str(tmp_path / "store"), embedder.get_embedding_dimension())
+
+        pipeline = DocumentIngestionPipeline(
+            IngestionConfig(chunk_size=300, chunk_overlap=0, use_semantic_chunking=False),
+            documents_folder=str(docs),
+            journal_dir=str(tmp_path / "journal"),
+            sink=store,
+            embedder=embedder
+        )
+        results = await pipeline.ingest_documents()
+        assert all(r.document_id and not r.errors for r in results)
+
+        # Stub embeddings are hashes of the text, so search for a stored chunk's exact text
+        stored = store.collection("default")
+        chunk = next(c for c in stored.chunks if stored.documents[c["document_id"]]["title"] == "Billing")
+        settings = SimpleNamespace(
+            default_match_count=3, max_match_count=50, default_text_weight=0.3,
+            search_projection="full", default_collection="default", search_diversify=False, mmr_lambda=0.7
+        )
+        deps = SimpleNamespace(
+            settings=settings, vector_store=store, result_cache=None, collection_id=None, user_preferences={},
+            search_timings=[],
+            get_embedding=AsyncMock(return_value=(await embedder.generate_embeddings_batch([chunk["content"]]))[0])
+        )
+        ctx = SimpleNamespace(deps=deps)
+
+        semantic = await semantic_search(ctx, chunk["content"])
+        hybrid = await hybrid_search(ctx, "invoices monthly")
+        chunks = await get_chunks(ctx, [semantic[0].chunk_id])
+
+        assert semantic[0].chunk_id == chunk["chunk_id"]
+        assert semantic[0].similarity == pytest.approx(1.0, rel=1e-5)
+        assert hybrid[0]["document_title"] == "Billing"
+        assert chunks[0]["content"] == chunk["content"]
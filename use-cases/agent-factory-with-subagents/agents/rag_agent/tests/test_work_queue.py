@@ -0,0 +1,130 @@
+"""Test the Postgres work queue for multi-worker ingestion."""
+
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from ..ingestion.sources import SourceDocument
+from ..ingestion.work_queue import IngestionJob, IngestionJobQueue, LeaseLostError
+
+
+@pytest.fixture
+def conn():
+    """Mock database connection."""
+    connection = MagicMock()
+    connection.fetch = AsyncMock(return_value=[])
+    connection.fetchval = AsyncMock()
+    connection.execute = AsyncMock(return_value="UPDATE 0")
+    connection.executemany = AsyncMock()
+    return connection
+
+
+class TestEnqueue:
+    """Test job creation from source documents."""
+
+    @pytest.mark.asyncio
+    async def test_files_by_path_members_inline(self, conn):
+        """Test loose files are enqueued by path and archive members with content."""
+        documents = [
+            SourceDocument("a.md", "alpha", "a.md", 5, {"file_path": "/docs/a.md"}),
+            SourceDocument("docs.tgz!b.md", "beta", "b.md", 4, {"archive": "docs.tgz"})
+        ]
+
+        offered = await IngestionJobQueue("batch-1").enqueue(conn, documents)
+
+        rows = conn.executemany.call_args[0][1]
+        assert offered == 2
+        assert rows[0][3:5] == ("/docs/a.md", None)
+        assert rows[1][3:5] == (None, "beta")
+        assert "ON CONFLICT (batch_id, source_id) DO NOTHING" in conn.executemany.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_inline_files(self, conn):
+        """Test inline mode stores loose file contents too."""
+        documents = [SourceDocument("a.md", "alpha", "a.md", 5, {"file_path": "/docs/a.md"})]
+
+        await IngestionJobQueue("batch-1").enqueue(conn, documents, inline=True)
+
+        assert conn.executemany.call_args[0][1][0][4] == "alpha"
+
+    @pytest.mark.asyncio
+    async def test_jobs_carry_collection(self, conn):
+        """Test jobs record the collection workers must ingest into."""
+        documents = [SourceDocument("a.md", "alpha", "a.md", 5, {"file_path": "/docs/a.md"})]
+
+        await IngestionJobQueue("batch-1").enqueue(conn, documents, collection="acme")
+
+        assert conn.executemany.call_args[0][1][0][-1] == "acme"
+
+
+class TestLeases:
+    """Test claiming, completing and reclaiming jobs."""
+
+    @pytest.mark.asyncio
+    async def test_claim_skips_locked_rows(self, conn):
+        """Test claims lease pending jobs without blocking other workers."""
+        conn.fetch.return_value = [{
+            "id": 7, "batch_id": "batch-1", "source_id": "a.md", "name": "a.md",
+            "location": "/docs/a.md", "content": None, "title": None,
+            "metadata": {"file_path": "/docs/a.md"}, "attempts": 1,
+            "collection_id": "acme"
+        }]
+
+        jobs = await IngestionJobQueue("batch-1", lease_seconds=60).claim(conn, "host:1")
+
+        query, batch_id, worker_id, lease = conn.fetch.call_args[0][:4]
+        assert "FOR UPDATE SKIP LOCKED" in query
+        assert (batch_id, worker_id, lease) == ("batch-1", "host:1", 60.0)
+        assert jobs[0].id == 7
+        assert jobs[0].metadata == {"file_path": "/docs/a.md"}
+        assert jobs[0].collection_id == "acme"
+
+    @pytest.mark.asyncio
+    async def test_complete_after_lease_lost(self, conn):
+        """Test completing a reclaimed job raises so the save rolls back."""
+        conn.fetchval.return_value = None
+        job = IngestionJob(7, "batch-1", "a.md", "a.md", content="alpha", attempts=1)
+
+        with pytest.raises(LeaseLostError):
+            await IngestionJobQueue("batch-1").complete(conn, job, "host:1", "doc-1", 3)
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_reports_lost_lease(self, conn):
+        """Test heartbeats tell the worker when its lease is gone."""
+        conn.fetchval.return_value = None
+        job = IngestionJob(7, "batch-1", "a.md", "a.md", content="alpha", attempts=2)
+
+        assert not await IngestionJobQueue("batch-1").heartbeat(conn, job, "host:1")
+        assert conn.fetchval.call_args[0][1:4] == (7, "host:1", 2)
+
+    @pytest.mark.asyncio
+    async def test_reclaim_stale_counts_rows(self, conn):
+        """Test expired leases are returned to the queue."""
+        conn.execute.return_value = "UPDATE 2"
+
+        assert await IngestionJobQueue("batch-1").reclaim_stale(conn) == 2
+        assert "lease_expires_at < now()" in conn.execute.call_args[0][0]
+
+
+class TestIngestionJob:
+    """Test materializing jobs into documents."""
+
+    def test_inline_content(self):
+        """Test inline jobs carry their content."""
+        job = IngestionJob(1, "batch-1", "dump.jsonl#1", "1", content="text", title="Title")
+
+        document = job.to_document()
+
+        assert document.content == "text"
+        assert document.title == "Title"
+
+    def test_reads_file_location(self, tmp_path):
+        """Test path jobs read the shared file."""
+        path = tmp_path / "a.md"
+        path.write_text("# A\n\nbody")
+        job = IngestionJob(1, "batch-1", "a.md", "a.md", location=str(path))
+
+        document = job.to_document()
+
+        assert document.content == "# A\n\nbody"
+        assert document.size == path.stat().st_size
@@ -3,9 +3,18 @@
 from typing import Optional, List, Dict, Any
 from pydantic_ai import RunContext
 from pydantic import BaseModel, Field
-import asyncpg
-import json
+import uuid
 from dependencies import AgentDependencies
+from utils.models import SearchFilters
+from utils.vector_store import VectorQuery
+from utils.mmr import tool_search
+from utils.context import build_passages, pack_passages, window_radius
+from utils.search_timing import SearchTimings, TimedResults
+
+# full: chunk text and metadata; snippet: highlighted window and whitelisted metadata
+PROJECTIONS = ("full", "snippet")
+# Searches whose timings a session keeps
+RECENT_SEARCHES = 20
 
 
 class SearchResult(BaseModel):
@@ -17,12 +26,145 @@ class SearchResult(BaseModel):
     metadata: Dict[str, Any]
     document_title: str
     document_source: str
+    snippet: bool = False
+
+
+def resolve_projection(settings, projection: Optional[str] = None) -> str:
+    """Get the result projection for one search, validated."""
+    projection = projection or settings.search_projection
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unknown projection: {projection}. Use one of {', '.join(PROJECTIONS)}")
+    return projection
+
+
+def resolve_mmr_lambda(settings, diversify: Optional[bool] = None) -> Optional[float]:
+    """Get the MMR relevance weight for one search, or None for the plain ranking."""
+    if diversify is None:
+        diversify = settings.search_diversify
+    if not diversify:
+        return None
+    return max(0.0, min(1.0, settings.mmr_lambda))
+
+
+def resolve_collection(deps: AgentDependencies) -> str:
+    """Get the collection the session searches."""
+    return deps.collection_id or deps.settings.default_collection
+
+
+async def run_search(deps: AgentDependencies, tool: str, request: VectorQuery) -> List[Dict[str, Any]]:
+    """
+    Run a search through the result cache, embedding the query only on a miss.
+    
+    The corpus generation is read before the search runs, so results of a
+    search that races an ingest are filed under the older generation and
+    never served once the ingest commits. A local index that has not synced
+    up to that generation leaves the search to Postgres. The search is timed
+    by phase and recorded in the process-wide search histograms.
+    
+    Args:
+        deps: Session dependencies
+        tool: semantic_search or hybrid_search
+        request: Search without its embedding
+    
+    Returns:
+        Result rows of the vector store, with the search's timings
+    """
+    timings = request.timings = SearchTimings()
+    cache = deps.result_cache
+    generation = None
+    rows = None
+    if cache:
+        with timings.phase("cache"):
+            generation = request.generation = await deps.vector_store.generation(request.collection)
+            rows = await cache.get(tool, request, generation)
+    
+    if rows is None:
+        with timings.phase("embed"):
+            request.embedding = await deps.get_embedding(request.text)
+        rows = await tool_search(deps.vector_store, tool, request)
+        
+        if cache:
+            with timings.phase("cache"):
+                cache.put(tool, request, generation, rows)
+    
+    record_timings(deps, tool, timings)
+    return TimedResults(rows, timings)
+
+
+def record_timings(deps: AgentDependencies, tool: str, timings: SearchTimings):
+    """
+    Finish a search's timings; add them to the histograms and the session's recent searches.
+    
+    Args:
+        deps: Session dependencies
+        tool: Search tool, the histograms' label
+        timings: Timings of the search
+    """
+    timings.finish().record(tool)
+    deps.search_timings.append((tool, timings))
+    del deps.search_timings[:-RECENT_SEARCHES]
+
+
+async def run_search_batch(
+    deps: AgentDependencies,
+    tool: str,
+    requests: List[VectorQuery],
+    timings: SearchTimings
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run many searches through the result cache with one embedding call and one query.
+    
+    Args:
+        deps: Session dependencies
+        tool: semantic_search or hybrid_search
+        requests: Searches without their embeddings, sharing all other parameters but the text
+        timings: Timings the phases of the whole batch are added to
+    
+    Returns:
+        Result rows of the vector store, one list per request
+    """
+    if not requests:
+        return []
+    
+    for request in requests:
+        request.timings = timings
+    cache = deps.result_cache
+    generation = None
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * len(requests)
+    if cache:
+        with timings.phase("cache"):
+            generation = await deps.vector_store.generation(requests[0].collection)
+            for request in requests:
+                request.generation = generation
+            results = [await cache.get(tool, request, generation) for request in requests]
+    
+    misses = [i for i, rows in enumerate(results) if rows is None]
+    if misses:
+        with timings.phase("embed"):
+            embeddings = await deps.get_embeddings([requests[i].text for i in misses])
+        for i, embedding in zip(misses, embeddings):
+            requests[i].embedding = embedding
+        
+        store = deps.vector_store
+        search = store.hybrid_search_batch if tool == "hybrid_search" else store.search_batch
+        found = await search([requests[i] for i in misses])
+        for i, rows in zip(misses, found):
+            results[i] = rows
+            if cache:
+                with timings.phase("cache"):
+                    cache.put(tool, requests[i], generation, rows)
+    return results
 
 
 async def semantic_search(
     ctx: RunContext[AgentDependencies],
     query: str,
-    match_count: Optional[int] = None
+    match_count: Optional[int] = None,
+    filters: Optional[SearchFilters] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    projection: Optional[str] = None,
+    diversify: Optional[bool] = None
 ) -> List[SearchResult]:
     """
     Perform pure semantic search using vector similarity.
@@ -31,6 +173,13 @@ async def semantic_search(
         ctx: Agent runtime context with dependencies
         query: Search query text
         match_count: Number of results to return (default: 10)
+        filters: Only search documents matching these metadata, source and date filters
+        ef_search: HNSW candidate list size; higher trades speed for recall
+        probes: IVFFlat lists to probe; higher trades speed for recall
+        projection: 'snippet' returns highlighted excerpts (fetch full text
+            with get_chunks), 'full' the whole chunks
+        diversify: Skip results nearly identical to better ones (maximal
+            marginal relevance over extra candidates)
     
     Returns:
         List of search results ordered by similarity
@@ -45,35 +194,26 @@ async def semantic_search(
         # Validate match count
         match_count = min(match_count, deps.settings.max_match_count)
         
-        # Generate embedding for query
-        query_embedding = await deps.get_embedding(query)
-        
-        # Convert embedding to PostgreSQL vector string format
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
-        # Execute semantic search
-        async with deps.db_pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT * FROM match_chunks($1::vector, $2)
-                """,
-                embedding_str,
-                match_count
-            )
-        
-        # Convert to SearchResult objects
-        return [
-            SearchResult(
-                chunk_id=str(row['chunk_id']),
-                document_id=str(row['document_id']),
-                content=row['content'],
-                similarity=row['similarity'],
-                metadata=json.loads(row['metadata']) if row['metadata'] else {},
-                document_title=row['document_title'],
-                document_source=row['document_source']
-            )
-            for row in results
-        ]
+        snippet = resolve_projection(deps.settings, projection) == "snippet"
+        
+        # Execute semantic search, embedding the query unless cached
+        results = await run_search(deps, "semantic_search", VectorQuery(
+            embedding=None,
+            match_count=match_count,
+            collection=resolve_collection(deps),
+            text=query,
+            filters=filters,
+            snippet=snippet,
+            ef_search=ef_search,
+            probes=probes,
+            mmr_lambda=resolve_mmr_lambda(deps.settings, diversify)
+        ))
+        
+        # Rows already have the model's types, so skip re-validation
+        return TimedResults(
+            [SearchResult.model_construct(**row, snippet=snippet) for row in results],
+            results.timings
+        )
     except Exception as e:
         print(e)
         return f"Failed to perform a semantic search: {e}"
@@ -83,7 +223,12 @@ async def hybrid_search(
     ctx: RunContext[AgentDependencies],
     query: str,
     match_count: Optional[int] = None,
-    text_weight: Optional[float] = None
+    text_weight: Optional[float] = None,
+    filters: Optional[SearchFilters] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    projection: Optional[str] = None,
+    diversify: Optional[bool] = None
 ) -> List[Dict[str, Any]]:
     """
     Perform hybrid search combining semantic and keyword matching.
@@ -93,9 +238,17 @@ async def hybrid_search(
         query: Search query text
         match_count: Number of results to return (default: 10)
         text_weight: Weight for text matching (0-1, default: 0.3)
+        filters: Only search documents matching these metadata, source and date filters
+        ef_search: HNSW candidate list size; higher trades speed for recall
+        probes: IVFFlat lists to probe; higher trades speed for recall
+        projection: 'snippet' returns highlighted excerpts (fetch full text
+            with get_chunks), 'full' the whole chunks
+        diversify: Skip results nearly identical to better ones (maximal
+            marginal relevance over extra candidates)
     
     Returns:
-        List of search results with combined scores
+        List of search results ranked by reciprocal rank fusion of the
+        vector and keyword rankings
     """
     try:
         deps = ctx.deps
@@ -110,40 +263,204 @@ async def hybrid_search(
         match_count = min(match_count, deps.settings.max_match_count)
         text_weight = max(0.0, min(1.0, text_weight))
         
-        # Generate embedding for query
-        query_embedding = await deps.get_embedding(query)
-        
-        # Convert embedding to PostgreSQL vector string format
-        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
-        # Execute hybrid search
-        async with deps.db_pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT * FROM hybrid_search($1::vector, $2, $3, $4)
-                """,
-                embedding_str,
-                query,
-                match_count,
-                text_weight
-            )
-        
-        # Convert to dictionaries with additional scores
-        return [
-            {
-                'chunk_id': str(row['chunk_id']),
-                'document_id': str(row['document_id']),
-                'content': row['content'],
-                'combined_score': row['combined_score'],
-                'vector_similarity': row['vector_similarity'],
-                'text_similarity': row['text_similarity'],
-                'metadata': json.loads(row['metadata']) if row['metadata'] else {},
-                'document_title': row['document_title'],
-                'document_source': row['document_source']
-            }
-            for row in results
-        ]
+        snippet = resolve_projection(deps.settings, projection) == "snippet"
+        
+        # Execute hybrid search, embedding the query unless cached
+        results = await run_search(deps, "hybrid_search", VectorQuery(
+            embedding=None,
+            match_count=match_count,
+            collection=resolve_collection(deps),
+            text=query,
+            text_weight=text_weight,
+            filters=filters,
+            snippet=snippet,
+            ef_search=ef_search,
+            probes=probes,
+            mmr_lambda=resolve_mmr_lambda(deps.settings, diversify)
+        ))
+        
+        # Dictionaries with additional scores
+        return TimedResults([{**row, "snippet": snippet} for row in results], results.timings)
     except Exception as e:
         print(e)
         return f"Failed to perform hybrid search: {e}"
+
+
+async def search_context(
+    ctx: RunContext[AgentDependencies],
+    query: str,
+    token_budget: Optional[int] = None,
+    match_count: Optional[int] = None,
+    text_weight: Optional[float] = None,
+    filters: Optional[SearchFilters] = None
+) -> Dict[str, Any]:
+    """
+    Search and return the hits as merged passages that fit a token budget.
+    
+    Hits close together in a document come back as one passage, with the
+    text repeated between adjacent chunks removed.
+    
+    Args:
+        ctx: Agent runtime context with dependencies
+        query: Search query text
+        token_budget: Tokens the passages may use in total (default: 3000)
+        match_count: Number of hits to assemble passages from (default: 10)
+        text_weight: Weight for text matching (0-1, default: 0.3)
+        filters: Only search documents matching these metadata, source and date filters
+    
+    Returns:
+        passages (document, chunk range, content, score and tokens each),
+        most relevant first; tokens used; passages left out for the budget
+    """
+    try:
+        deps = ctx.deps
+        settings = deps.settings
+        
+        # Use defaults if not specified
+        if token_budget is None:
+            token_budget = settings.context_token_budget
+        if match_count is None:
+            match_count = settings.default_match_count
+        if text_weight is None:
+            text_weight = deps.user_preferences.get('text_weight', settings.default_text_weight)
+        
+        # Validate parameters
+        token_budget = max(0, min(token_budget, settings.context_token_budget))
+        match_count = min(match_count, settings.max_match_count)
+        text_weight = max(0.0, min(1.0, text_weight))
+        collection = resolve_collection(deps)
+        
+        hits = await run_search(deps, "hybrid_search", VectorQuery(
+            embedding=None,
+            match_count=match_count,
+            collection=collection,
+            text=query,
+            text_weight=text_weight,
+            filters=filters
+        ))
+        if not hits:
+            return {"passages": [], "tokens": 0, "omitted": 0}
+        
+        # Hits and the chunks around them, in one query
+        chunks = await deps.vector_store.get_neighbor_chunks(
+            collection,
+            [uuid.UUID(hit["chunk_id"]) for hit in hits],
+            window_radius(settings.context_neighbors, settings.context_merge_gap)
+        )
+        passages = build_passages(
+            hits,
+            chunks,
+            "combined_score",
+            neighbors=settings.context_neighbors,
+            merge_gap=settings.context_merge_gap
+        )
+        packed, omitted = pack_passages(passages, token_budget)
+        
+        return {
+            "passages": [passage.to_dict() for passage in packed],
+            "tokens": sum(passage.tokens for passage in packed),
+            "omitted": omitted
+        }
+    except Exception as e:
+        print(e)
+        return f"Failed to assemble search context: {e}"
+
+
+async def batch_search(
+    ctx: RunContext[AgentDependencies],
+    queries: List[str],
+    match_count: Optional[int] = None,
+    search_type: str = "hybrid",
+    text_weight: Optional[float] = None,
+    filters: Optional[SearchFilters] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run several searches at once, e.g. rewrites of a query or the parts of a question.
+    
+    Args:
+        ctx: Agent runtime context with dependencies
+        queries: Search query texts
+        match_count: Number of results per query (default: 10)
+        search_type: 'hybrid' or 'semantic'
+        text_weight: Weight for text matching in hybrid search (0-1, default: 0.3)
+        filters: Only search documents matching these metadata, source and date filters
+    
+    Returns:
+        One entry per query, in order, with the query and its ranked results
+    """
+    try:
+        deps = ctx.deps
+        settings = deps.settings
+        if search_type not in ("hybrid", "semantic"):
+            raise ValueError(f"Unknown search type: {search_type}. Use hybrid or semantic")
+        tool = f"{search_type}_search"
+        
+        # Use defaults if not specified
+        if match_count is None:
+            match_count = settings.default_match_count
+        if text_weight is None:
+            text_weight = deps.user_preferences.get('text_weight', settings.default_text_weight)
+        
+        # Validate parameters
+        match_count = min(match_count, settings.max_match_count)
+        text_weight = max(0.0, min(1.0, text_weight))
+        collection = resolve_collection(deps)
+        
+        # One embedding call and one statement per batch_search_size queries
+        size = max(1, settings.batch_search_size)
+        timings = SearchTimings()
+        results = []
+        for start in range(0, len(queries), size):
+            results += await run_search_batch(deps, tool, [
+                VectorQuery(
+                    embedding=None,
+                    match_count=match_count,
+                    collection=collection,
+                    text=query,
+                    text_weight=text_weight,
+                    filters=filters
+                )
+                for query in queries[start:start + size]
+            ], timings)
+        
+        record_timings(deps, f"{tool}_batch", timings)
+        return TimedResults(
+            [{"query": query, "results": rows} for query, rows in zip(queries, results)],
+            timings
+        )
+    except Exception as e:
+        print(e)
+        return f"Failed to perform batch search: {e}"
+
+
+async def get_chunks(
+    ctx: RunContext[AgentDependencies],
+    chunk_ids: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Fetch the full text of search results returned as snippets.
+    
+    Args:
+        ctx: Agent runtime context with dependencies
+        chunk_ids: chunk_id values from search results
+    
+    Returns:
+        Full chunks with their complete metadata, in the order requested
+    """
+    try:
+        deps = ctx.deps
+        
+        # Skip malformed ids instead of failing the whole batch
+        ids = []
+        for chunk_id in chunk_ids[:deps.settings.max_match_count]:
+            try:
+                ids.append(uuid.UUID(str(chunk_id)))
+            except ValueError:
+                continue
+        if not ids:
+            return []
+        
+        return await deps.vector_store.get_chunks(resolve_collection(deps), ids)
+    except Exception as e:
+        print(e)
+        return f"Failed to fetch chunks: {e}"
@@ -0,0 +1,216 @@
+"""
+Context assembly: search hits merged into passages and packed into a token budget.
+
+Search returns independent chunks. Adjacent chunks of a document repeat the
+chunker's overlap, and nothing bounds how many tokens the results add to the
+prompt. Hits are grouped by document; hits within a few chunks of each other
+become one passage, stitched from the chunks in between with the overlap
+removed; passages are then packed, most relevant first, into the budget.
+"""
+
+from dataclasses import dataclass, field, asdict, replace
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+# The chunker's estimate (DocumentChunk.token_count)
+CHARS_PER_TOKEN = 4
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 16
+# Longest overlap looked for; chunk_overlap defaults to 200 characters
+MAX_OVERLAP_CHARS = 2000
+
+# A passage is cut to fit the remaining budget only if that leaves this many tokens
+MIN_PASSAGE_TOKENS = 50
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of a text like the chunker does."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def strip_overlap(previous: str, following: str, min_overlap: int = MIN_OVERLAP_CHARS) -> Optional[str]:
+    """
+    Remove the text a chunk repeats from the end of the chunk before it.
+
+    Args:
+        previous: Text of the earlier chunk
+        following: Text of the next chunk
+        min_overlap: Shortest repeated text to remove
+
+    Returns:
+        The part of following after the overlap, or None if they do not overlap
+    """
+    limit = min(len(previous), len(following), MAX_OVERLAP_CHARS)
+    if limit < min_overlap:
+        return None
+
+    tail = previous[-limit:]
+    probe = following[:min_overlap]
+    # Earlier positions in the tail are longer overlaps, so the first full match wins
+    position = tail.find(probe)
+    while position != -1:
+        if following.startswith(tail[position:]):
+            return following[len(tail) - position:]
+        position = tail.find(probe, position + 1)
+    return None
+
+
+def join_chunks(chunks: Sequence[Dict[str, Any]]) -> str:
+    """Concatenate consecutive chunks, removing their overlap where there is one."""
+    text = ""
+    previous_index = None
+    for chunk in chunks:
+        content = chunk["content"]
+        if not text:
+            text = content
+        else:
+            rest = strip_overlap(text, content) if chunk["chunk_index"] == previous_index + 1 else None
+            text = text + rest if rest is not None else text + "\n\n" + content
+        previous_index = chunk["chunk_index"]
+    return text
+
+
+@dataclass
+class Passage:
+    """Consecutive chunks of one document, merged around one or more search hits."""
+    document_id: str
+    document_title: str
+    document_source: str
+    first_chunk_index: int
+    last_chunk_index: int
+    content: str
+    # Best relevance score of the hits in the passage
+    score: float
+    tokens: int
+    hit_chunk_ids: List[str] = field(default_factory=list)
+    truncated: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Passage as returned by the search_context tool."""
+        return asdict(self)
+
+
+def window_radius(neighbors: int, merge_gap: int) -> int:
+    """Chunks fetched on each side of a hit to cover its neighbors and bridge gaps."""
+    return max(neighbors, (merge_gap + 1) // 2)
+
+
+def build_passages(
+    hits: Sequence[Dict[str, Any]],
+    chunks: Sequence[Dict[str, Any]],
+    score_key: str,
+    neighbors: int = 0,
+    merge_gap: int = 1
+) -> List[Passage]:
+    """
+    Merge search hits into passages.
+
+    Each hit covers its chunk and neighbors chunks on either side; covered
+    ranges of a document at most merge_gap chunks apart are merged, and
+    the chunks between are filled in.
+
+    Args:
+        hits: Search result rows (chunk_id, document_id, document_title,
+            document_source and the score)
+        chunks: Chunks around the hits (chunk_id, document_id, chunk_index, content)
+        score_key: Row field holding the hits' relevance
+        neighbors: Chunks added on each side of a hit
+        merge_gap: Largest number of chunks between two ranges that are still merged
+
+    Returns:
+        Passages in no particular order
+    """
+    by_id = {chunk["chunk_id"]: chunk for chunk in chunks}
+    document_chunks: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    for chunk in chunks:
+        document_chunks.setdefault(chunk["document_id"], {})[chunk["chunk_index"]] = chunk
+
+    # (first index, last index, score, hit ids) per document
+    ranges: Dict[str, List[Tuple[int, int, float, List[str]]]] = {}
+    documents: Dict[str, Dict[str, Any]] = {}
+    for hit in hits:
+        chunk = by_id.get(hit["chunk_id"])
+        # Deleted since the search
+        if chunk is None:
+            continue
+        documents.setdefault(hit["document_id"], hit)
+        index = chunk["chunk_index"]
+        ranges.setdefault(hit["document_id"], []).append(
+            (index - neighbors, index + neighbors, hit[score_key], [hit["chunk_id"]])
+        )
+
+    passages = []
+    for document_id, document_ranges in ranges.items():
+        merged: List[Tuple[int, int, float, List[str]]] = []
+        for first, last, score, hit_ids in sorted(document_ranges):
+            if merged and first - merged[-1][1] - 1 <= merge_gap:
+                previous = merged[-1]
+                merged[-1] = (previous[0], max(previous[1], last), max(previous[2], score), previous[3] + hit_ids)
+            else:
+                merged.append((first, last, score, hit_ids))
+
+        available = document_chunks[document_id]
+        hit = documents[document_id]
+        for first, last, score, hit_ids in merged:
+            span = [available[index] for index in range(first, last + 1) if index in available]
+            content = join_chunks(span)
+            passages.append(Passage(
+                document_id=document_id,
+                document_title=hit["document_title"],
+                document_source=hit["document_source"],
+                first_chunk_index=span[0]["chunk_index"],
+                last_chunk_index=span[-1]["chunk_index"],
+                content=content,
+                score=score,
+                tokens=estimate_tokens(content),
+                hit_chunk_ids=hit_ids
+            ))
+    return passages
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut a text to about this many tokens, at a sentence or word boundary when there is one."""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    for boundary in (". ", "\n"):
+        position = cut.rfind(boundary)
+        if position > limit // 2:
+            return cut[:position + 1].rstrip()
+    position = cut.rfind(" ")
+    return (cut[:position] if position > 0 else cut).rstrip()
+
+
+def pack_passages(passages: Sequence[Passage], token_budget: int) -> Tuple[List[Passage], int]:
+    """
+    Greedily fill a token budget with the most relevant passages.
+
+    Passages are taken most relevant first. A passage that does not fit is
+    cut short to the remaining budget when at least MIN_PASSAGE_TOKENS are
+    left, and left out otherwise, so after the first cut only passages small
+    enough for what remains are added. Cut passages are copies; the caller's
+    passages are not changed.
+
+    Args:
+        passages: Candidate passages
+        token_budget: Total tokens the packed passages may use
+
+    Returns:
+        Packed passages, most relevant first, and the number left out
+    """
+    packed = []
+    remaining = token_budget
+    omitted = 0
+    for passage in sorted(passages, key=lambda p: p.score, reverse=True):
+        if passage.tokens <= remaining:
+            packed.append(passage)
+            remaining -= passage.tokens
+        elif remaining >= MIN_PASSAGE_TOKENS:
+            content = truncate_to_tokens(passage.content, remaining)
+            passage = replace(passage, content=content, tokens=estimate_tokens(content), truncated=True)
+            packed.append(passage)
+            remaining -= passage.tokens
+        else:
+            omitted += 1
+    return packed, omitted
@@ -3,11 +3,15 @@ Database utilities for PostgreSQL connection and operations.
 """
 
 import os
+import re
 import json
+import base64
+import time
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Mapping
 from datetime import datetime, timedelta, timezone
 from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
 from uuid import UUID
 import logging
 
@@ -15,55 +19,731 @@ import asyncpg
 from asyncpg.pool import Pool
 from dotenv import load_dotenv
 
+from .metrics import MetricsRegistry
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library codec is used instead
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Search statements, shared by the search tools and the pool warmup so the
+# warmed text is exactly what the tools send
+# Rows come back ready to serialize: ids as text, metadata decoded by the
+# JSONB codec, never NULL
+MATCH_CHUNKS_QUERY = """
+    SELECT
+        r.chunk_id::text,
+        r.document_id::text,
+        r.content,
+        r.similarity,
+        COALESCE(r.metadata, '{}'::jsonb) AS metadata,
+        r.document_title,
+        r.document_source
+    FROM match_chunks(
+        $1::vector, $2, $3, $4::jsonb, $5, $6::timestamptz, $7::timestamptz, $8, $9
+    ) r
+"""
+
+HYBRID_SEARCH_QUERY = """
+    SELECT
+        r.chunk_id::text,
+        r.document_id::text,
+        r.content,
+        r.combined_score,
+        r.vector_similarity,
+        r.text_similarity,
+        COALESCE(r.metadata, '{}'::jsonb) AS metadata,
+        r.document_title,
+        r.document_source
+    FROM hybrid_search(
+        $1::vector, $2, $3, $4, $5, $6, $7,
+        $8::jsonb, $9, $10::timestamptz, $11::timestamptz, $12, $13
+    ) r
+"""
+
+# Many searches in one statement: the query vectors (and texts) are
+# unnested and each row is laterally joined to one search function call.
+# query_index is the 0-based position of the query in the arrays.
+BATCH_MATCH_CHUNKS_QUERY = """
+    SELECT
+        q.query_index - 1 AS query_index,
+        r.chunk_id::text,
+        r.document_id::text,
+        r.content,
+        r.similarity,
+        COALESCE(r.metadata, '{}'::jsonb) AS metadata,
+        r.document_title,
+        r.document_source
+    FROM unnest($1::text[]) WITH ORDINALITY AS q(embedding, query_index)
+    CROSS JOIN LATERAL match_chunks(
+        q.embedding::vector, $2, $3, $4::jsonb, $5, $6::timestamptz, $7::timestamptz, $8, $9
+    ) r
+    ORDER BY q.query_index, r.similarity DESC
+"""
+
+BATCH_HYBRID_SEARCH_QUERY = """
+    SELECT
+        q.query_index - 1 AS query_index,
+        r.chunk_id::text,
+        r.document_id::text,
+        r.content,
+        r.combined_score,
+        r.vector_similarity,
+        r.text_similarity,
+        COALESCE(r.metadata, '{}'::jsonb) AS metadata,
+        r.document_title,
+        r.document_source
+    FROM unnest($1::text[], $2::text[]) WITH ORDINALITY AS q(embedding, query_text, query_index)
+    CROSS JOIN LATERAL hybrid_search(
+        q.embedding::vector, q.query_text, $3, $4, $5, $6, $7,
+        $8::jsonb, $9, $10::timestamptz, $11::timestamptz, $12, $13
+    ) r
+    ORDER BY q.query_index, r.combined_score DESC
+"""
+
+# Snippet projections: a highlighted window of each chunk and whitelisted
+# metadata keys instead of the full text and metadata
+MATCH_CHUNKS_SNIPPET_QUERY = """
+    SELECT
+        r.chunk_id::text,
+        r.document_id::text,
+        chunk_snippet(r.content, $10, $12) AS content,
+        r.similarity,
+        jsonb_pick(r.metadata, $11::text[]) AS metadata,
+        r.document_title,
+        r.document_source
+    FROM match_chunks(
+        $1::vector, $2, $3, $4::jsonb, $5, $6::timestamptz, $7::timestamptz, $8, $9
+    ) r
+"""
+
+HYBRID_SEARCH_SNIPPET_QUERY = """
+    SELECT
+        r.chunk_id::text,
+        r.document_id::text,
+        chunk_snippet(r.content, $2, $15) AS content,
+        r.combined_score,
+        r.vector_similarity,
+        r.text_similarity,
+        jsonb_pick(r.metadata, $14::text[]) AS metadata,
+        r.document_title,
+        r.document_source
+    FROM hybrid_search(
+        $1::vector, $2, $3, $4, $5, $6, $7,
+        $8::jsonb, $9, $10::timestamptz, $11::timestamptz, $12, $13
+    ) r
+"""
+
+# Full text of chunks by id, in the order requested
+CHUNKS_BY_ID_QUERY = """
+    SELECT
+        c.id::text AS chunk_id,
+        c.document_id::text,
+        c.content,
+        c.chunk_index,
+        COALESCE(c.metadata, '{}'::jsonb) AS metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM chunks c
+    JOIN documents d ON d.id = c.document_id
+    WHERE c.collection_id = $1 AND c.id = ANY($2::uuid[])
+    ORDER BY array_position($2::uuid[], c.id)
+"""
+
+# Chunks within $3 positions of the given chunks in their documents, for
+# merging search hits into passages; one range scan of the
+# (document_id, chunk_index) index per hit
+NEIGHBOR_CHUNKS_QUERY = """
+    SELECT DISTINCT ON (c.id)
+        c.id::text AS chunk_id,
+        c.document_id::text,
+        c.chunk_index,
+        c.content
+    FROM chunks h
+    JOIN chunks c
+      ON c.collection_id = h.collection_id
+     AND c.document_id = h.document_id
+     AND c.chunk_index BETWEEN h.chunk_index - $3 AND h.chunk_index + $3
+    WHERE h.collection_id = $1 AND h.id = ANY($2::uuid[])
+    ORDER BY c.id
+"""
+
+# Embeddings of chunks by id, for re-ranking search candidates
+EMBEDDINGS_BY_ID_QUERY = """
+    SELECT id::text AS chunk_id, embedding::real[] AS embedding
+    FROM chunks
+    WHERE collection_id = $1 AND id = ANY($2::uuid[]) AND embedding IS NOT NULL
+"""
+
+# Corpus generation of a collection; 0 until its first write
+GENERATION_QUERY = """
+    SELECT COALESCE(MAX(generation), 0) FROM corpus_generations WHERE collection_id = $1
+"""
+
+# Run after committing changes to a collection's chunks, once per batch
+BUMP_GENERATION_QUERY = """
+    INSERT INTO corpus_generations (collection_id, generation) VALUES ($1, 1)
+    ON CONFLICT (collection_id) DO UPDATE
+    SET generation = corpus_generations.generation + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING generation
+"""
+
+SEARCH_QUERIES = (
+    MATCH_CHUNKS_QUERY,
+    HYBRID_SEARCH_QUERY,
+    MATCH_CHUNKS_SNIPPET_QUERY,
+    HYBRID_SEARCH_SNIPPET_QUERY,
+    BATCH_MATCH_CHUNKS_QUERY,
+    BATCH_HYBRID_SEARCH_QUERY,
+    NEIGHBOR_CHUNKS_QUERY,
+    EMBEDDINGS_BY_ID_QUERY,
+    GENERATION_QUERY
+)
+
+# Pool sizing and query latency buckets in seconds
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0, 60.0)
+
+REPLICA_ROUTING = ("round_robin", "least_latency")
+
+# Seconds the replica is behind the primary. A replica that has replayed
+# everything it received is current, however old its last replayed commit.
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float8
+"""
+
+# Failures that take a replica out of rotation instead of failing the read
+REPLICA_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError)
+
+# First byte of the binary jsonb wire format
+JSONB_VERSION = b"\x01"
+
+_CALLED_FUNCTION = re.compile(r"\bFROM\s+(\w+)\s*\(", re.IGNORECASE)
+_LATERAL_FUNCTION = re.compile(r"\bLATERAL\s+(\w+)\s*\(", re.IGNORECASE)
+
+
+def query_label(query: str) -> str:
+    """
+    Short, low-cardinality name of a query for latency metrics.
+    
+    Args:
+        query: SQL text
+    
+    Returns:
+        The called set-returning function (e.g. 'match_chunks', or
+        'match_chunks_batch' when laterally joined to a batch of queries),
+        or the statement's leading keyword
+    """
+    match = _LATERAL_FUNCTION.search(query)
+    if match:
+        return f"{match.group(1).lower()}_batch"
+    match = _CALLED_FUNCTION.search(query)
+    if match:
+        return match.group(1).lower()
+    words = query.split(None, 1)
+    return words[0].lower() if words else "empty"
+
+
+def json_dumps(value: Any) -> bytes:
+    """Serialize a value to JSON bytes, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: bytes) -> Any:
+    """Parse JSON bytes (or a memoryview of them), with orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return JSONB_VERSION + json_dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    # Skip the version byte without copying the payload
+    return json_loads(memoryview(data)[1:])
+
+
+async def register_json_codecs(conn: asyncpg.Connection):
+    """
+    Exchange json and jsonb values as Python objects.
+    
+    The codecs use the binary wire format, so values are parsed once from
+    the bytes asyncpg receives: rows arrive with dicts, and parameters
+    take dicts and lists instead of pre-serialized strings.
+    
+    Args:
+        conn: Database connection
+    """
+    await conn.set_type_codec(
+        "jsonb", schema="pg_catalog", encoder=_encode_jsonb, decoder=_decode_jsonb, format="binary"
+    )
+    await conn.set_type_codec(
+        "json", schema="pg_catalog", encoder=json_dumps, decoder=json_loads, format="binary"
+    )
+
+
+def record_to_dict(row: Mapping[str, Any], isoformat: Sequence[str] = (), **extra) -> Dict[str, Any]:
+    """
+    Convert a result row to a plain dictionary.
+    
+    Queries are written so rows need no per-field conversion (ids cast to
+    text in SQL, JSON decoded by the codec); this is the one place rows are
+    turned into dicts.
+    
+    Args:
+        row: asyncpg Record or mapping
+        isoformat: Timestamp columns to render as ISO 8601 strings
+        **extra: Additional keys to set
+    
+    Returns:
+        Dictionary of the row's columns
+    """
+    data = dict(row)
+    for key in isoformat:
+        value = data.get(key)
+        if value is not None:
+            data[key] = value.isoformat()
+    if extra:
+        data.update(extra)
+    return data
+
+
+def replica_name(url: str) -> str:
+    """Name a replica by host and port, without credentials."""
+    parts = urlsplit(url)
+    return f"{parts.hostname or 'localhost'}:{parts.port or 5432}"
+
+
+def parse_urls(value: Optional[str]) -> List[str]:
+    """Split a comma-separated list of connection URLs."""
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+
+class ReplicaPool:
+    """A read replica's connection pool and its measured health."""
+    
+    def __init__(self, url: str):
+        """
+        Initialize replica.
+        
+        Args:
+            url: PostgreSQL connection URL of the replica
+        """
+        self.url = url
+        self.name = replica_name(url)
+        self.pool: Optional[Pool] = None
+        self.lag: float = 0.0
+        self.latency: Optional[float] = None
+        self.up = False
+        self.checked_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+    
+    def record_probe(self, lag: float, round_trip: float):
+        """Record a successful health probe."""
+        self.up = True
+        self.lag = lag
+        # Smoothed, so a single slow probe does not flip routing
+        self.latency = round_trip if self.latency is None else 0.8 * self.latency + 0.2 * round_trip
+    
+    def usable(self, max_lag: float) -> bool:
+        """Whether read-only queries may be routed here."""
+        return self.up and self.pool is not None and self.lag <= max_lag
+
 
 class DatabasePool:
-    """Manages PostgreSQL connection pool."""
+    """
+    Manages the process-wide PostgreSQL connection pool.
+    
+    Ingestion, the search tools and the CLI share one instance (db_pool), so
+    a process holds a single pool sized in one place. The pool is created
+    once, under a lock, however many tasks hit the first acquire at the same
+    time. New connections are warmed by preparing the search statements,
+    which loads the pgvector type codec and the server's catalog caches
+    before the first user query. Acquire wait time, connections in use and
+    per-statement query latency are recorded in a MetricsRegistry.
+    
+    With replica URLs configured, `acquire(readonly=True)` routes to a read
+    replica (round-robin or lowest measured latency) and everything else
+    stays on the primary. A background task probes each replica's
+    replication lag every `replica_check_interval` seconds, and acquires
+    only read its last measurement; replicas lagging more than
+    `max_replica_lag` seconds, or failing to connect, are skipped until a
+    later probe finds them healthy. Without a usable replica, reads fall
+    back to the primary.
+    """
     
-    def __init__(self, database_url: Optional[str] = None):
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        statement_cache_size: Optional[int] = None,
+        warmup_queries: Sequence[str] = (),
+        metrics: Optional[MetricsRegistry] = None,
+        replica_urls: Optional[Sequence[str]] = None,
+        replica_routing: Optional[str] = None,
+        max_replica_lag: Optional[float] = None,
+        replica_check_interval: float = 5.0,
+        replica_probe_timeout: float = 2.0
+    ):
         """
         Initialize database pool.
         
         Args:
             database_url: PostgreSQL connection URL
+            min_size: Connections opened (and warmed) up front
+            max_size: Upper bound on open connections
+            statement_cache_size: Prepared statements cached per connection;
+                0 disables the cache (required behind pgbouncer in transaction mode)
+            warmup_queries: Statements prepared on every new connection
+            metrics: Registry receiving pool and query metrics
+            replica_urls: Read replicas for read-only acquires
+            replica_routing: 'round_robin' or 'least_latency'
+            max_replica_lag: Replication lag in seconds above which a replica is skipped
+            replica_check_interval: Seconds between lag probes of a replica
+            replica_probe_timeout: Seconds a lag probe may wait for a connection
+                and its answer before the replica is marked down
         """
         self.database_url = database_url or os.getenv("DATABASE_URL")
-        if not self.database_url:
-            raise ValueError("DATABASE_URL environment variable not set")
-        
+        self.min_size = min_size if min_size is not None else int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+        self.max_size = max_size if max_size is not None else int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+        self.statement_cache_size = (
+            statement_cache_size if statement_cache_size is not None
+            else int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+        )
+        self.warmup_queries = tuple(warmup_queries)
+        self.metrics = metrics or MetricsRegistry()
+        self.replica_urls = tuple(
+            replica_urls if replica_urls is not None else parse_urls(os.getenv("DATABASE_REPLICA_URLS"))
+        )
+        self.replica_routing = replica_routing or os.getenv("REPLICA_ROUTING", "round_robin")
+        self.max_replica_lag = (
+            max_replica_lag if max_replica_lag is not None
+            else float(os.getenv("REPLICA_MAX_LAG", "5"))
+        )
+        self.replica_check_interval = replica_check_interval
+        self.replica_probe_timeout = replica_probe_timeout
         self.pool: Optional[Pool] = None
+        self.replicas: List[ReplicaPool] = []
+        self._probe_task: Optional[asyncio.Task] = None
+        self._init_lock = asyncio.Lock()
+        self._in_use = 0
+        self._next_replica = 0
+    
+    def configure(
+        self,
+        database_url: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        statement_cache_size: Optional[int] = None,
+        warmup_queries: Optional[Sequence[str]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        replica_urls: Optional[Sequence[str]] = None,
+        replica_routing: Optional[str] = None,
+        max_replica_lag: Optional[float] = None
+    ):
+        """
+        Override pool options before the pool is created.
+        
+        Connection options only take effect until the pool exists; later
+        calls keep the running pool and log a warning. The metrics registry,
+        routing strategy and lag threshold can be changed at any time.
+        
+        Args:
+            database_url: PostgreSQL connection URL
+            min_size: Connections opened (and warmed) up front
+            max_size: Upper bound on open connections
+            statement_cache_size: Prepared statements cached per connection
+            warmup_queries: Statements prepared on every new connection
+            metrics: Registry receiving pool and query metrics
+            replica_urls: Read replicas for read-only acquires
+            replica_routing: 'round_robin' or 'least_latency'
+            max_replica_lag: Replication lag in seconds above which a replica is skipped
+        """
+        if metrics is not None:
+            self.metrics = metrics
+        if replica_routing is not None:
+            self.replica_routing = replica_routing
+        if max_replica_lag is not None:
+            self.max_replica_lag = max_replica_lag
+        
+        options = {
+            "database_url": database_url,
+            "min_size": min_size,
+            "max_size": max_size,
+            "statement_cache_size": statement_cache_size,
+            "warmup_queries": tuple(warmup_queries) if warmup_queries is not None else None,
+            "replica_urls": tuple(replica_urls) if replica_urls is not None else None
+        }
+        changed = {
+            name: value for name, value in options.items()
+            if value is not None and value != getattr(self, name)
+        }
+        if not changed:
+            return
+        if self.pool:
+            logger.warning(f"Database pool already initialized; ignoring {', '.join(changed)}")
+            return
+        for name, value in changed.items():
+            setattr(self, name, value)
+    
+    async def _setup_connection(self, conn: asyncpg.Connection):
+        """Instrument and warm a newly opened connection."""
+        await register_json_codecs(conn)
+        
+        if hasattr(conn, "add_query_logger"):
+            conn.add_query_logger(self._record_query)
+        
+        for query in self.warmup_queries:
+            try:
+                await conn.prepare(query)
+            except asyncpg.PostgresError as e:
+                # E.g. schema not applied yet; the query fails properly when used
+                logger.warning(f"Could not warm up {query_label(query)}: {e}")
+    
+    def _record_query(self, record):
+        """Record the latency of a finished query (asyncpg query logger)."""
+        self.metrics.observe(
+            "db_query_seconds",
+            record.elapsed,
+            help="Database query latency",
+            buckets=QUERY_BUCKETS,
+            query=query_label(record.query),
+            status="error" if record.exception else "ok"
+        )
+    
+    async def _create_pool(self, url: str) -> Pool:
+        """Create one instrumented, warmed asyncpg pool."""
+        return await asyncpg.create_pool(
+            url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=300,
+            command_timeout=60,
+            statement_cache_size=self.statement_cache_size,
+            init=self._setup_connection
+        )
     
     async def initialize(self):
-        """Create connection pool."""
-        if not self.pool:
-            self.pool = await asyncpg.create_pool(
-                self.database_url,
-                min_size=5,
-                max_size=20,
-                max_inactive_connection_lifetime=300,
-                command_timeout=60
+        """Create connection pools, once."""
+        if self.pool:
+            return
+        
+        async with self._init_lock:
+            # Another task may have created it while we waited for the lock
+            if self.pool:
+                return
+            
+            if not self.database_url:
+                raise ValueError("DATABASE_URL environment variable not set")
+            if self.replica_routing not in REPLICA_ROUTING:
+                raise ValueError(
+                    f"Unknown replica routing: {self.replica_routing}. Use one of {', '.join(REPLICA_ROUTING)}"
+                )
+            
+            start = time.perf_counter()
+            self.pool = await self._create_pool(self.database_url)
+            logger.info(
+                f"Database connection pool initialized ({self.min_size}-{self.max_size} connections, "
+                f"warmed in {time.perf_counter() - start:.2f}s)"
             )
-            logger.info("Database connection pool initialized")
+            
+            # A replica that is down at startup is only skipped, and retried by later probes
+            self.replicas = [ReplicaPool(url) for url in self.replica_urls]
+            await asyncio.gather(*(self._probe(replica) for replica in self.replicas))
+            if self.replicas:
+                usable = sum(replica.usable(self.max_replica_lag) for replica in self.replicas)
+                logger.info(
+                    f"Routing read-only queries to {usable}/{len(self.replicas)} replicas ({self.replica_routing})"
+                )
+                self._probe_task = asyncio.create_task(self._probe_replicas())
     
     async def close(self):
-        """Close connection pool."""
-        if self.pool:
-            await self.pool.close()
-            self.pool = None
-            logger.info("Database connection pool closed")
+        """Close connection pools."""
+        async with self._init_lock:
+            if self._probe_task is not None:
+                self._probe_task.cancel()
+                try:
+                    await self._probe_task
+                except asyncio.CancelledError:
+                    pass
+                self._probe_task = None
+            for replica in self.replicas:
+                if replica.pool:
+                    await replica.pool.close()
+            self.replicas = []
+            if self.pool:
+                await self.pool.close()
+                self.pool = None
+                self._in_use = 0
+                logger.info("Database connection pool closed")
+    
+    def _mark_down(self, replica: ReplicaPool, error: BaseException):
+        """Stop routing to a replica until a probe succeeds."""
+        if replica.up:
+            logger.warning(f"Replica {replica.name} unavailable, reading from the primary: {error}")
+        replica.up = False
+        self.metrics.set_gauge("db_replica_up", 0, help="Whether a replica receives reads", replica=replica.name)
+    
+    async def _probe(self, replica: ReplicaPool):
+        """Measure a replica's replication lag and round-trip latency."""
+        if replica.lock.locked():
+            # Another task is probing it; route on the previous measurement
+            return
+        
+        async with replica.lock:
+            replica.checked_at = time.monotonic()
+            try:
+                if replica.pool is None:
+                    replica.pool = await self._create_pool(replica.url)
+                start = time.perf_counter()
+                # A saturated or unreachable replica must not hold its lock past the timeout
+                lag = await asyncio.wait_for(self._read_lag(replica), self.replica_probe_timeout)
+                replica.record_probe(lag, time.perf_counter() - start)
+            except REPLICA_ERRORS as e:
+                self._mark_down(replica, e)
+                return
+        
+        if replica.lag > self.max_replica_lag:
+            logger.warning(f"Replica {replica.name} lags {replica.lag:.1f}s, skipping it")
+        self.metrics.set_gauge(
+            "db_replica_lag_seconds", replica.lag, help="Measured replication lag", replica=replica.name
+        )
+        self.metrics.set_gauge(
+            "db_replica_up", int(replica.usable(self.max_replica_lag)),
+            help="Whether a replica receives reads", replica=replica.name
+        )
+    
+    async def _read_lag(self, replica: ReplicaPool) -> float:
+        """Read a replica's replication lag in seconds."""
+        conn = await replica.pool.acquire()
+        try:
+            return float(await conn.fetchval(REPLICA_LAG_QUERY) or 0.0)
+        finally:
+            await replica.pool.release(conn)
+    
+    async def _probe_replicas(self):
+        """Probe every replica each replica_check_interval seconds until the pool closes."""
+        while True:
+            await asyncio.sleep(self.replica_check_interval)
+            results = await asyncio.gather(
+                *(self._probe(replica) for replica in self.replicas), return_exceptions=True
+            )
+            for replica, result in zip(self.replicas, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Could not probe replica {replica.name}: {result}")
+    
+    def _choose_replica(self) -> Optional[ReplicaPool]:
+        """Pick the replica for a read-only acquire, or None for the primary; never waits on a probe."""
+        candidates = [replica for replica in self.replicas if replica.usable(self.max_replica_lag)]
+        if not candidates:
+            return None
+        if self.replica_routing == "least_latency":
+            return min(candidates, key=lambda replica: replica.latency)
+        
+        self._next_replica += 1
+        return candidates[self._next_replica % len(candidates)]
+    
+    def _set_in_use(self, delta: int):
+        """Track checked-out connections and their high-water mark."""
+        self._in_use += delta
+        self.metrics.set_gauge(
+            "db_pool_connections_in_use", self._in_use, help="Connections currently checked out"
+        )
+        self.metrics.max_gauge(
+            "db_pool_connections_in_use_max", self._in_use, help="Most connections checked out at once"
+        )
     
     @asynccontextmanager
-    async def acquire(self):
-        """Acquire a connection from the pool."""
+    async def acquire(self, readonly: bool = False):
+        """
+        Acquire a connection.
+        
+        Args:
+            readonly: The caller only reads, so a replica may serve it
+        """
         if not self.pool:
             await self.initialize()
         
-        async with self.pool.acquire() as connection:
+        replica = self._choose_replica() if readonly and self.replicas else None
+        
+        start = time.perf_counter()
+        connection = None
+        if replica:
+            try:
+                connection = await replica.pool.acquire()
+            except REPLICA_ERRORS as e:
+                self._mark_down(replica, e)
+                replica = None
+        pool = replica.pool if replica else self.pool
+        if connection is None:
+            connection = await pool.acquire()
+        
+        self.metrics.observe(
+            "db_pool_acquire_wait_seconds",
+            time.perf_counter() - start,
+            help="Time spent waiting for a pooled connection",
+            buckets=WAIT_BUCKETS
+        )
+        self.metrics.inc(
+            "db_pool_acquires_total",
+            help="Connections handed out by target",
+            target=replica.name if replica else "primary"
+        )
+        self._set_in_use(1)
+        try:
             yield connection
+        finally:
+            self._set_in_use(-1)
+            await pool.release(connection)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get pool sizing statistics.
+        
+        A high acquire-wait p95 while in_use_max equals max_size means the
+        pool is too small; an in_use_max well below min_size means it is
+        larger than needed.
+        
+        Returns:
+            Pool size, idle and in-use connections, acquire wait and
+            per-query latency summaries, and the state of each replica
+        """
+        wait = self.metrics.histogram("db_pool_acquire_wait_seconds")
+        queries = self.metrics.snapshot()["histograms"].get("db_query_seconds", {})
+        return {
+            "size": self.pool.get_size() if self.pool else 0,
+            "idle": self.pool.get_idle_size() if self.pool else 0,
+            "in_use": self._in_use,
+            "in_use_max": self.metrics.gauge_value("db_pool_connections_in_use_max"),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "acquire_wait": wait.to_dict() if wait else {},
+            "queries": queries,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "usable": replica.usable(self.max_replica_lag),
+                    "lag_seconds": round(replica.lag, 3),
+                    "latency_ms": round(replica.latency * 1000, 2) if replica.latency is not None else None,
+                    "acquires": self.metrics.counter_value("db_pool_acquires_total", target=replica.name)
+                }
+                for replica in self.replicas
+            ]
+        }
 
 
 # Global database pool instance
@@ -80,109 +760,200 @@ async def close_database():
     await db_pool.close()
 
 # Document Management Functions
-async def get_document(document_id: str) -> Optional[Dict[str, Any]]:
+
+# Collection of documents read without naming one; ingestion.collections
+# defines the same default for writes (utils does not import ingestion)
+DEFAULT_COLLECTION = "default"
+
+# Hides documents an unfinished blue/green reindex (ingestion.reindex) holds
+# back: before its swap the run's staged documents, after it the previous
+# generation's until they are deleted
+VISIBLE_DOCUMENT = """NOT EXISTS (
+        SELECT 1 FROM collection_reindexes r
+        WHERE r.collection_id = d.collection_id
+          AND (d.metadata->>'ingestion_run_id' IS NOT DISTINCT FROM r.run_id) <> r.swapped
+    )"""
+
+GET_DOCUMENT_QUERY = f"""
+    SELECT 
+        d.id::text,
+        d.title,
+        d.source,
+        d.content,
+        d.metadata,
+        d.chunk_count,
+        d.created_at,
+        d.updated_at
+    FROM documents d
+    WHERE d.id = $1::uuid AND d.collection_id = $2 AND {VISIBLE_DOCUMENT}
+"""
+
+
+async def get_document(document_id: str, collection: str = DEFAULT_COLLECTION) -> Optional[Dict[str, Any]]:
     """
     Get document by ID.
     
     Args:
         document_id: Document UUID
+        collection: Collection the document must belong to
     
     Returns:
-        Document data or None if not found
+        Document data or None if not found in the collection
     """
-    async with db_pool.acquire() as conn:
-        result = await conn.fetchrow(
-            """
-            SELECT 
-                id::text,
-                title,
-                source,
-                content,
-                metadata,
-                created_at,
-                updated_at
-            FROM documents
-            WHERE id = $1::uuid
-            """,
-            document_id
-        )
+    async with db_pool.acquire(readonly=True) as conn:
+        result = await conn.fetchrow(GET_DOCUMENT_QUERY, document_id, collection)
         
         if result:
-            return {
-                "id": result["id"],
-                "title": result["title"],
-                "source": result["source"],
-                "content": result["content"],
-                "metadata": json.loads(result["metadata"]),
-                "created_at": result["created_at"].isoformat(),
-                "updated_at": result["updated_at"].isoformat()
-            }
+            return record_to_dict(result, isoformat=("created_at", "updated_at"))
         
         return None
 
 
+DOCUMENT_LIST_COLUMNS = """
+    SELECT 
+        d.id::text,
+        d.title,
+        d.source,
+        d.metadata,
+        d.chunk_count,
+        d.created_at,
+        d.updated_at
+    FROM documents d
+"""
+
+
+def encode_cursor(created_at: datetime, document_id: str) -> str:
+    """
+    Encode the sort key of the last listed document as an opaque cursor.
+    
+    Args:
+        created_at: Creation time of the document
+        document_id: Document UUID
+    
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps([created_at.isoformat(), str(document_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decode a cursor returned by list_documents_page.
+    
+    Args:
+        cursor: Cursor string
+    
+    Returns:
+        Tuple of (created_at, document id)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), UUID(document_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+async def list_documents_page(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    collection: str = DEFAULT_COLLECTION
+) -> Dict[str, Any]:
+    """
+    List a collection's documents newest first, one keyset page at a time.
+    
+    Pages continue from the (created_at, id) of the previous page's last
+    document, so every page is a range scan of
+    idx_documents_collection_created_at no matter how deep it is, and
+    documents inserted meanwhile do not shift later pages. Chunk counts
+    come from the documents table.
+    
+    Args:
+        limit: Maximum number of documents to return
+        cursor: next_cursor of the previous page, or None for the first page
+        metadata_filter: Optional metadata filter
+        collection: Collection to list
+    
+    Returns:
+        Dictionary with the page's documents and the cursor of the next
+        page (None after the last page)
+    """
+    params: List[Any] = [collection]
+    conditions = ["d.collection_id = $1", VISIBLE_DOCUMENT]
+    
+    if metadata_filter:
+        params.append(metadata_filter)
+        conditions.append(f"d.metadata @> ${len(params)}::jsonb")
+    
+    if cursor:
+        created_at, document_id = decode_cursor(cursor)
+        params.extend([created_at, document_id])
+        conditions.append(f"(d.created_at, d.id) < (${len(params) - 1}::timestamptz, ${len(params)}::uuid)")
+    
+    query = DOCUMENT_LIST_COLUMNS + " WHERE " + " AND ".join(conditions)
+    
+    # One extra row tells whether another page follows
+    params.append(limit + 1)
+    query += f"""
+        ORDER BY d.created_at DESC, d.id DESC
+        LIMIT ${len(params)}
+    """
+    
+    async with db_pool.acquire(readonly=True) as conn:
+        results = await conn.fetch(query, *params)
+    
+    rows = results[:limit]
+    next_cursor = None
+    if len(results) > limit and rows:
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    return {
+        "documents": [record_to_dict(row, isoformat=("created_at", "updated_at")) for row in rows],
+        "next_cursor": next_cursor
+    }
+
+
 async def list_documents(
     limit: int = 100,
     offset: int = 0,
-    metadata_filter: Optional[Dict[str, Any]] = None
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    collection: str = DEFAULT_COLLECTION
 ) -> List[Dict[str, Any]]:
     """
-    List documents with optional filtering.
+    List a collection's documents with optional filtering.
+    
+    Kept for offset-based callers: the database still reads and discards
+    every skipped row, so deep offsets get slower. Use list_documents_page
+    for paging through large collections.
     
     Args:
         limit: Maximum number of documents to return
         offset: Number of documents to skip
         metadata_filter: Optional metadata filter
+        collection: Collection to list
     
     Returns:
         List of documents
     """
-    async with db_pool.acquire() as conn:
-        query = """
-            SELECT 
-                d.id::text,
-                d.title,
-                d.source,
-                d.metadata,
-                d.created_at,
-                d.updated_at,
-                COUNT(c.id) AS chunk_count
-            FROM documents d
-            LEFT JOIN chunks c ON d.id = c.document_id
-        """
-        
-        params = []
-        conditions = []
-        
-        if metadata_filter:
-            conditions.append(f"d.metadata @> ${len(params) + 1}::jsonb")
-            params.append(json.dumps(metadata_filter))
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += """
-            GROUP BY d.id, d.title, d.source, d.metadata, d.created_at, d.updated_at
-            ORDER BY d.created_at DESC
-            LIMIT $%d OFFSET $%d
-        """ % (len(params) + 1, len(params) + 2)
-        
-        params.extend([limit, offset])
-        
+    params: List[Any] = [collection]
+    query = DOCUMENT_LIST_COLUMNS + " WHERE d.collection_id = $1 AND " + VISIBLE_DOCUMENT
+    
+    if metadata_filter:
+        params.append(metadata_filter)
+        query += f" AND d.metadata @> ${len(params)}::jsonb"
+    
+    params.extend([limit, offset])
+    query += f"""
+        ORDER BY d.created_at DESC, d.id DESC
+        LIMIT ${len(params) - 1} OFFSET ${len(params)}
+    """
+    
+    async with db_pool.acquire(readonly=True) as conn:
         results = await conn.fetch(query, *params)
-        
-        return [
-            {
-                "id": row["id"],
-                "title": row["title"],
-                "source": row["source"],
-                "metadata": json.loads(row["metadata"]),
-                "created_at": row["created_at"].isoformat(),
-                "updated_at": row["updated_at"].isoformat(),
-                "chunk_count": row["chunk_count"]
-            }
-            for row in results
-        ]
+    
+    return [record_to_dict(row, isoformat=("created_at", "updated_at")) for row in results]
 
 # Utility Functions
 async def execute_query(query: str, *params) -> List[Dict[str, Any]]:
@@ -198,7 +969,7 @@ async def execute_query(query: str, *params) -> List[Dict[str, Any]]:
     """
     async with db_pool.acquire() as conn:
         results = await conn.fetch(query, *params)
-        return [dict(row) for row in results]
+        return [record_to_dict(row) for row in results]
 
 
 async def test_connection() -> bool:
@@ -0,0 +1,686 @@
+"""
+NumPy IVF-flat vector store persisted to local files.
+
+Runs the agent without PostgreSQL: for edge deployments, and for fast tests
+of the search tools and the ingestion pipeline. Each collection is a
+directory holding an append-only float32 file of embeddings, an append-only
+JSON log of upserts and deletes, and the trained centroids.
+"""
+
+import os
+import re
+import json
+import math
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Iterable
+from uuid import UUID
+
+import numpy as np
+
+from .vector_store import VectorQuery, VECTOR_METRICS, RRF_K, hybrid_candidate_count
+from .models import SearchFilters
+from .search_timing import timed
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+LOG_FILE = "log.jsonl"
+CENTROIDS_FILE = "centroids.npy"
+
+# Rows needed before the lists are trained; smaller collections are scanned exactly
+TRAIN_MIN_ROWS = 1024
+# Retrain once the collection has grown this many times past the last training
+RETRAIN_GROWTH = 4
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without English stopwords."""
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def jsonb_contains(value: Any, pattern: Any) -> bool:
+    """
+    Check JSON containment the way PostgreSQL's jsonb @> does.
+
+    Objects contain an object if every key's value is contained; arrays
+    contain an array if every pattern element is contained in some element.
+    """
+    if isinstance(pattern, dict):
+        return isinstance(value, dict) and all(
+            key in value and jsonb_contains(value[key], item) for key, item in pattern.items()
+        )
+    if isinstance(pattern, list):
+        return isinstance(value, list) and all(
+            any(jsonb_contains(element, item) for element in value) for item in pattern
+        )
+    if isinstance(value, list):
+        # A scalar is contained in an array holding it
+        return pattern in value
+    return value == pattern
+
+
+def highlight(content: str, terms: Iterable[str], max_words: int) -> str:
+    """
+    A window of about max_words words around the first matching term, matches wrapped in **.
+
+    Without matching terms it is the chunk's opening words, like chunk_snippet().
+    """
+    terms = set(terms)
+    words = content.split()
+    normalized = [" ".join(tokenize(word)) for word in words]
+    first = next((i for i, word in enumerate(normalized) if word in terms), 0)
+    start = max(0, min(first - max_words // 2, len(words) - max_words))
+    return " ".join(
+        f"**{word}**" if normalized[i] in terms else word
+        for i, word in enumerate(words[start:start + max_words], start)
+    )
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on a sample of the vectors.
+
+    Args:
+        vectors: Rows to cluster
+        n_lists: Number of lists (clusters)
+        seed: Random seed
+
+    Returns:
+        Unit-length centroids, one row per list
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    sample = sample / np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for j in range(n_lists):
+            members = sample[assignment == j]
+            # Empty lists are reseeded from a random sample row
+            centroid = members.sum(axis=0) if len(members) else sample[rng.integers(sample_size)]
+            centroids[j] = centroid / max(np.linalg.norm(centroid), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFCollection:
+    """One collection's rows, lists and keyword postings, mirrored to its directory."""
+
+    def __init__(self, path: str, dimension: int, metric: str):
+        """
+        Initialize collection.
+
+        Args:
+            path: Directory of the collection's files
+            dimension: Embedding dimension
+            metric: cosine or inner_product
+        """
+        self.path = path
+        self.dimension = dimension
+        self.metric = metric
+        self._clear()
+
+    def _clear(self):
+        """Forget all rows held in memory."""
+        self.count = 0
+        # Number of the last logged write; cached search results are keyed on it
+        self.generation = 0
+        self.vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0
+
+        self.chunks: List[Dict[str, Any]] = []
+        self.row_of: Dict[str, int] = {}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+
+    @property
+    def live_rows(self) -> int:
+        """Rows not deleted."""
+        return int(self.alive[:self.count].sum())
+
+    def _file(self, name: str) -> str:
+        """Path of one of the collection's files."""
+        return os.path.join(self.path, name)
+
+    def load(self):
+        """Replay the collection's files, dropping a torn last write."""
+        os.makedirs(self.path, exist_ok=True)
+
+        vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        if os.path.exists(self._file(VECTORS_FILE)):
+            raw = np.fromfile(self._file(VECTORS_FILE), dtype=np.float32)
+            vectors = raw[:len(raw) - len(raw) % self.dimension].reshape(-1, self.dimension)
+
+        if os.path.exists(self._file(LOG_FILE)):
+            replayed = 0
+            with open(self._file(LOG_FILE), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if entry["op"] == "upsert":
+                        rows = len(entry["chunks"])
+                        if self.count + rows > len(vectors):
+                            break
+                        self._apply_upsert(entry["document"], entry["chunks"], vectors[self.count:self.count + rows])
+                    elif entry["op"] == "delete":
+                        self._apply_delete(entry["document_ids"])
+                    self.generation = entry.get("generation", self.generation + 1)
+                    replayed += len(line)
+
+            # Cut a torn last entry, so later appends start on a clean line
+            if replayed < os.path.getsize(self._file(LOG_FILE)):
+                logger.warning(f"Dropping a torn write at the end of {self._file(LOG_FILE)}")
+                with open(self._file(LOG_FILE), "r+b") as f:
+                    f.truncate(replayed)
+
+        # Vectors appended without their log line belong to no document
+        if len(vectors) > self.count:
+            with open(self._file(VECTORS_FILE), "r+b") as f:
+                f.truncate(self.count * self.dimension * 4)
+
+        if os.path.exists(self._file(CENTROIDS_FILE)):
+            self.centroids = np.load(self._file(CENTROIDS_FILE))
+            self.trained_rows = self.count
+            self.lists[:self.count] = self._assign(self.vectors[:self.count])
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest list of each row."""
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int32)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _grow(self, rows: int):
+        """Make room for more rows."""
+        needed = self.count + rows
+        if needed <= len(self.vectors):
+            return
+        capacity = max(needed, 2 * len(self.vectors), 1024)
+        for name in ("vectors", "alive", "lists"):
+            current = getattr(self, name)
+            grown = np.zeros((capacity,) + current.shape[1:], dtype=current.dtype)
+            grown[:self.count] = current[:self.count]
+            setattr(self, name, grown)
+
+    def _apply_upsert(self, document: Dict[str, Any], chunks: List[Dict[str, Any]], vectors: np.ndarray):
+        """Add a document's rows to memory."""
+        self._grow(len(chunks))
+        start = self.count
+        end = start + len(chunks)
+
+        self.vectors[start:end] = vectors
+        self.alive[start:end] = True
+        if self.centroids is not None:
+            self.lists[start:end] = self._assign(vectors)
+
+        for row, chunk in enumerate(chunks, start):
+            chunk = {**chunk, "document_id": document["id"]}
+            self.chunks.append(chunk)
+            self.row_of[chunk["chunk_id"]] = row
+            for term in tokenize(chunk["content"]):
+                postings = self.postings.setdefault(term, {})
+                postings[row] = postings.get(row, 0) + 1
+
+        created_at = document["created_at"]
+        self.documents[document["id"]] = {
+            **document,
+            "created_at": datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at,
+            "rows": list(range(start, end))
+        }
+        self.count = end
+
+    def _apply_delete(self, document_ids: Sequence[str]):
+        """Remove documents' rows from memory."""
+        for document_id in document_ids:
+            document = self.documents.pop(document_id, None)
+            if not document:
+                continue
+            for row in document["rows"]:
+                self.alive[row] = False
+                self.row_of.pop(self.chunks[row]["chunk_id"], None)
+                for term in set(tokenize(self.chunks[row]["content"])):
+                    self.postings.get(term, {}).pop(row, None)
+
+    def _append_log(self, entry: Dict[str, Any]):
+        """Append one entry to the log."""
+        entry["generation"] = self.generation + 1
+        with open(self._file(LOG_FILE), "a") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+        self.generation += 1
+
+    def upsert(self, document: Dict[str, Any], chunks: List[Dict[str, Any]], vectors: np.ndarray):
+        """Add a document, persisting its vectors before the log entry that references them."""
+        if self.metric == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        vectors = vectors.astype(np.float32)
+
+        with open(self._file(VECTORS_FILE), "ab") as f:
+            f.write(vectors.tobytes())
+        self._append_log({"op": "upsert", "document": document, "chunks": chunks})
+        self._apply_upsert(document, chunks, vectors)
+
+        if self.live_rows >= TRAIN_MIN_ROWS and (
+            self.centroids is None or self.count >= RETRAIN_GROWTH * self.trained_rows
+        ):
+            self.train()
+
+    def delete(self, document_ids: List[str]):
+        """Delete documents, rewriting the files once most rows are dead."""
+        if not document_ids:
+            return
+        self._append_log({"op": "delete", "document_ids": document_ids})
+        self._apply_delete(document_ids)
+        if self.count and self.live_rows < self.count / 2:
+            self.compact()
+
+    def train(self, n_lists: Optional[int] = None):
+        """Cluster the live rows into lists and assign every row."""
+        live = self.vectors[:self.count][self.alive[:self.count]]
+        n_lists = min(n_lists or int(math.sqrt(len(live))), len(live))
+        if n_lists < 1:
+            return
+
+        self.centroids = train_centroids(live, n_lists)
+        self.lists[:self.count] = self._assign(self.vectors[:self.count])
+        self.trained_rows = self.count
+        np.save(self._file(CENTROIDS_FILE), self.centroids)
+        logger.info(f"Trained {n_lists} lists on {len(live)} rows of {self.path}")
+
+    def compact(self):
+        """Rewrite the files with the live rows only."""
+        documents = [
+            (
+                {key: value for key, value in document.items() if key != "rows"},
+                [self.chunks[row] for row in document["rows"]],
+                self.vectors[document["rows"]]
+            )
+            for document in self.documents.values()
+        ]
+
+        for name in (VECTORS_FILE, LOG_FILE):
+            tmp = self._file(name + ".tmp")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        with open(self._file(VECTORS_FILE + ".tmp"), "wb") as vectors_file, \
+                open(self._file(LOG_FILE + ".tmp"), "w") as log_file:
+            # Keeps the generation when no document is left
+            log_file.write(json.dumps({"op": "mark", "generation": self.generation}) + "\n")
+            for document, chunks, vectors in documents:
+                vectors_file.write(vectors.astype(np.float32).tobytes())
+                # Same contents, so the generation carries over
+                entry = {
+                    "op": "upsert",
+                    "document": {**document, "created_at": document["created_at"].isoformat()},
+                    "chunks": [{k: v for k, v in chunk.items() if k != "document_id"} for chunk in chunks],
+                    "generation": self.generation
+                }
+                log_file.write(json.dumps(entry, default=str) + "\n")
+        # The log is replaced last: a crash in between leaves vectors the old log
+        # does not reach past, which load() truncates
+        os.replace(self._file(VECTORS_FILE + ".tmp"), self._file(VECTORS_FILE))
+        os.replace(self._file(LOG_FILE + ".tmp"), self._file(LOG_FILE))
+
+        self._clear()
+        self.load()
+
+    def allowed_rows(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        """Mask of rows whose documents match the filters, or None without filters."""
+        if filters is None or filters.is_empty():
+            return None
+
+        mask = np.zeros(self.count, dtype=bool)
+        for document in self.documents.values():
+            if filters.metadata and not jsonb_contains(document["metadata"], filters.metadata):
+                continue
+            if filters.source_prefix and not document["source"].startswith(filters.source_prefix):
+                continue
+            if filters.created_after and document["created_at"] < filters.created_after:
+                continue
+            if filters.created_before and document["created_at"] >= filters.created_before:
+                continue
+            mask[document["rows"]] = True
+        return mask
+
+    def vector_ranking(
+        self,
+        embedding: Sequence[float],
+        limit: int,
+        probes: int,
+        allowed: Optional[np.ndarray]
+    ) -> List[Tuple[int, float]]:
+        """
+        Top rows by similarity to the query embedding.
+
+        Unfiltered searches score the rows of the probes lists nearest to the
+        query; filtered searches and untrained collections score every
+        eligible row exactly.
+
+        Returns:
+            (row, similarity) pairs, most similar first
+        """
+        query = self._query_vector(embedding)
+        eligible = self.alive[:self.count] if allowed is None else self.alive[:self.count] & allowed
+
+        if self.centroids is not None and allowed is None:
+            nearest = np.argsort(self.centroids @ query)[::-1][:max(probes, 1)]
+            eligible = eligible & np.isin(self.lists[:self.count], nearest)
+
+        candidates = np.flatnonzero(eligible)
+        if not len(candidates) or limit <= 0:
+            return []
+
+        scores = self.vectors[candidates] @ query
+        k = min(limit, len(candidates))
+        top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def _query_vector(self, embedding: Sequence[float]) -> np.ndarray:
+        """Query embedding as stored rows are (unit length for cosine)."""
+        query = np.asarray(embedding, dtype=np.float32)
+        if self.metric == "cosine":
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+        return query
+
+    def similarity(self, row: int, embedding: Sequence[float]) -> float:
+        """Similarity of one row to the query embedding."""
+        return float(self.vectors[row] @ self._query_vector(embedding))
+
+    def keyword_ranking(self, text: str, limit: int, allowed: Optional[np.ndarray]) -> List[Tuple[int, float]]:
+        """
+        Top rows by keyword relevance: saturated term frequency weighted by idf.
+
+        Returns:
+            (row, score) pairs, most relevant first
+        """
+        live = max(self.live_rows, 1)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + live / len(postings))
+            for row, frequency in postings.items():
+                if allowed is not None and not allowed[row]:
+                    continue
+                scores[row] = scores.get(row, 0.0) + idf * frequency / (frequency + 1.2)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class IVFVectorStore:
+    """
+    VectorStore on NumPy: IVF-flat lists over float32 rows, kept in memory and on disk.
+
+    Searches probe the lists whose centroids are nearest to the query and
+    score their rows exactly; collections below TRAIN_MIN_ROWS are scanned
+    exactly. Hybrid search fuses the vector ranking with a keyword ranking by
+    reciprocal rank fusion, with the weights and constant hybrid_search()
+    uses in PostgreSQL.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        metric: str = "cosine",
+        probes: int = 8,
+        snippet_metadata_keys: Sequence[str] = ("file_path", "title", "tags"),
+        snippet_max_words: int = 35
+    ):
+        """
+        Initialize store.
+
+        Args:
+            path: Directory holding one subdirectory per collection
+            dimension: Embedding dimension
+            metric: cosine or inner_product
+            probes: Lists scored per search unless the query asks for more
+            snippet_metadata_keys: Metadata keys kept in snippet results
+            snippet_max_words: Words per snippet
+        """
+        if metric not in VECTOR_METRICS:
+            raise ValueError(f"Unknown vector metric: {metric}. Use one of {', '.join(VECTOR_METRICS)}")
+
+        self.path = path
+        self.dimension = dimension
+        self.metric = metric
+        self.probes = probes
+        self.snippet_metadata_keys = list(snippet_metadata_keys)
+        self.snippet_max_words = snippet_max_words
+        self._collections: Dict[str, IVFCollection] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> "IVFVectorStore":
+        """Create a store configured like the PostgreSQL searches."""
+        return cls(
+            settings.vector_store_path,
+            settings.embedding_dimension,
+            settings.vector_metric,
+            probes=settings.ivfflat_probes or 8,
+            snippet_metadata_keys=[k.strip() for k in settings.snippet_metadata_keys.split(",") if k.strip()],
+            snippet_max_words=settings.snippet_max_words
+        )
+
+    def collection(self, collection: str) -> IVFCollection:
+        """Get a collection, loading it from disk on first use."""
+        if collection not in self._collections:
+            loaded = IVFCollection(os.path.join(self.path, collection), self.dimension, self.metric)
+            loaded.load()
+            self._collections[collection] = loaded
+        return self._collections[collection]
+
+    async def upsert(
+        self,
+        collection: str,
+        title: str,
+        source: str,
+        content: str,
+        chunks: Sequence[Any],
+        metadata: Dict[str, Any],
+        replace_partial: bool = False,
+        **options: Any
+    ) -> str:
+        """
+        Store a document and its embedded chunks.
+
+        Options only PostgreSQL supports (work-queue finalize) are ignored.
+
+        Args:
+            collection: Collection the document belongs to
+            title: Document title
+            source: Document source
+            content: Document text (not kept; searches return chunks)
+            chunks: Embedded chunks
+            metadata: Document metadata
+            replace_partial: Remove a copy saved earlier by the same ingestion run
+
+        Returns:
+            Document ID
+        """
+        stored = self.collection(collection)
+        run_id = metadata.get("ingestion_run_id")
+        if replace_partial and run_id:
+            stored.delete([
+                document_id for document_id, document in stored.documents.items()
+                if document["source"] == source and document["metadata"].get("ingestion_run_id") == run_id
+            ])
+
+        document = {
+            "id": str(uuid.uuid4()),
+            "title": title,
+            "source": source,
+            "metadata": metadata,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        rows = [
+            {
+                "chunk_id": str(uuid.uuid4()),
+                "content": chunk.content,
+                "chunk_index": chunk.index,
+                "metadata": chunk.metadata
+            }
+            for chunk in chunks
+        ]
+        vectors = np.array(
+            [getattr(chunk, "embedding", None) or [0.0] * self.dimension for chunk in chunks],
+            dtype=np.float32
+        ).reshape(len(rows), self.dimension)
+
+        stored.upsert(document, rows, vectors)
+        return document["id"]
+
+    async def delete(self, collection: str, source: Optional[str] = None) -> int:
+        """
+        Delete a collection's documents with this source, or all of them.
+
+        Returns:
+            Number of documents deleted
+        """
+        stored = self.collection(collection)
+        document_ids = [
+            document_id for document_id, document in stored.documents.items()
+            if source is None or document["source"] == source
+        ]
+        stored.delete(document_ids)
+        return len(document_ids)
+
+    def _result(self, stored: IVFCollection, row: int, query: VectorQuery, **scores: float) -> Dict[str, Any]:
+        """Result row in the shape the PostgreSQL searches return."""
+        chunk = stored.chunks[row]
+        document = stored.documents[chunk["document_id"]]
+        content = chunk["content"]
+        metadata = chunk["metadata"]
+        if query.snippet:
+            content = highlight(content, tokenize(query.text or ""), self.snippet_max_words)
+            metadata = {key: metadata[key] for key in self.snippet_metadata_keys if key in metadata}
+        return {
+            "chunk_id": chunk["chunk_id"],
+            "document_id": chunk["document_id"],
+            "content": content,
+            **scores,
+            "metadata": metadata,
+            "document_title": document["title"],
+            "document_source": document["source"]
+        }
+
+    async def search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """Find the chunks most similar to the query embedding."""
+        stored = self.collection(query.collection)
+        with timed(query.timings, "execute"):
+            ranking = stored.vector_ranking(
+                query.embedding,
+                query.match_count,
+                query.probes or self.probes,
+                stored.allowed_rows(query.filters)
+            )
+        with timed(query.timings, "convert"):
+            return [self._result(stored, row, query, similarity=score) for row, score in ranking]
+
+    async def hybrid_search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """Fuse the vector and keyword rankings by reciprocal rank fusion."""
+        stored = self.collection(query.collection)
+        allowed = stored.allowed_rows(query.filters)
+        candidates = hybrid_candidate_count(query.match_count)
+
+        with timed(query.timings, "execute"):
+            vector = stored.vector_ranking(query.embedding, candidates, query.probes or self.probes, allowed)
+            text = stored.keyword_ranking(query.text or "", candidates, allowed)
+
+        fused: Dict[int, Dict[str, float]] = {}
+        for rank, (row, similarity) in enumerate(vector, 1):
+            fused[row] = {"score": (1 - query.text_weight) / (RRF_K + rank), "vector": similarity, "text": 0.0}
+        for rank, (row, relevance) in enumerate(text, 1):
+            entry = fused.setdefault(row, {"score": 0.0, "vector": None, "text": 0.0})
+            entry["score"] += query.text_weight / (RRF_K + rank)
+            entry["text"] = relevance
+
+        top = sorted(fused.items(), key=lambda item: item[1]["score"], reverse=True)[:query.match_count]
+        return [
+            self._result(
+                stored, row, query,
+                combined_score=entry["score"],
+                vector_similarity=entry["vector"] if entry["vector"] is not None else stored.similarity(row, query.embedding),
+                text_similarity=entry["text"]
+            )
+            for row, entry in top
+        ]
+
+    async def search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """Run several searches; in-process, so there is no round trip to save."""
+        return [await self.search(query) for query in queries]
+
+    async def hybrid_search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """Run several hybrid searches."""
+        return [await self.hybrid_search(query) for query in queries]
+
+    async def get_neighbor_chunks(self, collection: str, chunk_ids: Sequence[UUID], radius: int) -> List[Dict[str, Any]]:
+        """Fetch the chunks within radius positions of these chunks in their documents."""
+        stored = self.collection(collection)
+        wanted: Dict[str, set] = {}
+        for chunk_id in chunk_ids:
+            row = stored.row_of.get(str(chunk_id))
+            if row is not None:
+                chunk = stored.chunks[row]
+                wanted.setdefault(chunk["document_id"], set()).update(
+                    range(chunk["chunk_index"] - radius, chunk["chunk_index"] + radius + 1)
+                )
+
+        results = []
+        for document_id, indexes in wanted.items():
+            for row in stored.documents[document_id]["rows"]:
+                chunk = stored.chunks[row]
+                if chunk["chunk_index"] in indexes:
+                    results.append({
+                        "chunk_id": chunk["chunk_id"],
+                        "document_id": document_id,
+                        "chunk_index": chunk["chunk_index"],
+                        "content": chunk["content"]
+                    })
+        return results
+
+    async def get_embeddings(self, collection: str, chunk_ids: Sequence[UUID]) -> Dict[str, Sequence[float]]:
+        """Fetch chunk embeddings by id, keyed by chunk id (normalized for cosine stores)."""
+        stored = self.collection(collection)
+        rows = {str(chunk_id): stored.row_of.get(str(chunk_id)) for chunk_id in chunk_ids}
+        return {chunk_id: stored.vectors[row] for chunk_id, row in rows.items() if row is not None}
+
+    async def generation(self, collection: str) -> int:
+        """Get the collection's corpus generation: the number of its last logged write."""
+        return self.collection(collection).generation
+
+    async def get_chunks(self, collection: str, chunk_ids: Sequence[UUID]) -> List[Dict[str, Any]]:
+        """Fetch full chunks by id, in the order requested."""
+        stored = self.collection(collection)
+        results = []
+        for chunk_id in chunk_ids:
+            row = stored.row_of.get(str(chunk_id))
+            if row is None:
+                continue
+            chunk = stored.chunks[row]
+            document = stored.documents[chunk["document_id"]]
+            results.append({
+                "chunk_id": chunk["chunk_id"],
+                "document_id": chunk["document_id"],
+                "content": chunk["content"],
+                "chunk_index": chunk["chunk_index"],
+                "metadata": chunk["metadata"],
+                "document_title": document["title"],
+                "document_source": document["source"]
+            })
+        return results
@@ -0,0 +1,432 @@
+"""
+In-process exact vector search over a memory-mapped copy of a collection's embeddings.
+
+For collections up to about a million chunks, a NumPy matrix-vector product
+over every embedding is faster than a round trip to match_chunks. The index
+keeps the embeddings of one collection in a float32 file on disk, mapped into
+memory, next to a file of chunk ids. Searches score all rows, select the top
+k with argpartition and hydrate only those k chunks from Postgres.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple, Optional, Sequence, Any
+from uuid import UUID
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.u8"
+META_FILE = "meta.json"
+
+ID_BYTES = 16
+INITIAL_CAPACITY = 1024
+SYNC_BATCH_SIZE = 5000
+
+# Same similarities match_chunks returns for these metrics
+LOCAL_METRICS = ("cosine", "inner_product")
+
+SYNC_ROWS_QUERY = """
+    SELECT id, created_at, embedding::real[] AS embedding
+    FROM chunks
+    WHERE collection_id = $1
+      AND embedding IS NOT NULL
+      AND ($2::timestamptz IS NULL OR (created_at, id) > ($2::timestamptz, $3::uuid))
+    ORDER BY created_at, id
+    LIMIT $4
+"""
+
+SYNC_COUNT_QUERY = """
+    SELECT COUNT(*)
+    FROM chunks
+    WHERE collection_id = $1 AND embedding IS NOT NULL
+"""
+
+# Read before the rows, so the synced rows include every write this generation published
+SYNC_GENERATION_QUERY = """
+    SELECT COALESCE(MAX(generation), 0) FROM corpus_generations WHERE collection_id = $1
+"""
+
+
+class LocalVectorIndex:
+    """
+    Exact top-k search over a collection's embeddings, memory-mapped from disk.
+
+    Rows are appended in (created_at, id) order, and the last synced pair is
+    the watermark incremental syncs continue from. Chunks deleted or
+    re-inserted behind the watermark (re-ingestion, blue/green reindexing,
+    transactions committing late) show up as a row count that differs from
+    the database's, which triggers a full rebuild. Cosine indexes store
+    normalized rows, so every metric is a single dot product per row.
+    """
+
+    def __init__(self, path: str, collection: str, dimension: int, metric: str = "cosine"):
+        """
+        Initialize index.
+
+        Args:
+            path: Directory holding the index files of this collection
+            collection: Collection the index mirrors
+            dimension: Embedding dimension
+            metric: cosine or inner_product, as configured for match_chunks
+        """
+        if metric not in LOCAL_METRICS:
+            raise ValueError(f"Unknown vector metric: {metric}. Use one of {', '.join(LOCAL_METRICS)}")
+
+        self.path = path
+        self.collection = collection
+        self.dimension = dimension
+        self.metric = metric
+        self.count = 0
+        self.capacity = 0
+        self.watermark: Optional[Tuple[datetime, UUID]] = None
+        self.synced_at = 0.0
+        # Corpus generation the last sync caught up with; None until the first sync
+        self.generation: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        # Searches score on worker threads; they read the maps and the row count together
+        self._map_lock = threading.RLock()
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def _file(self, name: str) -> str:
+        """Path of one of the index files."""
+        return os.path.join(self.path, name)
+
+    def _map(self, capacity: int):
+        """Map the data files, growing them to hold capacity rows."""
+        for name, row_bytes in ((VECTORS_FILE, self.dimension * 4), (IDS_FILE, ID_BYTES)):
+            with open(self._file(name), "ab") as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+
+        vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        ids = np.memmap(self._file(IDS_FILE), dtype=np.uint8, mode="r+", shape=(capacity, ID_BYTES))
+        with self._map_lock:
+            self._vectors, self._ids, self.capacity = vectors, ids, capacity
+
+    def _write_meta(self):
+        """Persist the row count and watermark; written last, so a crash mid-append loses nothing committed."""
+        meta = {
+            "collection": self.collection,
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "count": self.count,
+            "capacity": self.capacity,
+            "watermark": [self.watermark[0].isoformat(), str(self.watermark[1])] if self.watermark else None
+        }
+        tmp = self._file(META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file(META_FILE))
+
+    def load(self) -> bool:
+        """
+        Open the index files, or create empty ones.
+
+        Files built for another dimension or metric are discarded.
+
+        Returns:
+            True if existing rows were loaded
+        """
+        os.makedirs(self.path, exist_ok=True)
+
+        meta = None
+        if os.path.exists(self._file(META_FILE)):
+            with open(self._file(META_FILE)) as f:
+                meta = json.load(f)
+            if (meta.get("dimension"), meta.get("metric")) != (self.dimension, self.metric):
+                logger.info(f"Local index at {self.path} was built for another dimension or metric, rebuilding")
+                meta = None
+
+        if meta is None:
+            self.reset()
+            return False
+
+        if meta["watermark"]:
+            created_at, chunk_id = meta["watermark"]
+            self.watermark = (datetime.fromisoformat(created_at), UUID(chunk_id))
+        with self._map_lock:
+            self.count = meta["count"]
+            self._map(max(meta["capacity"], INITIAL_CAPACITY))
+        logger.info(f"Loaded local index of {self.collection} with {self.count} rows")
+        return True
+
+    def reset(self):
+        """Drop all rows."""
+        os.makedirs(self.path, exist_ok=True)
+        with self._map_lock:
+            self.close()
+            for name in (VECTORS_FILE, IDS_FILE):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+            self.count = 0
+            self.watermark = None
+            self._map(INITIAL_CAPACITY)
+        self._write_meta()
+
+    def close(self):
+        """Unmap the data files."""
+        with self._map_lock:
+            self._vectors = self._ids = None
+            self.capacity = 0
+
+    def append(self, ids: Sequence[UUID], embeddings: Any, watermark: Tuple[datetime, UUID]):
+        """
+        Append rows after the current ones.
+
+        Args:
+            ids: Chunk ids
+            embeddings: Embeddings of the chunks, one row per id
+            watermark: (created_at, id) of the last appended chunk
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dimension)
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+
+        end = self.count + len(ids)
+        if end > self.capacity:
+            capacity = self.capacity
+            while capacity < end:
+                capacity *= 2
+            self._map(capacity)
+
+        self._vectors[self.count:end] = vectors
+        self._ids[self.count:end] = np.frombuffer(b"".join(u.bytes for u in ids), dtype=np.uint8).reshape(-1, ID_BYTES)
+        self._vectors.flush()
+        self._ids.flush()
+
+        # Rows become visible to searches only once the count moves past them
+        self.count = end
+        self.watermark = watermark
+        self._write_meta()
+
+    def search(self, embedding: Sequence[float], match_count: int) -> List[Tuple[str, float]]:
+        """
+        Find the most similar chunks by exact scoring of every row.
+
+        Safe to call from a worker thread while a sync appends or swaps in
+        a rebuild on the event loop.
+
+        Args:
+            embedding: Query embedding
+            match_count: Number of results
+
+        Returns:
+            (chunk id, similarity) pairs, most similar first
+        """
+        with self._map_lock:
+            vectors, ids, count = self._vectors, self._ids, self.count
+        if vectors is None or not count or match_count <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if self.metric == "cosine":
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+        scores = vectors[:count] @ query
+        k = min(match_count, count)
+        top = np.argpartition(scores, count - k)[count - k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(str(UUID(bytes=ids[i].tobytes())), float(scores[i])) for i in top]
+
+    def due(self, interval: float) -> bool:
+        """Check whether the last sync is older than interval seconds."""
+        return time.monotonic() - self.synced_at >= interval
+
+    async def sync(self, pool, batch_size: int = SYNC_BATCH_SIZE) -> int:
+        """
+        Bring the index up to date with the collection's chunks.
+
+        Appends chunks past the watermark in batches, then compares row
+        counts and rebuilds from scratch if they differ. The collection's
+        corpus generation, read first, becomes the index's generation.
+        Concurrent calls return immediately while a sync is running; searches
+        keep using the rows synced so far.
+
+        Args:
+            pool: DatabasePool to read chunks through
+            batch_size: Chunks fetched per query
+
+        Returns:
+            Number of rows appended
+        """
+        if self._sync_lock.locked():
+            return 0
+
+        async with self._sync_lock:
+            async with pool.acquire(readonly=True) as conn:
+                generation = await conn.fetchval(SYNC_GENERATION_QUERY, self.collection)
+                appended = await self._append_new(conn, batch_size)
+                expected = await conn.fetchval(SYNC_COUNT_QUERY, self.collection)
+
+                if expected != self.count:
+                    logger.info(
+                        f"Local index of {self.collection} has {self.count} rows, "
+                        f"the database {expected}; rebuilding"
+                    )
+                    appended = await self._rebuild(conn, batch_size)
+
+            self.synced_at = time.monotonic()
+            self.generation = generation
+            if appended:
+                logger.info(f"Synced {appended} chunks into the local index of {self.collection}")
+            return appended
+
+    def sync_in_background(self, pool) -> Optional[asyncio.Task]:
+        """
+        Start a sync without waiting for it, unless one is running.
+
+        Searches call this when the index is due, and keep answering from
+        the current rows while new rows are appended or a rebuild runs.
+
+        Args:
+            pool: DatabasePool to read chunks through
+
+        Returns:
+            The sync task, or None if a sync is already running
+        """
+        if self._sync_lock.locked() or (self._sync_task is not None and not self._sync_task.done()):
+            return None
+        self._sync_task = asyncio.create_task(self._sync_logged(pool))
+        return self._sync_task
+
+    def cancel_sync(self):
+        """Stop a background sync; the rows appended so far are kept."""
+        if self._sync_task is not None and not self._sync_task.done():
+            self._sync_task.cancel()
+        self._sync_task = None
+
+    async def _sync_logged(self, pool) -> int:
+        """Sync, logging failures: nothing awaits a background sync."""
+        try:
+            return await self.sync(pool)
+        except Exception as e:
+            logger.warning(f"Could not sync the local index of {self.collection}: {e}")
+            # Retried after the next interval rather than by every search
+            self.synced_at = time.monotonic()
+            return 0
+
+    async def _rebuild(self, conn, batch_size: int) -> int:
+        """
+        Build a fresh copy of the index next to this one and swap it in.
+
+        Searches keep using the current rows until the swap. The metadata
+        file is removed before the data files are replaced, so an
+        interrupted swap leaves an index that load() starts over.
+        """
+        shadow = LocalVectorIndex(self.path + ".next", self.collection, self.dimension, self.metric)
+        shadow.reset()
+        appended = await shadow._append_new(conn, batch_size)
+        shadow.close()
+
+        os.remove(self._file(META_FILE))
+        for name in (VECTORS_FILE, IDS_FILE, META_FILE):
+            os.replace(shadow._file(name), self._file(name))
+        os.rmdir(shadow.path)
+
+        self.load()
+        return appended
+
+    async def _append_new(self, conn, batch_size: int) -> int:
+        """Append all chunks past the watermark."""
+        appended = 0
+        while True:
+            after, after_id = self.watermark or (None, None)
+            rows = await conn.fetch(SYNC_ROWS_QUERY, self.collection, after, after_id, batch_size)
+            if not rows:
+                return appended
+
+            self.append(
+                [row["id"] for row in rows],
+                [row["embedding"] for row in rows],
+                (rows[-1]["created_at"], rows[-1]["id"])
+            )
+            appended += len(rows)
+            if len(rows) < batch_size:
+                return appended
+
+
+# Process-wide indexes by directory, so each set of index files has a single writer
+_shared_indexes: Dict[str, LocalVectorIndex] = {}
+
+
+def shared_index(path: str, collection: str, dimension: int, metric: str = "cosine") -> LocalVectorIndex:
+    """
+    Get the process's index of a collection, loading it on first use.
+
+    Every session of the process shares it and its sync lock. Separate
+    objects on the same files would append at their own row counts and
+    rebuild through the same shadow directory.
+
+    Args:
+        path: Directory holding the index files of this collection
+        collection: Collection the index mirrors
+        dimension: Embedding dimension
+        metric: cosine or inner_product, as configured for match_chunks
+
+    Returns:
+        The loaded index; it has not synced until its generation is set
+    """
+    index = _shared_indexes.get(path)
+    if index is None:
+        index = LocalVectorIndex(path, collection, dimension, metric)
+        index.load()
+        _shared_indexes[path] = index
+    return index
+
+
+def close_shared_indexes():
+    """Stop the shared indexes' syncs and unmap their files; called when the application shuts down."""
+    for index in _shared_indexes.values():
+        index.cancel_sync()
+        index.close()
+    _shared_indexes.clear()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Build or update a collection's local index from the command line."""
+    try:
+        from .db_utils import DatabasePool
+    except ImportError:
+        # For direct execution
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from utils.db_utils import DatabasePool
+
+    parser = argparse.ArgumentParser(description="Sync a collection's embeddings into a local search index")
+    parser.add_argument("--path", default=os.getenv("LOCAL_INDEX_PATH"), required=not os.getenv("LOCAL_INDEX_PATH"),
+                        help="Index directory (default: LOCAL_INDEX_PATH)")
+    parser.add_argument("--collection", default="default", help="Collection to index")
+    parser.add_argument("--dimension", type=int, default=int(os.getenv("EMBEDDING_DIMENSION", "1536")))
+    parser.add_argument("--metric", default=os.getenv("VECTOR_METRIC", "cosine"), choices=LOCAL_METRICS)
+    args = parser.parse_args(argv)
+
+    async def run():
+        pool = DatabasePool(min_size=1, max_size=2)
+        index = LocalVectorIndex(os.path.join(args.path, args.collection), args.collection, args.dimension, args.metric)
+        index.load()
+        try:
+            appended = await index.sync(pool)
+        finally:
+            await pool.close()
+        print(f"{index.collection}: {index.count} rows ({appended} new)")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
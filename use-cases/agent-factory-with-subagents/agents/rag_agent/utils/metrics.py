@@ -0,0 +1,310 @@
+"""
+In-process metrics with JSON and Prometheus textfile export.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import threading
+import tempfile
+from typing import Dict, Any, Optional, Tuple, Iterator
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Latency buckets in seconds, from fast DB calls to slow LLM/embedding batches
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process, or 0 where unsupported."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> int:
+    """Current resident set size of this process, falling back to the peak."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_bytes()
+
+
+def _label_set(labels: Dict[str, Any]) -> LabelSet:
+    """Normalize labels into a hashable, ordered key."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Render labels in Prometheus exposition format."""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    rendered = []
+    for key, value in pairs:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        rendered.append(f'{key}="{value}"')
+    return "{" + ",".join(rendered) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value in Prometheus exposition format."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """Fixed-bucket histogram with estimated quantiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize histogram.
+
+        Args:
+            buckets: Upper bounds of the buckets; +Inf is implied
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Record one observation."""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by linear interpolation within its bucket.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated value, or 0.0 without observations
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                fraction = (rank - seen) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """Yield (upper bound, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), self.counts):
+            total += bucket_count
+            yield bound, total
+
+    def to_dict(self) -> Dict[str, float]:
+        """Summarize the histogram."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6)
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters, gauges and histograms.
+
+    Metrics are identified by name plus optional labels, e.g.
+    `observe("ingest_stage_seconds", 0.2, stage="embed")`.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+
+    def _describe(self, name: str, metric_type: str, help_text: str):
+        existing = self._help.get(name)
+        if existing and existing[0] != metric_type:
+            raise ValueError(f"Metric {name} already registered as {existing[0]}")
+        if not existing or (help_text and not existing[1]):
+            self._help[name] = (metric_type, help_text)
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels):
+        """Increase a counter."""
+        with self._lock:
+            self._describe(name, "counter", help)
+            series = self._counters.setdefault(name, {})
+            key = _label_set(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, help: str = "", **labels):
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._describe(name, "gauge", help)
+            self._gauges.setdefault(name, {})[_label_set(labels)] = value
+
+    def max_gauge(self, name: str, value: float, help: str = "", **labels):
+        """Raise a gauge to value if it is higher (high-water mark)."""
+        with self._lock:
+            self._describe(name, "gauge", help)
+            series = self._gauges.setdefault(name, {})
+            key = _label_set(labels)
+            series[key] = max(series.get(key, value), value)
+
+    def gauge_value(self, name: str, **labels) -> float:
+        """Get a gauge's current value."""
+        with self._lock:
+            return self._gauges.get(name, {}).get(_label_set(labels), 0)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        help: str = "",
+        buckets: Optional[Tuple[float, ...]] = None,
+        **labels
+    ):
+        """Record an observation in a histogram."""
+        with self._lock:
+            self._describe(name, "histogram", help)
+            series = self._histograms.setdefault(name, {})
+            key = _label_set(labels)
+            if key not in series:
+                series[key] = Histogram(buckets or DEFAULT_BUCKETS)
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, help: str = "", **labels):
+        """Time a block into a histogram of seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, help=help, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Get a counter's current value."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_set(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        """Get a histogram series, if it has observations."""
+        with self._lock:
+            return self._histograms.get(name, {}).get(_label_set(labels))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get all metrics as plain data.
+
+        Returns:
+            Dictionary of counters, gauges and histogram summaries
+        """
+        def series_key(labels: LabelSet) -> str:
+            return ",".join(f"{k}={v}" for k, v in labels) or "_"
+
+        with self._lock:
+            return {
+                "counters": {
+                    name: {series_key(k): v for k, v in series.items()}
+                    for name, series in self._counters.items()
+                },
+                "gauges": {
+                    name: {series_key(k): v for k, v in series.items()}
+                    for name, series in self._gauges.items()
+                },
+                "histograms": {
+                    name: {series_key(k): h.to_dict() for k, h in series.items()}
+                    for name, series in self._histograms.items()
+                }
+            }
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        with self._lock:
+            for name in sorted(self._help):
+                metric_type, help_text = self._help[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+                if metric_type == "histogram":
+                    for labels, histogram in sorted(self._histograms[name].items()):
+                        for bound, total in histogram.cumulative():
+                            le = ("le", _format_value(bound))
+                            lines.append(f"{name}_bucket{_format_labels(labels, le)} {total}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+                else:
+                    store = self._counters if metric_type == "counter" else self._gauges
+                    for labels, value in sorted(store[name].items()):
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        """Write a JSON snapshot of all metrics."""
+        _atomic_write(path, json.dumps(self.snapshot(), indent=2))
+
+    def write_prometheus_textfile(self, path: str):
+        """
+        Write metrics for the node exporter textfile collector.
+
+        The file is replaced atomically, as the collector requires, so a scrape
+        never sees a partially written file.
+
+        Args:
+            path: Target .prom file inside the collector directory
+        """
+        _atomic_write(path, self.to_prometheus())
+
+
+def _atomic_write(path: str, content: str):
+    """Write a file through a temporary file and rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".metrics")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,145 @@
+"""
+Maximal marginal relevance: diverse top-k selection from over-fetched candidates.
+
+Overlapping chunk windows and sections repeated across documents make the
+plain ranking return several near-identical chunks, which all end up in the
+LLM's context. MMR picks results one at a time, trading each candidate's
+relevance against its similarity to the results already picked.
+"""
+
+from dataclasses import replace
+from typing import List, Dict, Any, Sequence, Callable, Awaitable
+from uuid import UUID
+
+import numpy as np
+
+from .vector_store import VectorQuery
+from .search_timing import timed
+
+DEFAULT_LAMBDA = 0.7
+
+
+def mmr_candidate_count(match_count: int) -> int:
+    """Candidates fetched for MMR to choose match_count results from."""
+    return max(match_count * 4, 20)
+
+
+def mmr_select(
+    embeddings: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    lambda_mult: float = DEFAULT_LAMBDA
+) -> List[int]:
+    """
+    Greedily select k diverse, relevant rows.
+
+    Each step picks the candidate maximizing
+    lambda * relevance - (1 - lambda) * max cosine similarity to the picked
+    ones. Pairwise similarities come from one Gram matrix product; each step
+    is then a vector update of the running maximum.
+
+    Args:
+        embeddings: Candidate embeddings, one row per candidate
+        relevance: Relevance of each candidate, on the scale of cosine similarity
+        k: Number of rows to select
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only
+
+    Returns:
+        Indices of the selected rows, in selection order
+    """
+    count = len(relevance)
+    k = min(k, count)
+    if k <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    similarity = vectors @ vectors.T
+
+    relevance = lambda_mult * np.asarray(relevance, dtype=np.float32)
+    redundancy = np.full(count, -np.inf, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    selected = []
+    for _ in range(k):
+        # Nothing picked yet: no redundancy penalty
+        penalty = np.where(np.isinf(redundancy), 0.0, redundancy)
+        scores = np.where(available, relevance - (1 - lambda_mult) * penalty, -np.inf)
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, similarity[pick])
+    return selected
+
+
+def relevance_scores(rows: Sequence[Dict[str, Any]], score_key: str) -> np.ndarray:
+    """
+    Relevance of search results on a 0-1 scale.
+
+    Vector similarities already are on the scale of the pairwise cosine
+    similarities; fused hybrid scores are min-max scaled to it.
+    """
+    scores = np.array([row[score_key] for row in rows], dtype=np.float32)
+    if score_key == "similarity":
+        return scores
+    spread = scores.max() - scores.min()
+    return (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+
+
+async def mmr_search(
+    store,
+    search: Callable[[VectorQuery], Awaitable[List[Dict[str, Any]]]],
+    query: VectorQuery,
+    score_key: str = "similarity"
+) -> List[Dict[str, Any]]:
+    """
+    Over-fetch candidates with a store search and keep a diverse top-k.
+
+    Args:
+        store: VectorStore the candidates come from
+        search: The store's search or hybrid_search
+        query: Search with mmr_lambda set
+        score_key: Row field holding the search's relevance score
+
+    Returns:
+        Up to query.match_count rows in MMR order
+    """
+    candidates = await search(replace(query, match_count=mmr_candidate_count(query.match_count)))
+    if len(candidates) <= 1:
+        return candidates[:query.match_count]
+
+    with timed(query.timings, "rerank"):
+        embeddings = await store.get_embeddings(query.collection, [UUID(row["chunk_id"]) for row in candidates])
+        # Chunks deleted since the search have no embedding left
+        candidates = [row for row in candidates if row["chunk_id"] in embeddings]
+        if not candidates:
+            return []
+
+        order = mmr_select(
+            np.stack([np.asarray(embeddings[row["chunk_id"]], dtype=np.float32) for row in candidates]),
+            relevance_scores(candidates, score_key),
+            query.match_count,
+            DEFAULT_LAMBDA if query.mmr_lambda is None else query.mmr_lambda
+        )
+    return [candidates[i] for i in order]
+
+
+async def tool_search(store, tool: str, query: VectorQuery) -> List[Dict[str, Any]]:
+    """
+    Run a search tool's query on a store, diversified when it sets mmr_lambda.
+
+    Args:
+        store: VectorStore to search
+        tool: semantic_search or hybrid_search
+        query: Search with its embedding
+
+    Returns:
+        Result rows
+    """
+    if tool == "hybrid_search":
+        search, score_key = store.hybrid_search, "combined_score"
+    else:
+        search, score_key = store.search, "similarity"
+    if query.mmr_lambda is None:
+        return await search(query)
+    return await mmr_search(store, search, query, score_key)
@@ -5,7 +5,7 @@ Pydantic models for data validation and serialization.
 from typing import List, Dict, Any, Optional, Literal
 from datetime import datetime
 from uuid import UUID
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 from enum import Enum
 
 # Enums
@@ -22,12 +22,39 @@ class MessageRole(str, Enum):
     SYSTEM = "system"
 
 # Request Models
+class SearchFilters(BaseModel):
+    """Document filters applied inside the search query, before ranking."""
+    metadata: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Key/value pairs the document metadata must contain"
+    )
+    source_prefix: Optional[str] = Field(default=None, description="Document source path prefix")
+    created_after: Optional[datetime] = Field(default=None, description="Documents created at or after")
+    created_before: Optional[datetime] = Field(default=None, description="Documents created before")
+    
+    @model_validator(mode="before")
+    @classmethod
+    def legacy_metadata_keys(cls, data: Any) -> Any:
+        """Treat unknown top-level keys as metadata, the shape filters had before (e.g. {"category": "x"})."""
+        if not isinstance(data, dict):
+            return data
+        legacy = {key: value for key, value in data.items() if key not in cls.model_fields}
+        if not legacy:
+            return data
+        known = {key: value for key, value in data.items() if key in cls.model_fields}
+        return {**known, "metadata": {**legacy, **(known.get("metadata") or {})}}
+    
+    def is_empty(self) -> bool:
+        """Check whether no filter is set."""
+        return not (self.metadata or self.source_prefix or self.created_after or self.created_before)
+
+
 class SearchRequest(BaseModel):
     """Search request model."""
     query: str = Field(..., description="Search query")
     search_type: SearchType = Field(default=SearchType.SEMANTIC, description="Type of search")
     limit: int = Field(default=10, ge=1, le=50, description="Maximum results")
-    filters: Dict[str, Any] = Field(default_factory=dict, description="Search filters")
+    filters: SearchFilters = Field(default_factory=SearchFilters, description="Search filters")
     
     model_config = ConfigDict(use_enum_values=True)
 
@@ -69,6 +96,42 @@ class SearchResponse(BaseModel):
     total_results: int = 0
     search_type: SearchType
     query_time_ms: float
+    timings: Dict[str, float] = Field(default_factory=dict, description="Milliseconds per search phase")
+    
+    @classmethod
+    def from_results(cls, results: List[Any], search_type: SearchType) -> "SearchResponse":
+        """
+        Build a response from a search tool's results.
+        
+        Args:
+            results: Rows or SearchResult models returned by a search tool,
+                with the search's timings when it returned TimedResults
+            search_type: Search the results come from
+        
+        Returns:
+            Response timed by the search's own total
+        """
+        timings = getattr(results, "timings", None)
+        total_ms = timings.total_ms if timings is not None else None
+        chunks = []
+        for result in results:
+            row = result if isinstance(result, dict) else result.model_dump()
+            chunks.append(ChunkResult(
+                chunk_id=row["chunk_id"],
+                document_id=row["document_id"],
+                content=row["content"],
+                score=row.get("similarity", row.get("combined_score", 0.0)),
+                metadata=row.get("metadata") or {},
+                document_title=row["document_title"],
+                document_source=row["document_source"]
+            ))
+        return cls(
+            results=chunks,
+            total_results=len(chunks),
+            search_type=search_type,
+            query_time_ms=total_ms if total_ms is not None else 0.0,
+            timings=timings.to_dict() if timings is not None else {}
+        )
 
 
 class ToolCall(BaseModel):
@@ -193,4 +256,7 @@ class IngestionResult(BaseModel):
     title: str
     chunks_created: int
     processing_time_ms: float
+    bytes_read: int = 0
+    tokens: int = 0
+    stage_timings_ms: Dict[str, float] = Field(default_factory=dict)
     errors: List[str] = Field(default_factory=list)
\ No newline at end of file
@@ -0,0 +1,547 @@
+"""
+Search result cache, invalidated by corpus generations.
+
+The same searches repeat across sessions (onboarding questions above all),
+and each one costs an embedding call and an index query. Results are cached
+under the tool, the normalized query text and the search parameters, along
+with the collection's corpus generation at the time of the search.
+Ingestion bumps the generation after each batch of writes to the
+collection, so entries of a changed collection are not served again.
+
+Entries live in an in-process LRU shared by the sessions of a process. With
+a path, they are also kept in a SQLite file shared by the processes on a
+host, which logs queries with their embeddings; after an ingest the warmer
+replays the most frequent ones without calling the embedding API. SQLite
+calls block (up to the busy timeout while another process writes), so they
+run on one worker thread per cache, never on the event loop.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import argparse
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import asdict
+from typing import List, Dict, Any, Optional, Tuple
+
+from .vector_store import VectorQuery, PostgresVectorStore
+from .mmr import tool_search
+from .ivf_store import IVFVectorStore
+from .models import SearchFilters
+from .metrics import MetricsRegistry
+from .db_utils import json_dumps, db_pool
+
+logger = logging.getLogger(__name__)
+
+CACHED_TOOLS = ("semantic_search", "hybrid_search")
+
+DEFAULT_MAX_ENTRIES = 512
+# Logged queries kept for the warmer; the least frequent are dropped first
+QUERY_LOG_ROWS = 10000
+# Puts between size checks of the shared file
+PRUNE_EVERY = 100
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        key TEXT PRIMARY KEY,
+        collection TEXT NOT NULL,
+        generation INTEGER NOT NULL,
+        rows BLOB NOT NULL,
+        used_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS queries (
+        key TEXT PRIMARY KEY,
+        tool TEXT NOT NULL,
+        params TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 1,
+        used_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_results_used_at ON results (used_at);
+    CREATE INDEX IF NOT EXISTS idx_queries_hits ON queries (hits);
+"""
+
+
+def normalize_query(text: str) -> str:
+    """Query text as compared for caching: lowercased, whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+
+def query_params(tool: str, query: VectorQuery) -> Dict[str, Any]:
+    """
+    Everything besides the embedding that determines a search's results.
+
+    The embedding is a function of the text, so it is left out; text_weight
+    only matters to hybrid search.
+    """
+    filters = None
+    if query.filters is not None and not query.filters.is_empty():
+        filters = query.filters.model_dump(mode="json", exclude_none=True)
+    return {
+        "tool": tool,
+        "collection": query.collection,
+        "text": normalize_query(query.text or ""),
+        "match_count": query.match_count,
+        "text_weight": query.text_weight if tool == "hybrid_search" else None,
+        "filters": filters,
+        "snippet": query.snippet,
+        "ef_search": query.ef_search,
+        "probes": query.probes,
+        "mmr_lambda": query.mmr_lambda
+    }
+
+
+def cache_key(tool: str, query: VectorQuery) -> str:
+    """Stable key of a search, the same in every process."""
+    params = json.dumps(query_params(tool, query), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+
+class SearchResultCache:
+    """
+    LRU of search results per (search, corpus generation), optionally backed by SQLite.
+
+    An entry only answers a lookup made with the generation it was stored
+    under. Lookups read the in-process LRU first and the shared file on a
+    miss; stores write the LRU and queue the write of the shared file.
+    Every use of the shared file runs on the cache's single SQLite thread,
+    in submission order, so its connection is never used concurrently.
+    Callers get copies of the cached rows and may modify them.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Results kept in memory, and kept in the shared file
+                per collection generation; 0 disables the cache
+            path: SQLite file shared across processes; also logs queries
+                for the warmer
+            metrics: Registry receiving hit and miss counts
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.metrics = metrics or MetricsRegistry()
+        self._entries: "OrderedDict[str, Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._generations: Dict[str, int] = {}
+        self._puts = 0
+
+    def configure(
+        self,
+        max_entries: Optional[int] = None,
+        path: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """
+        Override cache options; entries already cached in memory are kept.
+
+        Args:
+            max_entries: Results kept in memory
+            path: SQLite file shared across processes
+            metrics: Registry receiving hit and miss counts
+        """
+        if max_entries is not None:
+            self.max_entries = max_entries
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+        if path is not None and path != self.path:
+            self.close()
+            self.path = path
+        if metrics is not None:
+            self.metrics = metrics
+
+    @property
+    def enabled(self) -> bool:
+        """Whether results are cached at all."""
+        return self.max_entries > 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the shared file on first use; call on the SQLite thread only."""
+        if self._db is None and self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # Writes are single statements, so autocommit; WAL lets readers
+            # in other processes proceed while one writes
+            self._db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _submit(self, fn, *args) -> Future:
+        """Queue a call on the SQLite thread."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+        return self._executor.submit(fn, *args)
+
+    async def _run(self, fn, *args):
+        """Run a call on the SQLite thread without blocking the event loop."""
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def _close_db(self):
+        """Close the connection; runs on the SQLite thread."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def flush(self):
+        """Wait until the queued writes of the shared file are done."""
+        if self._executor is not None:
+            await self._run(lambda: None)
+
+    def close(self):
+        """Finish the queued writes and close the shared file; blocks."""
+        if self._executor is not None:
+            self._executor.submit(self._close_db)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _remember(self, key: str, generation: int, rows: List[Dict[str, Any]]):
+        """Put an entry at the recent end of the LRU."""
+        self._entries[key] = (generation, rows)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(
+        self,
+        tool: str,
+        query: VectorQuery,
+        generation: int,
+        record: bool = True
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up the results of a search.
+
+        Args:
+            tool: Search tool the results are for
+            query: Search; its embedding is not needed
+            generation: Current corpus generation of the query's collection
+            record: Count the lookup in the metrics and the query log
+
+        Returns:
+            Copies of the cached result rows, or None
+        """
+        if not self.enabled:
+            return None
+
+        key = cache_key(tool, query)
+        rows = None
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generation:
+            self._entries.move_to_end(key)
+            rows = entry[1]
+
+        if rows is None and self.path:
+            rows = await self._run(self._read, key, generation)
+            if rows is not None:
+                self._remember(key, generation, rows)
+
+        if record:
+            self.metrics.inc(
+                "search_cache_requests_total",
+                help="Search result cache lookups",
+                tool=tool,
+                result="hit" if rows is not None else "miss"
+            )
+            if rows is not None and self.path:
+                self._submit(self._touch, key, time.time())
+        return [dict(row) for row in rows] if rows is not None else None
+
+    def _read(self, key: str, generation: int) -> Optional[List[Dict[str, Any]]]:
+        """Read an entry from the shared file."""
+        found = self._connection().execute(
+            "SELECT rows FROM results WHERE key = ? AND generation = ?", (key, generation)
+        ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def _touch(self, key: str, now: float):
+        """Mark a shared entry and its logged query as used."""
+        db = self._connection()
+        db.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+        db.execute("UPDATE queries SET hits = hits + 1, used_at = ? WHERE key = ?", (now, key))
+
+    def put(self, tool: str, query: VectorQuery, generation: int, rows: List[Dict[str, Any]], record: bool = True):
+        """
+        Store the results of a search.
+
+        The shared file is written in the background; flush() waits for it.
+
+        Args:
+            tool: Search tool the results are for
+            query: Search, with the embedding it ran with
+            generation: Corpus generation read before the search ran
+            rows: Result rows; the cache keeps copies
+            record: Log the query for the warmer
+        """
+        if not self.enabled:
+            return
+
+        key = cache_key(tool, query)
+        self._remember(key, generation, [dict(row) for row in rows])
+        if not self.path:
+            return
+
+        # Serialized now, so later changes to rows are not written
+        logged = None
+        if record and query.embedding is not None:
+            logged = (tool, json.dumps(self._replay_params(query)), array("f", query.embedding).tobytes())
+        self._submit(self._write, key, query.collection, generation, json_dumps(rows), logged, time.time())
+
+    def _write(
+        self,
+        key: str,
+        collection: str,
+        generation: int,
+        rows: str,
+        logged: Optional[Tuple[str, str, bytes]],
+        now: float
+    ):
+        """Write an entry, and its logged query, to the shared file."""
+        db = self._connection()
+        # Results of older generations can never be served again
+        if self._generations.get(collection) != generation:
+            self._generations[collection] = generation
+            db.execute("DELETE FROM results WHERE collection = ? AND generation < ?", (collection, generation))
+        db.execute(
+            "INSERT OR REPLACE INTO results (key, collection, generation, rows, used_at) VALUES (?, ?, ?, ?, ?)",
+            (key, collection, generation, rows, now)
+        )
+        if logged is not None:
+            db.execute(
+                """
+                INSERT INTO queries (key, tool, params, embedding, used_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET hits = hits + 1, embedding = excluded.embedding, used_at = excluded.used_at
+                """,
+                (key, *logged, now)
+            )
+
+        self._puts += 1
+        if self._puts % PRUNE_EVERY == 0:
+            self._prune(db)
+
+    def _replay_params(self, query: VectorQuery) -> Dict[str, Any]:
+        """Fields needed to run a logged search again."""
+        params = asdict(query)
+        params.pop("embedding")
+        params.pop("timings")
+        params["filters"] = query.filters.model_dump(mode="json") if query.filters is not None else None
+        return params
+
+    def _prune(self, db: sqlite3.Connection):
+        """Bound the shared file: least recently used results, least frequent queries."""
+        db.execute(
+            """
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM results ORDER BY used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries * 8,)
+        )
+        db.execute(
+            """
+            DELETE FROM queries WHERE key IN (
+                SELECT key FROM queries ORDER BY hits DESC, used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (QUERY_LOG_ROWS,)
+        )
+
+    async def top_queries(self, limit: int) -> List[Tuple[str, VectorQuery]]:
+        """
+        Most frequent logged searches, with their embeddings.
+
+        Args:
+            limit: Number of searches
+
+        Returns:
+            (tool, query) pairs, most frequent first
+        """
+        if not self.path or limit <= 0:
+            return []
+
+        logged = []
+        for tool, params, embedding in await self._run(self._read_queries, limit):
+            params = json.loads(params)
+            if params.get("filters") is not None:
+                params["filters"] = SearchFilters(**params["filters"])
+            logged.append((tool, VectorQuery(embedding=array("f", embedding).tolist(), **params)))
+        return logged
+
+    def _read_queries(self, limit: int) -> List[Tuple[str, str, bytes]]:
+        """Read the most frequent logged queries."""
+        return self._connection().execute(
+            "SELECT tool, params, embedding FROM queries ORDER BY hits DESC, used_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def clear(self):
+        """Drop every cached result; the query log is kept. Blocks on the shared file."""
+        self._entries.clear()
+        if self.path:
+            self._submit(self._clear_shared).result()
+
+    def _clear_shared(self):
+        """Drop the shared file's results."""
+        self._generations.clear()
+        self._connection().execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts and hit ratio since the process started. Blocks on the shared file."""
+        hits = sum(
+            self.metrics.counter_value("search_cache_requests_total", tool=tool, result="hit") for tool in CACHED_TOOLS
+        )
+        misses = sum(
+            self.metrics.counter_value("search_cache_requests_total", tool=tool, result="miss") for tool in CACHED_TOOLS
+        )
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0
+        }
+        if self.path:
+            stats.update(self._submit(self._count_shared).result())
+        return stats
+
+    def _count_shared(self) -> Dict[str, int]:
+        """Count the shared file's results and logged queries."""
+        db = self._connection()
+        return {
+            "shared_entries": db.execute("SELECT COUNT(*) FROM results").fetchone()[0],
+            "logged_queries": db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+        }
+
+
+async def warm(cache: SearchResultCache, store, limit: int) -> int:
+    """
+    Replay the most frequent logged searches into the cache.
+
+    Run after an ingest bumped the generation, so the first user asking a
+    common question gets a cached answer. Logged embeddings are reused, so
+    warming costs index queries only.
+
+    Args:
+        cache: Cache with a shared file
+        store: VectorStore to search
+        limit: Number of logged searches to replay
+
+    Returns:
+        Number of searches run
+    """
+    warmed = 0
+    generations: Dict[str, int] = {}
+    for tool, query in await cache.top_queries(limit):
+        if query.collection not in generations:
+            generations[query.collection] = await store.generation(query.collection)
+        generation = generations[query.collection]
+        if await cache.get(tool, query, generation, record=False) is not None:
+            continue
+
+        try:
+            rows = await tool_search(store, tool, query)
+        except Exception as e:
+            logger.warning(f"Could not warm a cached {tool}: {e}")
+            continue
+        cache.put(tool, query, generation, rows, record=False)
+        warmed += 1
+
+    if warmed:
+        logger.info(f"Warmed the search result cache with {warmed} searches")
+    return warmed
+
+
+def _load_settings():
+    """Load the agent settings; imported late, as ingestion runs without them."""
+    try:
+        from ..settings import load_settings
+    except ImportError:
+        # For direct execution
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from settings import load_settings
+    return load_settings()
+
+
+async def warm_configured(store=None, limit: Optional[int] = None) -> int:
+    """
+    Warm the shared cache configured in the settings, if there is one.
+
+    Args:
+        store: VectorStore to search; by default the one the settings
+            select, on the shared database pool
+        limit: Searches to replay (default RESULT_CACHE_WARM_QUERIES)
+
+    Returns:
+        Number of searches run
+    """
+    settings = _load_settings()
+    limit = settings.result_cache_warm_queries if limit is None else limit
+    if not settings.result_cache_path or settings.result_cache_size <= 0 or limit <= 0:
+        return 0
+
+    if store is None:
+        if settings.vector_store == "ivf":
+            store = IVFVectorStore.from_settings(settings)
+        else:
+            if db_pool.pool is None:
+                db_pool.configure(database_url=settings.database_url, min_size=1, max_size=2)
+            store = PostgresVectorStore(db_pool, settings)
+
+    cache = SearchResultCache(settings.result_cache_size, settings.result_cache_path)
+    try:
+        return await warm(cache, store, limit)
+    finally:
+        await asyncio.to_thread(cache.close)
+
+
+# Shared by all sessions of the process
+result_cache = SearchResultCache()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Show, warm or clear the shared result cache from the command line."""
+    parser = argparse.ArgumentParser(description="Inspect and warm the shared search result cache")
+    parser.add_argument("--path", default=os.getenv("RESULT_CACHE_PATH"), required=not os.getenv("RESULT_CACHE_PATH"),
+                        help="Cache file (default: RESULT_CACHE_PATH)")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--warm", type=int, metavar="N", help="Replay the N most frequent logged searches")
+    action.add_argument("--clear", action="store_true", help="Drop all cached results")
+    args = parser.parse_args(argv)
+
+    if args.warm:
+        os.environ["RESULT_CACHE_PATH"] = args.path
+
+        async def run():
+            try:
+                return await warm_configured(limit=args.warm)
+            finally:
+                await db_pool.close()
+
+        logging.basicConfig(level=logging.INFO)
+        print(f"Warmed {asyncio.run(run())} searches")
+
+    cache = SearchResultCache(path=args.path)
+    if args.clear:
+        cache.clear()
+    for name, value in cache.stats().items():
+        print(f"{name}: {value}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Row handling benchmark: rows/s of search results and document listings.
+
+Compares the per-row JSON decoding the tools used to do with the binary
+JSONB codec and record_to_dict. Without a database the rows are synthetic
+and only the Python side is measured; with --database-url the same queries
+are fetched over a plain connection and over one with the codecs.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Optional
+from dataclasses import dataclass
+
+try:
+    from .db_utils import JSONB_VERSION, json_dumps, _decode_jsonb, record_to_dict, register_json_codecs
+except ImportError:
+    # For direct execution
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.db_utils import JSONB_VERSION, json_dumps, _decode_jsonb, record_to_dict, register_json_codecs
+
+SEARCH_ROWS = 50
+LISTING_ROWS = 1000
+
+LIVE_SEARCH_QUERY = """
+    SELECT c.id::text AS chunk_id, c.document_id::text, c.content, c.metadata,
+           d.title AS document_title, d.source AS document_source
+    FROM chunks c JOIN documents d ON d.id = c.document_id
+    LIMIT $1
+"""
+
+LIVE_LISTING_QUERY = """
+    SELECT id::text, title, source, metadata, created_at, updated_at
+    FROM documents
+    ORDER BY created_at DESC
+    LIMIT $1
+"""
+
+
+@dataclass
+class RowBenchResult:
+    """Throughput of one row handling path for one workload."""
+    workload: str
+    path: str
+    rows: int
+    rows_per_second: float
+
+
+def _metadata(i: int) -> Dict[str, Any]:
+    """Metadata shaped like an ingested markdown chunk's."""
+    return {
+        "file_path": f"/docs/section-{i % 20}/page-{i}.md",
+        "file_size": 4096 + i,
+        "title": f"Page {i}",
+        "tags": ["guide", "setup", f"tag-{i % 7}"],
+        "ingestion_date": "2024-06-01T12:00:00+00:00",
+        "line_count": 120,
+        "word_count": 900,
+        "chunk_method": "semantic",
+        "total_chunks": 12
+    }
+
+
+def synthetic_rows(count: int, content_chars: int, text_ids: bool = False) -> List[Dict[str, Any]]:
+    """
+    Rows as asyncpg hands them to a JSONB decoder.
+
+    Each row carries the raw metadata bytes (binary jsonb) and timestamps;
+    ids are UUIDs as the old queries returned them, or text as the current
+    queries cast them.
+    """
+    created = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    make_id = (lambda: str(uuid.uuid4())) if text_ids else uuid.uuid4
+    return [
+        {
+            "id": make_id(),
+            "document_id": make_id(),
+            "content": "x" * content_chars,
+            "metadata": JSONB_VERSION + json_dumps(_metadata(i)),
+            "title": f"Page {i}",
+            "source": f"section-{i % 20}/page-{i}.md",
+            "created_at": created,
+            "updated_at": created
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_convert(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Text jsonb decoded to str, parsed per row, fields copied one by one."""
+    return [
+        {
+            "id": str(row["id"]),
+            "document_id": str(row["document_id"]),
+            "content": row["content"],
+            "metadata": json.loads(row["metadata"][1:].decode("utf-8")),
+            "title": row["title"],
+            "source": row["source"],
+            "created_at": row["created_at"].isoformat(),
+            "updated_at": row["updated_at"].isoformat()
+        }
+        for row in rows
+    ]
+
+
+def codec_convert(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Binary jsonb decoded by the codec, ids already text, one dict() per row."""
+    converted = []
+    for row in rows:
+        data = record_to_dict(row, isoformat=("created_at", "updated_at"))
+        # Done by the driver as the row is read
+        data["metadata"] = _decode_jsonb(row["metadata"])
+        converted.append(data)
+    return converted
+
+
+def measure(convert: Callable[[List[Dict[str, Any]]], Any], rows: List[Dict[str, Any]], seconds: float) -> float:
+    """
+    Run a conversion repeatedly for a while.
+
+    Returns:
+        Rows converted per second
+    """
+    done = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds or not done:
+        convert(rows)
+        done += len(rows)
+        elapsed = time.perf_counter() - start
+    return done / elapsed
+
+
+def run_synthetic(seconds: float = 1.0) -> List[RowBenchResult]:
+    """
+    Benchmark both paths on synthetic 50-result searches and 1000-document listings.
+
+    Args:
+        seconds: Time spent per workload and path
+
+    Returns:
+        Results per workload and path
+    """
+    results = []
+    for workload, count, content_chars in (("search", SEARCH_ROWS, 2000), ("listing", LISTING_ROWS, 0)):
+        for path, convert, text_ids in (("legacy", legacy_convert, False), ("codec", codec_convert, True)):
+            rows = synthetic_rows(count, content_chars, text_ids)
+            results.append(RowBenchResult(workload, path, count, round(measure(convert, rows, seconds), 1)))
+    return results
+
+
+async def run_live(database_url: str, seconds: float = 1.0) -> List[RowBenchResult]:
+    """
+    Benchmark fetching real rows with and without the codecs.
+
+    Args:
+        database_url: PostgreSQL connection URL of an ingested database
+        seconds: Time spent per workload and path
+
+    Returns:
+        Results per workload and path
+    """
+    import asyncpg
+
+    results = []
+    plain = await asyncpg.connect(database_url)
+    codec = await asyncpg.connect(database_url)
+    await register_json_codecs(codec)
+    try:
+        for workload, query, limit in (
+            ("search", LIVE_SEARCH_QUERY, SEARCH_ROWS),
+            ("listing", LIVE_LISTING_QUERY, LISTING_ROWS)
+        ):
+            for path, conn in (("legacy", plain), ("codec", codec)):
+                done = 0
+                start = time.perf_counter()
+                while time.perf_counter() - start < seconds or not done:
+                    rows = await conn.fetch(query, limit)
+                    if path == "legacy":
+                        converted = [dict(row, metadata=json.loads(row["metadata"])) for row in rows]
+                    else:
+                        converted = [record_to_dict(row) for row in rows]
+                    done += max(len(converted), 1)
+                results.append(RowBenchResult(
+                    workload, path, len(rows), round(done / (time.perf_counter() - start), 1)
+                ))
+    finally:
+        await plain.close()
+        await codec.close()
+    return results
+
+
+def format_results(results: List[RowBenchResult]) -> str:
+    """Render results as a table with the codec speedup per workload."""
+    lines = [f"{'workload':<10} {'path':<8} {'rows':>6} {'rows/s':>14}"]
+    legacy: Dict[str, float] = {}
+    for result in results:
+        line = f"{result.workload:<10} {result.path:<8} {result.rows:>6} {result.rows_per_second:>14,.0f}"
+        if result.path == "legacy":
+            legacy[result.workload] = result.rows_per_second
+        elif legacy.get(result.workload):
+            line += f"  ({result.rows_per_second / legacy[result.workload]:.2f}x)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark search result and listing row handling")
+    parser.add_argument("--database-url", help="Fetch real rows from this database instead of synthetic ones")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time per workload and path")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        results = asyncio.run(run_live(args.database_url, args.seconds))
+    else:
+        results = run_synthetic(args.seconds)
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Per-phase search timings, process-wide phase histograms and sampled EXPLAIN capture.
+
+A search passes through the result cache, the embedding API, the pool, the
+database and row conversion; the total alone does not tell which one is
+slow. Each search carries a SearchTimings that the tools and stores add
+their phases to. The timings are attached to the tool's result and
+aggregated into histograms. Slow statements can be re-run with
+auto_explain in the background, and their plans logged as JSON lines.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Sequence, Iterator
+
+import asyncpg
+
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# In rough order of a search; local index searches add "hydrate"
+SEARCH_PHASES = ("cache", "embed", "acquire", "execute", "convert", "rerank")
+
+# Seconds, from an in-memory cache hit to a slow embedding call
+PHASE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+# Process-wide phase histograms, shared by every session
+search_metrics = MetricsRegistry()
+
+# Transaction-local auto_explain settings of a sampled re-run: the plans of the
+# statements inside the PL/pgSQL search functions, sent back as notices
+AUTO_EXPLAIN_SETTINGS = {
+    "auto_explain.log_min_duration": "0",
+    "auto_explain.log_analyze": "on",
+    "auto_explain.log_buffers": "on",
+    "auto_explain.log_nested_statements": "on",
+    "auto_explain.log_format": "json",
+    "auto_explain.log_level": "notice",
+    "client_min_messages": "notice"
+}
+
+
+class SearchTimings:
+    """Wall-clock milliseconds of one search, per phase."""
+
+    def __init__(self):
+        """Start timing a search."""
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.total_ms: Optional[float] = None
+
+    def add(self, phase: str, seconds: float):
+        """Add time to a phase; a phase run several times accumulates."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds * 1000
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Time a block into a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def finish(self) -> "SearchTimings":
+        """Stop the total clock."""
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        return self
+
+    def to_dict(self) -> Dict[str, float]:
+        """Phase and total milliseconds, e.g. {'embed_ms': 81.2, ..., 'total_ms': 95.0}."""
+        timings = {f"{phase}_ms": round(ms, 3) for phase, ms in self.phases.items()}
+        if self.total_ms is not None:
+            timings["total_ms"] = round(self.total_ms, 3)
+        return timings
+
+    def record(self, tool: str, metrics: Optional[MetricsRegistry] = None):
+        """
+        Add the finished search to the phase and total histograms.
+
+        Args:
+            tool: Search tool, the histograms' label
+            metrics: Registry to record into (default: search_metrics)
+        """
+        metrics = metrics or search_metrics
+        for phase, ms in self.phases.items():
+            metrics.observe(
+                "search_phase_seconds",
+                ms / 1000,
+                help="Search time by phase",
+                buckets=PHASE_BUCKETS,
+                tool=tool,
+                phase=phase
+            )
+        if self.total_ms is not None:
+            metrics.observe(
+                "search_seconds",
+                self.total_ms / 1000,
+                help="Search time end to end",
+                buckets=PHASE_BUCKETS,
+                tool=tool
+            )
+
+
+def timed(timings: Optional[SearchTimings], phase: str):
+    """Time a block into a phase of timings, if the search is being timed."""
+    return timings.phase(phase) if timings is not None else nullcontext()
+
+
+class TimedResults(list):
+    """
+    Search results that also carry the search's timings.
+
+    A plain list to everything that serializes or compares it (the agent
+    sees the results only); callers such as evaluations read .timings.
+    """
+
+    def __init__(self, results: Sequence[Any] = (), timings: Optional[SearchTimings] = None):
+        super().__init__(results)
+        self.timings = timings
+
+
+def phase_summary(tool: str, metrics: Optional[MetricsRegistry] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Get the latency summaries of a tool's phases.
+
+    Args:
+        tool: Search tool
+        metrics: Registry to read (default: search_metrics)
+
+    Returns:
+        Phase name to histogram summary in seconds, plus 'total'
+    """
+    metrics = metrics or search_metrics
+    summary = {}
+    for phase in SEARCH_PHASES + ("hydrate",):
+        histogram = metrics.histogram("search_phase_seconds", tool=tool, phase=phase)
+        if histogram:
+            summary[phase] = histogram.to_dict()
+    total = metrics.histogram("search_seconds", tool=tool)
+    if total:
+        summary["total"] = total.to_dict()
+    return summary
+
+
+class ExplainSampler:
+    """
+    Captures the query plans of a sample of slow search statements.
+
+    The statement is re-run with the same arguments and index settings on
+    its own connection in a background task, so the search that was slow
+    is not delayed further; the sample rate bounds the extra load. The
+    search functions are PL/pgSQL, so a plain EXPLAIN only shows a function
+    scan. The re-run loads auto_explain instead, with nested statements
+    logged to the client, which yields the plans of the index scans inside
+    the functions. Where auto_explain cannot be loaded (it needs superuser
+    or session_preload_libraries), EXPLAIN (ANALYZE, BUFFERS) of the call
+    is logged instead.
+    """
+
+    def __init__(self, path: str, threshold_ms: float, sample_rate: float = 1.0):
+        """
+        Initialize sampler.
+
+        Args:
+            path: JSON lines file plans are appended to
+            threshold_ms: Execute time above which a statement may be sampled
+            sample_rate: Fraction of slow statements explained (0-1)
+        """
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self._tasks: set = set()
+        # Unknown until the first capture tries to load it
+        self._auto_explain: Optional[bool] = None
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["ExplainSampler"]:
+        """Create the configured sampler, or None when sampling is off."""
+        threshold = getattr(settings, "search_explain_threshold_ms", None)
+        if threshold is None:
+            return None
+        return cls(settings.search_explain_path, threshold, settings.search_explain_sample_rate)
+
+    def wants(self, execute_ms: float) -> bool:
+        """Decide whether to explain a statement that took execute_ms."""
+        return execute_ms >= self.threshold_ms and random.random() < self.sample_rate
+
+    def sample(self, pool, label: str, query: str, args: Sequence[Any], params: Dict[str, str], execute_ms: float):
+        """
+        Explain a statement in the background.
+
+        Args:
+            pool: DatabasePool to run the EXPLAIN on
+            label: Query label for the log
+            query: SQL text of the slow statement
+            args: Its arguments
+            params: ANN index settings it ran with
+            execute_ms: Its measured execute time
+        """
+        task = asyncio.create_task(self.capture(pool, label, query, args, params, execute_ms))
+        # Keep a reference until the task is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def capture(
+        self,
+        pool,
+        label: str,
+        query: str,
+        args: Sequence[Any],
+        params: Dict[str, str],
+        execute_ms: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Re-run a statement with its plans captured and append them to the log.
+
+        Returns:
+            The logged entry, or None if the re-run failed
+        """
+        # Imported here: vector_store imports this module
+        from .vector_store import index_params
+
+        try:
+            async with pool.acquire(readonly=True) as conn:
+                plans = None
+                if await self._load_auto_explain(conn):
+                    method = "auto_explain"
+                    plans = await self._nested_plans(conn, query, args, params)
+                if not plans:
+                    method = "explain"
+                    async with index_params(conn, params):
+                        plan = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", *args)
+                    plans = json.loads(plan) if isinstance(plan, str) else plan
+        except Exception as e:
+            logger.warning(f"Could not explain {label}: {e}")
+            return None
+
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "query": label,
+            "execute_ms": round(execute_ms, 3),
+            "index_params": params,
+            # Embeddings are left out: large and meaningless in a log
+            "args": [arg for arg in args if not _is_embedding(arg)],
+            "method": method,
+            # auto_explain: one plan per statement, innermost first
+            "plan": plans
+        }
+        await asyncio.to_thread(self.write, entry)
+        return entry
+
+    async def _load_auto_explain(self, conn) -> bool:
+        """Load auto_explain into the connection's backend, once it is known to work."""
+        if self._auto_explain is False:
+            return False
+        try:
+            await conn.execute("LOAD 'auto_explain'")
+        except asyncpg.PostgresError as e:
+            logger.warning(f"auto_explain unavailable ({e}); sampled plans only show the search function scan")
+            self._auto_explain = False
+            return False
+        self._auto_explain = True
+        return True
+
+    async def _nested_plans(self, conn, query: str, args: Sequence[Any], params: Dict[str, str]) -> List[Any]:
+        """
+        Run a statement under auto_explain and collect the plans it reports.
+
+        The settings are transaction-local, so the pooled connection goes
+        back unchanged (the loaded library logs nothing on its own).
+        """
+        # Imported here: vector_store imports this module
+        from .vector_store import index_params
+
+        notices: List[str] = []
+
+        def collect(connection, message):
+            notices.append(message.message)
+
+        conn.add_log_listener(collect)
+        try:
+            async with index_params(conn, {**AUTO_EXPLAIN_SETTINGS, **params}):
+                await conn.fetch(query, *args)
+            # Listeners are called from the event loop after the messages arrive
+            await asyncio.sleep(0)
+        finally:
+            conn.remove_log_listener(collect)
+
+        plans = []
+        for notice in notices:
+            _, found, plan = notice.partition("plan:")
+            if found:
+                try:
+                    plans.append(json.loads(plan))
+                except json.JSONDecodeError:
+                    continue
+        return plans
+
+    def write(self, entry: Dict[str, Any]):
+        """Append one entry to the log file; blocking, so run off the event loop."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+
+def _is_embedding(arg: Any) -> bool:
+    """Check whether a statement argument is a vector literal or a list of them."""
+    if isinstance(arg, str):
+        return arg.startswith("[")
+    if isinstance(arg, list) and arg:
+        return _is_embedding(arg[0])
+    return False
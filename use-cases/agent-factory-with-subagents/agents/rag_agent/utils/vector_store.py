@@ -0,0 +1,711 @@
+"""
+Vector stores: where chunks and their embeddings live and how they are searched.
+
+The search tools and the ingestion pipeline talk to a VectorStore. The
+PostgreSQL store runs on pgvector and is the default; utils.ivf_store has a
+NumPy engine for deployments and tests without a database.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Any, Optional, Sequence, Set, Callable, Awaitable, Protocol, runtime_checkable
+from uuid import UUID
+
+import asyncpg
+
+from .db_utils import (
+    MATCH_CHUNKS_QUERY,
+    HYBRID_SEARCH_QUERY,
+    MATCH_CHUNKS_SNIPPET_QUERY,
+    HYBRID_SEARCH_SNIPPET_QUERY,
+    BATCH_MATCH_CHUNKS_QUERY,
+    BATCH_HYBRID_SEARCH_QUERY,
+    CHUNKS_BY_ID_QUERY,
+    NEIGHBOR_CHUNKS_QUERY,
+    EMBEDDINGS_BY_ID_QUERY,
+    GENERATION_QUERY,
+    BUMP_GENERATION_QUERY,
+    query_label,
+    record_to_dict
+)
+from .models import SearchFilters
+from .search_timing import SearchTimings, ExplainSampler, timed
+
+logger = logging.getLogger(__name__)
+
+VECTOR_METRICS = ("cosine", "inner_product")
+
+# pgvector's upper bound for hnsw.ef_search
+MAX_EF_SEARCH = 1000
+
+# Reciprocal rank fusion constant; damps the weight of the very top ranks
+RRF_K = 60
+
+
+def hybrid_candidate_count(match_count: int) -> int:
+    """Candidates each hybrid search leg contributes to the fusion."""
+    return max(match_count * 4, 40)
+
+
+@dataclass
+class VectorQuery:
+    """One search against a vector store."""
+    # Left unset until a result cache miss needs the search to run
+    embedding: Optional[List[float]]
+    match_count: int
+    collection: str = "default"
+    # Query text, for the keyword leg of hybrid search and for snippets
+    text: Optional[str] = None
+    text_weight: float = 0.3
+    filters: Optional[SearchFilters] = None
+    snippet: bool = False
+    # Recall knobs: HNSW candidate list size and IVF lists to probe
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    # Relevance weight of MMR diversification (utils.mmr); None keeps the plain ranking
+    mmr_lambda: Optional[float] = None
+    # Phase timings the store adds to; not a search parameter
+    timings: Optional[SearchTimings] = field(default=None, compare=False, repr=False)
+    # Corpus generation the results are cached under; the local index only
+    # answers once it has synced up to it. Not a search parameter
+    generation: Optional[int] = field(default=None, compare=False, repr=False)
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """
+    Storage and search of embedded chunks, grouped into documents and collections.
+
+    Search results are dicts with chunk_id, document_id, content, metadata,
+    document_title and document_source, plus similarity (search) or
+    combined_score, vector_similarity and text_similarity (hybrid_search).
+    """
+
+    async def upsert(
+        self,
+        collection: str,
+        title: str,
+        source: str,
+        content: str,
+        chunks: Sequence[Any],
+        metadata: Dict[str, Any],
+        **options: Any
+    ) -> str:
+        """Store a document and its embedded chunks; returns the document id."""
+        ...
+
+    async def delete(self, collection: str, source: Optional[str] = None) -> int:
+        """Delete a collection's documents with this source, or all of them; returns the number deleted."""
+        ...
+
+    async def search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """Find the chunks most similar to the query embedding."""
+        ...
+
+    async def hybrid_search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """Rank chunks by fusing vector similarity and keyword relevance."""
+        ...
+
+    async def search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """Run searches differing only in their embeddings; one result list per query."""
+        ...
+
+    async def hybrid_search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """Run hybrid searches differing only in their embeddings and texts; one result list per query."""
+        ...
+
+    async def get_chunks(self, collection: str, chunk_ids: Sequence[UUID]) -> List[Dict[str, Any]]:
+        """Fetch full chunks by id, in the order requested."""
+        ...
+
+    async def get_neighbor_chunks(self, collection: str, chunk_ids: Sequence[UUID], radius: int) -> List[Dict[str, Any]]:
+        """Fetch the chunks within radius positions of these chunks in their documents (chunk_index included)."""
+        ...
+
+    async def get_embeddings(self, collection: str, chunk_ids: Sequence[UUID]) -> Dict[str, Sequence[float]]:
+        """Fetch chunk embeddings by id, keyed by chunk id; missing chunks are left out."""
+        ...
+
+    async def generation(self, collection: str) -> int:
+        """Get the collection's corpus generation, which changes with every write."""
+        ...
+
+
+def resolve_index_params(
+    settings,
+    match_count: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> Dict[str, str]:
+    """
+    Work out the ANN index settings for one query.
+
+    Per-call values override the configured defaults. HNSW returns at most
+    ef_search rows, so ef_search is raised to match_count when it is lower.
+
+    Args:
+        settings: Application settings
+        match_count: Number of results requested
+        ef_search: HNSW candidate list size for this query
+        probes: IVFFlat lists to probe for this query
+
+    Returns:
+        Setting name to value, only for settings that are set
+    """
+    if ef_search is None:
+        ef_search = settings.hnsw_ef_search
+    if probes is None:
+        probes = settings.ivfflat_probes
+
+    params = {}
+    if ef_search is not None:
+        params['hnsw.ef_search'] = str(min(max(ef_search, match_count, 1), MAX_EF_SEARCH))
+    if probes is not None:
+        params['ivfflat.probes'] = str(max(probes, 1))
+    return params
+
+
+@asynccontextmanager
+async def index_params(conn: asyncpg.Connection, params: Dict[str, str]):
+    """
+    Apply ANN index settings to the queries run inside the block.
+
+    Settings are transaction-local (SET LOCAL semantics), so they never
+    leak to other users of the pooled connection. Without settings no
+    transaction is opened.
+
+    Args:
+        conn: Database connection
+        params: Setting name to value, from resolve_index_params
+    """
+    if not params:
+        yield
+        return
+
+    async with conn.transaction():
+        names = list(params)
+        calls = ', '.join(f'set_config(${2 * i + 1}, ${2 * i + 2}, true)' for i in range(len(names)))
+        args = [value for name in names for value in (name, params[name])]
+        await conn.execute(f'SELECT {calls}', *args)
+        yield
+
+
+def filter_args(filters: Optional[SearchFilters]) -> List[Any]:
+    """
+    Get the filter arguments of the search functions.
+
+    Args:
+        filters: Document filters, or None
+
+    Returns:
+        filter_metadata, source_prefix, created_after and created_before,
+        with None for each filter that is not set
+    """
+    if filters is None or filters.is_empty():
+        return [None, None, None, None]
+
+    return [
+        filters.metadata or None,
+        filters.source_prefix or None,
+        filters.created_after,
+        filters.created_before
+    ]
+
+
+def batch_template(queries: Sequence[VectorQuery]) -> VectorQuery:
+    """
+    Get the parameters a batch of searches shares.
+
+    A batch runs as one statement, so everything but the embedding and the
+    text is passed once.
+
+    Args:
+        queries: Searches of one batch
+
+    Returns:
+        The first query without its embedding and text
+    """
+    template = replace(queries[0], embedding=None, text=None)
+    for query in queries[1:]:
+        if replace(query, embedding=None, text=None) != template:
+            raise ValueError("Batched searches must share all parameters but the embedding and text")
+    if template.snippet:
+        raise ValueError("Batched searches return full chunks; snippet projections are not supported")
+    return template
+
+
+def group_batch_rows(rows: Sequence[Any], query_count: int) -> List[List[Dict[str, Any]]]:
+    """Split the rows of a batch statement into one ranked list per query."""
+    results: List[List[Dict[str, Any]]] = [[] for _ in range(query_count)]
+    for row in rows:
+        row = record_to_dict(row)
+        results[row.pop("query_index")].append(row)
+    return results
+
+
+def resolve_metric(settings) -> str:
+    """Get the configured vector metric, validated."""
+    metric = settings.vector_metric
+    if metric not in VECTOR_METRICS:
+        raise ValueError(f"Unknown vector metric: {metric}. Use one of {', '.join(VECTOR_METRICS)}")
+    return metric
+
+
+def snippet_metadata_keys(settings) -> List[str]:
+    """Get the metadata keys kept in snippet results."""
+    return [key.strip() for key in settings.snippet_metadata_keys.split(",") if key.strip()]
+
+
+class PostgresVectorStore:
+    """
+    pgvector-backed store: match_chunks and hybrid_search over partitioned chunks.
+
+    With a LocalVectorIndex, unfiltered full-text searches are scored
+    in-process and only the top chunks are read from the database.
+    """
+
+    def __init__(
+        self,
+        pool,
+        settings=None,
+        local_index=None,
+        documents_table: str = "documents",
+        chunks_table: str = "chunks"
+    ):
+        """
+        Initialize store.
+
+        Args:
+            pool: DatabasePool
+            settings: Application settings with the search configuration;
+                only needed for searches
+            local_index: In-process index of the searched collection
+            documents_table: Table documents are written to
+            chunks_table: Table chunks are written to (a shadow partition
+                during blue/green reindexing)
+        """
+        self.pool = pool
+        self.settings = settings
+        self.local_index = local_index
+        self.documents_table = documents_table
+        self.chunks_table = chunks_table
+        self.explain = ExplainSampler.from_settings(settings) if settings is not None else None
+        # Collections with upserts not yet published by bump_generations()
+        self.unpublished: Set[str] = set()
+
+    def _uses_local_index(self, query: VectorQuery) -> bool:
+        """
+        Check whether a search can run on the local index (no filters, full projection).
+
+        An index that has not synced yet, or not up to the generation the
+        results are cached under, would answer with rows missing from its
+        copy: a sync starts in the background and the search runs in Postgres.
+        """
+        index = self.local_index
+        if (
+            index is None
+            or index.collection != query.collection
+            or (query.filters is not None and not query.filters.is_empty())
+            or query.snippet
+        ):
+            return False
+        if index.generation is None or (query.generation is not None and index.generation < query.generation):
+            index.sync_in_background(self.pool)
+            return False
+        return index.count > 0
+
+    async def _local_search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """Search the in-process index and hydrate the top results."""
+        return (await self._local_search_batch([query]))[0]
+
+    async def _local_search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """
+        Search the in-process index for each query and hydrate all top results at once.
+
+        Chunks deleted since the last sync are missing from the hydrated
+        rows and dropped. A due sync runs in the background; this search
+        uses the rows synced so far.
+        """
+        index = self.local_index
+        if index.due(self.settings.local_index_sync_interval):
+            index.sync_in_background(self.pool)
+
+        timings = queries[0].timings
+        with timed(timings, "execute"):
+            # Scoring reads every row; a worker thread keeps the event loop free meanwhile
+            matches = await asyncio.to_thread(
+                lambda: [index.search(query.embedding, query.match_count) for query in queries]
+            )
+        chunk_ids = list(dict.fromkeys(chunk_id for ranking in matches for chunk_id, _ in ranking))
+        if not chunk_ids:
+            return [[] for _ in queries]
+
+        with timed(timings, "hydrate"):
+            rows = await self.get_chunks(queries[0].collection, [UUID(chunk_id) for chunk_id in chunk_ids])
+        by_id = {}
+        for row in rows:
+            row.pop("chunk_index", None)
+            by_id[row["chunk_id"]] = row
+        return [
+            [{**by_id[chunk_id], "similarity": similarity} for chunk_id, similarity in ranking if chunk_id in by_id]
+            for ranking in matches
+        ]
+
+    async def _fetch(
+        self,
+        sql: str,
+        args: Sequence[Any],
+        params: Dict[str, str],
+        timings: Optional[SearchTimings] = None
+    ) -> List[Any]:
+        """
+        Run a search statement on a read connection.
+
+        Pool wait and statement time go to the acquire and execute phases;
+        slow statements are handed to the EXPLAIN sampler when configured.
+        """
+        start = time.perf_counter()
+        async with self.pool.acquire(readonly=True) as conn:
+            acquired = time.perf_counter()
+            async with index_params(conn, params):
+                results = await conn.fetch(sql, *args)
+            executed = time.perf_counter()
+
+        if timings is not None:
+            timings.add("acquire", acquired - start)
+            timings.add("execute", executed - acquired)
+        execute_ms = (executed - acquired) * 1000
+        if self.explain is not None and self.explain.wants(execute_ms):
+            self.explain.sample(self.pool, query_label(sql), sql, args, params, execute_ms)
+        return results
+
+    async def search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """
+        Run match_chunks, or the local index when it can answer.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Chunks ordered by similarity
+        """
+        if self._uses_local_index(query):
+            return await self._local_search(query)
+
+        settings = self.settings
+        metric = resolve_metric(settings)
+        params = resolve_index_params(settings, query.match_count, query.ef_search, query.probes)
+
+        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
+        embedding_str = '[' + ','.join(map(str, query.embedding)) + ']'
+        args = [
+            embedding_str,
+            query.match_count,
+            metric,
+            *filter_args(query.filters),
+            settings.exact_scan_limit,
+            query.collection
+        ]
+        if query.snippet:
+            args += [query.text, snippet_metadata_keys(settings), settings.snippet_max_words]
+
+        results = await self._fetch(
+            MATCH_CHUNKS_SNIPPET_QUERY if query.snippet else MATCH_CHUNKS_QUERY,
+            args,
+            params,
+            query.timings
+        )
+
+        with timed(query.timings, "convert"):
+            return [record_to_dict(row) for row in results]
+
+    async def hybrid_search(self, query: VectorQuery) -> List[Dict[str, Any]]:
+        """
+        Run hybrid_search: RRF fusion of the vector and keyword rankings.
+
+        Args:
+            query: Search query with text
+
+        Returns:
+            Chunks ordered by combined score
+        """
+        settings = self.settings
+        metric = resolve_metric(settings)
+        candidate_count = hybrid_candidate_count(query.match_count)
+        params = resolve_index_params(settings, candidate_count, query.ef_search, query.probes)
+
+        embedding_str = '[' + ','.join(map(str, query.embedding)) + ']'
+        args = [
+            embedding_str,
+            query.text,
+            query.match_count,
+            query.text_weight,
+            metric,
+            candidate_count,
+            RRF_K,
+            *filter_args(query.filters),
+            settings.exact_scan_limit,
+            query.collection
+        ]
+        if query.snippet:
+            args += [snippet_metadata_keys(settings), settings.snippet_max_words]
+
+        results = await self._fetch(
+            HYBRID_SEARCH_SNIPPET_QUERY if query.snippet else HYBRID_SEARCH_QUERY,
+            args,
+            params,
+            query.timings
+        )
+
+        with timed(query.timings, "convert"):
+            return [record_to_dict(row) for row in results]
+
+    async def search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """
+        Run match_chunks for many query embeddings in one statement.
+
+        Args:
+            queries: Searches sharing all parameters but the embedding
+
+        Returns:
+            Chunks ordered by similarity, one list per query
+        """
+        if not queries:
+            return []
+        template = batch_template(queries)
+        if self._uses_local_index(template):
+            return await self._local_search_batch(queries)
+
+        settings = self.settings
+        metric = resolve_metric(settings)
+        params = resolve_index_params(settings, template.match_count, template.ef_search, template.probes)
+
+        args = [
+            ['[' + ','.join(map(str, query.embedding)) + ']' for query in queries],
+            template.match_count,
+            metric,
+            *filter_args(template.filters),
+            settings.exact_scan_limit,
+            template.collection
+        ]
+
+        results = await self._fetch(BATCH_MATCH_CHUNKS_QUERY, args, params, template.timings)
+
+        with timed(template.timings, "convert"):
+            return group_batch_rows(results, len(queries))
+
+    async def hybrid_search_batch(self, queries: Sequence[VectorQuery]) -> List[List[Dict[str, Any]]]:
+        """
+        Run hybrid_search for many queries in one statement.
+
+        Args:
+            queries: Searches sharing all parameters but the embedding and text
+
+        Returns:
+            Chunks ordered by combined score, one list per query
+        """
+        if not queries:
+            return []
+        template = batch_template(queries)
+
+        settings = self.settings
+        metric = resolve_metric(settings)
+        candidate_count = hybrid_candidate_count(template.match_count)
+        params = resolve_index_params(settings, candidate_count, template.ef_search, template.probes)
+
+        args = [
+            ['[' + ','.join(map(str, query.embedding)) + ']' for query in queries],
+            [query.text for query in queries],
+            template.match_count,
+            template.text_weight,
+            metric,
+            candidate_count,
+            RRF_K,
+            *filter_args(template.filters),
+            settings.exact_scan_limit,
+            template.collection
+        ]
+
+        results = await self._fetch(BATCH_HYBRID_SEARCH_QUERY, args, params, template.timings)
+
+        with timed(template.timings, "convert"):
+            return group_batch_rows(results, len(queries))
+
+    async def get_chunks(self, collection: str, chunk_ids: Sequence[UUID]) -> List[Dict[str, Any]]:
+        """Fetch full chunks by id, in the order requested."""
+        async with self.pool.acquire(readonly=True) as conn:
+            results = await conn.fetch(CHUNKS_BY_ID_QUERY, collection, list(chunk_ids))
+        return [record_to_dict(row) for row in results]
+
+    async def get_neighbor_chunks(self, collection: str, chunk_ids: Sequence[UUID], radius: int) -> List[Dict[str, Any]]:
+        """Fetch the chunks around these chunks in their documents, in one query."""
+        async with self.pool.acquire(readonly=True) as conn:
+            results = await conn.fetch(NEIGHBOR_CHUNKS_QUERY, collection, list(chunk_ids), radius)
+        return [record_to_dict(row) for row in results]
+
+    async def get_embeddings(self, collection: str, chunk_ids: Sequence[UUID]) -> Dict[str, Sequence[float]]:
+        """Fetch chunk embeddings by id, keyed by chunk id."""
+        async with self.pool.acquire(readonly=True) as conn:
+            results = await conn.fetch(EMBEDDINGS_BY_ID_QUERY, collection, list(chunk_ids))
+        return {row["chunk_id"]: row["embedding"] for row in results}
+
+    async def generation(self, collection: str) -> int:
+        """
+        Get the collection's corpus generation, bumped after committed writes.
+
+        Read on the primary: a search on a lagging replica must never be
+        filed under the newer generation another replica already shows.
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(GENERATION_QUERY, collection)
+
+    async def bump_generations(self) -> Dict[str, int]:
+        """
+        Publish the upserts committed since the last call as new corpus generations.
+
+        Upserts do not bump the generation themselves: every document would
+        take the collection's generation row lock, serializing concurrent
+        ingestion workers, and invalidate the result cache once per document.
+        The ingestion pipeline calls this every batch of documents instead,
+        each bump a short statement of its own; until then searches may be
+        answered from the cache as of the previous bump.
+
+        Returns:
+            New generation per bumped collection
+        """
+        bumped = {}
+        while self.unpublished:
+            collection = self.unpublished.pop()
+            async with self.pool.acquire() as conn:
+                bumped[collection] = await conn.fetchval(BUMP_GENERATION_QUERY, collection)
+        return bumped
+
+    async def upsert(
+        self,
+        collection: str,
+        title: str,
+        source: str,
+        content: str,
+        chunks: Sequence[Any],
+        metadata: Dict[str, Any],
+        replace_partial: bool = False,
+        finalize: Optional[Callable[[asyncpg.Connection, str, int], Awaitable[None]]] = None
+    ) -> str:
+        """
+        Save a document and its chunks in one transaction.
+
+        When replace_partial is set, a copy of the document committed by an
+        earlier attempt of the same run (crash after commit, before the journal
+        write) is removed in the same transaction, so resumed runs never
+        produce duplicates. finalize runs last in the same transaction, so
+        work-queue completion commits atomically with the document. The
+        collection's generation is bumped later, by bump_generations().
+
+        Args:
+            collection: Collection the document belongs to
+            title: Document title
+            source: Document source
+            content: Document text
+            chunks: Embedded chunks
+            metadata: Document metadata
+            replace_partial: Remove a copy saved earlier by the same ingestion run
+            finalize: Called with (connection, document id, chunk count) before commit
+
+        Returns:
+            Document ID
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if replace_partial and metadata.get("ingestion_run_id"):
+                    await conn.execute(
+                        f"""
+                        DELETE FROM {self.documents_table}
+                        WHERE collection_id = $1 AND source = $2 AND metadata->>'ingestion_run_id' = $3
+                        """,
+                        collection,
+                        source,
+                        metadata["ingestion_run_id"]
+                    )
+
+                # Insert document; chunk_count is written here rather than by a
+                # trigger so listings never count chunks and inserts stay set-based
+                document_result = await conn.fetchrow(
+                    f"""
+                    INSERT INTO {self.documents_table} (collection_id, title, source, content, metadata, chunk_count)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    RETURNING id::text
+                    """,
+                    collection,
+                    title,
+                    source,
+                    content,
+                    metadata,
+                    len(chunks)
+                )
+
+                document_id = document_result["id"]
+
+                # Insert chunks
+                for chunk in chunks:
+                    # Convert embedding to PostgreSQL vector string format
+                    embedding_data = None
+                    if hasattr(chunk, 'embedding') and chunk.embedding:
+                        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
+                        embedding_data = '[' + ','.join(map(str, chunk.embedding)) + ']'
+
+                    await conn.execute(
+                        f"""
+                        INSERT INTO {self.chunks_table} (collection_id, document_id, content, embedding, chunk_index, metadata, token_count)
+                        VALUES ($1, $2::uuid, $3, $4::vector, $5, $6, $7)
+                        """,
+                        collection,
+                        document_id,
+                        chunk.content,
+                        embedding_data,
+                        chunk.index,
+                        chunk.metadata,
+                        chunk.token_count
+                    )
+
+                if finalize:
+                    await finalize(conn, document_id, len(chunks))
+
+        # Shadow partitions are invisible to searches until the swap, which
+        # bumps the generation itself
+        if self.chunks_table == "chunks":
+            self.unpublished.add(collection)
+        return document_id
+
+    async def delete(self, collection: str, source: Optional[str] = None) -> int:
+        """
+        Delete documents of a collection; their chunks go with them.
+
+        Without a source the collection's partition is truncated instead of
+        deleting chunk by chunk. Other collections are untouched.
+
+        Args:
+            collection: Collection to delete from
+            source: Only delete documents with this source
+
+        Returns:
+            Number of documents deleted
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if source is None:
+                    partition = await conn.fetchval("SELECT create_collection($1)", collection)
+                    await conn.execute(f"TRUNCATE {partition}")
+                    result = await conn.execute("DELETE FROM documents WHERE collection_id = $1", collection)
+                else:
+                    result = await conn.execute(
+                        "DELETE FROM documents WHERE collection_id = $1 AND source = $2",
+                        collection,
+                        source
+                    )
+            # After the commit, so the generation row is not locked while
+            # a large collection is deleted
+            await conn.fetchval(BUMP_GENERATION_QUERY, collection)
+        return int(result.split()[-1]) if result else 0